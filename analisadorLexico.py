@@ -1,14 +1,101 @@
 # João Victor Lourenço da Silva (20220005997)
 
+import mmap
+import re
+from typing import Iterator, Optional, TextIO
+
 from helpers.token_tipos import Numero, Operadores, Pontuacao, Identificador, Error, PalavraReservada
-from helpers.token import Token
+from helpers.linhas import IndiceLinhas
+from helpers.simbolos import IDENTIFICADORES, interna
+from helpers.token import Token, TokenFatia
+from helpers.token_buffer import TokenBuffer
+
+# Palavras reservadas (comparadas em minúsculas, como antes)
+PALAVRAS_RESERVADAS = {
+    'if': PalavraReservada.IF,
+    'else': PalavraReservada.ELSE,
+    'while': PalavraReservada.WHILE,
+    'return': PalavraReservada.RETURN,
+    'fun': PalavraReservada.FUN,
+    'var': PalavraReservada.VAR,
+    'main': PalavraReservada.MAIN,
+}
+
+# Operadores e pontuação: lexema -> tipo
+SIMBOLOS = {
+    '==': Operadores.IGUAL_IGUAL,
+    '+=': Operadores.ADDEQ,
+    '++': Operadores.INC,
+    '-=': Operadores.SUBEQ,
+    '--': Operadores.DEC,
+    '*=': Operadores.MULEQ,
+    '/=': Operadores.DIVEQ,
+    '<=': Operadores.MENOR_IGUAL,
+    '>=': Operadores.MAIOR_IGUAL,
+    '!=': Operadores.DIFERENTE,
+    '+': Operadores.SOMA,
+    '-': Operadores.SUBTRACAO,
+    '*': Operadores.MULTIPLIC,
+    '/': Operadores.DIVISAO,
+    '%': Operadores.RESTO,
+    '<': Operadores.MENOR,
+    '>': Operadores.MAIOR,
+    '(': Pontuacao.PAREN_ESQ,
+    ')': Pontuacao.PAREN_DIR,
+    '{': Pontuacao.CHAVE_ESQ,
+    '}': Pontuacao.CHAVE_DIR,
+    '=': Pontuacao.IGUAL,
+    ';': Pontuacao.PONTO_VIRGULA,
+    ',': Pontuacao.VIRGULA,
+}
+
+# Padrão mestre (somente ASCII): espaços opcionais + um token.
+# Grupos: 1 número (com letras coladas vira LEX_ERROR, ex.: '237axy'), 2 identificador/palavra reservada,
+# 3 operador/pontuação (os de dois caracteres antes dos de um), 4 vazio = "não sei, use o classificador".
+# Número/identificador seguido de caractere não ASCII também cai no grupo 4, pois isalnum() poderia
+# continuar o lexema; assim a semântica de isspace/isdigit/isalpha/isalnum do Python é mantida.
+PADRAO_MESTRE = re.compile(r"""
+    [ \t\n\r\f\v\x1c-\x1f]*
+    (?:
+        ([0-9]+[A-Za-z0-9]*)(?![A-Za-z0-9]|[^\x00-\x7f])
+      | ([A-Za-z][A-Za-z0-9]*)(?![A-Za-z0-9]|[^\x00-\x7f])
+      | (==|\+=|\+\+|-=|--|\*=|/=|<=|>=|!=|[-+*/%<>(){}=;,])
+      | ()
+    )
+""", re.VERBOSE)
+
+# Versão em bytes do padrão mestre para o AnalizadorLexicoMmap. O número é separado em dígitos (1) e
+# sufixo alfanumérico (2, não vazio = LEX_ERROR); 3 identificador, 4 operador/pontuação e 5 vazio
+# (fim, NUL ou caractere inválido).
+PADRAO_MESTRE_BYTES = re.compile(rb"""
+    [ \t\n\r\f\v\x1c-\x1f]*
+    (?:
+        ([0-9]+)([A-Za-z0-9]*)(?![A-Za-z0-9])
+      | ([A-Za-z][A-Za-z0-9]*)(?![A-Za-z0-9])
+      | (==|\+=|\+\+|-=|--|\*=|/=|<=|>=|!=|[-+*/%<>(){}=;,])
+      | ()
+    )
+""", re.VERBOSE)
+
+# o modo mmap só vale para fontes ASCII sem '\r' (aí posição em bytes == posição no texto lido com
+# open(..., 'r')); do contrário o arquivo é decodificado e lido pelo AnalizadorLexico normal
+PADRAO_NAO_MMAP = re.compile(rb'[\r\x80-\xff]')
+
+SIMBOLOS_BYTES = {lex.encode(): tipo for lex, tipo in SIMBOLOS.items()}
+PALAVRAS_RESERVADAS_BYTES = {lex.encode(): tipo for lex, tipo in PALAVRAS_RESERVADAS.items()}
+
+# tamanho dos blocos lidos do arquivo no modo streaming (iter_tokens)
+TAM_BLOCO = 1 << 16
 
 class AnalizadorLexico:
-    def __init__(self, texto: str):
+    def __init__(self, texto: str = '', linhas: Optional[IndiceLinhas] = None):
         self.texto = texto
         self.i = 0 # posicao atual
         self.n = len(texto) # tamanho da expressao
-        self.linha = 1
+        # início de cada linha, montado de uma vez; os tokens guardam só a posição
+        self.linhas = linhas if linhas is not None else IndiceLinhas(texto)
+        self.base = 0 # posição absoluta de texto[0] (no streaming o texto é só o bloco atual)
+        self.fim = False # já gerou o EOF
 
     # get pega o que está na posição atual. Se a posição atual for maior que o tam. máximo do arquivo, insere \0
     def get(self) -> str:
@@ -16,49 +103,31 @@ class AnalizadorLexico:
 
     # incrementa o 'ponteiro' leitor do arquivo.
     def proximo_token(self):
-        if self.i < self.n and self.texto[self.i] == '\n':
-            self.linha += 1
         self.i += 1
 
     def verificaProxToken(self) -> str:
         return self.texto[self.i + 1] if (self.i + 1) < self.n else '\0'
 
     def verificaNumero(self, inicio: int) -> Token: # Verificar se é um número mesmo
-        lex = ''
         while self.get().isdigit():
-            lex += self.get()
             self.proximo_token()
         if self.get().isalnum(): # Agora, se vier alguma letra depois dos dígitos já vai dar erro
             while self.get().isalnum():
-                lex += self.get()
                 self.proximo_token()
-            return Token(Error.LEX_ERROR, lex, inicio, self.linha)
-        return Token(Numero.NUMERO, lex, inicio, self.linha)
+            return Token(Error.LEX_ERROR, self.texto[inicio:self.i], inicio, self.linhas)
+        return Token(Numero.NUMERO, self.texto[inicio:self.i], inicio, self.linhas)
     
     def verificaIdentificador(self, inicio: int) -> Token: 
-        lex = ''
         while self.get().isalnum():  # letra ou dígito (mas quando entra na função, já é letra).
-            lex += self.get()
             self.proximo_token()
+        lex = self.texto[inicio:self.i]
         
         # Agora, tem que verificar as palavras chave: if, else, while, return, fun, var, main.
-        lower = lex.lower()
-        if lower == 'if':
-            return Token(PalavraReservada.IF, lex, inicio, self.linha)
-        if lower == 'else':
-            return Token(PalavraReservada.ELSE, lex, inicio, self.linha)
-        if lower == 'while':
-            return Token(PalavraReservada.WHILE, lex, inicio, self.linha)
-        if lower == 'return':
-            return Token(PalavraReservada.RETURN, lex, inicio, self.linha)
-        if lower == 'fun':
-            return Token(PalavraReservada.FUN, lex, inicio, self.linha)
-        if lower == 'var':
-            return Token(PalavraReservada.VAR, lex, inicio, self.linha)
-        if lower == 'main':
-            return Token(PalavraReservada.MAIN, lex, inicio, self.linha)
-
-        return Token(Identificador.IDENT, lex, inicio, self.linha)
+        tipo = PALAVRAS_RESERVADAS.get(lex.lower())
+        if tipo is not None:
+            return Token(tipo, lex, inicio, self.linhas)
+        # identificador: já sai do léxico com o id internado
+        return Token(Identificador.IDENT, lex, inicio, self.linhas, interna(lex))
 
     def classificador(self) -> Token:
         # pula espaços em branco
@@ -80,110 +149,183 @@ class AnalizadorLexico:
         if carac.isalpha():
             return self.verificaIdentificador(inicio)
 
-        # Verifica se é ==
-        if carac == '=' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.IGUAL_IGUAL, '==', inicio, self.linha)
-        
-        # Verifica se é += e ++
-        if carac == '+' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.ADDEQ, '+=', inicio, self.linha)
-        if carac == '+' and self.verificaProxToken() == '+':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.INC, '++', inicio, self.linha)
-
-        # Verifica se é -= e --
-        if carac == '-' and self.verificaProxToken() == '=':
-            self.proximo_token()
+        # operadores de dois caracteres (==, +=, ++, -=, --, *=, /=, <=, >=, !=)
+        duplo = SIMBOLOS.get(carac + self.verificaProxToken())
+        if duplo is not None:
             self.proximo_token()
-            return Token(Operadores.SUBEQ, '-=', inicio, self.linha)
-        if carac == '-' and self.verificaProxToken() == '-':
             self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.DEC, '--', inicio, self.linha)
-
-        # Verifica se é *=
-        if carac == '*' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.MULEQ, '*=', inicio, self.linha)
-
-        # Verifica se é /=
-        if carac == '/' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.DIVEQ, '/=', inicio, self.linha)
-        
-        # Verifica se é <=, >=, !=
-        if carac == '<' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.MENOR_IGUAL, '<=', inicio, self.linha)
-        if carac == '>' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.MAIOR_IGUAL, '>=', inicio, self.linha)
-        if carac == '!' and self.verificaProxToken() == '=':
-            self.proximo_token()
-            self.proximo_token()
-            return Token(Operadores.DIFERENTE, '!=', inicio, self.linha)
+            return Token(duplo, self.texto[inicio:self.i], inicio, self.linhas)
         self.proximo_token() # desloca o ponteiro
 
-        # operadores
-        if carac == '+':
-            return Token(Operadores.SOMA, carac, inicio, self.linha)
-        if carac == '-':
-            return Token(Operadores.SUBTRACAO, carac, inicio, self.linha)
-        if carac == '*':
-            return Token(Operadores.MULTIPLIC, carac, inicio, self.linha)
-        if carac == '/':
-            return Token(Operadores.DIVISAO, carac, inicio, self.linha)
-        if carac == '%':
-            return Token(Operadores.RESTO, carac, inicio, self.linha)
-
-        # Verifica se é < ou >
-        if carac == '<':
-            return Token(Operadores.MENOR, carac, inicio, self.linha)
-        if carac == '>':
-            return Token(Operadores.MAIOR, carac, inicio, self.linha)
-
-        # pontuação
-        # pontuação
-        if carac == '(':
-            return Token(Pontuacao.PAREN_ESQ, carac, inicio, self.linha)
-        if carac == ')':
-            return Token(Pontuacao.PAREN_DIR, carac, inicio, self.linha)
-        if carac == '{':
-            return Token(Pontuacao.CHAVE_ESQ, carac, inicio, self.linha)
-        if carac == '}':
-            return Token(Pontuacao.CHAVE_DIR, carac, inicio, self.linha)
-        if carac == '=':  # operador de atribuição / início do resultado
-            return Token(Pontuacao.IGUAL, carac, inicio, self.linha)
-        if carac == ';':
-            return Token(Pontuacao.PONTO_VIRGULA, carac, inicio, self.linha)
-        if carac == ',':
-            return Token(Pontuacao.VIRGULA, carac, inicio, self.linha)
+        # operadores de um caractere e pontuação
+        simples = SIMBOLOS.get(carac)
+        if simples is not None:
+            return Token(simples, carac, inicio, self.linhas)
 
         # erro léxico
-        return Token(Error.LEX_ERROR, carac, inicio, self.linha)
+        return Token(Error.LEX_ERROR, carac, inicio, self.linhas)
 
         # se não for nenhuma das validações acima: caractere inválido = erro léxico
         # raise SyntaxError(f"Erro léxico na linha {self.linha}, posição {inicio}: caractere inválido '{carac}'")
 
-    # Cria a lista de tokens para exibir (Ele quem inicia toda tokenização)
-    def tokenizador(self) -> list[Token]:
-        tokens = []
+    # Gera os tokens de self.texto a partir de self.i usando o PADRAO_MESTRE: um casamento por token
+    # e o lexema é uma fatia do texto. Quando cai no grupo vazio, aquele token é lido pelo
+    # classificador() e o laço recomeça depois dele.
+    # Se final=False o texto é só um pedaço da entrada: para antes de qualquer token que encoste no
+    # fim do pedaço (ele poderia continuar no próximo bloco), deixando self.i no início dele.
+    def varre(self, final: bool = True) -> Iterator[Token]:
+        texto = self.texto
+        n = self.n
+        base = self.base
+        simbolos = SIMBOLOS
+        reservadas = PALAVRAS_RESERVADAS
+        linhas = self.linhas
         while True:
+            i = self.i
+            for m in PADRAO_MESTRE.finditer(texto, i):
+                grupo = m.lastindex
+                inicio, fim = m.span(grupo)
+                if grupo == 4 or (fim == n and not final):
+                    break
+                lex = m.group(grupo)
+                if grupo == 3:
+                    yield Token(simbolos[lex], lex, base + inicio, linhas)
+                elif grupo == 2:
+                    tipo = reservadas.get(lex.lower())
+                    if tipo is None:
+                        yield Token(Identificador.IDENT, lex, base + inicio, linhas, interna(lex))
+                    else:
+                        yield Token(tipo, lex, base + inicio, linhas)
+                elif lex.isdigit():
+                    yield Token(Numero.NUMERO, lex, base + inicio, linhas)
+                else:
+                    yield Token(Error.LEX_ERROR, lex, base + inicio, linhas)
+                i = fim
+            # caminho lento: um token pelo classificador, depois volta ao padrão mestre
+            self.i = i
             tok = self.classificador()
+            if not final and self.i >= n:
+                # chegou ao fim do pedaço: espera o próximo bloco para decidir
+                # (se só havia espaços, eles já ficam consumidos)
+                if tok is not None:
+                    self.i = i
+                return
             if tok is None:
-                tokens.append(Token(Pontuacao.EOF, '', self.i, self.linha)) # Adiciona EOF no final - Para o analisador léxico, por enquanto.
-                break  # fim implícito, não gera EOF
-            tokens.append(tok)
-        return tokens
+                self.fim = True
+                yield Token(Pontuacao.EOF, '', base + self.i, self.linhas) # Adiciona EOF no final - Para o analisador léxico, por enquanto.
+                return  # fim implícito, não gera EOF
+            tok.pos += base
+            yield tok
+
+    # Modo streaming: lê o arquivo em blocos e gera os tokens sob demanda (o Parser aceita o gerador).
+    # Só o pedaço ainda não consumido do texto fica em memória. Sem arquivo, varre o próprio self.texto.
+    def iter_tokens(self, arquivo: Optional[TextIO] = None, tam_bloco: int = TAM_BLOCO) -> Iterator[Token]:
+        if arquivo is None:
+            yield from self.varre()
+            return
+        while not self.fim:
+            bloco = arquivo.read(tam_bloco)
+            self.linhas.estende(bloco, self.base + self.n)
+            # descarta o que já virou token e junta o bloco novo ao que sobrou
+            self.base += self.i
+            self.texto = self.texto[self.i:] + bloco
+            self.i = 0
+            self.n = len(self.texto)
+            yield from self.varre(final=not bloco)
+
+    # Cria a lista de tokens para exibir (Ele quem inicia toda tokenização)
+    def tokenizador(self) -> list[Token]:
+        return list(self.varre())
+
+    # Mesmos tokens do tokenizador(), mas guardados num TokenBuffer (arrays compactos) em vez de
+    # um objeto Token por token; os lexemas continuam no texto-fonte e são fatiados sob demanda.
+    def tokenizador_compacto(self) -> TokenBuffer:
+        buffer = TokenBuffer(self.fonte_lexemas(), self.linhas)
+        adiciona = buffer.adiciona_token
+        for tok in self.varre():
+            adiciona(tok)
+        return buffer
+
+    # texto de onde os lexemas do TokenBuffer são fatiados
+    def fonte_lexemas(self):
+        return self.texto
+
+
+class AnalizadorLexicoMmap(AnalizadorLexico):
+    """
+    Léxico sobre o arquivo mapeado em memória (mmap): varre os bytes direto, sem ler o arquivo
+    para uma str. Os tokens são TokenFatia (posição/tamanho dentro de um memoryview do arquivo),
+    então nenhum lexema é copiado; o texto só é decodificado quando alguém lê tok.lexema.
+    Produz o mesmo fluxo de tokens que AnalizadorLexico(open(caminho).read()).
+    """
+    def __init__(self, caminho: str):
+        self.dados = None
+        with open(caminho, 'rb') as f:
+            try:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # arquivo vazio não pode ser mapeado
+                mapa = None
+        if mapa is not None and PADRAO_NAO_MMAP.search(mapa) is None:
+            super().__init__('')
+            self.dados = mapa
+            self.n = len(mapa)
+            self.linhas = IndiceLinhas(mapa)
+        else:
+            # fonte com '\r' ou fora do ASCII: mesmo caminho do main (texto com newlines universais)
+            if mapa is not None:
+                mapa.close()
+            with open(caminho, 'r') as f:
+                super().__init__(f.read())
+
+    def fonte_lexemas(self):
+        return self.texto if self.dados is None else memoryview(self.dados)
+
+    def varre(self, final: bool = True) -> Iterator[Token]:
+        if self.dados is None:
+            yield from super().varre(final)
+            return
+        dados = self.dados
+        fonte = memoryview(dados)
+        simbolos = SIMBOLOS_BYTES
+        reservadas = PALAVRAS_RESERVADAS_BYTES
+        linhas = self.linhas
+        interna_bytes = IDENTIFICADORES.interna_bytes
+        i = inicio = self.i
+        for m in PADRAO_MESTRE_BYTES.finditer(dados, i):
+            grupo = m.lastindex
+            if grupo == 2:
+                inicio = m.start(1)
+                fim = m.end()
+            else:
+                inicio, fim = m.span(grupo)
+                if inicio < i:
+                    # casamento vazio repetido no caractere inválido que já virou token
+                    continue
+            id = None
+            if grupo == 4:
+                tipo = simbolos[m.group(4)]
+            elif grupo == 3:
+                # só lexemas curtos podem ser palavra reservada (a maior é 'return')
+                lex = m.group(3)
+                tipo = Identificador.IDENT
+                if fim - inicio <= 6:
+                    tipo = reservadas.get(lex.lower(), Identificador.IDENT)
+                if tipo is Identificador.IDENT:
+                    id = interna_bytes(lex)
+            elif grupo == 2:
+                tipo = Error.LEX_ERROR if m.end(2) != m.start(2) else Numero.NUMERO
+            elif inicio < self.n and dados[inicio] != 0:
+                # caractere inválido: LEX_ERROR de um caractere, como no classificador
+                fim = inicio + 1
+                tipo = Error.LEX_ERROR
+            else:
+                # fim do arquivo (ou NUL, que o classificador também trata como fim)
+                break
+            yield TokenFatia(tipo, fonte, inicio, fim - inicio, linhas, id)
+            i = fim
+        self.i = inicio
+        self.fim = True
+        yield TokenFatia(Pontuacao.EOF, fonte, inicio, 0, linhas)
 
 
 if __name__ == '__main__':
@@ -1,11 +1,132 @@
 # analisadorSemantico.py
 from typing import Dict, Any, Set
 from helpers.arvore import (
-    Programa, Const, Var, OpBin, Decl, Stmt, Assign,
-    IfStmt, WhileStmt, BlockStmt, ReturnStmt, Call, FunDecl
+    Programa, Var, Decl, Stmt, Assign, Call, FunDecl
 )
+from helpers.linhas import coluna
+from helpers.visitante import VisitanteComandos
 
-def build_symbol_table_and_offsets(program: Programa) -> Dict[str, Any]:
+
+class VerificaNomes(VisitanteComandos):
+    """
+    Checagem de nomes de build_symbol_table_and_offsets sobre uma expressão ou um comando e tudo
+    abaixo dele: variáveis usadas e atribuídas precisam estar em local_names ou na symtab, e
+    chamadas precisam ir para uma função da symtab com a aridade certa. Levanta NameError.
+    """
+    def __init__(self, symtab: Dict[int, Dict[str, Any]], linhas):
+        self.symtab = symtab
+        self.linhas = linhas
+        self.local_names: Set[int] = set()
+
+    def verifica(self, no, local_names: Set[int]) -> None:
+        self.local_names = local_names
+        self.percorre(no)
+
+    def _onde(self, no) -> str:
+        return f"linha {no.linha}, coluna {coluna(self.linhas, no.pos)}, pos {no.pos}"
+
+    def visita_Var(self, e: Var):
+        # Var (referência)
+        if e.id not in self.local_names and e.id not in self.symtab:
+            raise NameError(f"Erro semântico: variável '{e.nome}' não declarada ({self._onde(e)})")
+
+    def visita_Call(self, e: Call):
+        symtab = self.symtab
+        # função deve estar registrada globalmente como função
+        if e.id not in symtab or symtab[e.id]['kind'] != 'fun':
+            raise NameError(f"Erro semântico: chamada para função não declarada '{e.nome}' ({self._onde(e)})")
+        expected = symtab[e.id]['num_params']
+        actual = len(e.args)
+        if expected != actual:
+            raise NameError(f"Erro semântico: chamada para '{e.nome}' com aridade {actual}, esperada {expected} ({self._onde(e)})")
+        # verificar os argumentos (em ordem)
+        return e.args
+
+    def visita_Assign(self, s: Assign):
+        # LHS deve já existir (em local_names OU global) e RHS não pode usar nomes não-declarados
+        if s.id not in self.local_names and s.id not in self.symtab:
+            raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' ({self._onde(s)})")
+        return (s.expr,)
+
+
+class EfeitosFuncao(VisitanteComandos):
+    """
+    Efeitos de um trecho de função sobre as globais, para marca_funcoes_puras: os ids das globais
+    lidas e atribuídas (nomes fora de local_names, que com a resolução estática local -> global
+    são sempre a global) e os ids das funções chamadas.
+    """
+    def __init__(self):
+        self.local_names: Set[int] = set()
+        self.lidas: Set[int] = set()
+        self.atribuidas: Set[int] = set()
+        self.chamadas: Set[int] = set()
+
+    def coleta(self, no, local_names: Set[int]) -> None:
+        self.local_names = local_names
+        self.percorre(no)
+
+    def visita_Var(self, e: Var):
+        if e.id not in self.local_names:
+            self.lidas.add(e.id)
+
+    def visita_Call(self, e: Call):
+        self.chamadas.add(e.id)
+        return e.args
+
+    def visita_Assign(self, s: Assign):
+        if s.id not in self.local_names:
+            self.atribuidas.add(s.id)
+        return (s.expr,)
+
+
+def marca_funcoes_puras(program: Programa, symtab: Dict[int, Any]) -> Set[int]:
+    """
+    Análise de pureza sobre um programa já verificado: uma função é pura se não atribui globais,
+    não lê globais que alguma parte do programa atribui (as demais valem o inicializador a
+    execução inteira) e só chama funções puras. O resultado dela depende só dos argumentos, e o
+    interpretador pode guardá-lo (CacheChamadas em helpers/arvore.py). Marca f.pura e
+    symtab[f.id]['pura'] e devolve os ids das funções puras.
+    """
+    fun_decls = getattr(program, 'fun_decls', [])
+    efeitos: Dict[int, EfeitosFuncao] = {}
+    mutaveis: Set[int] = set()
+    for f in fun_decls:
+        ef = EfeitosFuncao()
+        # cada inicializador enxerga os parâmetros e as locais anteriores (um nome local posterior
+        # ainda é a global ali)
+        visiveis = set(f.param_ids)
+        for d in getattr(f, 'local_decls', []):
+            ef.coleta(d.expr, visiveis)
+            visiveis = visiveis | {d.id}
+        for c in getattr(f, 'comandos', []):
+            ef.coleta(c, visiveis)
+        ef.coleta(f.resultado, visiveis)
+        efeitos[f.id] = ef
+        mutaveis |= ef.atribuidas
+    main = EfeitosFuncao()
+    for c in getattr(program, 'comandos', []):
+        main.coleta(c, set())
+    mutaveis |= main.atribuidas
+
+    puras = {fid for fid, ef in efeitos.items() if not ef.atribuidas and not (ef.lidas & mutaveis)}
+    # quem chama uma impura é impura (até não mudar mais: a verificação aceita chamadas para
+    # qualquer função da symtab, inclusive recursão mútua)
+    mudou = True
+    while mudou:
+        mudou = False
+        for fid in list(puras):
+            if not efeitos[fid].chamadas <= puras:
+                puras.discard(fid)
+                mudou = True
+
+    for f in fun_decls:
+        f.pura = f.id in puras
+        if f.id in symtab:
+            symtab[f.id]['pura'] = f.pura
+    return puras
+
+
+def build_symbol_table_and_offsets(program: Programa) -> Dict[int, Any]:
     """
     Constrói tabela global e preenche offsets em cada função AST.
     Além disso realiza checagens semânticas:
@@ -15,26 +136,30 @@ def build_symbol_table_and_offsets(program: Programa) -> Dict[str, Any]:
       - verifica LHS de atribuições (já declarado)
       - verifica a restrição 'main não pode ter variáveis locais' (se aplicável)
     Retorna symtab para uso posterior pelo gerador.
+    symtab, param_offsets e local_offsets são indexados pelo id internado do nome (helpers/simbolos.py);
+    o nome fica em symtab[id]['name'] para saída.
     """
-    symtab: Dict[str, Dict[str, Any]] = {}
+    symtab: Dict[int, Dict[str, Any]] = {}
+    # índice de linhas do fonte (o parser o guarda no Programa) para a coluna nas mensagens
+    linhas = getattr(program, 'linhas', None)
 
     # ---------- PASSO A: registrar globais e assinaturas de funções (permite recursão direta) ----------
     # registrar variáveis globais (declarações do topo) -> AST usa var_decls
     for d in getattr(program, 'var_decls', []):
         name = d.nome
-        if name in symtab:
+        if d.id in symtab:
             raise NameError(f"Redeclaração global: {name}")
         # marca como variável global
-        symtab[name] = {'kind': 'var', 'name': name}
+        symtab[d.id] = {'kind': 'var', 'name': name}
 
     # localizar declarações de funções (program.fun_decls)
     fun_decls = getattr(program, 'fun_decls', [])
     # 1ª passada: registrar apenas a assinatura (nome e número de parâmetros)
     for f in fun_decls:
-        if f.nome in symtab:
+        if f.id in symtab:
             raise NameError(f"Nome já usado (variável ou função) em nível global: {f.nome}")
         params = getattr(f, 'params', [])  # lista de nomes formais (ex.: ['x','y'])
-        symtab[f.nome] = {
+        symtab[f.id] = {
             'kind': 'fun',
             'name': f.nome,
             'num_params': len(params),
@@ -47,18 +172,18 @@ def build_symbol_table_and_offsets(program: Programa) -> Dict[str, Any]:
 
     # ---------- PASSO B: calcular offsets e verificar corpos ----------
     def _compute_offsets_for_function(f) -> None:
-        params = getattr(f, 'params', [])
-        locals_names = [d.nome for d in getattr(f, 'local_decls', [])]
+        params = f.param_ids
+        locals_names = [d.id for d in getattr(f, 'local_decls', [])]
 
         # param offsets: first param at rbp+16, second rbp+24, ...
         param_offsets = {}
-        for i, pname in enumerate(params):
-            param_offsets[pname] = 16 + 8 * i
+        for i, pid in enumerate(params):
+            param_offsets[pid] = 16 + 8 * i
 
         # local offsets: start at -8, -16, ...
         local_offsets = {}
-        for i, lname in enumerate(locals_names, start=1):
-            local_offsets[lname] = -8 * i
+        for i, lid in enumerate(locals_names, start=1):
+            local_offsets[lid] = -8 * i
 
         frame_size = 8 * len(locals_names)  # alinhado a 8
 
@@ -68,115 +193,53 @@ def build_symbol_table_and_offsets(program: Programa) -> Dict[str, Any]:
         setattr(f, 'num_params', len(params))
 
         # atualiza symtab
-        symtab[f.nome]['param_offsets'] = param_offsets
-        symtab[f.nome]['local_offsets'] = local_offsets
-        symtab[f.nome]['frame_size'] = frame_size
-        symtab[f.nome]['num_params'] = len(params)
+        symtab[f.id]['param_offsets'] = param_offsets
+        symtab[f.id]['local_offsets'] = local_offsets
+        symtab[f.id]['frame_size'] = frame_size
+        symtab[f.id]['num_params'] = len(params)
 
     # calcula offsets para todas as funções (antes de checar corpos)
     for f in fun_decls:
         _compute_offsets_for_function(f)
 
-    # Funções auxiliares de checagem de expressões e comandos
-    def check_expr(e, local_names: Set[str], available_funs: Set[str]):
-        """Verifica recursivamente uma expressão e levanta NameError em violação."""
-        # Const
-        if isinstance(e, Const):
-            return
-        # Var (referência)
-        if isinstance(e, Var):
-            if e.nome not in local_names and e.nome not in symtab:
-                ln = getattr(e, 'linha', '?')
-                ps = getattr(e, 'pos', '?')
-                raise NameError(f"Erro semântico: variável '{e.nome}' não declarada (linha {ln}, pos {ps})")
-            return
-        # Binary op
-        if isinstance(e, OpBin):
-            check_expr(e.opEsq, local_names, available_funs)
-            check_expr(e.opDir, local_names, available_funs)
-            return
-
-        # Call node (sua AST tem Call)
-        if isinstance(e, Call) or (hasattr(e, 'nome') and hasattr(e, 'args')):
-            fname = e.nome
-            args = e.args
-            # função deve estar registrada globalmente como função
-            if fname not in symtab or symtab[fname]['kind'] != 'fun':
-                ln = getattr(e, 'linha', '?')
-                ps = getattr(e, 'pos', '?')
-                raise NameError(f"Erro semântico: chamada para função não declarada '{fname}' (linha {ln}, pos {ps})")
-            expected = symtab[fname]['num_params']
-            actual = len(args)
-            if expected != actual:
-                ln = getattr(e, 'linha', '?')
-                ps = getattr(e, 'pos', '?')
-                raise NameError(f"Erro semântico: chamada para '{fname}' com aridade {actual}, esperada {expected} (linha {ln}, pos {ps})")
-            # verificar os argumentos recursivamente
-            for a in args:
-                check_expr(a, local_names, available_funs)
-            return
-
-        # Se chegar aqui: nó desconhecido — adaptar conforme sua AST
-        return
-
-    def check_stmt(s, local_names: Set[str], available_funs: Set[str]):
-        # Assign: LHS deve já existir (em local_names OU global) e RHS não pode usar nomes não-declarados
-        if isinstance(s, Assign):
-            if s.nome not in local_names and s.nome not in symtab:
-                ln = getattr(s, 'linha', '?')
-                ps = getattr(s, 'pos', '?')
-                raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})")
-            check_expr(s.expr, local_names, available_funs)
-            return
-        if isinstance(s, IfStmt):
-            check_expr(s.cond, local_names, available_funs)
-            for ss in s.then_stmts:
-                check_stmt(ss, local_names, available_funs)
-            if s.else_stmts is not None:
-                for ss in s.else_stmts:
-                    check_stmt(ss, local_names, available_funs)
-            return
-        if isinstance(s, WhileStmt):
-            check_expr(s.cond, local_names, available_funs)
-            for ss in s.body:
-                check_stmt(ss, local_names, available_funs)
-            return
-        if isinstance(s, ReturnStmt):
-            check_expr(s.expr, local_names, available_funs)
-            return
-        if isinstance(s, BlockStmt):
-            for ss in s.stmts:
-                check_stmt(ss, local_names, available_funs)
-            return
-        return
+    # checagem de expressões e comandos (VerificaNomes: pré-ordem com pilha explícita, uma cadeia
+    # a + b + c + ... tem um nível de OpBin por operando)
+    verificador = VerificaNomes(symtab, linhas)
+
+    def check_expr(e, local_names: Set[int], available_funs: Set[int]):
+        """Verifica uma expressão (e as subexpressões, em pré-ordem) e levanta NameError em violação."""
+        verificador.verifica(e, local_names)
+
+    def check_stmt(s, local_names: Set[int], available_funs: Set[int]):
+        verificador.verifica(s, local_names)
 
     # ---------- Checar cada função agora que assinaturas e offsets existem ----------
     # partial_funs permite chamadas para a própria função (recursão direta) e para funções já processadas
-    partial_funs: Dict[str, FunDecl] = {}
+    partial_funs: Dict[int, FunDecl] = {}
     for f in fun_decls:
-        # preparar conjuntos de nomes locais: params + locals
-        params = getattr(f, 'params', [])
-        locals_names = [d.nome for d in getattr(f, 'local_decls', [])]
+        # preparar conjuntos de nomes locais (ids): params + locals
+        params = f.param_ids
+        locals_names = [d.id for d in getattr(f, 'local_decls', [])]
         local_names = set(params) | set(locals_names)
 
         # checar conflitos parametro/local
-        for lname in locals_names:
-            if lname in params:
-                raise NameError(f"Erro semântico: variável local '{lname}' redeclarada como parâmetro em função '{f.nome}'")
+        for d in getattr(f, 'local_decls', []):
+            if d.id in params:
+                raise NameError(f"Erro semântico: variável local '{d.nome}' redeclarada como parâmetro em função '{f.nome}'")
 
         # construir ambiente local inicial (somente nomes, valores simbólicos)
         # aqui usa local_names para verificação de nomes; as referências a funções são verificadas via partial_funs+symtab
         # define available_funs como as funções já em partial_funs mais a própria (permitir recursão direta)
-        available_funs = set(partial_funs.keys()) | {f.nome}
+        available_funs = set(partial_funs.keys()) | {f.id}
 
         # checar inicializadores de declarações locais (podem usar params e globals e previously locals)
         local_env_names = set(params)  # nomes disponíveis no início para inicializadores
         for d in getattr(f, 'local_decls', []):
             # permitir que inicializador use params + previously declared locals + globals
             check_expr(d.expr, local_env_names | set(symtab.keys()), available_funs)
-            if d.nome in local_env_names:
+            if d.id in local_env_names:
                 raise NameError(f"Erro semântico: variável local '{d.nome}' redeclarada em função '{f.nome}'")
-            local_env_names.add(d.nome)
+            local_env_names.add(d.id)
 
         # checar comandos do corpo
         for c in getattr(f, 'comandos', []):
@@ -188,7 +251,7 @@ def build_symbol_table_and_offsets(program: Programa) -> Dict[str, Any]:
             check_expr(ret_expr, local_names | set(symtab.keys()), available_funs)
 
         # depois de tudo OK, registramos f em partial_funs para funções posteriores poderem chamá-la
-        partial_funs[f.nome] = f
+        partial_funs[f.id] = f
 
     # checar corpo do main (programa principal)
     # main não tem vardecl locais por sua restrição — parser já evita, checagem extra:
@@ -205,5 +268,8 @@ def build_symbol_table_and_offsets(program: Programa) -> Dict[str, Any]:
     if getattr(program, 'resultado', None) is not None:
         check_expr(program.resultado, set(symtab.keys()), available_funs_main)
 
-    # tudo ok — retorna tabela de símbolos (e funções já têm param_offsets/local_offsets/frame_size)
+    # funções cujo resultado só depende dos argumentos (f.pura, symtab[id]['pura'])
+    marca_funcoes_puras(program, symtab)
+
+    # tudo ok — retorna tabela de símbolos (e funções já têm param_offsets/local_offsets/frame_size/pura)
     return symtab
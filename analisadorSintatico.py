@@ -1,26 +1,76 @@
 # João Victor Lourenço da Silva (20220005997)
 
-from typing import List, Optional
+from collections import deque
+from collections.abc import Sequence
+from typing import Iterable, List, Optional, Tuple
 
 from helpers.token import Token
 from helpers.token_tipos import Numero, Identificador, Operadores, Pontuacao, Error, PalavraReservada
 from helpers.arvore import Exp, Const, OpBin, Var, Decl, Programa, Stmt, Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt, FunDecl, Call
+from helpers.arena import ArenaAST
 
 class ParserError(Exception):
     pass
 
+# Poder de ligação dos operadores binários (maior = liga mais forte); todos associativos à esquerda.
+BP_COMPARACAO = 1
+BP_ADITIVO = 2
+BP_MULTIPLICATIVO = 3
+BP_PRIMARIA = 4  # acima de qualquer operador: só a primária
+PODER_LIGACAO = {
+    Operadores.MENOR: BP_COMPARACAO,
+    Operadores.MAIOR: BP_COMPARACAO,
+    Operadores.IGUAL_IGUAL: BP_COMPARACAO,
+    Operadores.MENOR_IGUAL: BP_COMPARACAO,
+    Operadores.MAIOR_IGUAL: BP_COMPARACAO,
+    Operadores.DIFERENTE: BP_COMPARACAO,
+    Operadores.SOMA: BP_ADITIVO,
+    Operadores.SUBTRACAO: BP_ADITIVO,
+    Operadores.MULTIPLIC: BP_MULTIPLICATIVO,
+    Operadores.DIVISAO: BP_MULTIPLICATIVO,
+    Operadores.RESTO: BP_MULTIPLICATIVO,
+}
+
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.pos = 0  # posição atual no array de tokens
+    # tokens pode ser uma lista (acesso direto) ou qualquer iterável, por exemplo
+    # AnalizadorLexico.iter_tokens(): nesse caso os tokens são puxados sob demanda para uma
+    # janela pequena de lookahead e descartados ao serem consumidos.
+    def __init__(self, tokens: Iterable[Token]):
+        if isinstance(tokens, Sequence):
+            self.tokens = tokens
+            self.fonte = None
+        else:
+            self.tokens = None
+            self.fonte = iter(tokens)
+            self.janela = deque()
+        self.pos = 0  # posição atual no array de tokens (no streaming: quantos já foram consumidos)
 
     def get(self) -> Token:
         # retorna o token atual ou None no fim
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        if self.fonte is None:
+            return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        return self.espia(0)
+
+    def espia(self, k: int = 1) -> Optional[Token]:
+        # olha k tokens à frente do atual sem consumir (None se a entrada acabar antes)
+        if self.fonte is None:
+            i = self.pos + k
+            return self.tokens[i] if i < len(self.tokens) else None
+        janela = self.janela
+        while len(janela) <= k:
+            tok = next(self.fonte, None)
+            if tok is None:
+                return None
+            janela.append(tok)
+        return janela[k]
 
     def proximo_token(self):
         # avança para o próximo token
-        if self.pos < len(self.tokens):
+        if self.fonte is None:
+            if self.pos < len(self.tokens):
+                self.pos += 1
+        elif self.espia(0) is not None:
+            self.janela.popleft()
             self.pos += 1
 
     def verificaProxToken(self, tipo_esperado) -> Token: # Recebe o tipo que deve vir no próximo token.
@@ -29,114 +79,110 @@ class Parser:
         if tok is None or tok.tipo != tipo_esperado:
             pos = tok.pos if tok else self.pos
             linha = tok.linha if tok else '?'
+            coluna = tok.coluna if tok else '?'
             raise ParserError(
-                f"Erro na linha {linha}, pos {pos}: esperado {tipo_esperado}, encontrado {tok}"
+                f"Erro na linha {linha}, coluna {coluna}, pos {pos}: esperado {tipo_esperado}, encontrado {tok}"
             )
         self.proximo_token()
         return tok
 
-    # prim -> número | '(' exp_a ')'
+    # exp_c -> exp_a (('<'|'>'|'=='|'<='|'>='|'!=') exp_a)*
+    # exp_a -> exp_m (('+'|'-') exp_m)*
+    # exp_m -> prim (('*'|'/'|'%') prim)*
+    # prim  -> número | ident | ident '(' (exp_c (',' exp_c)*)? ')' | '(' exp_a ')'
+    #
+    # Os quatro níveis são um só laço de precedence climbing guiado por PODER_LIGACAO: cada
+    # analisaExp* é o mesmo analisaExp() com um poder mínimo diferente (analisaPrim = nenhum
+    # operador binário aceito). Parênteses e argumentos de chamada abrem um contexto numa pilha
+    # explícita em vez de uma chamada recursiva, então o aninhamento só é limitado pela memória.
     def analisaPrim(self) -> Exp:
-        tok = self.get()
-        if tok is None: # Se houve algum erro
-            raise ParserError("Fim inesperado de entrada ao analisar primária")
+        return self.analisaExp(BP_PRIMARIA)
 
-        if tok.tipo == Numero.NUMERO:
-            self.proximo_token()
-            valor = int(tok.lexema)
-            return Const(valor)
-        
-        if tok.tipo == Identificador.IDENT:
-            # se for identificador, tem que criar uma Var (com info de linha/pos para erros semânticos)
-            nome = tok.lexema
-            linha = tok.linha
-            pos = tok.pos
-
-            prox = self.tokens[self.pos + 1] if (self.pos + 1) < len(self.tokens) else None
-            if prox is not None and prox.tipo == Pontuacao.PAREN_ESQ:
-                self.proximo_token() #consome o identificador
-                self.verificaProxToken(Pontuacao.PAREN_ESQ) #consome o (
-                args = [] #argumentos
-                tok2 = self.get()
-                if tok2 is not None and tok2.tipo != Pontuacao.PAREN_DIR:
-                    #se entrou aqui é pq tem pelo menos 1 argumento
-                    args.append(self.analisaExpC())
-                    tok2 = self.get()
-                    while tok2 is not None and tok2.tipo == Pontuacao.VIRGULA:
-                        #Vai consumindo o restante dos argumentos e adicionando em args
-                        self.proximo_token()
-                        args.append(self.analisaExpC())
-                        tok2 = self.get()
-                self.verificaProxToken(Pontuacao.PAREN_DIR)
-                return Call(nome,args,linha=linha,pos=pos)
-            else:
-                self.proximo_token()
-                return Var(nome,linha=linha,pos=pos)
-
-        if tok.tipo == Pontuacao.PAREN_ESQ:
-            self.proximo_token()  # consome '('
-            expr = self.analisaExpA() # Vai começar a analisar uma nova expressão expA -> expM -> expPrim
-            self.verificaProxToken(Pontuacao.PAREN_DIR) # consome ')'
-            return expr
-
-        # nenhum caso válido
-        raise ParserError(
-            f"Erro na linha {tok.linha}, pos {tok.pos}: primária inválida, token {tok}"
-        )
-
-    
-    # exp_m -> prim (('*'|'/') prim)*
     def analisaExpM(self) -> Exp:
-        # inicia com uma primária
-        esq = self.analisaPrim()
-
-        # olhar sem consumir: get()
-        tok = self.get()
-        # enquanto houver * ou /
-        while tok is not None and tok.tipo in (Operadores.MULTIPLIC, Operadores.DIVISAO, Operadores.RESTO):
-            operador = tok.tipo
-            # consome o operador
-            self.proximo_token() # avança sem consumir
-            # analisa o operando direito
-            dir = self.analisaPrim()
-            # construo nó binário (associatividade à esquerda)
-            esq = OpBin(operador, esq, dir)
-            tok = self.get()
-
-        return esq
+        return self.analisaExp(BP_MULTIPLICATIVO)
 
-    # exp_a -> exp_m (('+'|'-') exp_m)*
     def analisaExpA(self) -> Exp:
-        # inicia com um nível multiplicativo
-        esq = self.analisaExpM()
+        return self.analisaExp(BP_ADITIVO)
 
-        tok = self.get()
-        # enquanto houver + ou -
-        while tok is not None and tok.tipo in (Operadores.SOMA, Operadores.SUBTRACAO):
-            operador = tok.tipo
-            # consome o operador
-            self.proximo_token()
-            # analisa o próximo exp_m
-            dir = self.analisaExpM()
-            # construo nó binário (associatividade à esquerda)
-            esq = OpBin(operador, esq, dir)
-            tok = self.get()
-
-        return esq
-    
     # Como temos um novo "nível" de precedência (comparações) criei a função para os comparadores.
     def analisaExpC(self) -> Exp:
-        esq = self.analisaExpA()
-        tok = self.get()
-        while tok is not None and tok.tipo in (Operadores.MENOR, Operadores.MAIOR, Operadores.IGUAL_IGUAL,
-            Operadores.MENOR_IGUAL, Operadores.MAIOR_IGUAL, Operadores.DIFERENTE):
-            operador = tok.tipo
-            self.proximo_token()
-            dir = self.analisaExpA()
-            esq = OpBin(operador, esq, dir)
+        return self.analisaExp(BP_COMPARACAO)
+
+    def analisaExp(self, min_bp: int = BP_COMPARACAO) -> Exp:
+        poder = PODER_LIGACAO
+        # contexto atual: poder mínimo, operandos à espera do operando direito [(esq, operador, bp)]
+        # e a chamada cujos argumentos estão sendo lidos (None = parênteses ou a expressão raiz)
+        pendentes = []
+        chamada = None
+        pilha = []  # contextos que abriram '(' e esperam o ')' correspondente
+        while True:
+            # ---------- primária ----------
             tok = self.get()
-        return esq
-    
+            if tok is None: # Se houve algum erro
+                raise ParserError("Fim inesperado de entrada ao analisar primária")
+            tipo = tok.tipo
+            if tipo == Numero.NUMERO:
+                self.proximo_token()
+                x = Const(int(tok.lexema))
+            elif tipo == Identificador.IDENT:
+                # identificador: Var ou Call (com info de linha/pos para erros semânticos)
+                prox = self.espia(1)
+                if prox is not None and prox.tipo == Pontuacao.PAREN_ESQ:
+                    self.proximo_token() #consome o identificador
+                    self.verificaProxToken(Pontuacao.PAREN_ESQ) #consome o (
+                    nova = (tok.lexema, [], tok.linha, tok.pos, tok.id)
+                    tok2 = self.get()
+                    if tok2 is not None and tok2.tipo != Pontuacao.PAREN_DIR:
+                        # pelo menos 1 argumento: cada um é uma exp_c lida num contexto novo
+                        pilha.append((min_bp, pendentes, chamada))
+                        min_bp, pendentes, chamada = BP_COMPARACAO, [], nova
+                        continue
+                    self.verificaProxToken(Pontuacao.PAREN_DIR)
+                    x = Call(nova[0], nova[1], linha=nova[2], pos=nova[3], id=nova[4])
+                else:
+                    self.proximo_token()
+                    x = Var(tok.lexema, linha=tok.linha, pos=tok.pos, id=tok.id)
+            elif tipo == Pontuacao.PAREN_ESQ:
+                self.proximo_token()  # consome '('
+                pilha.append((min_bp, pendentes, chamada))
+                min_bp, pendentes, chamada = BP_ADITIVO, [], None  # entre parênteses vem uma exp_a
+                continue
+            else:
+                # nenhum caso válido
+                raise ParserError(
+                    f"Erro na linha {tok.linha}, coluna {tok.coluna}, pos {tok.pos}: primária inválida, token {tok}"
+                )
+
+            # ---------- operadores binários e fechamento de contextos ----------
+            while True:
+                tok = self.get()
+                bp = poder.get(tok.tipo, 0) if tok is not None else 0
+                if bp >= min_bp:
+                    # reduz o que liga pelo menos tão forte quanto o operador novo (associatividade à esquerda)
+                    while pendentes and pendentes[-1][2] >= bp:
+                        esq, operador, _ = pendentes.pop()
+                        x = OpBin(operador, esq, x)
+                    pendentes.append((x, tok.tipo, bp))
+                    self.proximo_token() # consome o operador
+                    break
+                # a expressão do contexto atual terminou
+                while pendentes:
+                    esq, operador, _ = pendentes.pop()
+                    x = OpBin(operador, esq, x)
+                if not pilha:
+                    return x
+                if chamada is None:
+                    self.verificaProxToken(Pontuacao.PAREN_DIR) # consome ')'
+                else:
+                    chamada[1].append(x)
+                    if tok is not None and tok.tipo == Pontuacao.VIRGULA:
+                        # próximo argumento
+                        self.proximo_token()
+                        break
+                    self.verificaProxToken(Pontuacao.PAREN_DIR)
+                    x = Call(chamada[0], chamada[1], linha=chamada[2], pos=chamada[3], id=chamada[4])
+                min_bp, pendentes, chamada = pilha.pop()
+
     # Comandos até '}' sem consumir }
     def parse_block(self) -> List['Stmt']:
         stmts: List[Stmt] = []
@@ -213,6 +259,7 @@ class Parser:
             nome = tok.lexema
             linha = tok.linha
             pos = tok.pos
+            id = tok.id
             self.proximo_token()
             
             ntok = self.get()
@@ -221,7 +268,7 @@ class Parser:
                 self.proximo_token()
                 expr = self.analisaExpC()
                 self.verificaProxToken(Pontuacao.PONTO_VIRGULA)
-                return Assign(nome, expr, linha=linha, pos=pos)
+                return Assign(nome, expr, linha=linha, pos=pos, id=id)
 
             # atribuições compostas: '+=', '-=', '*=', '/='
             if ntok is not None and ntok.tipo in (Operadores.ADDEQ, Operadores.SUBEQ, Operadores.MULEQ, Operadores.DIVEQ):
@@ -241,7 +288,7 @@ class Parser:
                 else:
                     raise ParserError("Operador composto desconhecido")
                 from helpers.arvore import Var, OpBin 
-                return Assign(nome, OpBin(binop, Var(nome, linha=linha, pos=pos), rhs), linha=linha, pos=pos)
+                return Assign(nome, OpBin(binop, Var(nome, linha=linha, pos=pos, id=id), rhs), linha=linha, pos=pos, id=id)
 
             # incremento/decremento postfix: '++' / '--'
             if ntok is not None and ntok.tipo in (Operadores.INC, Operadores.DEC):
@@ -250,14 +297,15 @@ class Parser:
                 self.verificaProxToken(Pontuacao.PONTO_VIRGULA)
                 from helpers.arvore import Var, Const, OpBin
                 if inc_tok == Operadores.INC:
-                    return Assign(nome, OpBin(Operadores.SOMA, Var(nome, linha=linha, pos=pos), Const(1)), linha=linha, pos=pos)
+                    return Assign(nome, OpBin(Operadores.SOMA, Var(nome, linha=linha, pos=pos, id=id), Const(1)), linha=linha, pos=pos, id=id)
                 else:
-                    return Assign(nome, OpBin(Operadores.SUBTRACAO, Var(nome, linha=linha, pos=pos), Const(1)), linha=linha, pos=pos)
+                    return Assign(nome, OpBin(Operadores.SUBTRACAO, Var(nome, linha=linha, pos=pos, id=id), Const(1)), linha=linha, pos=pos, id=id)
                 
             # se não foi nenhum caso acima, é erro sintático
             pos_err = ntok.pos if ntok else self.pos
             linha_err = ntok.linha if ntok else '?'
-            raise ParserError(f"Erro na linha {linha_err}, pos {pos_err}: esperado operador de atribuição ou '++'/'--', encontrado {ntok}")
+            coluna_err = ntok.coluna if ntok else '?'
+            raise ParserError(f"Erro na linha {linha_err}, coluna {coluna_err}, pos {pos_err}: esperado operador de atribuição ou '++'/'--', encontrado {ntok}")
         
         if tok.tipo == PalavraReservada.RETURN:
             # consumir 'return'
@@ -267,7 +315,7 @@ class Parser:
             return ReturnStmt(expr, linha=tok.linha, pos=tok.pos)
 
         # caso inválido
-        raise ParserError(f"Erro na linha {tok.linha}, pos {tok.pos}: comando inválido, token {tok}")
+        raise ParserError(f"Erro na linha {tok.linha}, coluna {tok.coluna}, pos {tok.pos}: comando inválido, token {tok}")
 
     #vardecl ::= 'var' <ident> '=' <exp> ';'
     def parse_var_decl(self) -> Decl:
@@ -275,7 +323,8 @@ class Parser:
         if tok is None or tok.tipo != PalavraReservada.VAR:
             pos = tok.pos if tok else self.pos
             linha = tok.linha if tok else '?'
-            raise ParserError(f"Erro na linha {linha}, pos {pos}: esperado 'var' iniciando declaração de variável, encontrado {tok}")
+            coluna = tok.coluna if tok else '?'
+            raise ParserError(f"Erro na linha {linha}, coluna {coluna}, pos {pos}: esperado 'var' iniciando declaração de variável, encontrado {tok}")
         #Consumir o 'var'
         self.proximo_token()
         nome_tok = self.verificaProxToken(Identificador.IDENT)
@@ -286,7 +335,7 @@ class Parser:
         self.verificaProxToken(Pontuacao.IGUAL)
         expr = self.analisaExpC()
         self.verificaProxToken(Pontuacao.PONTO_VIRGULA)
-        return Decl(nome,expr,linha=linha_ident,pos=pos_ident)
+        return Decl(nome,expr,linha=linha_ident,pos=pos_ident,id=nome_tok.id)
 
     # fundecl ::= 'fun' <ident> '(' <args>? ')' '{' <vardecl>* <cmd>* 'return' <exp> ';' '}'
     def parse_fun_decl(self) -> FunDecl:
@@ -294,7 +343,8 @@ class Parser:
         if tok is None or tok.tipo != PalavraReservada.FUN:
             pos = tok.pos if tok else self.pos
             linha = tok.linha if tok else '?'
-            raise ParserError(f"Erro na linha {linha}, pos {pos}: esperado 'fun' iniciando declaração de função, encontrado {tok}")
+            coluna = tok.coluna if tok else '?'
+            raise ParserError(f"Erro na linha {linha}, coluna {coluna}, pos {pos}: esperado 'fun' iniciando declaração de função, encontrado {tok}")
         self.proximo_token() # Consumir o fun
         nome_tok = self.verificaProxToken(Identificador.IDENT)
         nome = nome_tok.lexema
@@ -303,16 +353,19 @@ class Parser:
         # Parametros formais
         self.verificaProxToken(Pontuacao.PAREN_ESQ)
         params: List[str] = []
+        param_ids: List[int] = []
         tok2 = self.get()
         if tok2 is not None and tok2.tipo != Pontuacao.PAREN_DIR:
             # pelo menos um parâmetro
             p_tok = self.verificaProxToken(Identificador.IDENT)
             params.append(p_tok.lexema)
+            param_ids.append(p_tok.id)
             tok2 = self.get()
             while tok2 is not None and tok2.tipo == Pontuacao.VIRGULA:
                 self.proximo_token()  # consome ','
                 p_tok = self.verificaProxToken(Identificador.IDENT)
                 params.append(p_tok.lexema)
+                param_ids.append(p_tok.id)
                 tok2 = self.get()
         self.verificaProxToken(Pontuacao.PAREN_DIR)
 
@@ -340,7 +393,10 @@ class Parser:
         # fechar '}'
         self.verificaProxToken(Pontuacao.CHAVE_DIR)
 
-        return FunDecl(nome, params, local_decls, comandos, resultado, linha=linha_ident, pos=pos_ident)
+        if None in param_ids:
+            param_ids = None  # tokens sem id (montados à mão): o FunDecl interna os nomes
+        return FunDecl(nome, params, local_decls, comandos, resultado, linha=linha_ident, pos=pos_ident,
+                       id=nome_tok.id, param_ids=param_ids)
 
     # Novo parser para a linguagem EV
     def parse_programa(self) -> Programa:
@@ -348,6 +404,8 @@ class Parser:
         fun_decls: List[FunDecl] = []
 
         tok = self.get()
+        # índice de linhas do texto-fonte (para as colunas nas mensagens da análise semântica)
+        linhas = tok.linhas if tok is not None else None
         # ler declarações (var / fun) em qualquer ordem
         while tok is not None and (tok.tipo == PalavraReservada.VAR or tok.tipo == PalavraReservada.FUN):
             if tok.tipo == PalavraReservada.VAR:
@@ -359,12 +417,18 @@ class Parser:
                 fun_decls.append(f)
             tok = self.get()
 
+        comandos, resultado = self.parse_main()
+        return Programa(var_decls, fun_decls, comandos, resultado, linhas=linhas)
+
+    # main ::= 'main' '{' comando* ('return' exp ';')? '}' EOF  -> (comandos, resultado)
+    def parse_main(self) -> Tuple[List[Stmt], Exp]:
         # agora esperamos 'main'
         tok = self.get()
         if tok is None or tok.tipo != PalavraReservada.MAIN:
             pos = tok.pos if tok else self.pos
             linha = tok.linha if tok else '?'
-            raise ParserError(f"Erro na linha {linha}, pos {pos}: esperado 'main' iniciando bloco principal, encontrado {tok}")
+            coluna = tok.coluna if tok else '?'
+            raise ParserError(f"Erro na linha {linha}, coluna {coluna}, pos {pos}: esperado 'main' iniciando bloco principal, encontrado {tok}")
         # consome 'main'
         self.proximo_token()
         self.verificaProxToken(Pontuacao.CHAVE_ESQ)
@@ -382,7 +446,7 @@ class Parser:
                 break
             # detecta 'var' dentro de main -> erro (religioso a sua restrição)
             if ntok.tipo == PalavraReservada.VAR:
-                raise ParserError(f"Erro na linha {ntok.linha}, pos {ntok.pos}: declaração 'var' não permitida dentro de main")
+                raise ParserError(f"Erro na linha {ntok.linha}, coluna {ntok.coluna}, pos {ntok.pos}: declaração 'var' não permitida dentro de main")
             comandos.append(self.analisaComando())
 
         # se houver 'return' processa retorno, senão considera resultado Const(0)
@@ -393,21 +457,41 @@ class Parser:
             self.verificaProxToken(Pontuacao.PONTO_VIRGULA)
             self.verificaProxToken(Pontuacao.CHAVE_DIR)
             self.verificaProxToken(Pontuacao.EOF)
-            return Programa(var_decls, fun_decls, comandos, resultado)
+            return comandos, resultado
         elif tok is not None and tok.tipo == Pontuacao.CHAVE_DIR:
             # main sem return - fecha e EOF
             self.proximo_token()
             self.verificaProxToken(Pontuacao.EOF)
             resultado = Const(0)
-            return Programa(var_decls, fun_decls, comandos, resultado)
+            return comandos, resultado
         else:
             pos = tok.pos if tok else self.pos
             linha = tok.linha if tok else '?'
-            raise ParserError(f"Erro na linha {linha}, pos {pos}: esperado 'return' ou '}}' fechando main, encontrado {tok}")
+            coluna = tok.coluna if tok else '?'
+            raise ParserError(f"Erro na linha {linha}, coluna {coluna}, pos {pos}: esperado 'return' ou '}}' fechando main, encontrado {tok}")
 
     def parse(self) -> Programa:
         return self.parse_programa()
 
+    # Mesmo programa que parse_programa(), mas numa ArenaAST (helpers/arena.py): cada declaração
+    # de topo e cada comando do main vai para a arena assim que é lido, então a árvore de objetos
+    # nunca existe inteira (o pico é o maior item de topo). Os erros são os mesmos do parse().
+    def parse_arena(self) -> ArenaAST:
+        tok = self.get()
+        arena = ArenaAST(tok.linhas if tok is not None else None)
+        var_decls: List[int] = []
+        fun_decls: List[int] = []
+        while tok is not None and (tok.tipo == PalavraReservada.VAR or tok.tipo == PalavraReservada.FUN):
+            if tok.tipo == PalavraReservada.VAR:
+                var_decls.append(arena.adiciona(self.parse_var_decl()))
+            else:
+                fun_decls.append(arena.adiciona(self.parse_fun_decl()))
+            tok = self.get()
+        comandos, resultado = self.parse_main()
+        comandos = [arena.adiciona(s) for s in comandos]
+        arena.adiciona_programa(var_decls, fun_decls, comandos, arena.adiciona(resultado))
+        return arena
+
 
 if __name__ == '__main__':
     import sys
@@ -0,0 +1,367 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Avaliação em lote: uma função FUN sobre muitos conjuntos de argumentos de uma vez, com arrays
+int64 do NumPy (um elemento por conjunto), em vez de uma chamada de Call.chama por elemento.
+
+- Entra no caminho vetorizado a função sem while, sem recursão (direta ou mútua), que só atribui
+  a parâmetros e locais e só chama funções que também entram. Cada comando roda sob uma máscara
+  dos elementos que passam por ele: um IfStmt divide a máscara pela condição, uma atribuição é um
+  np.where(máscara, novo, antigo), um return grava o valor nos elementos da máscara e os tira dos
+  comandos seguintes. OpBin vira a ufunc do operador (comparações dão 1/0, divisão e resto com
+  o arredondamento de // e % do Python).
+- Os erros são os da avaliação elemento a elemento, mas só contam os elementos da máscara: uma
+  divisão por zero num ramo que nenhum elemento tomou não levanta nada.
+- Os valores da linguagem não têm limite e int64 tem: uma operação que transborda num elemento da
+  máscara (ou um argumento/constante que não cabe em int64) faz o lote inteiro ir elemento a
+  elemento, com o resultado exato.
+- As globais valem o que os inicializadores dão (o estado antes do main); a função não as altera.
+- Sem NumPy, ou com uma função que não entra (motivo em FuncaoLote.motivo), o lote roda elemento a
+  elemento pelo interpretador da árvore, com um armazenamento de globais só para o lote inteiro
+  (como chamadas seguidas numa mesma execução).
+
+avalia_lote(programa, nome, *colunas) -> um resultado por elemento (ndarray; lista sem NumPy).
+"""
+
+import sys
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # sem NumPy: todo lote vai elemento a elemento
+    np = None
+
+from helpers.arvore import (
+    Call, FunDecl, Programa, Quadro, avalia, especie, _ESPECIES,
+    CONST, VAR, OPBIN, CALL, ASSIGN, IF, BLOCO, RETURN,
+)
+from helpers.token_tipos import Operadores
+from helpers.visitante import VisitanteComandos
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+class _Desiste(Exception):
+    # o lote vai elemento a elemento: um valor de um elemento ativo não cabe em int64 (ou um nó
+    # que a execução vetorizada não conhece)
+    pass
+
+
+class _Elegibilidade(VisitanteComandos):
+    """Por que o corpo de uma função não pode ser vetorizado (None se pode) e quem ela chama."""
+    def __init__(self, f: FunDecl):
+        self.locais = set(f.param_ids) | {d.id for d in f.local_decls}
+        self.motivo: Optional[str] = None
+        self.chamadas: Dict[int, Call] = {}
+
+    def visita_WhileStmt(self, s):
+        self.motivo = self.motivo or "tem while"
+        return None
+
+    def visita_Assign(self, s):
+        if s.id not in self.locais:
+            self.motivo = self.motivo or f"atribui à global '{s.nome}'"
+        return (s.expr,)
+
+    def visita_Call(self, e: Call):
+        self.chamadas.setdefault(e.id, e)
+        return e.args
+
+
+def motivos_nao_vetorizavel(funcoes: Dict[int, FunDecl]) -> Dict[int, Optional[str]]:
+    """
+    {id da função: motivo de não entrar no caminho vetorizado, ou None}. Uma função fica de fora se
+    o próprio corpo não entra, se está num ciclo de chamadas (recursão) ou se chama uma que fica
+    de fora (ou que não existe).
+    """
+    diretos: Dict[int, Optional[str]] = {}
+    chama: Dict[int, Dict[int, Call]] = {}
+    for fid, f in funcoes.items():
+        e = _Elegibilidade(f)
+        for d in f.local_decls:
+            e.percorre(d.expr)
+        for c in f.comandos:
+            e.percorre(c)
+        e.percorre(f.resultado)
+        diretos[fid] = e.motivo
+        chama[fid] = e.chamadas
+
+    motivos: Dict[int, Optional[str]] = {}
+    # pós-ordem do grafo de chamadas (pilha explícita); 'abertas' são as funções no caminho atual
+    for raiz in funcoes:
+        if raiz in motivos:
+            continue
+        abertas = {raiz}
+        pilha = [(raiz, iter(chama[raiz].values()))]
+        while pilha:
+            fid, filhos = pilha[-1]
+            c = next(filhos, None)
+            if c is None:
+                pilha.pop()
+                abertas.discard(fid)
+                if fid not in motivos:
+                    motivo = diretos[fid]
+                    for gid, chamada in chama[fid].items():
+                        if motivo is not None:
+                            break
+                        if gid not in funcoes:
+                            motivo = f"chama '{chamada.nome}', que não existe"
+                        elif motivos.get(gid) is not None:
+                            motivo = f"chama '{chamada.nome}' ({motivos[gid]})"
+                    motivos[fid] = motivo
+                continue
+            if c.id not in funcoes or c.id in motivos:
+                continue
+            if c.id in abertas:
+                # ciclo: todas as funções do caminho a partir de c são recursivas
+                for gid, _ in pilha[[p[0] for p in pilha].index(c.id):]:
+                    motivos[gid] = "recursiva"
+                continue
+            abertas.add(c.id)
+            pilha.append((c.id, iter(chama[c.id].values())))
+    return motivos
+
+
+class _Vetorial:
+    """Execução mascarada de funções elegíveis sobre arrays int64 de n elementos."""
+    def __init__(self, funcoes: Dict[int, FunDecl], globais: Dict[int, int], n: int):
+        self.funcoes = funcoes
+        self.n = n
+        self.globais = {}
+        for gid, v in globais.items():
+            self.globais[gid] = self.constante(v)
+
+    @staticmethod
+    def constante(v: int):
+        if not INT64_MIN <= v <= INT64_MAX:
+            raise _Desiste()
+        return np.int64(v)
+
+    def opera(self, op: Operadores, a, b, m):
+        if op == Operadores.SOMA:
+            r = np.add(a, b)
+            if np.any((((a ^ r) & (b ^ r)) < 0) & m):
+                raise _Desiste()
+            return r
+        if op == Operadores.SUBTRACAO:
+            r = np.subtract(a, b)
+            if np.any((((a ^ b) & (a ^ r)) < 0) & m):
+                raise _Desiste()
+            return r
+        if op == Operadores.MULTIPLIC:
+            r = np.multiply(a, b)
+            a_ = np.where(a == 0, 1, a)
+            transborda = ((a != 0) & (r // a_ != b)) | ((a == -1) & (b == INT64_MIN))
+            if np.any(transborda & m):
+                raise _Desiste()
+            return r
+        if op == Operadores.DIVISAO or op == Operadores.RESTO:
+            zero = b == 0
+            if np.any(zero & m):
+                raise ZeroDivisionError("Divisão por zero" if op == Operadores.DIVISAO else "Divisão por zero (resto)")
+            # com divisor -1, o quociente de INT64_MIN transborda; o resto é sempre 0
+            menos_um = b == -1
+            b_ = np.where(zero | menos_um, 1, b)
+            if op == Operadores.RESTO:
+                return np.remainder(a, b_)
+            if np.any(menos_um & (a == INT64_MIN) & m):
+                raise _Desiste()
+            return np.where(menos_um, np.negative(a), np.floor_divide(a, b_))
+        if op == Operadores.MENOR:
+            return (a < b).astype(np.int64)
+        if op == Operadores.MAIOR:
+            return (a > b).astype(np.int64)
+        if op == Operadores.IGUAL_IGUAL:
+            return (a == b).astype(np.int64)
+        if op == Operadores.MENOR_IGUAL:
+            return (a <= b).astype(np.int64)
+        if op == Operadores.MAIOR_IGUAL:
+            return (a >= b).astype(np.int64)
+        if op == Operadores.DIFERENTE:
+            return (a != b).astype(np.int64)
+        raise ValueError(f"Operador desconhecido: {op}")
+
+    def exp(self, raiz, env: Dict[int, object], m):
+        # pós-ordem com pilha de valores, como avalia(); (op,) marca um operador com os operandos
+        # prontos e (Call,) uma chamada com os argumentos prontos
+        especies = _ESPECIES
+        globais = self.globais
+        valores: list = []
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is tuple:
+                no = no[0]
+                if type(no) is Operadores:
+                    b = valores.pop()
+                    valores[-1] = self.opera(no, valores[-1], b, m)
+                else:
+                    n = len(no.args)
+                    args = valores[len(valores) - n:]
+                    del valores[len(valores) - n:]
+                    f = no.destino(self.funcoes)
+                    no.confere_aridade(f, args)
+                    valores.append(self.funcao(f, args, m))
+                continue
+            k = especies.get(type(no))
+            if k is None:
+                k = especie(type(no))
+            if k == CONST:
+                valores.append(self.constante(no.valor))
+            elif k == VAR:
+                v = env.get(no.id)
+                if v is None:
+                    v = globais.get(no.id)
+                    if v is None:
+                        raise NameError(no.erro_nao_declarada())
+                valores.append(v)
+            elif k == OPBIN:
+                pilha.append((no.operador,))
+                pilha.append(no.opDir)
+                pilha.append(no.opEsq)
+            elif k == CALL:
+                no.destino(self.funcoes)
+                pilha.append((no,))
+                pilha.extend(reversed(no.args))
+            else:
+                raise _Desiste()
+        return valores[-1]
+
+    def funcao(self, f: FunDecl, args: list, m):
+        # uma chamada para os elementos de m (as chamadas dentro dela são da mesma forma: o grafo
+        # de chamadas das funções elegíveis não tem ciclo, então a profundidade é limitada)
+        env: Dict[int, object] = {}
+        for pid, v in zip(f.param_ids, args):
+            env[pid] = v
+        for d in f.local_decls:
+            env[d.id] = self.exp(d.expr, env, m)
+        resultado = np.zeros(self.n, dtype=np.int64)
+        vivos = m.copy()
+        especies = _ESPECIES
+        pilha = [(iter(f.comandos), m)]
+        while pilha:
+            s = next(pilha[-1][0], None)
+            if s is None:
+                pilha.pop()
+                continue
+            ramo = pilha[-1][1] & vivos
+            if not ramo.any():
+                continue
+            k = especies.get(type(s))
+            if k is None:
+                k = especie(type(s))
+            if k == ASSIGN:
+                env[s.id] = np.where(ramo, self.exp(s.expr, env, ramo), env[s.id])
+            elif k == IF:
+                c = self.exp(s.cond, env, ramo) != 0
+                if s.else_stmts is not None:
+                    pilha.append((iter(s.else_stmts), ramo & ~c))
+                pilha.append((iter(s.then_stmts), ramo & c))
+            elif k == BLOCO:
+                pilha.append((iter(s.stmts), ramo))
+            elif k == RETURN:
+                resultado = np.where(ramo, self.exp(s.expr, env, ramo), resultado)
+                vivos &= ~ramo
+            else:
+                raise _Desiste()
+        if vivos.any():
+            resultado = np.where(vivos, self.exp(f.resultado, env, vivos), resultado)
+        return resultado
+
+
+class FuncaoLote:
+    """
+    Uma função de um programa preparada para lotes: a tabela de funções, as globais depois dos
+    inicializadores e se ela entra no caminho vetorizado (motivo é None) ou não (e por quê).
+    """
+    def __init__(self, programa: Programa, nome: str):
+        self.funcoes: Dict[int, FunDecl] = {}
+        for f in programa.fun_decls:
+            if f.id in self.funcoes:
+                raise NameError(f"Erro semântico: função '{f.nome}' já declarada")
+            self.funcoes[f.id] = f
+        # as globais como no início do main de Programa.avaliador()
+        self.globais: Dict[int, int] = {}
+        inicio = Quadro([], {}, self.globais)
+        for d in programa.var_decls:
+            self.globais[d.id] = avalia(d.expr, inicio, {})
+        self.f = next((f for f in programa.fun_decls if f.nome == nome), None)
+        if self.f is None:
+            raise NameError(f"Erro semântico: chamada para função não declarada '{nome}'")
+        self.chamada = Call(self.f.nome, [], id=self.f.id)
+        if np is None:
+            self.motivo: Optional[str] = "NumPy não instalado"
+        else:
+            self.motivo = motivos_nao_vetorizavel(self.funcoes)[self.f.id]
+        self.lotes_vetorizados = 0
+        self.lotes_por_elemento = 0
+
+    def avalia(self, *colunas: Sequence[int]):
+        """Um resultado por elemento: f(colunas[0][i], colunas[1][i], ...)."""
+        self.chamada.confere_aridade(self.f, list(colunas))
+        tamanhos = {len(c) for c in colunas}
+        if len(tamanhos) > 1:
+            raise ValueError(f"colunas de tamanhos diferentes: {sorted(tamanhos)}")
+        n = tamanhos.pop() if tamanhos else 1
+        if self.motivo is None:
+            arrays = self._arrays(colunas)
+            if arrays is not None:
+                try:
+                    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+                        vetorial = _Vetorial(self.funcoes, self.globais, n)
+                        r = vetorial.funcao(self.f, arrays, np.ones(n, dtype=bool))
+                    self.lotes_vetorizados += 1
+                    return np.broadcast_to(r, (n,)).copy()
+                except _Desiste:
+                    pass
+        self.lotes_por_elemento += 1
+        return self.avalia_por_elemento(colunas, n)
+
+    @staticmethod
+    def _arrays(colunas) -> Optional[List]:
+        arrays = []
+        for c in colunas:
+            a = np.asarray(c)
+            if a.ndim != 1 or a.dtype.kind not in 'iub':
+                return None  # inteiros grandes (object), floats, ...: elemento a elemento
+            if a.dtype.kind == 'u' and a.size and a.max() > INT64_MAX:
+                return None
+            arrays.append(a.astype(np.int64, copy=False))
+        return arrays
+
+    def avalia_por_elemento(self, colunas, n: int):
+        # uma chamada de Call.chama por elemento, com as globais compartilhadas pelo lote
+        f = self.f
+        funcoes = self.funcoes
+        q = Quadro([], {}, dict(self.globais))
+        chamada = self.chamada
+        linhas = [list(map(int, c)) for c in colunas]
+        resultados = [chamada.chama(f, [c[i] for c in linhas], q, funcoes) for i in range(n)]
+        if np is None:
+            return resultados
+        if all(INT64_MIN <= v <= INT64_MAX for v in resultados):
+            return np.array(resultados, dtype=np.int64)
+        return np.array(resultados, dtype=object)
+
+
+def avalia_lote(programa: Programa, nome: str, *colunas: Sequence[int]):
+    """Resultados de nome(colunas[0][i], colunas[1][i], ...) para cada i (ver FuncaoLote)."""
+    return FuncaoLote(programa, nome).avalia(*colunas)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print("Uso: python avaliacaoLote.py <arquivo.txt> <função> <início:fim> [<início:fim> ...]")
+        sys.exit(1)
+    from analisadorLexico import AnalizadorLexico
+    from analisadorSintatico import Parser
+    from analisadorSemantico import build_symbol_table_and_offsets
+    with open(sys.argv[1], 'r') as arquivo:
+        programa = Parser(AnalizadorLexico(arquivo.read()).tokenizador()).parse()
+    build_symbol_table_and_offsets(programa)
+    intervalos = [tuple(map(int, a.split(':'))) for a in sys.argv[3:]]
+    colunas = [list(range(inicio, fim)) for inicio, fim in intervalos]
+    lote = FuncaoLote(programa, sys.argv[2])
+    print(f"vetorizado: {'sim' if lote.motivo is None else 'não (' + lote.motivo + ')'}")
+    print(lote.avalia(*colunas))
@@ -0,0 +1,83 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_arena.py
+"""
+AST de objetos dataclass (Parser.parse) x ArenaAST (Parser.parse_arena, arrays paralelos): memória
+retida pela árvore, tempo de parse e de um percurso completo coletando os ids de todos os nomes
+(pilha sobre os objetos x varredura linear dos arrays x pré-ordem sobre os índices da arena).
+Confere que o adaptador (ArenaAST.para_programa) devolve exatamente a AST do parser.
+Uso: python benchmarks/bench_arena.py [n_funcoes]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from helpers.arena import _especie, _filhos_no, FUNDECL
+from gera_programa import gera_programa
+
+
+def ids_objetos(programa) -> set:
+    # o mesmo que ArenaAST.ids_usados, andando nos objetos
+    usados = set()
+    pilha = [programa]
+    while pilha:
+        no = pilha.pop()
+        k = _especie(no)
+        id = getattr(no, 'id', None)
+        if id is not None:
+            usados.add(id)
+        if k == FUNDECL:
+            usados.update(no.param_ids)
+        pilha.extend(_filhos_no(no, k))
+    return usados
+
+
+def mede(nome: str, fn):
+    inicio = time.perf_counter()
+    resultado = fn()
+    print(f"    {nome:<40} {time.perf_counter() - inicio:8.3f} s")
+    return resultado
+
+
+def retido(fn):
+    # (resultado, bytes alocados que continuam vivos depois de fn)
+    tracemalloc.start()
+    resultado = fn()
+    usado, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, usado
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    tokens = AnalizadorLexico(gera_programa(n)).tokenizador_compacto()
+
+    programa, mem_obj = retido(lambda: Parser(tokens).parse())
+    arena, mem_arena = retido(lambda: Parser(tokens).parse_arena())
+    nos = len(arena)
+    print(f"{n} funções, {nos} nós")
+    print(f"objetos   {mem_obj / 1024 / 1024:8.2f} MB  {mem_obj / nos:6.1f} bytes/nó")
+    print(f"arena     {mem_arena / 1024 / 1024:8.2f} MB  {mem_arena / nos:6.1f} bytes/nó"
+          f"  ({mem_obj / mem_arena:.1f}x menos)")
+
+    print("parse")
+    mede("Parser.parse (objetos)", lambda: Parser(tokens).parse())
+    mede("Parser.parse_arena", lambda: Parser(tokens).parse_arena())
+    print("percurso completo (ids de todos os nomes)")
+    a = mede("pilha sobre os objetos", lambda: ids_objetos(programa))
+    b = mede("arena: varredura linear", arena.ids_usados)
+    c = mede("arena: pré-ordem (percorre)", lambda: sum(1 for _ in arena.percorre()))
+    assert a == b and c == nos, "percursos diferentes!"
+    print("adaptador")
+    volta = mede("ArenaAST.para_programa", arena.para_programa)
+    assert volta == programa, "AST do adaptador diferente!"
+    print("AST do adaptador idêntica à do parser.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_binario.py
+"""
+Formato binário do Programa verificado (serializadorBinario.py): carregar o arquivo x refazer o
+front-end a partir do fonte (léxico + parse + análise semântica) e x pickle do mesmo Programa, com o
+tamanho de cada representação. Confere que o programa e a symtab carregados são idênticos aos da
+compilação normal.
+Uso: python benchmarks/bench_binario.py [n_funcoes ...]
+"""
+
+import os
+import pickle
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from serializadorBinario import serializa, desserializa
+from gera_programa import gera_programa
+
+
+def melhor(fn, vezes: int = 5) -> float:
+    tempos = []
+    for _ in range(vezes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def front_end(texto: str):
+    programa = Parser(AnalizadorLexico(texto).tokenizador()).parse()
+    return programa, build_symbol_table_and_offsets(programa)
+
+
+def mede(nome: str, t: float, base: float):
+    print(f"    {nome:<40} {t:8.3f} s  ({base / t:5.1f}x)")
+
+
+def main():
+    tamanhos = [int(a) for a in sys.argv[1:]] or [50, 500, 2000]
+    for n in tamanhos:
+        texto = gera_programa(n)
+        programa, symtab = front_end(texto)
+        dados = serializa(programa)
+        conservado = pickle.dumps((programa, symtab), protocol=pickle.HIGHEST_PROTOCOL)
+        volta, volta_symtab = desserializa(dados)
+        assert volta == programa and volta_symtab == symtab, "programa carregado diferente!"
+
+        print(f"{n} funções: fonte {len(texto) / 1024:8.1f} KB, pickle {len(conservado) / 1024:8.1f} KB, "
+              f"binário {len(dados) / 1024:8.1f} KB")
+        base = melhor(lambda: front_end(texto))
+        mede("léxico + parse + semântica", base, base)
+        mede("pickle.loads", melhor(lambda: pickle.loads(conservado)), base)
+        mede("desserializa (binário)", melhor(lambda: desserializa(dados)), base)
+        mede("serializa (binário)", melhor(lambda: serializa(programa)), base)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_bytecode.py
+"""
+Bytecode e máquina de pilha (maquinaVirtual.py) x Programa.avaliador(): o laço de testes.txt
+(soma acumulada), a função de gera_programa (while com if/else e %) e uma recursão (fib), com o
+tamanho do bytecode e o tempo de compilação. Confere que os programas de testes.txt que passam na
+análise semântica dão o mesmo resultado (ou o mesmo erro) nas duas execuções.
+Uso: python benchmarks/bench_bytecode.py [n] [n_fib]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser, ParserError
+from analisadorSemantico import build_symbol_table_and_offsets
+from maquinaVirtual import compila_bytecode
+from bench_closures import programas_de_testes, resultado, melhor
+from gera_programa import gera_funcao
+
+SOMA = """
+fun somaAte(n) {
+  var i = 0;
+  var s = 0;
+  while (i < n) {
+    s += i;
+    i++;
+  }
+  return s;
+}
+main { return somaAte(%d); }
+"""
+
+FIB = """
+fun fib(n) {
+  var r = 0;
+  if (n < 2) { r = n; } else { r = fib(n - 1) + fib(n - 2); }
+  return r;
+}
+main { return fib(%d); }
+"""
+
+
+def compara(nome: str, fonte: str):
+    programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+    bytecode = compila_bytecode(programa)
+    assert programa.avaliador() == bytecode.executa(), "resultado diferente!"
+    base = melhor(programa.avaliador)
+    t = melhor(bytecode.executa)
+    t_compila = melhor(lambda: compila_bytecode(programa))
+    print(f"    {nome:<22} avaliador {base:8.3f} s   bytecode {t:8.3f} s  ({base / t:5.1f}x)"
+          f"   {len(bytecode.codigo):5} palavras, compilação {t_compila * 1000:6.2f} ms")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_fib = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print("testes.txt: mesmo resultado")
+    for titulo, fonte in programas_de_testes():
+        fonte = fonte.replace("_", "")
+        try:
+            programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+            build_symbol_table_and_offsets(programa)
+        except (ParserError, NameError):
+            continue
+        a = resultado(programa.avaliador)
+        b = resultado(lambda: compila_bytecode(programa).executa())
+        assert a == b, f"{titulo}: {a!r} x {b!r}"
+        print(f"    {titulo[:50]:<50} {a}")
+
+    print(f"n = {n}, fib({n_fib})")
+    compara("soma acumulada", SOMA % n)
+    compara("gera_programa f0", gera_funcao(0) + f"main {{ return f0({n}); }}\n")
+    compara("fib", FIB % n_fib)
+
+
+if __name__ == '__main__':
+    main()
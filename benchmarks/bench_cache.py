@@ -0,0 +1,47 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_cache.py
+"""
+Front-end com CacheCompilacao: falta (léxico + parse + semântica + gravação) x acerto (leitura da
+entrada), conferindo que o Programa e a symtab do cache são iguais aos de uma compilação normal.
+Uso: python benchmarks/bench_cache.py [n_funcoes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cacheCompilacao import CacheCompilacao, compila_sem_cache
+from gera_programa import gera_programa
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texto = gera_programa(n)
+    print(f"Fonte: {len(texto)} caracteres, {n} funções")
+
+    inicio = time.perf_counter()
+    esperado = compila_sem_cache(texto)
+    print(f"sem cache                  {time.perf_counter() - inicio:8.3f} s")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        cache = CacheCompilacao(diretorio)
+        inicio = time.perf_counter()
+        cache.compila(texto)
+        print(f"falta (compila + grava)    {time.perf_counter() - inicio:8.3f} s")
+
+        repeticoes = 10
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            obtido = cache.compila(texto)
+        print(f"acerto                     {(time.perf_counter() - inicio) / repeticoes:8.3f} s")
+        print(cache.estatisticas)
+
+    assert obtido == esperado, "Programa/symtab do cache diferentes!"
+    print("Programa e symtab idênticos.")
+
+
+if __name__ == '__main__':
+    main()
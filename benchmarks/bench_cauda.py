@@ -0,0 +1,75 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_cauda.py
+"""
+Chamadas de cauda em Programa.avaliador(): uma soma por recursão de cauda (return conta(...)
+num if e como resultado da função), um par/ímpar mutuamente recursivo e o mesmo laço com while,
+com n = 10^2 ... 10^5. Pelo trampolim de executa_corpo a profundidade não cresce com n; a soma
+sem chamada de cauda (n + soma(n - 1)) ainda aninha uma ativação por nível e para em
+RecursionError. Confere os resultados com a fórmula.
+Uso: python benchmarks/bench_cauda.py [max_n]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+
+PROGRAMAS = {
+    "cauda": ("""
+fun conta(n, a) {
+  if (n == 0) { return a; }
+  return conta(n - 1, a + n);
+}
+main { return conta(%d, 0); }
+""", lambda n: n * (n + 1) // 2),
+    "par/ímpar": ("""
+fun impar(n) { if (n == 0) { return 0; } return par(n - 1); }
+fun par(n) { if (n == 0) { return 1; } return impar(n - 1); }
+main { return par(%d); }
+""", lambda n: 1 - n % 2),
+    "while": ("""
+fun conta(n) {
+  var a = 0;
+  while (n > 0) { a += n; n = n - 1; }
+  return a;
+}
+main { return conta(%d); }
+""", lambda n: n * (n + 1) // 2),
+    "sem cauda": ("""
+fun soma(n) {
+  if (n == 0) { return 0; }
+  return n + soma(n - 1);
+}
+main { return soma(%d); }
+""", lambda n: n * (n + 1) // 2),
+}
+
+
+def main():
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    ns = []
+    n = 100
+    while n <= max_n:
+        ns.append(n)
+        n *= 10
+    for nome, (molde, esperado) in PROGRAMAS.items():
+        print(nome)
+        for n in ns:
+            programa = Parser(AnalizadorLexico(molde % n).tokenizador()).parse()
+            inicio = time.perf_counter()
+            try:
+                r = programa.avaliador()
+            except RecursionError:
+                print(f"    n = {n:>7}   RecursionError")
+                break
+            t = time.perf_counter() - inicio
+            assert r == esperado(n), f"{nome}({n}): {r} x {esperado(n)}"
+            print(f"    n = {n:>7}   {t:8.3f} s  {t / n * 1e6:8.2f} us/nível")
+
+
+if __name__ == '__main__':
+    main()
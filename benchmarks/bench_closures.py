@@ -0,0 +1,89 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_closures.py
+"""
+Interpretador por closures (interpretadorClosures.py) x Programa.avaliador() nos laços: os programas
+de testes.txt que têm while, com o argumento da chamada do main trocado por n, e a função de
+gera_programa (while com if/else e %) chamada com n. Confere, antes, que todos os programas de
+testes.txt dão o mesmo resultado (ou o mesmo erro) nas duas execuções.
+Uso: python benchmarks/bench_closures.py [n]
+"""
+
+import os
+import re
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser, ParserError
+from interpretadorClosures import compila_closures
+from gera_programa import gera_funcao
+
+
+def programas_de_testes():
+    # cada '// TESTE ...' até o próximo, sem os comentários '*** ... ***'
+    with open(os.path.join(RAIZ, "testes.txt"), encoding="utf-8") as f:
+        texto = re.sub(r"\*\*\*.*?\*\*\*", "", f.read(), flags=re.S)
+    for parte in re.split(r"^// *TESTE", texto, flags=re.M)[1:]:
+        titulo, _, fonte = parte.partition("\n")
+        yield titulo.strip(), fonte
+
+
+def resultado(fn):
+    try:
+        return fn()
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def melhor(fn, vezes: int = 3) -> float:
+    tempos = []
+    for _ in range(vezes):
+        inicio = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def compara(nome: str, fonte: str):
+    programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+    compilado = compila_closures(programa)
+    assert programa.avaliador() == compilado.executa(), "resultado diferente!"
+    base = melhor(programa.avaliador)
+    t = melhor(compilado.executa)
+    t_compila = melhor(lambda: compila_closures(programa))
+    print(f"    {nome:<34} avaliador {base:8.3f} s   closures {t:8.3f} s  ({base / t:5.1f}x)"
+          f"   compilação {t_compila * 1000:6.2f} ms")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print("testes.txt: mesmo resultado")
+    lacos = []
+    for titulo, fonte in programas_de_testes():
+        # o léxico não aceita '_' em identificadores (soma_ate, inc_param): sem eles, esses testes
+        # também entram
+        fonte = fonte.replace("_", "")
+        try:
+            programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+        except ParserError:
+            continue
+        a = resultado(programa.avaliador)
+        b = resultado(lambda: compila_closures(programa).executa())
+        assert a == b, f"{titulo}: {a!r} x {b!r}"
+        print(f"    {titulo[:50]:<50} {a}")
+        if "while" in fonte:
+            lacos.append((titulo, fonte))
+
+    print(f"laços com n = {n}")
+    for titulo, fonte in lacos:
+        main_n = re.sub(r"return (\w+)\(\d+\)", rf"return \1({n})", fonte)
+        compara(titulo.split(" — ")[0], main_n)
+    compara("gera_programa f0", gera_funcao(0) + f"main {{ return f0({n}); }}\n")
+
+
+if __name__ == '__main__':
+    main()
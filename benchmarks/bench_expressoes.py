@@ -0,0 +1,164 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_expressoes.py
+"""
+Parser de expressões: cascata recursiva antiga (analisaExpC -> analisaExpA -> analisaExpM ->
+analisaPrim) x precedence climbing (Parser.analisaExp). Mede chamadas de função Python por token,
+tempo, e a profundidade de parênteses que cada um aguenta.
+Uso: python benchmarks/bench_expressoes.py [n_expressoes]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser, ParserError
+from helpers.arvore import Exp, Const, OpBin, Var, Call
+from helpers.token_tipos import Numero, Identificador, Operadores, Pontuacao
+
+
+class ParserCascata(Parser):
+    # camada de expressões como era antes: uma função por nível de precedência
+    def analisaPrim(self) -> Exp:
+        tok = self.get()
+        if tok is None:
+            raise ParserError("Fim inesperado de entrada ao analisar primária")
+        if tok.tipo == Numero.NUMERO:
+            self.proximo_token()
+            return Const(int(tok.lexema))
+        if tok.tipo == Identificador.IDENT:
+            nome, linha, pos, id = tok.lexema, tok.linha, tok.pos, tok.id
+            prox = self.espia(1)
+            if prox is not None and prox.tipo == Pontuacao.PAREN_ESQ:
+                self.proximo_token()
+                self.verificaProxToken(Pontuacao.PAREN_ESQ)
+                args = []
+                tok2 = self.get()
+                if tok2 is not None and tok2.tipo != Pontuacao.PAREN_DIR:
+                    args.append(self.analisaExpC())
+                    tok2 = self.get()
+                    while tok2 is not None and tok2.tipo == Pontuacao.VIRGULA:
+                        self.proximo_token()
+                        args.append(self.analisaExpC())
+                        tok2 = self.get()
+                self.verificaProxToken(Pontuacao.PAREN_DIR)
+                return Call(nome, args, linha=linha, pos=pos, id=id)
+            self.proximo_token()
+            return Var(nome, linha=linha, pos=pos, id=id)
+        if tok.tipo == Pontuacao.PAREN_ESQ:
+            self.proximo_token()
+            expr = self.analisaExpA()
+            self.verificaProxToken(Pontuacao.PAREN_DIR)
+            return expr
+        raise ParserError(f"primária inválida, token {tok}")
+
+    def analisaExpM(self) -> Exp:
+        esq = self.analisaPrim()
+        tok = self.get()
+        while tok is not None and tok.tipo in (Operadores.MULTIPLIC, Operadores.DIVISAO, Operadores.RESTO):
+            self.proximo_token()
+            esq = OpBin(tok.tipo, esq, self.analisaPrim())
+            tok = self.get()
+        return esq
+
+    def analisaExpA(self) -> Exp:
+        esq = self.analisaExpM()
+        tok = self.get()
+        while tok is not None and tok.tipo in (Operadores.SOMA, Operadores.SUBTRACAO):
+            self.proximo_token()
+            esq = OpBin(tok.tipo, esq, self.analisaExpM())
+            tok = self.get()
+        return esq
+
+    def analisaExpC(self) -> Exp:
+        esq = self.analisaExpA()
+        tok = self.get()
+        while tok is not None and tok.tipo in (Operadores.MENOR, Operadores.MAIOR, Operadores.IGUAL_IGUAL,
+                                               Operadores.MENOR_IGUAL, Operadores.MAIOR_IGUAL, Operadores.DIFERENTE):
+            self.proximo_token()
+            esq = OpBin(tok.tipo, esq, self.analisaExpA())
+            tok = self.get()
+        return esq
+
+
+def gera_expressao(rnd: random.Random, profundidade: int) -> str:
+    if profundidade == 0 or rnd.random() < 0.25:
+        return rnd.choice(["x", "y", str(rnd.randint(0, 99))])
+    forma = rnd.random()
+    if forma < 0.15:
+        return f"(({gera_expressao(rnd, profundidade - 1)}))"
+    if forma < 0.25:
+        return f"f({gera_expressao(rnd, profundidade - 1)}, {gera_expressao(rnd, profundidade - 1)})"
+    op = rnd.choice(["+", "-", "*", "/", "%", "+", "*"])
+    return f"{gera_expressao(rnd, profundidade - 1)} {op} {gera_expressao(rnd, profundidade - 1)}"
+
+
+def gera_fonte(n: int) -> str:
+    rnd = random.Random(42)
+    linhas = ["var x = 1;", "var y = 2;", "fun f(a, b) { return a + b; }", "main {"]
+    for _ in range(n):
+        linhas.append(f"  x = {gera_expressao(rnd, 6)} < {gera_expressao(rnd, 4)};")
+    linhas.append("  return x;\n}")
+    return "\n".join(linhas)
+
+
+def conta_chamadas(fn) -> int:
+    # número de chamadas de funções Python (as do C, como dict.get, não entram)
+    chamadas = 0
+
+    def perfil(frame, evento, arg):
+        nonlocal chamadas
+        if evento == 'call':
+            chamadas += 1
+
+    sys.setprofile(perfil)
+    try:
+        fn()
+    finally:
+        sys.setprofile(None)
+    return chamadas
+
+
+LIMITE = 1 << 17
+
+
+def profundidade_maxima(classe) -> int:
+    # maior aninhamento de parênteses (busca por dobra, até LIMITE) que o parser lê sem RecursionError
+    def aguenta(d: int) -> bool:
+        tokens = AnalizadorLexico("main { return " + "(" * d + "1" + ")" * d + "; }").tokenizador()
+        try:
+            classe(tokens).parse()
+            return True
+        except RecursionError:
+            return False
+
+    d = 1
+    while d < LIMITE and aguenta(d * 2):
+        d *= 2
+    return d
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    texto = gera_fonte(n)
+    tokens = AnalizadorLexico(texto).tokenizador()
+    print(f"Fonte: {len(texto)} caracteres, {len(tokens)} tokens, {n} expressões")
+
+    asts = {}
+    for nome, classe in (("cascata recursiva", ParserCascata), ("precedence climbing", Parser)):
+        chamadas = conta_chamadas(lambda: classe(tokens).parse())
+        inicio = time.perf_counter()
+        asts[nome] = classe(tokens).parse()
+        dt = time.perf_counter() - inicio
+        print(f"{nome:<22} {dt:8.3f} s  {chamadas / len(tokens):6.2f} chamadas/token  "
+              f"parênteses aninhados: >= {profundidade_maxima(classe)}")
+
+    assert asts["cascata recursiva"] == asts["precedence climbing"], "ASTs diferentes!"
+    print("ASTs idênticas.")
+
+
+if __name__ == '__main__':
+    main()
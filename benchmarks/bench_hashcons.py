@@ -0,0 +1,94 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_hashcons.py
+"""
+Nós de expressão com hash-consing (helpers/arvore.py): quantas ocorrências de expressão o parser
+cria, quantas subárvores distintas existem ignorando linha/pos (a 'forma' canônica, um DAG em que
+subárvores repetidas são o mesmo objeto) e a memória de cada representação (as formas são montadas
+por cima da árvore, então somam memória). Depois, Exp.gerador de todas as expressões do programa
+sem memo x com memo por forma (o texto não depende de linha/pos).
+Uso: python benchmarks/bench_hashcons.py [n_funcoes]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from helpers.arvore import Exp, OpBin, Call, nos_canonicos
+from helpers.arena import _especie, _filhos_no
+from gera_programa import gera_programa
+
+
+def expressoes(programa) -> list:
+    # raízes de expressão do programa (inicializadores, lados direitos, condições, retornos)
+    raizes = []
+    pilha = [programa]
+    while pilha:
+        no = pilha.pop()
+        for filho in _filhos_no(no, _especie(no)):
+            (raizes if isinstance(filho, Exp) else pilha).append(filho)
+    return raizes
+
+
+def conta(raizes: list) -> tuple:
+    # (ocorrências na árvore, objetos distintos)
+    ocorrencias = 0
+    vistos = set()
+    pilha = list(raizes)
+    while pilha:
+        no = pilha.pop()
+        ocorrencias += 1
+        vistos.add(id(no))
+        if isinstance(no, OpBin):
+            pilha += (no.opEsq, no.opDir)
+        elif isinstance(no, Call):
+            pilha.extend(no.args)
+    return ocorrencias, len(vistos)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    tokens = AnalizadorLexico(gera_programa(n)).tokenizador_compacto()
+
+    tracemalloc.start()
+    programa = Parser(tokens).parse()
+    mem_arvore = tracemalloc.get_traced_memory()[0]
+    raizes = expressoes(programa)
+    antes = tracemalloc.get_traced_memory()[0]
+    formas = [r.forma for r in raizes]
+    mem_formas = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+
+    ocorrencias, distintos = conta(raizes)
+    _, distintas = conta(formas)
+    print(f"{n} funções, {len(raizes)} expressões")
+    print(f"árvore do parser   {ocorrencias:9d} nós  {distintos:9d} objetos  (programa inteiro: {mem_arvore / 1e6:7.1f} MB)")
+    print(f"formas (DAG)       {ocorrencias:9d} nós  {distintas:9d} objetos  ({mem_formas / 1e6:7.1f} MB, "
+          f"{ocorrencias / distintas:.0f} ocorrências por objeto)")
+    print(f"nós canônicos vivos: {nos_canonicos()}")
+
+    inicio = time.perf_counter()
+    textos = [r.gerador() for r in raizes]
+    t_sem = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    memo = {}
+    memo_textos = []
+    for r in raizes:
+        f = r.forma
+        texto = memo.get(f)
+        if texto is None:
+            texto = memo[f] = f.gerador()
+        memo_textos.append(texto)
+    t_com = time.perf_counter() - inicio
+    assert memo_textos == textos, "textos diferentes!"
+    print(f"Exp.gerador sem memo     {t_sem:8.3f} s")
+    print(f"Exp.gerador memo/forma   {t_com:8.3f} s  ({len(memo)} textos distintos)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_incremental.py
+"""
+Latência edição -> AST: léxico + parse completos x SessaoIncremental.edita().
+Uso: python benchmarks/bench_incremental.py [n_funcoes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from sessaoIncremental import SessaoIncremental
+from gera_programa import gera_programa
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texto = gera_programa(n)
+    sessao = SessaoIncremental(texto)
+
+    # edita o literal 'var s{i} = {i};' de uma função no meio do arquivo, várias vezes
+    alvo = f"var s{n // 2} = {n // 2};"
+    inicio = texto.index(alvo) + len(alvo) - 1 - len(str(n // 2))
+    fim = inicio + len(str(n // 2))
+    edicoes = 20
+    t0 = time.perf_counter()
+    for k in range(edicoes):
+        novo = str(k * 1000 + 7)
+        sessao.edita(inicio, fim, novo)
+        fim = inicio + len(novo)
+    dt_inc = (time.perf_counter() - t0) / edicoes
+    est_inc = sessao.estatisticas
+
+    # quebra de linha antes da mesma função: todo o resto do arquivo muda de linha/posição
+    t0 = time.perf_counter()
+    for _ in range(edicoes):
+        sessao.edita(inicio, inicio, '\n')
+    dt_linha = (time.perf_counter() - t0) / edicoes
+
+    t0 = time.perf_counter()
+    completo = Parser(AnalizadorLexico(sessao.texto).tokenizador()).parse()
+    dt_full = time.perf_counter() - t0
+
+    assert completo == sessao.programa, "ASTs diferentes!"
+    print(f"Fonte: {len(texto)} caracteres, {n} funções")
+    print(f"léxico + parse completos   {dt_full * 1000:9.2f} ms")
+    print(f"SessaoIncremental.edita()  {dt_inc * 1000:9.2f} ms  ({est_inc})")
+    print(f"  ... inserindo '\\n'        {dt_linha * 1000:9.2f} ms  ({sessao.estatisticas})")
+
+
+if __name__ == '__main__':
+    main()
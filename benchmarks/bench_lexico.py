@@ -0,0 +1,64 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_lexico.py
+"""
+Vazão do analisador léxico: padrão mestre (tokenizador) x classificador caractere a caractere.
+Uso: python benchmarks/bench_lexico.py [n_funcoes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico, AnalizadorLexicoMmap
+from helpers.token_tipos import Pontuacao
+from helpers.token import Token
+from gera_programa import gera_programa
+
+
+def tokeniza_caractere_a_caractere(texto: str) -> list[Token]:
+    # mesmo laço de antes do padrão mestre: um classificador() por token
+    lexer = AnalizadorLexico(texto)
+    tokens = []
+    while True:
+        tok = lexer.classificador()
+        if tok is None:
+            tokens.append(Token(Pontuacao.EOF, '', lexer.i, lexer.linhas))
+            break
+        tokens.append(tok)
+    return tokens
+
+
+def mede(nome: str, fn, texto: str) -> list[Token]:
+    inicio = time.perf_counter()
+    tokens = fn(texto)
+    dt = time.perf_counter() - inicio
+    mb = len(texto) / (1024 * 1024)
+    print(f"{nome:<28} {dt:8.3f} s  {mb / dt:8.2f} MB/s  {len(tokens) / dt:12.0f} tokens/s")
+    return tokens
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texto = gera_programa(n)
+    print(f"Fonte: {len(texto)} caracteres, {n} funções")
+    lentos = mede("classificador (por caractere)", tokeniza_caractere_a_caractere, texto)
+    rapidos = mede("tokenizador (padrão mestre)", lambda t: AnalizadorLexico(t).tokenizador(), texto)
+    assert list(map(repr, lentos)) == list(map(repr, rapidos)), "fluxos de tokens diferentes!"
+
+    # mmap: inclui a abertura do arquivo (o caminho antigo incluiria o read() inteiro)
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write(texto)
+    try:
+        mapeados = mede("AnalizadorLexicoMmap (bytes)", lambda t: AnalizadorLexicoMmap(f.name).tokenizador(), texto)
+        assert list(map(repr, rapidos)) == list(map(repr, mapeados)), "fluxos de tokens diferentes!"
+        del mapeados
+    finally:
+        os.remove(f.name)
+    print("Fluxos de tokens idênticos.")
+
+
+if __name__ == '__main__':
+    main()
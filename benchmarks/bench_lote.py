@@ -0,0 +1,78 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_lote.py
+"""
+Avaliação em lote (avaliacaoLote.py): a mesma função para n conjuntos de argumentos, uma chamada
+de Call.chama por elemento x o caminho vetorizado com NumPy. Funções só com if/else, returns
+precoces e chamadas a outras funções sem laço; e uma com while, que vai elemento a elemento nos
+dois casos. Confere que os resultados são iguais (o elemento a elemento roda sobre os primeiros
+n_elemento conjuntos e o tempo dele é estendido para n).
+Uso: python benchmarks/bench_lote.py [n] [n_elemento]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from avaliacaoLote import FuncaoLote, np
+
+FONTE = """
+var limite = 1000;
+fun abs(x) { if (x < 0) { return 0 - x; } return x; }
+fun limita(x, lo, hi) {
+  var r = x;
+  if (x < lo) { r = lo; } else { if (x > hi) { r = hi; } }
+  return r;
+}
+fun passo(a, b) {
+  var t = a * 3 + b;
+  if (t % 2 == 0) { t = t / 2; } else { t = 3 * t + 1; }
+  if (b != 0) { return t / b + abs(a - b); }
+  return limita(t, 0 - limite, limite) + a % 5;
+}
+fun somaAte(n, b) {
+  var s = 0;
+  while (n > 0) { s += n % 7 + b; n = n - 1; }
+  return s;
+}
+main { return 0; }
+"""
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    n_elemento = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    if np is None:
+        print("NumPy não instalado: todo lote vai elemento a elemento")
+        return
+    programa = Parser(AnalizadorLexico(FONTE).tokenizador()).parse()
+    build_symbol_table_and_offsets(programa)
+    aleatorio = random.Random(0)
+    a = np.array([aleatorio.randint(-10 ** 6, 10 ** 6) for _ in range(n)], dtype=np.int64)
+    b = np.array([aleatorio.randint(-5, 5) for _ in range(n)], dtype=np.int64)
+    print(f"n = {n}")
+    for nome, colunas in (("abs", (a,)), ("limita", (a, b * 100, b * 100 + 500)),
+                          ("passo", (a, b)), ("somaAte", (np.abs(a) % 50, b))):
+        lote = FuncaoLote(programa, nome)
+        q_elemento = [c[:n_elemento] for c in colunas]
+        inicio = time.perf_counter()
+        esperado = lote.avalia_por_elemento(q_elemento, n_elemento)
+        t_elemento = (time.perf_counter() - inicio) * n / n_elemento
+        if lote.motivo is None:
+            inicio = time.perf_counter()
+            r = lote.avalia(*colunas)
+            t = time.perf_counter() - inicio
+            assert (r[:n_elemento] == esperado).all(), f"{nome}: resultado diferente!"
+            print(f"    {nome:<10} elemento a elemento {t_elemento:8.3f} s   lote {t:8.3f} s  "
+                  f"({t_elemento / t:7.1f}x)  {n / t / 1e6:7.2f} M elementos/s")
+        else:
+            print(f"    {nome:<10} elemento a elemento {t_elemento:8.3f} s   (não vetoriza: {lote.motivo})")
+
+
+if __name__ == '__main__':
+    main()
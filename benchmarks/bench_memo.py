@@ -0,0 +1,85 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_memo.py
+"""
+Programa.avaliador() sem e com memo das funções puras (CacheChamadas): fib e caminhos numa grade
+(recursões que recalculam os mesmos argumentos um número exponencial de vezes), e uma função que
+lê uma global atribuída no main (impura: não entra no memo). Mostra quais funções a análise de
+analisadorSemantico marcou puras, o tempo de cada execução e as estatísticas do memo, e confere
+que os resultados são os mesmos; com um LRU pequeno as entradas saem e o resultado não muda.
+Uso: python benchmarks/bench_memo.py [n_fib] [n_grade]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from helpers.arvore import CacheChamadas
+
+PROGRAMAS = {
+    "fib": """
+fun fib(n) {
+  var r = 0;
+  if (n < 2) { r = n; } else { r = fib(n - 1) + fib(n - 2); }
+  return r;
+}
+main { return fib(%(fib)d); }
+""",
+    "caminhos na grade": """
+fun caminhos(a, b) {
+  if (a == 0) { return 1; }
+  if (b == 0) { return 1; }
+  return (caminhos(a - 1, b) + caminhos(a, b - 1)) %% 1000007;
+}
+main { return caminhos(%(grade)d, %(grade)d); }
+""",
+    "global atribuída": """
+var k = 0;
+var s = 0;
+fun escala(x) { return x * k; }
+main {
+  while (k < %(fib)d) {
+    s += escala(3) + escala(3);
+    k++;
+  }
+  return s;
+}
+""",
+}
+
+
+def tempo(fn):
+    inicio = time.perf_counter()
+    r = fn()
+    return r, time.perf_counter() - inicio
+
+
+def main():
+    n_fib = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_grade = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    for nome, molde in PROGRAMAS.items():
+        fonte = molde % {'fib': n_fib, 'grade': n_grade}
+        programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+        symtab = build_symbol_table_and_offsets(programa)
+        puras = [e['name'] for e in symtab.values() if e.get('pura')]
+        print(f"{nome}: puras {puras or '-'}")
+        esperado, base = tempo(programa.avaliador)
+        memo = CacheChamadas()
+        r, t = tempo(lambda: programa.avaliador(memo))
+        assert r == esperado, f"{nome}: {r} x {esperado}"
+        r, t_pequeno = tempo(lambda: programa.avaliador(CacheChamadas(tamanho_max=4)))
+        assert r == esperado, f"{nome} (LRU de 4): {r} x {esperado}"
+        r, t_desligado = tempo(lambda: programa.avaliador(CacheChamadas(ligado=False)))
+        assert r == esperado, f"{nome} (desligado): {r} x {esperado}"
+        print(f"    sem memo {base:8.3f} s   memo {t:8.3f} s  ({base / t:7.1f}x)   "
+              f"LRU de 4 {t_pequeno:8.3f} s   desligado {t_desligado:8.3f} s   resultado {esperado}")
+        for linha in memo.relatorio().splitlines():
+            print("    " + linha)
+
+
+if __name__ == '__main__':
+    main()
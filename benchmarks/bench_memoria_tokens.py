@@ -0,0 +1,48 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_memoria_tokens.py
+"""
+Memória por token: lista de Token x TokenBuffer (struct-of-arrays), e o parse sobre cada um.
+Uso: python benchmarks/bench_memoria_tokens.py [n_funcoes]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from gera_programa import gera_programa
+
+
+def mede_memoria(nome: str, fn):
+    tracemalloc.start()
+    resultado = fn()
+    usado, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(resultado)
+    print(f"{nome:<16} {n} tokens  {usado / 1024 / 1024:8.2f} MB  {usado / n:8.1f} bytes/token")
+    return resultado
+
+
+def mede_parse(nome: str, tokens):
+    inicio = time.perf_counter()
+    ast = Parser(tokens).parse()
+    print(f"parse sobre {nome:<16} {time.perf_counter() - inicio:8.3f} s")
+    return ast
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    texto = gera_programa(n)
+    lista = mede_memoria("list[Token]", lambda: AnalizadorLexico(texto).tokenizador())
+    buffer = mede_memoria("TokenBuffer", lambda: AnalizadorLexico(texto).tokenizador_compacto())
+    a = mede_parse("list[Token]", lista)
+    b = mede_parse("TokenBuffer", buffer)
+    assert repr(a) == repr(b), "ASTs diferentes!"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_paralelo.py
+"""
+Parser sequencial x ParserParalelo (declarações de topo parseadas num ProcessPoolExecutor) com
+1, 2, 4, ... processos, até os núcleos da máquina. O pool é aquecido antes da medição (a criação
+dos processos não entra no tempo) e as ASTs são conferidas contra a do parser sequencial. Também
+mostra a CPU gasta só no processo principal (pré-varredura, empacotamento, main, desserialização):
+é a parte que não escala, o piso do tempo com muitos núcleos.
+Uso: python benchmarks/bench_paralelo.py [n_funcoes] [max_processos]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from parserParalelo import ParserParalelo
+from gera_programa import gera_programa
+
+
+def mede(fn, repeticoes: int = 3):
+    # (melhor tempo de parede, CPU do processo principal nessa mesma execução)
+    melhor = (float('inf'), 0.0)
+    for _ in range(repeticoes):
+        inicio, cpu = time.perf_counter(), time.process_time()
+        fn()
+        melhor = min(melhor, (time.perf_counter() - inicio, time.process_time() - cpu))
+    return melhor
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    max_processos = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    tokens = AnalizadorLexico(gera_programa(n)).tokenizador()
+    print(f"{n} funções, {len(tokens)} tokens, {os.cpu_count()} núcleos")
+
+    esperado = Parser(tokens).parse()
+    t_seq, _ = mede(lambda: Parser(tokens).parse())
+    print(f"sequencial          {t_seq:8.3f} s")
+
+    processos = 1
+    while processos <= max_processos:
+        with ParserParalelo(processos) as parser:
+            assert parser.parse(tokens) == esperado, "ASTs diferentes!"
+            dt, cpu = mede(lambda: parser.parse(tokens))
+        print(f"{processos:3d} processo(s)     {dt:8.3f} s  ({t_seq / dt:5.2f}x)  "
+              f"CPU no processo principal {cpu:6.3f} s")
+        processos *= 2
+
+
+if __name__ == '__main__':
+    main()
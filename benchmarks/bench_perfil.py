@@ -0,0 +1,45 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_perfil.py
+"""
+Custo do perfil (perfilador.py) sobre Programa.avaliador(): o laço de gera_programa e fib, sem
+perfil e com perfila(). Sem ganchos, o avaliador só testa um None por nó; com o Perfilador, todo
+nó passa pelos ganchos e é contado. Confere que o resultado é o mesmo e mostra a tabela do perfil
+de fib.
+Uso: python benchmarks/bench_perfil.py [n] [n_fib]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from perfilador import perfila
+from bench_bytecode import FIB
+from bench_closures import melhor
+from gera_programa import gera_funcao
+
+
+def compara(nome: str, fonte: str):
+    programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+    r, perfil = perfila(programa)
+    assert r == programa.avaliador(), "resultado diferente!"
+    base = melhor(programa.avaliador)
+    t = melhor(lambda: perfila(programa))
+    print(f"    {nome:<22} avaliador {base:8.3f} s   com perfil {t:8.3f} s  ({t / base:5.1f}x)")
+    return perfil
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_fib = int(sys.argv[2]) if len(sys.argv) > 2 else 18
+    print(f"n = {n}, fib({n_fib})")
+    compara("gera_programa f0", gera_funcao(0) + f"main {{ return f0({n}); }}\n")
+    perfil = compara("fib", FIB % n_fib)
+    print()
+    print(perfil.tabela())
+
+
+if __name__ == '__main__':
+    main()
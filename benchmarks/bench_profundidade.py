@@ -0,0 +1,117 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_profundidade.py
+"""
+Expressões enormes: 'return x + 2 * x - (x - 1) + x % 7 ...' com n operandos vira uma árvore OpBin
+funda à esquerda, com um nível por operando. Compila (léxico, parse, as duas checagens
+semânticas, assembly), imprime como main.py (print(ast) e Programa.gerador, com a cadeia do main
+dentro de um if) e avalia para n = 10^3 ... 10^6, mostrando o tempo por operando de cada fase
+(constante = linear) e o pico de memória. Com o rich instalado, roda também python main.py
+--bytecode num arquivo com a cadeia, que imprime tokens, AST, código gerado e a árvore do rich.
+Uso: python benchmarks/bench_profundidade.py [max_operandos]
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from gerador import gera_codigo
+
+TERMOS = ("x", "2 * x", "(x - 1)", "x % 7")
+
+
+def gera_fonte(n: int) -> str:
+    partes = [TERMOS[0]]
+    for i in range(1, n):
+        partes.append(" - " if i % 3 == 0 else " + ")
+        partes.append(TERMOS[i % len(TERMOS)])
+    cadeia = "".join(partes)
+    return ("var x = 5;\nfun f(y) {\n  return y + " + cadeia + ";\n}\n"
+            "main {\n  if (x > 0) {\n    return f(1) - " + cadeia + ";\n  }\n  return 0;\n}\n")
+
+
+def esperado(n: int) -> int:
+    # valor do programa com x = 5, calculado sem a AST: f(1) = 1 + cadeia; main = f(1) - termo0 ...
+    valores = {"x": 5, "2 * x": 10, "(x - 1)": 4, "x % 7": 5}
+    resto = 0
+    for i in range(1, n):
+        v = valores[TERMOS[i % len(TERMOS)]]
+        resto += -v if i % 3 == 0 else v
+    primeiro = valores[TERMOS[0]]
+    f1 = 1 + primeiro + resto
+    return f1 - primeiro + resto
+
+
+def fases(texto: str):
+    # TokenBuffer (11 bytes/token) e descartado depois do parse: a memória que sobra é a da AST
+    tokens = AnalizadorLexico(texto).tokenizador_compacto()
+    yield "léxico", None
+    ast = Parser(tokens).parse()
+    del tokens
+    yield "parse", None
+    yield "verifica_semantica", ast.verifica_semantica()
+    yield "build_symbol_table", build_symbol_table_and_offsets(ast)
+    # as saídas de main.py: a cadeia do main está num Return dentro de um If (repr dos comandos)
+    yield "print(ast)", len(repr(ast))
+    yield "Programa.gerador", len(ast.gerador())
+    yield "assembly", len(gera_codigo(ast))
+    yield "avaliador", ast.avaliador()
+
+
+def main_py(n: int) -> None:
+    # python main.py --bytecode com a cadeia (num diretório temporário: main.py grava assemblys/saida.s)
+    if importlib.util.find_spec("rich") is None:
+        print(f"main.py --bytecode com {n} operandos: pulado (rich não instalado)")
+        return
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "cadeia.txt")
+        with open(caminho, "w") as f:
+            f.write(gera_fonte(n))
+        inicio = time.perf_counter()
+        saida = subprocess.run([sys.executable, os.path.join(RAIZ, "main.py"), "--bytecode", caminho],
+                               cwd=pasta, capture_output=True, text=True)
+        dt = time.perf_counter() - inicio
+    assert saida.returncode == 0, saida.stderr[-2000:] or saida.stdout[-2000:]
+    linhas = saida.stdout.splitlines()
+    resultado = linhas[linhas.index("--- Resultado da avaliação ---") + 1]
+    assert int(resultado) == esperado(n), f"main.py: {resultado} != {esperado(n)}"
+    print(f"main.py --bytecode com {n} operandos: {dt:.3f} s, resultado {resultado}")
+
+
+def main():
+    max_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    main_py(5000)
+    n = 1000
+    while n <= max_n:
+        texto = gera_fonte(n)
+        tempos = []
+        anterior = time.perf_counter()
+        for nome, valor in fases(texto):
+            agora = time.perf_counter()
+            tempos.append((nome, agora - anterior))
+            anterior = agora
+        assert valor == esperado(n), f"avaliador: {valor} != {esperado(n)}"
+
+        tracemalloc.start()
+        for _ in fases(texto):
+            pass
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"n = {n:>8} operandos (x2: função e main)   pico {pico / n:7.0f} bytes/operando")
+        for nome, dt in tempos:
+            print(f"    {nome:<20} {dt:8.3f} s  {dt / n * 1e6:6.2f} µs/operando")
+        n *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_python.py
+"""
+Transpilação para Python (transpiladorPython.py) x Programa.avaliador(): o laço de soma, a função de
+gera_programa e fib, com o tempo de transpilar + compile() na primeira vez e com o objeto de código
+já guardado (mesmo fonte). Confere que os programas de testes.txt que passam na análise semântica
+dão o mesmo resultado (ou o mesmo erro) nas duas execuções, e também programas com ramos e
+corpos de while só com blocos vazios.
+Uso: python benchmarks/bench_python.py [n] [n_fib]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser, ParserError
+from analisadorSemantico import build_symbol_table_and_offsets
+import transpiladorPython
+from transpiladorPython import compila_python
+from bench_bytecode import SOMA, FIB
+from bench_closures import programas_de_testes, resultado, melhor
+from gera_programa import gera_funcao
+
+# ramos e corpos só com blocos vazios (não geram linhas no Python)
+BLOCOS_VAZIOS = {
+    "if só com bloco vazio": "var a = 1; main { if (a) { { } } return a; }",
+    "if/else com blocos vazios": "var a = 0; main { if (a) { { } } else { { { } } } return a; }",
+    "while só com bloco vazio": "var a = 0; main { while (a) { { } } return a + 1; }",
+    "while com chamada na condição": "fun f(x) { return x; } var a = 0; main { while (f(a)) { { } } return 2; }",
+}
+
+
+def compara(nome: str, fonte: str):
+    programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+    symtab = build_symbol_table_and_offsets(programa)
+    transpiladorPython._CODIGOS.clear()
+    t_primeira = melhor(lambda: (transpiladorPython._CODIGOS.clear(), compila_python(programa, symtab)))
+    compilado = compila_python(programa, symtab)
+    t_guardado = melhor(lambda: compila_python(programa, symtab))
+    assert programa.avaliador() == compilado.executa(), "resultado diferente!"
+    base = melhor(programa.avaliador)
+    t = melhor(compilado.executa)
+    print(f"    {nome:<22} avaliador {base:8.3f} s   python {t:8.3f} s  ({base / t:6.1f}x)"
+          f"   compilação {t_primeira * 1000:6.2f} ms (guardada {t_guardado * 1000:6.2f} ms)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    n_fib = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print("testes.txt: mesmo resultado")
+    for titulo, fonte in programas_de_testes():
+        fonte = fonte.replace("_", "")
+        try:
+            programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+            build_symbol_table_and_offsets(programa)
+        except (ParserError, NameError):
+            continue
+        a = resultado(programa.avaliador)
+        b = resultado(lambda: compila_python(programa).executa())
+        assert a == b, f"{titulo}: {a!r} x {b!r}"
+        print(f"    {titulo[:50]:<50} {a}")
+    for titulo, fonte in BLOCOS_VAZIOS.items():
+        programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+        build_symbol_table_and_offsets(programa)
+        a = resultado(programa.avaliador)
+        b = resultado(lambda: compila_python(programa).executa())
+        assert a == b, f"{titulo}: {a!r} x {b!r}"
+        print(f"    {titulo[:50]:<50} {a}")
+
+    print(f"n = {n}, fib({n_fib})")
+    compara("soma acumulada", SOMA % n)
+    compara("gera_programa f0", gera_funcao(0) + f"main {{ return f0({n}); }}\n")
+    compara("fib", FIB % n_fib)
+
+
+if __name__ == '__main__':
+    main()
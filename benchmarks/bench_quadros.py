@@ -0,0 +1,50 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_quadros.py
+"""
+Custo de uma chamada em Programa.avaliador() conforme o número de globais do programa: fib(n) com
+0, 10, 100 e 1000 globais declaradas. Com os registros de ativação (Quadro: slots dos parâmetros e
+locais + um armazenamento de globais compartilhado) o tempo por chamada não depende das globais.
+Uso: python benchmarks/bench_quadros.py [n_fib]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+
+FIB = """
+fun fib(n) {
+  var r = 0;
+  if (n < 2) { r = n; } else { r = fib(n - 1) + fib(n - 2); }
+  return r;
+}
+main { return fib(%d); }
+"""
+
+
+def chamadas_fib(n: int) -> int:
+    a, b = 1, 1
+    for _ in range(n):
+        a, b = b, a + b + 1
+    return a
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 18
+    chamadas = chamadas_fib(n)
+    print(f"fib({n}): {chamadas} chamadas")
+    for n_globais in (0, 10, 100, 1000):
+        globais = "".join(f"var g{i} = {i};\n" for i in range(n_globais))
+        programa = Parser(AnalizadorLexico(globais + FIB % n).tokenizador()).parse()
+        inicio = time.perf_counter()
+        programa.avaliador()
+        t = time.perf_counter() - inicio
+        print(f"    {n_globais:5} globais  {t:8.3f} s  {t / chamadas * 1e6:8.2f} us/chamada")
+
+
+if __name__ == '__main__':
+    main()
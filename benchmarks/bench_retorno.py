@@ -0,0 +1,91 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_retorno.py
+"""
+Funções que saem cedo por return em Programa.avaliador(): menor divisor (return de dentro de um
+while, dentro de um if), sinal (três returns em ifs seguidos) e busca com dois laços aninhados,
+cada uma chamada n vezes de um laço do main. O return sai de executa() como valor (None = seguir),
+sem levantar e capturar uma exceção por chamada. Confere o resultado com o interpretador por
+closures.
+Uso: python benchmarks/bench_retorno.py [n]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from interpretadorClosures import compila_closures
+
+GLOBAIS = """
+var i = 0;
+var s = 0;
+"""
+
+LACO = """
+main {
+  while (i < %d) {
+    s += %s;
+    i++;
+  }
+  return s;
+}
+"""
+
+PROGRAMAS = {
+    "menor divisor": ("""
+fun menorDiv(n) {
+  var d = 2;
+  while (d < n) {
+    if (n %% d == 0) { return d; }
+    d++;
+  }
+  return n;
+}
+""", "menorDiv(i % 50 + 2)"),
+    "sinal": ("""
+fun sinal(x) {
+  if (x < 0) { return 0 - 1; }
+  if (x == 0) { return 0; }
+  return 1;
+}
+""", "sinal(i % 3 - 1)"),
+    "laços aninhados": ("""
+fun par(n) {
+  var a = 1;
+  var b = 1;
+  while (a < n) {
+    b = 1;
+    while (b < n) {
+      if (a * b == n) { return a + b; }
+      b++;
+    }
+    a++;
+  }
+  return 0;
+}
+""", "par(i % 12 + 1)"),
+}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"n = {n} chamadas")
+    for nome, (funcao, chamada) in PROGRAMAS.items():
+        fonte = GLOBAIS + (funcao + LACO) % (n, chamada)
+        programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+        esperado = compila_closures(programa).executa()
+        tempos = []
+        for _ in range(3):
+            inicio = time.perf_counter()
+            r = programa.avaliador()
+            tempos.append(time.perf_counter() - inicio)
+        assert r == esperado, f"{nome}: {r} x {esperado}"
+        t = min(tempos)
+        print(f"    {nome:<16} {t:8.3f} s  {t / n * 1e6:8.2f} us/chamada   resultado {r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_servico.py
+"""
+Um processo novo por programa (python -c com o mesmo caminho de main.py até o resultado: importa
+o compilador, léxico, parse, semântica, avaliação; o main.py ainda importa o rich) contra pedidos
+ao servicoCompilacao.py pelo stdin: um pedido por vez (latência de ida e volta) e todos de uma
+vez (vazão com o pool de processos). Confere que todas as respostas dão o resultado do processo
+novo e mostra as métricas do serviço.
+Uso: python benchmarks/bench_servico.py [n_programas] [processos]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMA = """
+var s = 0;
+var i = 0;
+fun quadrado(x) { return x * x; }
+main {
+  while (i < %d) { s += quadrado(i); i++; }
+  return s;
+}
+"""
+
+# os mesmos imports de main.py (menos o rich), mesmo os que o bytecode não usa
+PROCESSO_NOVO = """
+import sys
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from gerador import gera_codigo
+from interpretadorClosures import avalia_closures
+from maquinaVirtual import compila_bytecode
+from transpiladorPython import compila_python
+programa = Parser(AnalizadorLexico(sys.stdin.read()).tokenizador()).parse()
+symtab = build_symbol_table_and_offsets(programa)
+print(compila_bytecode(programa, symtab).executa())
+"""
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    processos = sys.argv[2] if len(sys.argv) > 2 else str(os.cpu_count() or 1)
+    fontes = [PROGRAMA % (k * 10) for k in range(n)]
+
+    inicio = time.perf_counter()
+    esperados = []
+    for fonte in fontes:
+        saida = subprocess.run([sys.executable, "-c", PROCESSO_NOVO], input=fonte, cwd=RAIZ,
+                               capture_output=True, text=True, check=True).stdout
+        esperados.append(int(saida))
+    t_novo = time.perf_counter() - inicio
+    print(f"processo novo por programa   {t_novo / n * 1000:8.2f} ms/programa")
+
+    inicio = time.perf_counter()
+    servico = subprocess.Popen([sys.executable, os.path.join(RAIZ, "servicoCompilacao.py"),
+                                "--processos", processos], cwd=RAIZ, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    def pede(pedido):
+        servico.stdin.write(json.dumps(pedido) + "\n")
+        servico.stdin.flush()
+
+    pede({"id": -1, "op": "ping"})
+    servico.stdout.readline()
+    print(f"partida do serviço           {(time.perf_counter() - inicio) * 1000:8.2f} ms (uma vez)")
+
+    # um por vez: a primeira passada aquece os processos (e o LRU de programas de cada um)
+    for rodada in ("um por vez (1a passada)", "um por vez (2a passada)"):
+        inicio = time.perf_counter()
+        for k, fonte in enumerate(fontes):
+            pede({"id": k, "op": "avalia", "fonte": fonte})
+            resposta = json.loads(servico.stdout.readline())
+            assert resposta["ok"] and resposta["resultado"] == esperados[k], resposta
+        t = time.perf_counter() - inicio
+        print(f"{rodada:<28} {t / n * 1000:8.2f} ms/programa  ({t_novo / t:6.1f}x)")
+
+    inicio = time.perf_counter()
+    for k, fonte in enumerate(fontes):
+        pede({"id": k, "op": "avalia", "fonte": fonte, "modo": "closures"})
+    for _ in fontes:
+        resposta = json.loads(servico.stdout.readline())
+        assert resposta["ok"] and resposta["resultado"] == esperados[resposta["id"]], resposta
+    t = time.perf_counter() - inicio
+    print(f"todos de uma vez             {t / n * 1000:8.2f} ms/programa  ({t_novo / t:6.1f}x)")
+
+    pede({"op": "metricas"})
+    metricas = json.loads(servico.stdout.readline())["metricas"]["avalia"]
+    print(f"serviço: {metricas['pedidos']} pedidos, ms {metricas['ms']}, espera {metricas['ms_fila']}")
+    servico.stdin.close()
+    servico.wait()
+
+
+if __name__ == '__main__':
+    main()
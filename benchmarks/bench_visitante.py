@@ -0,0 +1,165 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/bench_visitante.py
+"""
+Despacho por classe de nó (helpers/visitante.py): pré-ordem completa do programa com a cadeia de
+isinstance que as fases usavam x Visitante.percorre (tabela {classe: método}, um acesso a dict por
+nó), e o gerador de assembly e a verificação semântica já portados. Depois, a passada de exemplo
+DobraConstantes: num programa sem constantes a dobrar devolve o mesmo Programa (nada é copiado) e,
+num com expressões constantes, o resultado da avaliação continua o mesmo.
+Uso: python benchmarks/bench_visitante.py [n_funcoes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from gerador import gera_codigo
+from helpers.arvore import (
+    Const, Var, OpBin, Call, Decl, Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt, FunDecl, Programa,
+)
+from helpers.visitante import VisitanteComandos, DobraConstantes, executa_passos
+from gera_programa import gera_programa
+
+
+def conta_isinstance(programa) -> int:
+    n = 0
+    pilha = [programa]
+    while pilha:
+        no = pilha.pop()
+        n += 1
+        if isinstance(no, Const) or isinstance(no, Var):
+            continue
+        if isinstance(no, OpBin):
+            pilha += (no.opDir, no.opEsq)
+        elif isinstance(no, Call):
+            pilha.extend(reversed(no.args))
+        elif isinstance(no, (Decl, Assign, ReturnStmt)):
+            pilha.append(no.expr)
+        elif isinstance(no, IfStmt):
+            pilha.extend(reversed(no.else_stmts or ()))
+            pilha.extend(reversed(no.then_stmts))
+            pilha.append(no.cond)
+        elif isinstance(no, WhileStmt):
+            pilha.extend(reversed(no.body))
+            pilha.append(no.cond)
+        elif isinstance(no, BlockStmt):
+            pilha.extend(reversed(no.stmts))
+        elif isinstance(no, FunDecl):
+            pilha.append(no.resultado)
+            pilha.extend(reversed(no.comandos))
+            pilha.extend(reversed(no.local_decls))
+        elif isinstance(no, Programa):
+            pilha.append(no.resultado)
+            pilha.extend(reversed(no.comandos))
+            pilha.extend(reversed(no.fun_decls))
+            pilha.extend(reversed(no.var_decls))
+    return n
+
+
+class Conta(VisitanteComandos):
+    def __init__(self):
+        self.n = 0
+
+    def generico(self, no):
+        # Const e Var
+        self.n += 1
+
+    def visita_OpBin(self, no):
+        self.n += 1
+        return (no.opEsq, no.opDir)
+
+    def visita_Call(self, no):
+        self.n += 1
+        return no.args
+
+    def visita_Decl(self, no):
+        self.n += 1
+        return (no.expr,)
+
+    def visita_Assign(self, no):
+        self.n += 1
+        return (no.expr,)
+
+    def visita_ReturnStmt(self, no):
+        self.n += 1
+        return (no.expr,)
+
+    def visita_IfStmt(self, no):
+        self.n += 1
+        return super().visita_IfStmt(no)
+
+    def visita_WhileStmt(self, no):
+        self.n += 1
+        return super().visita_WhileStmt(no)
+
+    def visita_BlockStmt(self, no):
+        self.n += 1
+        return no.stmts
+
+    def visita_FunDecl(self, no):
+        self.n += 1
+        return [*no.local_decls, *no.comandos, no.resultado]
+
+    def visita_Programa(self, no):
+        self.n += 1
+        return [*no.var_decls, *no.fun_decls, *no.comandos, no.resultado]
+
+
+def conta_visitante(programa) -> int:
+    c = Conta()
+    c.percorre(programa)
+    return c.n
+
+
+def mede(nome: str, fn):
+    inicio = time.perf_counter()
+    resultado = fn()
+    print(f"    {nome:<40} {time.perf_counter() - inicio:8.3f} s")
+    return resultado
+
+
+CONSTANTES = """
+var k = 60 * 60 * 24;
+fun f(n) { var i = 0; var s = 0;
+  while (i < n) { s += (2 + 3) * i - 10 / 2; i++; }
+  return s + k % (7 * 11); }
+main { return f(1000) + 100 * 2; }
+"""
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    programa = Parser(AnalizadorLexico(gera_programa(n)).tokenizador_compacto()).parse()
+    build_symbol_table_and_offsets(programa)
+
+    print(f"{n} funções")
+    print("pré-ordem completa")
+    a = mede("cadeia de isinstance", lambda: conta_isinstance(programa))
+    b = mede("Visitante.percorre (tabela por classe)", lambda: conta_visitante(programa))
+    assert a == b, "contagens diferentes!"
+    print(f"    {a} nós")
+    print("fases portadas")
+    mede("gera_codigo (EmissorAsm)", lambda: gera_codigo(programa))
+    mede("verifica_semantica (VerificaEscopo)", programa.verifica_semantica)
+
+    print("DobraConstantes")
+    tempos = {}
+    mesmo = executa_passos(programa, [DobraConstantes()], tempos)
+    print(f"    {'programa gerado':<40} {tempos['dobra_constantes']:8.3f} s  "
+          f"({'mesmo objeto' if mesmo is programa else 'copiado'})")
+    antes = Parser(AnalizadorLexico(CONSTANTES).tokenizador()).parse()
+    depois = DobraConstantes().executa(antes)
+    assert antes.avaliador() == depois.avaliador(), "resultado diferente depois da dobra!"
+    for a, d in [(antes.var_decls[0].expr, depois.var_decls[0].expr),
+                 (antes.fun_decls[0].resultado, depois.fun_decls[0].resultado),
+                 (antes.resultado, depois.resultado)]:
+        print(f"    {a.gerador():<40} -> {d.gerador()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# João Victor Lourenço da Silva (20220005997)
+# benchmarks/gera_programa.py
+"""
+Gera programas FUN sintéticos (grandes) para os benchmarks.
+Cada função usa locais, while, if/else, operadores compostos e chamadas às funções anteriores.
+"""
+
+
+def gera_funcao(i: int) -> str:
+    chamada = f"f{i - 1}(n - 1)" if i > 0 else "n"
+    return (
+        f"fun f{i}(n) {{\n"
+        f"  var i = 0;\n"
+        f"  var s{i} = {i};\n"
+        f"  while (i < n) {{\n"
+        f"    if ((i % 3) == 0) {{\n"
+        f"      s{i} += i * 2;\n"
+        f"    }} else {{\n"
+        f"      s{i} -= 1;\n"
+        f"    }}\n"
+        f"    i++;\n"
+        f"  }}\n"
+        f"  return s{i} + {chamada};\n"
+        f"}}\n"
+    )
+
+
+def gera_programa(n_funcoes: int) -> str:
+    partes = ["var g = 7;\n"]
+    for i in range(n_funcoes):
+        partes.append(gera_funcao(i))
+    partes.append(f"main {{\n  g = f{n_funcoes - 1}(3) + g;\n  return g;\n}}\n")
+    return "".join(partes)
+
+
+if __name__ == '__main__':
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(gera_programa(n), end="")
@@ -0,0 +1,181 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Cache em disco, endereçado por conteúdo, do front-end: léxico -> Parser.parse ->
+build_symbol_table_and_offsets.
+
+- Chave: sha256 da versão do compilador + texto-fonte. A versão inclui o código dos módulos que
+  definem o Programa verificado, então mexer no léxico/parser/semântica invalida tudo sozinho.
+- Valor: o Programa já verificado (FunDecl com param_offsets/local_offsets/frame_size) no formato
+  binário de serializadorBinario.py; a symtab sai das anotações. Num acerto não há léxico, parse
+  nem checagem. O escritor e o leitor usam pilha explícita, então árvores fundas (cadeias enormes
+  de OpBin) também entram no cache.
+- Cada entrada é um arquivo <chave>.bin; a gravação vai para um temporário e entra com os.replace
+  (atômico), então vários processos podem ler e gravar o mesmo diretório sem ver arquivo pela metade.
+- LRU limitado por tamanho: um acerto atualiza o mtime da entrada; ao passar de tamanho_max, as
+  entradas mais antigas saem (com flock num arquivo de trava, quando disponível).
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # sem flock (Windows): a remoção continua tolerando corridas
+    fcntl = None
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from helpers.arvore import Programa
+from serializadorBinario import EscritorBinario, carrega, FormatoInvalido
+
+# muda quando o formato das entradas muda
+FORMATO = 2
+
+# módulos cujo código determina o Programa verificado que vai para o cache
+MODULOS_COMPILADOR = (
+    'analisadorLexico', 'analisadorSintatico', 'analisadorSemantico', 'cacheCompilacao',
+    'serializadorBinario', 'helpers.arena', 'helpers.arvore', 'helpers.linhas', 'helpers.simbolos',
+    'helpers.token', 'helpers.token_buffer', 'helpers.token_tipos', 'helpers.visitante',
+)
+
+TAMANHO_MAX = 256 * 1024 * 1024
+SUFIXO = '.bin'
+
+_versao: Optional[str] = None
+
+
+def versao_compilador() -> str:
+    # hash do código-fonte dos módulos do front-end (calculado uma vez por processo)
+    global _versao
+    if _versao is None:
+        h = hashlib.sha256(f"{FORMATO}:{sys.version_info[:2]}".encode())
+        raiz = os.path.dirname(os.path.abspath(__file__))
+        for nome in MODULOS_COMPILADOR:
+            with open(os.path.join(raiz, *nome.split('.')) + '.py', 'rb') as f:
+                h.update(f.read())
+        _versao = h.hexdigest()
+    return _versao
+
+
+def chave(texto: str) -> str:
+    h = hashlib.sha256(versao_compilador().encode())
+    h.update(b'\0')
+    h.update(texto.encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
+
+
+def compila_sem_cache(texto: str) -> Tuple[Programa, Dict[int, Any]]:
+    programa = Parser(AnalizadorLexico(texto).tokenizador()).parse()
+    symtab = build_symbol_table_and_offsets(programa)
+    return programa, symtab
+
+
+class CacheCompilacao:
+    def __init__(self, diretorio: str, tamanho_max: int = TAMANHO_MAX):
+        self.diretorio = diretorio
+        self.tamanho_max = tamanho_max
+        os.makedirs(diretorio, exist_ok=True)
+        self.estatisticas = {'acertos': 0, 'faltas': 0, 'gravacoes': 0, 'removidas': 0}
+
+    def _caminho(self, k: str) -> str:
+        return os.path.join(self.diretorio, k + SUFIXO)
+
+    def compila(self, texto: str) -> Tuple[Programa, Dict[int, Any]]:
+        """
+        Devolve (programa verificado, symtab) do texto, do cache se possível.
+        Erros sintáticos/semânticos sobem como sempre (e nada é gravado).
+        """
+        k = chave(texto)
+        resultado = self.carrega(k)
+        if resultado is not None:
+            self.estatisticas['acertos'] += 1
+            return resultado
+        self.estatisticas['faltas'] += 1
+        programa, symtab = compila_sem_cache(texto)
+        self.grava(k, programa, symtab)
+        return programa, symtab
+
+    def carrega(self, k: str) -> Optional[Tuple[Programa, Dict[int, Any]]]:
+        caminho = self._caminho(k)
+        try:
+            # os nomes vão como texto no arquivo e são internados de novo neste processo
+            with open(caminho, 'rb') as f:
+                programa, symtab = carrega(f)
+        except FileNotFoundError:
+            return None
+        except (FormatoInvalido, OSError):
+            # entrada corrompida (ou de outro formato): descarta
+            self._remove(caminho)
+            return None
+        try:
+            os.utime(caminho)  # recência para o LRU
+        except OSError:
+            pass
+        return programa, symtab
+
+    def grava(self, k: str, programa: Programa, symtab: Dict[int, Any]) -> None:
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                EscritorBinario(f).grava_programa(programa)
+            os.replace(temporario, self._caminho(k))
+        except BaseException:
+            self._remove(temporario)
+            raise
+        self.estatisticas['gravacoes'] += 1
+        self.limita()
+
+    def limita(self) -> None:
+        # LRU: remove as entradas menos usadas (mtime mais antigo) até caber em tamanho_max
+        with open(os.path.join(self.diretorio, '.trava'), 'a') as trava:
+            if fcntl is not None:
+                fcntl.flock(trava, fcntl.LOCK_EX)
+            try:
+                entradas = []
+                total = 0
+                with os.scandir(self.diretorio) as it:
+                    for e in it:
+                        if not e.name.endswith(SUFIXO):
+                            continue
+                        try:
+                            st = e.stat()
+                        except FileNotFoundError:
+                            continue
+                        entradas.append((st.st_mtime, st.st_size, e.path))
+                        total += st.st_size
+                if total <= self.tamanho_max:
+                    return
+                entradas.sort()
+                for _, tamanho, caminho in entradas:
+                    if total <= self.tamanho_max:
+                        break
+                    self._remove(caminho)
+                    self.estatisticas['removidas'] += 1
+                    total -= tamanho
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _remove(caminho: str) -> None:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python cacheCompilacao.py <arquivo.txt> [diretorio_cache]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        entrada = f.read()
+    cache = CacheCompilacao(sys.argv[2] if len(sys.argv) == 3 else '.cache_fun')
+    programa, symtab = cache.compila(entrada)
+    print(programa)
+    print(cache.estatisticas)
@@ -1,10 +1,11 @@
 # João Victor Lourenço da Silva (20220005997)
 
 from helpers.arvore import (
-    Const, OpBin, Var, Decl, Programa,
+    Const, OpBin, Var, Decl, Programa, Stmt,
     Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt, FunDecl, Call
 )
 from helpers.token_tipos import Operadores
+from helpers.visitante import Visitante
 
 # ===== Modelos fixos assembly =====
 
@@ -171,6 +172,136 @@ def cmp_ne(right_code: str, left_code: str) -> str:
     )
 
 
+def _partes(modelo) -> tuple:
+    # modelo(a, b) == a + meio + b + fim: separa os pedaços fixos para a geração com pilha
+    meio, fim = modelo("", "\0").split("\0")
+    return meio, fim
+
+
+# operador -> (avalia a direita primeiro?, pedaço entre os operandos, pedaço depois deles)
+PARTES_OPBIN = {
+    Operadores.SOMA: (False, *_partes(opBin_soma)),
+    Operadores.SUBTRACAO: (False, *_partes(opBin_sub)),
+    Operadores.MULTIPLIC: (False, *_partes(opBin_mul)),
+    Operadores.DIVISAO: (False, *_partes(opBin_div)),
+    Operadores.RESTO: (False, *_partes(opBin_mod)),
+    Operadores.IGUAL_IGUAL: (True, *_partes(cmp_equal)),
+    Operadores.MENOR: (True, *_partes(cmp_less)),
+    Operadores.MAIOR: (True, *_partes(cmp_greater)),
+    Operadores.MENOR_IGUAL: (True, *_partes(cmp_le)),
+    Operadores.MAIOR_IGUAL: (True, *_partes(cmp_ge)),
+    Operadores.DIFERENTE: (True, *_partes(cmp_ne)),
+}
+
+
+# helper para formatar offset(%rbp)
+def rbp_addr(offset: int) -> str:
+    # offset já contém sinal quando negativo (por exemplo -8)
+    # no assembly precisa ser como -8(%rbp) ou 16(%rbp)
+    return f"{offset}(%rbp)"
+
+
+class EmissorAsm(Visitante):
+    """
+    Geração com pilha explícita (Visitante.percorre): a pilha tem pedaços de assembly (str,
+    emitidos como estão) e nós, e cada visita_* devolve, na ordem de emissão, os pedaços e os nós
+    filhos do seu nó. A ordem de emissão e a numeração dos rótulos são as mesmas do percurso
+    recursivo, mas uma cadeia a + b + c + ... (um OpBin por operando) não esbarra no limite de
+    recursão e o texto é juntado uma vez só no fim.
+    """
+    def __init__(self, new_label, exit_label: str):
+        self.new_label = new_label
+        self.exit_label = exit_label
+        self.current_fun: FunDecl | None = None
+        self.func_return_label: str | None = None
+        self.saida: list[str] = []
+
+    def emite(self, raiz, current_fun: FunDecl | None, func_return_label: str | None) -> str:
+        self.current_fun = current_fun
+        self.func_return_label = func_return_label
+        self.saida = []
+        self.percorre(raiz)
+        return "".join(self.saida)
+
+    def _endereco_local(self, id: int) -> str | None:
+        # endereço de uma local/param da função atual (offsets indexados pelo id internado; o nome só
+        # entra no texto do assembly), ou None se o nome é global
+        if self.current_fun is not None:
+            local_offs = getattr(self.current_fun, 'local_offsets', {})
+            if id in local_offs:
+                return rbp_addr(local_offs[id])
+            param_offs = getattr(self.current_fun, 'param_offsets', {})
+            if id in param_offs:
+                return rbp_addr(param_offs[id])
+        return None
+
+    def visita_str(self, pedaco: str):
+        self.saida.append(pedaco)
+
+    # ---------- expressões (deixam o resultado em %rax) ----------
+    def visita_Const(self, no: Const):
+        self.saida.append(gen_const(no.valor))
+
+    def visita_Var(self, no: Var):
+        endereco = self._endereco_local(no.id)
+        if endereco is None:
+            endereco = f"{no.nome}(%rip)"
+        self.saida.append(f"    mov {endereco}, %rax\n")
+
+    def visita_Call(self, no: Call):
+        # Avaliar argumentos e empilhar em ordem inversa (último primeiro)
+        itens = []
+        for a in reversed(no.args):
+            itens += (a, "    push %rax\n")
+        fim = f"    call {no.nome}\n"
+        nargs = len(no.args)
+        if nargs > 0:
+            fim += f"    add ${8 * nargs}, %rsp\n"
+        itens.append(fim)
+        return itens
+
+    def visita_OpBin(self, no: OpBin):
+        partes = PARTES_OPBIN.get(no.operador)
+        if partes is None:
+            raise NotImplementedError(f"Operação {no.operador} não suportada ainda")
+        # aritméticos avaliam a esquerda primeiro; comparações, a direita
+        direita_primeiro, meio, fim = partes
+        primeiro, segundo = (no.opDir, no.opEsq) if direita_primeiro else (no.opEsq, no.opDir)
+        return (primeiro, meio, segundo, fim)
+
+    # ---------- comandos ----------
+    def visita_ReturnStmt(self, no: ReturnStmt):
+        destino = self.func_return_label if self.func_return_label is not None else self.exit_label
+        return (no.expr, f"    jmp {destino}\n")
+
+    def visita_Assign(self, no: Assign):
+        endereco = self._endereco_local(no.id)
+        if endereco is None:
+            endereco = f"{no.nome}(%rip)"
+        return (no.expr, f"    mov %rax, {endereco}\n")
+
+    def visita_IfStmt(self, no: IfStmt):
+        l_false = self.new_label("Lfalso")
+        l_end = self.new_label("Lfim")
+        return [no.cond, f"    cmp $0, %rax\n    jz {l_false}\n", *no.then_stmts,
+                f"    jmp {l_end}\n{l_false}:\n", *(no.else_stmts or ()), f"{l_end}:\n"]
+
+    def visita_WhileStmt(self, no: WhileStmt):
+        l_begin = self.new_label("Linicio")
+        l_end = self.new_label("Lfim")
+        return [f"{l_begin}:\n", no.cond, f"    cmp $0, %rax\n    jz {l_end}\n", *no.body,
+                f"    jmp {l_begin}\n{l_end}:\n"]
+
+    def visita_BlockStmt(self, no: BlockStmt):
+        return no.stmts
+
+    def visita_Stmt(self, no: Stmt):
+        raise NotImplementedError(f"Stmt desconhecido em gen_stmt(): {no}")
+
+    def generico(self, no):
+        raise NotImplementedError(f"Nó desconhecido em rec(): {no}")
+
+
 # ===== Gerador principal =====
 
 def gera_codigo(ast) -> str:
@@ -208,165 +339,17 @@ def gera_codigo(ast) -> str:
         label_counter["n"] += 1
         return f"{base}{i}"
 
-    # helper para formatar offset(%rbp)
-    def rbp_addr(offset: int) -> str:
-        # offset já contém sinal quando negativo (por exemplo -8)
-        # no assembly precisa ser como -8(%rbp) ou 16(%rbp)
-        return f"{offset}(%rbp)"
+    # rótulo de saída do main (_start) para tratar return no main
+    exit_label = new_label("Lexit_main_")
+    emissor = EmissorAsm(new_label, exit_label)
 
-    # função recursiva que gera código para expressões e deixa resultado em %rax
+    # código de uma expressão (resultado em %rax)
     def rec(expr, current_fun: FunDecl | None) -> str:
-        if isinstance(expr, Const):
-            return gen_const(expr.valor)
-
-        if isinstance(expr, Var):
-            name = expr.nome
-            # se estamos dentro de uma função e a variável é local/param -> usar offset
-            if current_fun is not None:
-                local_offs = getattr(current_fun, 'local_offsets', {})
-                param_offs = getattr(current_fun, 'param_offsets', {})
-                if name in local_offs:
-                    off = local_offs[name]
-                    return f"    mov {rbp_addr(off)}, %rax\n"
-                if name in param_offs:
-                    off = param_offs[name]
-                    return f"    mov {rbp_addr(off)}, %rax\n"
-            # caso global:
-            return f"    mov {name}(%rip), %rax\n"
-
-        if isinstance(expr, Call):
-            # Avaliar argumentos e empilhar em ordem inversa (último primeiro)
-            code = ""
-            for a in reversed(expr.args):
-                code += rec(a, current_fun)
-                code += "    push %rax\n"
-            code += f"    call {expr.nome}\n"
-            nargs = len(expr.args)
-            if nargs > 0:
-                code += f"    add ${8 * nargs}, %rsp\n"
-            return code
-
-        if isinstance(expr, OpBin):
-            if expr.operador == Operadores.SOMA:
-                left = rec(expr.opEsq, current_fun)
-                right = rec(expr.opDir, current_fun)
-                return opBin_soma(left, right)
-            if expr.operador == Operadores.SUBTRACAO:
-                left = rec(expr.opEsq, current_fun)
-                right = rec(expr.opDir, current_fun)
-                return opBin_sub(left, right)
-            if expr.operador == Operadores.MULTIPLIC:
-                left = rec(expr.opEsq, current_fun)
-                right = rec(expr.opDir, current_fun)
-                return opBin_mul(left, right)
-            if expr.operador == Operadores.DIVISAO:
-                left = rec(expr.opEsq, current_fun)
-                right = rec(expr.opDir, current_fun)
-                return opBin_div(left, right)
-            if expr.operador == Operadores.RESTO:
-                left = rec(expr.opEsq, current_fun)
-                right = rec(expr.opDir, current_fun)
-                return opBin_mod(left, right)
-            if expr.operador == Operadores.IGUAL_IGUAL:
-                right = rec(expr.opDir, current_fun)
-                left = rec(expr.opEsq, current_fun)
-                return cmp_equal(right, left)
-            if expr.operador == Operadores.MENOR:
-                right = rec(expr.opDir, current_fun)
-                left = rec(expr.opEsq, current_fun)
-                return cmp_less(right, left)
-            if expr.operador == Operadores.MAIOR:
-                right = rec(expr.opDir, current_fun)
-                left = rec(expr.opEsq, current_fun)
-                return cmp_greater(right, left)
-            if expr.operador == Operadores.MENOR_IGUAL:
-                right = rec(expr.opDir, current_fun)
-                left = rec(expr.opEsq, current_fun)
-                return cmp_le(right, left)
-            if expr.operador == Operadores.MAIOR_IGUAL:
-                right = rec(expr.opDir, current_fun)
-                left = rec(expr.opEsq, current_fun)
-                return cmp_ge(right, left)
-            if expr.operador == Operadores.DIFERENTE:
-                right = rec(expr.opDir, current_fun)
-                left = rec(expr.opEsq, current_fun)
-                return cmp_ne(right, left)
-            raise NotImplementedError(f"Operação {expr.operador} não suportada ainda")
-
-        raise NotImplementedError(f"Nó desconhecido em rec(): {expr}")
-
-    # gera código para statements (Assign, If, While, Block, Return)
-    def gen_stmt(stmt, current_fun: FunDecl | None, func_return_label: str | None) -> str:
-        # ReturnStmt
-        if isinstance(stmt, ReturnStmt):
-            code = rec(stmt.expr, current_fun)
-            if func_return_label is not None:
-                code += f"    jmp {func_return_label}\n"
-            else:
-                code += f"    jmp {exit_label}\n"
-            return code
-
-        # Assign
-        if isinstance(stmt, Assign):
-            code = rec(stmt.expr, current_fun)
-            name = stmt.nome
-            if current_fun is not None:
-                local_offs = getattr(current_fun, 'local_offsets', {})
-                param_offs = getattr(current_fun, 'param_offsets', {})
-                if name in local_offs:
-                    off = local_offs[name]
-                    code += f"    mov %rax, {rbp_addr(off)}\n"
-                    return code
-                if name in param_offs:
-                    off = param_offs[name]
-                    code += f"    mov %rax, {rbp_addr(off)}\n"
-                    return code
-            code += f"    mov %rax, {name}(%rip)\n"
-            return code
-
-        # IfStmt
-        if isinstance(stmt, IfStmt):
-            l_false = new_label("Lfalso")
-            l_end = new_label("Lfim")
-            code = ""
-            code += rec(stmt.cond, current_fun)
-            code += "    cmp $0, %rax\n"
-            code += f"    jz {l_false}\n"
-            for s in stmt.then_stmts:
-                code += gen_stmt(s, current_fun, func_return_label)
-            code += f"    jmp {l_end}\n"
-            code += f"{l_false}:\n"
-            if stmt.else_stmts is not None:
-                for s in stmt.else_stmts:
-                    code += gen_stmt(s, current_fun, func_return_label)
-            code += f"{l_end}:\n"
-            return code
-
-        # WhileStmt
-        if isinstance(stmt, WhileStmt):
-            l_begin = new_label("Linicio")
-            l_end = new_label("Lfim")
-            code = f"{l_begin}:\n"
-            code += rec(stmt.cond, current_fun)
-            code += "    cmp $0, %rax\n"
-            code += f"    jz {l_end}\n"
-            for s in stmt.body:
-                code += gen_stmt(s, current_fun, func_return_label)
-            code += f"    jmp {l_begin}\n"
-            code += f"{l_end}:\n"
-            return code
-
-        # BlockStmt
-        if isinstance(stmt, BlockStmt):
-            code = ""
-            for s in stmt.stmts:
-                code += gen_stmt(s, current_fun, func_return_label)
-            return code
-
-        raise NotImplementedError(f"Stmt desconhecido em gen_stmt(): {stmt}")
+        return emissor.emite(expr, current_fun, None)
 
-    # rótulo de saída do main (_start) para tratar return no main
-    exit_label = new_label("Lexit_main_")
+    # código de um comando (Assign, If, While, Block, Return)
+    def gen_stmt(stmt, current_fun: FunDecl | None, func_return_label: str | None) -> str:
+        return emissor.emite(stmt, current_fun, func_return_label)
 
     #Gerar código de cada função (fun_decls) ANTES de _start
     if isinstance(ast, Programa):
@@ -389,7 +372,7 @@ def gera_codigo(ast) -> str:
             # inicializar declarações locais (em ordem)
             for d in f.local_decls:
                 asm += rec(d.expr, f)       # resultado em %rax
-                off = f.local_offsets.get(d.nome)
+                off = f.local_offsets.get(d.id)
                 if off is None:
                     raise RuntimeError(f"Offset da local '{d.nome}' não encontrado para função {f.nome}")
                 asm += f"    mov %rax, {rbp_addr(off)}\n"
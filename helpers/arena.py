@@ -0,0 +1,375 @@
+# João Victor Lourenço da Silva (20220005997)
+# helpers/arena.py
+
+"""
+AST em arena (struct-of-arrays): em vez de um objeto dataclass (com __dict__) por nó, cada nó é
+um índice em arrays paralelos tipados.
+
+- especies (bytearray): espécie do nó (CONST, VAR, OPBIN, ... de helpers/arvore.py, mais DECL,
+  FUNDECL e PROGRAMA);
+- operadores (bytearray): código do operador de um OPBIN (índice em OPERADORES);
+- a, b, c (array('i')): campos do nó, com significado por espécie (tabela abaixo);
+- constantes (array('q')): valores dos CONST (vira lista se algum não couber em 64 bits);
+- listas (array('i')): listas de filhos (argumentos, comandos, declarações) como [n, i1, ..., in];
+  um campo que aponta para uma lista guarda o deslocamento dela aqui;
+- tabela de spans à parte: span[i] é -1 (nó sem linha/pos: Const, OpBin, If, ...) ou o índice em
+  span_linhas/span_posicoes.
+
+    CONST     a = índice em constantes
+    VAR       a = id
+    OPBIN     a = esquerda, b = direita (operadores[i] = código do operador)
+    CALL      a = id, b = lista de argumentos
+    DECL      a = id, b = expressão
+    ASSIGN    a = id, b = expressão
+    IF        a = condição, b = lista then, c = lista else (-1 = sem else)
+    WHILE     a = condição, b = lista do corpo
+    BLOCO     a = lista de comandos
+    RETURN    a = expressão
+    FUNDECL   a = id, b = lista de ids dos parâmetros, c = lista [decls locais, comandos, resultado]
+    PROGRAMA  a = lista de var_decls, b = lista de fun_decls, c = lista [comandos, resultado]
+
+Os nós entram em pós-ordem (filhos antes do pai), então toda a subárvore de um nó é um intervalo
+contíguo que termina nele e um percurso completo é uma varredura linear dos arrays. Nomes não são
+guardados: saem do id (helpers/simbolos.py).
+
+Adaptador: arvore(i) / para_programa() remontam os nós dataclass de helpers/arvore.py, para as
+fases que ainda andam na árvore de objetos (verificação, symtab, gerador, avaliador, rich).
+"""
+
+from array import array
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Set
+
+from .arvore import (
+    CONST, VAR, OPBIN, CALL, ASSIGN, IF, WHILE, BLOCO, RETURN, OUTRO, especie, SIMBOLOS_OPERADORES,
+    Const, Var, OpBin, Call, Decl, Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt, FunDecl, Programa,
+)
+from .linhas import IndiceLinhas
+from .simbolos import IDENTIFICADORES
+
+# espécies que só existem na arena (as de helpers/arvore.py vão de 0 a 11)
+DECL, FUNDECL, PROGRAMA = 12, 13, 14
+
+# código do operador <-> Operadores
+OPERADORES = list(SIMBOLOS_OPERADORES)
+CODIGOS_OPERADORES = {op: i for i, op in enumerate(OPERADORES)}
+
+SEM = -1  # campo ausente (sem else, sem span, linha/pos None)
+
+# espécies cujo campo 'a' é o id de um nome
+_COM_ID = (VAR, CALL, DECL, ASSIGN, FUNDECL)
+
+
+def _especie(no) -> int:
+    k = especie(type(no))
+    if k == OUTRO:
+        if isinstance(no, FunDecl):
+            return FUNDECL
+        if isinstance(no, Decl):
+            return DECL
+        if isinstance(no, Programa):
+            return PROGRAMA
+        raise TypeError(f"nó sem representação na arena: {type(no).__name__}")
+    return k
+
+
+def _filhos_no(no, k: int) -> list:
+    # filhos de um nó dataclass, na ordem do fonte (a ordem em que entram na arena)
+    if k == OPBIN:
+        return [no.opEsq, no.opDir]
+    if k == CALL:
+        return no.args
+    if k == DECL or k == ASSIGN or k == RETURN:
+        return [no.expr]
+    if k == IF:
+        return [no.cond, *no.then_stmts, *(no.else_stmts or ())]
+    if k == WHILE:
+        return [no.cond, *no.body]
+    if k == BLOCO:
+        return no.stmts
+    if k == FUNDECL:
+        return [*no.local_decls, *no.comandos, no.resultado]
+    if k == PROGRAMA:
+        return [*no.var_decls, *no.fun_decls, *no.comandos, no.resultado]
+    return []
+
+
+class ArenaAST:
+    def __init__(self, linhas: Optional[IndiceLinhas] = None):
+        self.especies = bytearray()
+        self.operadores = bytearray()
+        self.a = array('i')
+        self.b = array('i')
+        self.c = array('i')
+        self.span = array('i')
+        self.span_linhas = array('i')
+        self.span_posicoes = array('q')
+        self.constantes = array('q')
+        self.listas = array('i')
+        self.linhas = linhas   # índice de linhas do fonte (Programa.linhas)
+        self.raiz = SEM        # nó PROGRAMA, quando houver
+
+    def __len__(self) -> int:
+        return len(self.especies)
+
+    def __repr__(self) -> str:
+        return f"ArenaAST({len(self)} nós, {self.nbytes()} bytes)"
+
+    def nbytes(self) -> int:
+        # bytes dos arrays (a arena inteira fora os cabeçalhos dos objetos)
+        total = len(self.especies) + len(self.operadores)
+        for arr in (self.a, self.b, self.c, self.span, self.span_linhas, self.span_posicoes, self.listas):
+            total += len(arr) * arr.itemsize
+        if isinstance(self.constantes, array):
+            total += len(self.constantes) * self.constantes.itemsize
+        return total
+
+    # ---------- construção ----------
+
+    def _novo(self, k: int, a: int = 0, b: int = 0, c: int = 0, operador: int = 0,
+              linha: Optional[int] = None, pos: Optional[int] = None) -> int:
+        i = len(self.especies)
+        self.especies.append(k)
+        self.operadores.append(operador)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+        if linha is None and pos is None:
+            self.span.append(SEM)
+        else:
+            self.span.append(len(self.span_linhas))
+            self.span_linhas.append(SEM if linha is None else linha)
+            self.span_posicoes.append(SEM if pos is None else pos)
+        return i
+
+    def _lista(self, itens) -> int:
+        off = len(self.listas)
+        self.listas.append(len(itens))
+        self.listas.extend(itens)
+        return off
+
+    def _constante(self, valor: int) -> int:
+        k = len(self.constantes)
+        try:
+            self.constantes.append(valor)
+        except OverflowError:
+            # inteiro do FUN maior que 64 bits: as constantes passam a ser uma lista de int
+            self.constantes = list(self.constantes)
+            self.constantes.append(valor)
+        return k
+
+    def adiciona(self, raiz) -> int:
+        """
+        Copia uma subárvore de nós dataclass (Exp, Stmt, Decl, FunDecl ou Programa) para a arena
+        e devolve o índice da raiz. Pós-ordem com pilha explícita: (nó, espécie, n) na pilha marca
+        que os n filhos já foram copiados e estão no fim de 'feitos'.
+        """
+        feitos: List[int] = []
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is tuple:
+                no, k, n = no
+                filhos = feitos[len(feitos) - n:]
+                del feitos[len(feitos) - n:]
+                feitos.append(self._grava(no, k, filhos))
+                continue
+            k = _especie(no)
+            if k == CONST:
+                feitos.append(self._novo(CONST, self._constante(no.valor)))
+            elif k == VAR:
+                feitos.append(self._novo(VAR, no.id, linha=no.linha, pos=no.pos))
+            else:
+                filhos = _filhos_no(no, k)
+                pilha.append((no, k, len(filhos)))
+                pilha.extend(reversed(filhos))
+        return feitos[-1]
+
+    def _grava(self, no, k: int, filhos: List[int]) -> int:
+        # nó com os filhos (na ordem de _filhos_no) já na arena
+        if k == OPBIN:
+            return self._novo(OPBIN, filhos[0], filhos[1], operador=CODIGOS_OPERADORES[no.operador])
+        if k == CALL:
+            return self._novo(CALL, no.id, self._lista(filhos), linha=no.linha, pos=no.pos)
+        if k == DECL or k == ASSIGN:
+            return self._novo(k, no.id, filhos[0], linha=no.linha, pos=no.pos)
+        if k == RETURN:
+            return self._novo(RETURN, filhos[0], linha=no.linha, pos=no.pos)
+        if k == IF:
+            n = len(no.then_stmts)
+            senao = self._lista(filhos[1 + n:]) if no.else_stmts is not None else SEM
+            return self._novo(IF, filhos[0], self._lista(filhos[1:1 + n]), senao)
+        if k == WHILE:
+            return self._novo(WHILE, filhos[0], self._lista(filhos[1:]))
+        if k == BLOCO:
+            return self._novo(BLOCO, self._lista(filhos))
+        if k == FUNDECL:
+            n = len(no.local_decls)
+            partes = [self._lista(filhos[:n]), self._lista(filhos[n:-1]), filhos[-1]]
+            return self._novo(FUNDECL, no.id, self._lista(no.param_ids), self._lista(partes),
+                              linha=no.linha, pos=no.pos)
+        # PROGRAMA
+        nv, nf = len(no.var_decls), len(no.fun_decls)
+        return self.adiciona_programa(filhos[:nv], filhos[nv:nv + nf], filhos[nv + nf:-1], filhos[-1])
+
+    def adiciona_programa(self, var_decls: List[int], fun_decls: List[int], comandos: List[int],
+                          resultado: int) -> int:
+        # fecha a arena com o nó PROGRAMA (as declarações e o main já estão nela)
+        self.raiz = self._novo(PROGRAMA, self._lista(var_decls), self._lista(fun_decls),
+                               self._lista([self._lista(comandos), resultado]))
+        return self.raiz
+
+    @classmethod
+    def de_programa(cls, programa: Programa) -> "ArenaAST":
+        arena = cls(programa.linhas)
+        arena.adiciona(programa)
+        return arena
+
+    # ---------- leitura ----------
+
+    def lista(self, off: int) -> array:
+        # itens da lista que começa em 'off' (vazia para SEM)
+        if off == SEM:
+            return array('i')
+        n = self.listas[off]
+        return self.listas[off + 1:off + 1 + n]
+
+    def linha(self, i: int) -> Optional[int]:
+        s = self.span[i]
+        if s == SEM or self.span_linhas[s] == SEM:
+            return None
+        return self.span_linhas[s]
+
+    def pos(self, i: int) -> Optional[int]:
+        s = self.span[i]
+        if s == SEM or self.span_posicoes[s] == SEM:
+            return None
+        return self.span_posicoes[s]
+
+    def nome(self, i: int) -> str:
+        return IDENTIFICADORES.nomes[self.a[i]]
+
+    def filhos(self, i: int) -> List[int]:
+        # filhos de i na ordem do fonte (a mesma de _filhos_no)
+        k = self.especies[i]
+        a, b, c = self.a[i], self.b[i], self.c[i]
+        lista = self.lista
+        if k == CONST or k == VAR:
+            return []
+        if k == OPBIN:
+            return [a, b]
+        if k == CALL:
+            return list(lista(b))
+        if k == DECL or k == ASSIGN:
+            return [b]
+        if k == RETURN:
+            return [a]
+        if k == IF:
+            return [a, *lista(b), *lista(c)]
+        if k == WHILE:
+            return [a, *lista(b)]
+        if k == BLOCO:
+            return list(lista(a))
+        if k == FUNDECL:
+            decls, comandos, resultado = lista(c)
+            return [*lista(decls), *lista(comandos), resultado]
+        comandos, resultado = lista(c)
+        return [*lista(a), *lista(b), *lista(comandos), resultado]
+
+    def percorre(self, i: Optional[int] = None) -> Iterator[int]:
+        # pré-ordem a partir de i (padrão: a raiz), com pilha explícita
+        pilha = [self.raiz if i is None else i]
+        while pilha:
+            j = pilha.pop()
+            yield j
+            pilha.extend(reversed(self.filhos(j)))
+
+    def inicio(self, i: int) -> int:
+        # primeiro índice da subárvore de i (a folha mais à esquerda)
+        if self.especies[i] == PROGRAMA:
+            return 0  # as declarações entram em ordem de fonte, antes de todo o resto
+        filhos = self.filhos(i)
+        while filhos:
+            i = filhos[0]
+            filhos = self.filhos(i)
+        return i
+
+    # ---------- percursos lineares (sem pilha: os arrays já estão em pós-ordem) ----------
+
+    def contagem(self) -> Counter:
+        # número de nós por espécie
+        return Counter(self.especies)
+
+    def ids_usados(self) -> Set[int]:
+        # ids de todos os nomes da árvore (variáveis, chamadas, declarações, funções e parâmetros)
+        especies, a = self.especies, self.a
+        usados = {a[i] for i in range(len(especies)) if especies[i] in _COM_ID}
+        for i in range(len(especies)):
+            if especies[i] == FUNDECL:
+                usados.update(self.lista(self.b[i]))
+        return usados
+
+    def profundidade(self) -> int:
+        # altura da árvore: numa pós-ordem, a altura de cada nó sai das dos filhos, já calculadas
+        alturas = array('i', bytes(4 * len(self.especies)))
+        for i in range(len(self.especies)):
+            filhos = self.filhos(i)
+            alturas[i] = 1 + max([alturas[f] for f in filhos]) if filhos else 1
+        return max(alturas) if alturas else 0
+
+    # ---------- adaptador para os nós dataclass ----------
+
+    def arvore(self, i: int):
+        """
+        Nó dataclass (com toda a subárvore) equivalente ao nó i. Uma varredura linear do intervalo
+        da subárvore: cada nó é montado depois dos filhos, que já estão em 'nos'.
+        """
+        ini = self.inicio(i)
+        especies, operadores, a, b, c = self.especies, self.operadores, self.a, self.b, self.c
+        nomes = IDENTIFICADORES.nomes
+        lista = self.lista
+        nos: Dict[int, object] = {}
+
+        def pega(off: int) -> list:
+            return [nos.pop(j) for j in lista(off)]
+
+        for j in range(ini, i + 1):
+            k = especies[j]
+            if k == CONST:
+                no = Const(self.constantes[a[j]])
+            elif k == VAR:
+                no = Var(nomes[a[j]], linha=self.linha(j), pos=self.pos(j), id=a[j])
+            elif k == OPBIN:
+                no = OpBin(OPERADORES[operadores[j]], nos.pop(a[j]), nos.pop(b[j]))
+            elif k == CALL:
+                no = Call(nomes[a[j]], pega(b[j]), linha=self.linha(j), pos=self.pos(j), id=a[j])
+            elif k == DECL:
+                no = Decl(nomes[a[j]], nos.pop(b[j]), linha=self.linha(j), pos=self.pos(j), id=a[j])
+            elif k == ASSIGN:
+                no = Assign(nomes[a[j]], nos.pop(b[j]), linha=self.linha(j), pos=self.pos(j), id=a[j])
+            elif k == IF:
+                cond = nos.pop(a[j])
+                no = IfStmt(cond, pega(b[j]), pega(c[j]) if c[j] != SEM else None)
+            elif k == WHILE:
+                cond = nos.pop(a[j])
+                no = WhileStmt(cond, pega(b[j]))
+            elif k == BLOCO:
+                no = BlockStmt(pega(a[j]))
+            elif k == RETURN:
+                no = ReturnStmt(nos.pop(a[j]), linha=self.linha(j), pos=self.pos(j))
+            elif k == FUNDECL:
+                param_ids = list(lista(b[j]))
+                decls, comandos, resultado = lista(c[j])
+                no = FunDecl(nomes[a[j]], [nomes[p] for p in param_ids], pega(decls), pega(comandos),
+                             nos.pop(resultado), linha=self.linha(j), pos=self.pos(j), id=a[j],
+                             param_ids=param_ids)
+            else:
+                comandos, resultado = lista(c[j])
+                no = Programa(pega(a[j]), pega(b[j]), pega(comandos), nos.pop(resultado), linhas=self.linhas)
+            nos[j] = no
+        return nos[i]
+
+    def para_programa(self) -> Programa:
+        if self.raiz == SEM:
+            raise ValueError("arena sem nó PROGRAMA")
+        return self.arvore(self.raiz)
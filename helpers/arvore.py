@@ -1,13 +1,23 @@
 # João Victor Lourenço da Silva (20220005997)
 
+import operator
+import weakref
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import FrozenInstanceError, dataclass, field
+from typing import Dict, List, Optional, Sequence, Union
+from .linhas import IndiceLinhas, coluna
+from .simbolos import interna
 from .token_tipos import Operadores  # reutiliza os operadores
 
+# o que os avaliador() recebem: um Quadro, ou um dict {id: valor} usado como as globais
+Ambiente = Union["Quadro", Dict[int, int], None]
+
 class Exp(ABC):
+    __slots__ = ('_hash', '_forma', '__weakref__')
+
     @abstractmethod
-    def avaliador(self, env: Optional[Dict[str, int]] = None, funcoes: Optional[Dict[str, "FunDecl"]] = None) -> int:
+    def avaliador(self, env: Ambiente = None, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> int:
         # interpreta e retorna o valor da expressão.
         pass
 
@@ -15,129 +25,804 @@ class Exp(ABC):
     def gerador(self) -> str:
         pass
 
-@dataclass
+    def __setattr__(self, nome: str, valor) -> None:
+        raise FrozenInstanceError(f"cannot assign to field '{nome}'")
+
+    def __delattr__(self, nome: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field '{nome}'")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, outro) -> bool:
+        if self is outro:
+            return True
+        if outro.__class__ is not self.__class__:
+            return NotImplemented
+        return iguais(self, outro)
+
+    @property
+    def forma(self) -> "Exp":
+        # subárvore canônica equivalente, sem linha/pos (ela mesma, se já for canônica)
+        f = self._forma
+        if f is None:
+            return self
+        if f is _PENDENTE:
+            f = forma(self)
+        return f
+
+
+# ---------- Nós de expressão: imutáveis, com __slots__ e hash-consing ----------
+# O construtor de Const/Var/OpBin/Call é a fábrica: um nó sem linha/pos cujos filhos também são
+# canônicos é procurado em _NOS e, se já existir um igual, o mesmo objeto é devolvido, então
+# subárvores repetidas viram um DAG (e a igualdade delas é só 'is'). Nós com linha/pos (os que o
+# parser cria para identificadores e chamadas) ficam fora da tabela: cada ocorrência guarda a sua
+# posição para as mensagens de erro, e um nó que nunca se repete só gastaria memória na tabela.
+# Então a árvore do parser compartilha só constantes e subárvores sem posição; o DAG completo é o
+# das formas, montado à parte (memória a mais, não a menos).
+#
+# _hash é o hash estrutural, calculado na criação a partir dos hashes dos filhos, sem linha/pos.
+# _forma é None num nó canônico; nos outros, a subárvore canônica equivalente (calculada na
+# primeira vez que é pedida): duas subárvores com a mesma estrutura têm a mesma forma, o mesmo
+# objeto, que serve de chave barata para memoizar resultados por subárvore.
+_NOS: "weakref.WeakValueDictionary[tuple, Exp]" = weakref.WeakValueDictionary()
+_PENDENTE = object()  # _forma ainda não calculada
+# Os construtores gravam os slots pelo __set__ de cada descritor (o __setattr__ dos nós levanta
+# FrozenInstanceError): metade do custo de object.__setattr__, que procura o nome a cada chamada.
+# Os dos campos de cada classe são definidos logo depois dela.
+_poe_hash = Exp._hash.__set__
+_poe_forma = Exp._forma.__set__
+
+
 class Const(Exp):
-    valor: int
+    __slots__ = ('valor',)
+
+    def __new__(cls, valor: int):
+        chave = (cls, valor)
+        no = _NOS.get(chave)
+        if no is None:
+            no = object.__new__(cls)
+            _const_valor(no, valor)
+            _poe_hash(no, hash(chave))
+            _poe_forma(no, None)
+            _NOS[chave] = no
+        return no
 
-    def avaliador(self, env: Optional[Dict[str, int]] = None, funcoes: Optional[Dict[str, "FunDecl"]] = None) -> int:
+    def __reduce__(self):
+        return (Const, (self.valor,))
+
+    def __repr__(self) -> str:
+        return f"Const(valor={self.valor!r})"
+
+    def avaliador(self, env: Ambiente = None, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> int:
         return self.valor
 
     def gerador(self) -> str:
         return str(self.valor)
 
-@dataclass
+_const_valor = Const.valor.__set__
+
 class Var(Exp):
-    nome: str
-    linha: Optional[int] = None
-    pos: Optional[int] = None
+    __slots__ = ('nome', 'linha', 'pos', 'id')  # id: id de self.nome na TabelaSimbolos
 
-    def avaliador(self, env: Optional[Dict[str, int]] = None, funcoes: Optional[Dict[str, "FunDecl"]] = None) -> int:
-        if env is None:
-            env = {}
-        if self.nome not in env:
-            ln = self.linha if self.linha is not None else '?'
-            ps = self.pos if self.pos is not None else '?'
-            raise NameError(f"Erro semântico: variável '{self.nome}' não declarada (linha {ln}, pos {ps})")
-        return env[self.nome]
+    def __new__(cls, nome: str, linha: Optional[int] = None, pos: Optional[int] = None, id: Optional[int] = None):
+        # id internado do nome (o parser já passa o do token; nós montados à mão são internados aqui)
+        if id is None:
+            id = interna(nome)
+        chave = (cls, id)
+        canonico = linha is None and pos is None
+        if canonico:
+            no = _NOS.get(chave)
+            if no is not None:
+                return no
+        no = object.__new__(cls)
+        _var_nome(no, nome)
+        _var_linha(no, linha)
+        _var_pos(no, pos)
+        _var_id(no, id)
+        _poe_hash(no, hash(chave))
+        if canonico:
+            _poe_forma(no, None)
+            _NOS[chave] = no
+        else:
+            _poe_forma(no, _PENDENTE)
+        return no
+
+    def __reduce__(self):
+        # pelo nome: o id é internado de novo no processo que desserializa
+        return (Var, (self.nome, self.linha, self.pos))
+
+    def __repr__(self) -> str:
+        return f"Var(nome={self.nome!r}, linha={self.linha!r}, pos={self.pos!r})"
+
+    def avaliador(self, env: Ambiente = None, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> int:
+        return avalia(self, quadro_de(env), funcoes)
+
+    def erro_nao_declarada(self) -> str:
+        ln = self.linha if self.linha is not None else '?'
+        ps = self.pos if self.pos is not None else '?'
+        return f"Erro semântico: variável '{self.nome}' não declarada (linha {ln}, pos {ps})"
 
     def gerador(self) -> str:
         return self.nome
 
-@dataclass
+_var_nome, _var_linha, _var_pos, _var_id = (d.__set__ for d in (Var.nome, Var.linha, Var.pos, Var.id))
+
 class Call(Exp):
-    nome: str
-    args: List[Exp]
-    linha: Optional[int] = None
-    pos: Optional[int] = None
+    __slots__ = ('nome', 'args', 'linha', 'pos', 'id')  # id: id de self.nome na TabelaSimbolos
+
+    def __new__(cls, nome: str, args: Sequence[Exp], linha: Optional[int] = None, pos: Optional[int] = None,
+                id: Optional[int] = None):
+        # id internado do nome (o parser já passa o do token; nós montados à mão são internados aqui)
+        if id is None:
+            id = interna(nome)
+        args = tuple(args)
+        chave = (cls, id, args)
+        canonico = linha is None and pos is None and all(a._forma is None for a in args)
+        if canonico:
+            no = _NOS.get(chave)
+            if no is not None:
+                return no
+        no = object.__new__(cls)
+        _call_nome(no, nome)
+        _call_args(no, args)
+        _call_linha(no, linha)
+        _call_pos(no, pos)
+        _call_id(no, id)
+        _poe_hash(no, hash((cls, id, tuple(a._hash for a in args))))
+        if canonico:
+            _poe_forma(no, None)
+            _NOS[chave] = no
+        else:
+            _poe_forma(no, _PENDENTE)
+        return no
+
+    def __reduce__(self):
+        return (Call, (self.nome, self.args, self.linha, self.pos))
 
     def __repr__(self) -> str:
-        return f"Call({self.nome}({', '.join(map(str, self.args))}))"
+        return texto_repr(self)
 
-    def avaliador(self, env: Optional[Dict[str, int]] = None, funcoes: Optional[Dict[str, "FunDecl"]] = None) -> int:
-        if funcoes is None or self.nome not in funcoes:
+    def avaliador(self, env: Ambiente = None, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> int:
+        return avalia(self, quadro_de(env), funcoes)
+
+    def destino(self, funcoes: Optional[Dict[int, "FunDecl"]]) -> "FunDecl":
+        # função chamada (verificada antes de avaliar os argumentos)
+        if funcoes is None or self.id not in funcoes:
             ln = self.linha if self.linha is not None else '?'
             ps = self.pos if self.pos is not None else '?'
             raise NameError(f"Erro semântico: chamada para função não declarada '{self.nome}' (linha {ln}, pos {ps})")
-        f = funcoes[self.nome]
-        # avaliar argumentos no ambiente atual
-        args_vals = [a.avaliador(env, funcoes) for a in self.args]
+        return funcoes[self.id]
+
+    def confere_aridade(self, f: "FunDecl", args_vals: List[int]) -> None:
         if len(args_vals) != len(f.params):
             raise TypeError(f"Erro semântico: chamada para '{self.nome}' com número errado de argumentos (esperado {len(f.params)}, encontrado {len(args_vals)})")
-        # criar ambiente local como cópia do env (isolamento)
-        global_env = dict(env) if env is not None else {}
-        local_env = dict(global_env)  # alterações locais não afetam o env original
-        # atribuir parâmetros
-        for pname, val in zip(f.params, args_vals):
-            local_env[pname] = val
-        # avaliar declarações locais da função (em ordem)
-        for d in f.local_decls:
-            local_env[d.nome] = d.expr.avaliador(local_env, funcoes)
-        # executar comandos
+
+    def chama(self, f: "FunDecl", args_vals: List[int], q: "Quadro",
+              funcoes: Dict[int, "FunDecl"]) -> int:
+        # executa o corpo de f com os argumentos já avaliados, num quadro novo
+        self.confere_aridade(f, args_vals)
         try:
-            for s in f.comandos:
-                s.avaliador(local_env, funcoes)
-        except ReturnException as re:
-            return re.value
-        # se não houve return precoce (por segurança), avaliar resultado da função
-        return f.resultado.avaliador(local_env, funcoes)
+            completo, parciais, n_locais = f._quadro
+        except AttributeError:
+            completo, parciais, n_locais = prepara_quadro(f)
+        memo = q.memo
+        if memo is not None and memo.ligado and getattr(f, 'pura', False):
+            # função pura (analisadorSemantico.marca_funcoes_puras): o resultado só depende dos
+            # argumentos. Um erro no corpo sobe sem gravar nada.
+            chave = tuple(args_vals)
+            r = memo.busca(f, chave)
+            if r is None:
+                r = executa_corpo(f, args_vals, completo, parciais, n_locais, q, funcoes)
+                memo.guarda(f, chave, r)
+            return r
+        return executa_corpo(f, args_vals, completo, parciais, n_locais, q, funcoes)
 
     def gerador(self) -> str:
-        args_s = ", ".join([a.gerador() for a in self.args])
-        return f"{self.nome}({args_s})"
+        return texto_exp(self)
+
+_call_nome, _call_args, _call_linha, _call_pos, _call_id = (
+    d.__set__ for d in (Call.nome, Call.args, Call.linha, Call.pos, Call.id))
 
-@dataclass
 class OpBin(Exp):
-    operador: Operadores
-    opEsq: Exp
-    opDir: Exp
-
-    def avaliador(self, env: Optional[Dict[str, int]] = None, funcoes: Optional[Dict[str, "FunDecl"]] = None) -> int:
-        esquerda = self.opEsq.avaliador(env, funcoes)
-        direita = self.opDir.avaliador(env, funcoes)
-        if self.operador == Operadores.SOMA:
-            return esquerda + direita
-        if self.operador == Operadores.SUBTRACAO:
-            return esquerda - direita
-        if self.operador == Operadores.MULTIPLIC:
-            return esquerda * direita
-        if self.operador == Operadores.DIVISAO:
-            if direita == 0:
-                raise ZeroDivisionError("Divisão por zero")
-            return esquerda // direita
-        if self.operador == Operadores.RESTO:
-            if direita == 0:
-                raise ZeroDivisionError("Divisão por zero (resto)")
-            return esquerda % direita
-        if self.operador == Operadores.MENOR:
-            return 1 if esquerda < direita else 0
-        if self.operador == Operadores.MAIOR:
-            return 1 if esquerda > direita else 0
-        if self.operador == Operadores.IGUAL_IGUAL:
-            return 1 if esquerda == direita else 0
-        if self.operador == Operadores.MENOR_IGUAL:
-            return 1 if esquerda <= direita else 0
-        if self.operador == Operadores.MAIOR_IGUAL:
-            return 1 if esquerda >= direita else 0
-        if self.operador == Operadores.DIFERENTE:
-            return 1 if esquerda != direita else 0
-        raise ValueError(f"Operador desconhecido: {self.operador}")
+    __slots__ = ('operador', 'opEsq', 'opDir')
+
+    def __new__(cls, operador: Operadores, opEsq: Exp, opDir: Exp):
+        chave = (cls, operador, opEsq, opDir)
+        canonico = opEsq._forma is None and opDir._forma is None
+        if canonico:
+            no = _NOS.get(chave)
+            if no is not None:
+                return no
+        no = object.__new__(cls)
+        _opbin_operador(no, operador)
+        _opbin_esq(no, opEsq)
+        _opbin_dir(no, opDir)
+        _poe_hash(no, hash((cls, operador, opEsq._hash, opDir._hash)))
+        if canonico:
+            _poe_forma(no, None)
+            _NOS[chave] = no
+        else:
+            _poe_forma(no, _PENDENTE)
+        return no
+
+    def __reduce__(self):
+        return (OpBin, (self.operador, self.opEsq, self.opDir))
+
+    def __repr__(self) -> str:
+        return texto_repr(self)
+
+    def avaliador(self, env: Ambiente = None, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> int:
+        return avalia(self, quadro_de(env), funcoes)
 
     def gerador(self) -> str:
-        op_map = {
-            Operadores.SOMA: '+',
-            Operadores.SUBTRACAO: '-',
-            Operadores.MULTIPLIC: '*',
-            Operadores.DIVISAO: '/',
-            Operadores.RESTO: '%',
-            Operadores.MENOR: '<',
-            Operadores.MAIOR: '>',
-            Operadores.IGUAL_IGUAL: '==',
-            Operadores.MENOR_IGUAL: '<=',
-            Operadores.MAIOR_IGUAL: '>=',
-            Operadores.DIFERENTE: '!=',
-        }
-        simb = op_map.get(self.operador, '?')
-        return f"({self.opEsq.gerador()} {simb} {self.opDir.gerador()})"
+        return texto_exp(self)
+
+_opbin_operador, _opbin_esq, _opbin_dir = (d.__set__ for d in (OpBin.operador, OpBin.opEsq, OpBin.opDir))
+
+
+def iguais(a: Exp, b: Exp) -> bool:
+    # igualdade estrutural com linha/pos (a dos antigos dataclasses), com pilha explícita
+    pilha = [(a, b)]
+    while pilha:
+        a, b = pilha.pop()
+        if a is b:
+            continue
+        if a.__class__ is not b.__class__ or a._hash != b._hash:
+            return False
+        if isinstance(a, OpBin):
+            if a.operador is not b.operador:
+                return False
+            pilha.append((a.opDir, b.opDir))
+            pilha.append((a.opEsq, b.opEsq))
+        elif isinstance(a, Const):
+            if a.valor != b.valor:
+                return False
+        elif a.id != b.id or a.linha != b.linha or a.pos != b.pos:
+            return False
+        elif isinstance(a, Call):
+            if len(a.args) != len(b.args):
+                return False
+            pilha.extend(zip(a.args, b.args))
+    return True
+
+
+def forma(raiz: Exp) -> Exp:
+    # subárvore canônica (sem linha/pos) de raiz, montada em pós-ordem; guarda o resultado em
+    # _forma de cada nó do caminho
+    pilha = [raiz]
+    while pilha:
+        no = pilha[-1]
+        if no._forma is not _PENDENTE:
+            pilha.pop()
+            continue
+        filhos = (no.opEsq, no.opDir) if isinstance(no, OpBin) else no.args if isinstance(no, Call) else ()
+        pendentes = [f for f in filhos if f._forma is _PENDENTE]
+        if pendentes:
+            pilha.extend(pendentes)
+            continue
+        pilha.pop()
+        if isinstance(no, OpBin):
+            f = OpBin(no.operador, no.opEsq.forma, no.opDir.forma)
+        elif isinstance(no, Call):
+            f = Call(no.nome, [a.forma for a in no.args], id=no.id)
+        else:
+            f = Var(no.nome, id=no.id)
+        _poe_forma(no, f)
+    return raiz.forma
+
+
+def nos_canonicos() -> int:
+    # quantos nós canônicos (compartilháveis) estão vivos
+    return len(_NOS)
+
+
+def _divide(esquerda: int, direita: int) -> int:
+    if direita == 0:
+        raise ZeroDivisionError("Divisão por zero")
+    return esquerda // direita
+
+
+def _resto(esquerda: int, direita: int) -> int:
+    if direita == 0:
+        raise ZeroDivisionError("Divisão por zero (resto)")
+    return esquerda % direita
+
+
+# operador -> função (esquerda, direita) -> int; comparações dão 1/0
+OPERACOES = {
+    Operadores.SOMA: operator.add,
+    Operadores.SUBTRACAO: operator.sub,
+    Operadores.MULTIPLIC: operator.mul,
+    Operadores.DIVISAO: _divide,
+    Operadores.RESTO: _resto,
+    Operadores.MENOR: lambda esquerda, direita: 1 if esquerda < direita else 0,
+    Operadores.MAIOR: lambda esquerda, direita: 1 if esquerda > direita else 0,
+    Operadores.IGUAL_IGUAL: lambda esquerda, direita: 1 if esquerda == direita else 0,
+    Operadores.MENOR_IGUAL: lambda esquerda, direita: 1 if esquerda <= direita else 0,
+    Operadores.MAIOR_IGUAL: lambda esquerda, direita: 1 if esquerda >= direita else 0,
+    Operadores.DIFERENTE: lambda esquerda, direita: 1 if esquerda != direita else 0,
+}
+
+
+def operacao(operador: Operadores):
+    f = OPERACOES.get(operador)
+    if f is None:
+        def f(esquerda: int, direita: int) -> int:
+            raise ValueError(f"Operador desconhecido: {operador}")
+    return f
+
+
+def aplica_operador(operador: Operadores, esquerda: int, direita: int) -> int:
+    return operacao(operador)(esquerda, direita)
+
+
+SIMBOLOS_OPERADORES = {
+    Operadores.SOMA: '+',
+    Operadores.SUBTRACAO: '-',
+    Operadores.MULTIPLIC: '*',
+    Operadores.DIVISAO: '/',
+    Operadores.RESTO: '%',
+    Operadores.MENOR: '<',
+    Operadores.MAIOR: '>',
+    Operadores.IGUAL_IGUAL: '==',
+    Operadores.MENOR_IGUAL: '<=',
+    Operadores.MAIOR_IGUAL: '>=',
+    Operadores.DIFERENTE: '!=',
+}
+
+
+# ---------- Percursos com pilha explícita ----------
+# Nenhum percurso de expressão se chama recursivamente: uma cadeia a + b + c + ... vira uma
+# árvore OpBin funda à esquerda, com um nível por operando, e estouraria o limite de recursão do
+# Python. avalia() e texto_exp() usam uma pilha de trabalho; executa() usa uma pilha de
+# iteradores de listas de comandos.
+
+# Espécie de cada classe de nó, calculada uma vez por classe: o laço despacha por um inteiro em vez
+# de uma cadeia de isinstance (que passa pelo __instancecheck__ do ABC a cada teste).
+CONST, VAR, OPBIN, CALL, APLICA, CHAMA, ASSIGN, IF, WHILE, BLOCO, RETURN, OUTRO = range(12)
+_ESPECIES: Dict[type, int] = {
+    tuple: CHAMA,                 # (Call,): argumentos prontos, chamar
+    type(operator.add): APLICA,   # função de OPERACOES: operandos prontos, aplicar
+    type(_divide): APLICA,
+}
+
+
+def especie(cls: type) -> int:
+    k = _ESPECIES.get(cls)
+    if k is None:
+        k = OUTRO
+        for base, e in ((Const, CONST), (Var, VAR), (OpBin, OPBIN), (Call, CALL), (Assign, ASSIGN),
+                        (IfStmt, IF), (WhileStmt, WHILE), (BlockStmt, BLOCO), (ReturnStmt, RETURN)):
+            if issubclass(cls, base):
+                k = e
+                break
+        _ESPECIES[cls] = k
+    return k
+
+
+# ---------- Registros de ativação ----------
+# Cada chamada tem um Quadro: uma lista de slots de tamanho fixo (os parâmetros, depois as locais
+# na ordem das declarações, como os offsets de analisadorSemantico) e um mapa {id: slot} dos nomes
+# visíveis, calculado uma vez por função (prepara_quadro). As globais ficam num dict só, o mesmo
+# para todos os quadros de uma execução: o que uma função atribui a uma global continua valendo
+# depois do retorno, e um nome que não é parâmetro nem local da função é sempre a global.
+
+class Quadro:
+    __slots__ = ('slots', 'indices', 'globais', 'memo', 'ganchos')
+
+    def __init__(self, slots: List[int], indices: Dict[int, int], globais: Dict[int, int],
+                 memo: Optional["CacheChamadas"] = None, ganchos: Optional["Ganchos"] = None):
+        self.slots = slots
+        self.indices = indices
+        self.globais = globais
+        self.memo = memo  # o mesmo para todos os quadros de uma execução (None: sem memo)
+        self.ganchos = ganchos  # idem (None: sem ganchos)
+
+
+class Ganchos:
+    """
+    Pontos de observação de Programa.avaliador(ganchos=...) (o perfilador usa): os métodos não
+    fazem nada e uma subclasse sobrescreve os que quer. Sem ganchos (None), avalia/executa só
+    testam o None; com eles, os atalhos de folhas ficam desligados e todo nó passa por no().
+    """
+    def no(self, no) -> None:
+        # antes de avaliar uma expressão ou executar um comando (Decl: global ou local). Um Call
+        # de cauda passa por aqui sem ser avaliado: a chamada sai pelo trampolim
+        pass
+
+    def volta(self, s: "WhileStmt") -> None:
+        # o corpo do while terminou e a condição vai ser avaliada de novo
+        pass
+
+    def entra(self, dono: Union["FunDecl", "Programa"]) -> None:
+        # começa uma ativação (o Programa é a do main); uma chamada de cauda fecha a de quem
+        # chama (sai) depois de avaliar os argumentos e abre a da chamada
+        pass
+
+    def sai(self, dono: Union["FunDecl", "Programa"]) -> None:
+        # termina a ativação aberta por entra(dono), com return ou com erro
+        pass
+
+    def resultado(self, dono: Union["FunDecl", "Programa"]) -> None:
+        # os comandos terminaram sem return: vai ser avaliado o resultado de dono
+        pass
+
+
+class CacheChamadas:
+    """
+    Memo opcional de Programa.avaliador(memo=...) para as funções marcadas puras pela análise
+    semântica (f.pura, de build_symbol_table_and_offsets): um LRU {argumentos: resultado} por
+    função, de até tamanho_max entradas. estatisticas[nome] conta acertos, faltas e removidas
+    (entradas que saíram pelo limite). Com ligado = False as chamadas não consultam nem gravam
+    nada. Funções sem a anotação (programa não verificado) nunca entram.
+    """
+    def __init__(self, tamanho_max: int = 4096, ligado: bool = True):
+        if tamanho_max < 1:
+            raise ValueError("tamanho_max do memo precisa ser pelo menos 1")
+        self.tamanho_max = tamanho_max
+        self.ligado = ligado
+        self.tabelas: Dict[int, OrderedDict] = {}
+        self.estatisticas: Dict[str, Dict[str, int]] = {}
+
+    def _contadores(self, f: "FunDecl") -> Dict[str, int]:
+        c = self.estatisticas.get(f.nome)
+        if c is None:
+            c = self.estatisticas[f.nome] = {'acertos': 0, 'faltas': 0, 'removidas': 0}
+        return c
+
+    def busca(self, f: "FunDecl", chave: tuple) -> Optional[int]:
+        tabela = self.tabelas.get(f.id)
+        r = tabela.get(chave) if tabela is not None else None
+        if r is None:
+            self._contadores(f)['faltas'] += 1
+            return None
+        tabela.move_to_end(chave)  # recência para o LRU
+        self._contadores(f)['acertos'] += 1
+        return r
+
+    def guarda(self, f: "FunDecl", chave: tuple, valor: int) -> None:
+        tabela = self.tabelas.get(f.id)
+        if tabela is None:
+            tabela = self.tabelas[f.id] = OrderedDict()
+        tabela[chave] = valor
+        if len(tabela) > self.tamanho_max:
+            tabela.popitem(last=False)
+            self._contadores(f)['removidas'] += 1
+
+    def limpa(self) -> None:
+        # descarta as entradas (as estatísticas ficam)
+        self.tabelas.clear()
+
+    def relatorio(self) -> str:
+        linhas = [f"{'função':<20} {'acertos':>10} {'faltas':>10} {'removidas':>10} {'taxa':>7}"]
+        for nome, c in sorted(self.estatisticas.items()):
+            total = c['acertos'] + c['faltas']
+            taxa = c['acertos'] / total if total else 0.0
+            linhas.append(f"{nome:<20} {c['acertos']:>10} {c['faltas']:>10} {c['removidas']:>10} {taxa:>7.1%}")
+        return "\n".join(linhas)
+
+
+def quadro_de(env: Ambiente) -> Quadro:
+    # avaliador() chamado de fora com um dict: ele faz o papel das globais
+    if type(env) is Quadro:
+        return env
+    return Quadro([], {}, env if env is not None else {})
+
+
+def prepara_quadro(f: "FunDecl") -> tuple:
+    """
+    (indices, parciais, n_locais) do quadro de f, guardado em f._quadro: indices é {id: slot} de
+    todos os parâmetros e locais e parciais[i] o que o inicializador da i-ésima local enxerga (os
+    parâmetros e as locais anteriores). Parâmetro repetido fica no último slot, como no env antigo.
+    """
+    indices = {pid: i for i, pid in enumerate(f.param_ids)}
+    parciais = []
+    n = len(f.param_ids)
+    for i, d in enumerate(f.local_decls):
+        parciais.append(indices)
+        indices = dict(indices)
+        indices[d.id] = n + i
+    f._quadro = (indices, parciais, len(f.local_decls))
+    return f._quadro
+
+
+def avalia(raiz: Exp, q: Quadro, funcoes: Optional[Dict[int, "FunDecl"]]) -> int:
+    # pós-ordem: os operandos ficam em 'valores'; na pilha, depois dos filhos de um nó, vai a marca
+    # do que fazer com eles (a função do operador, ou (Call,) para chamar)
+    especies = _ESPECIES
+    operacoes = OPERACOES
+    slots = q.slots
+    indices = q.indices
+    globais = q.globais
+    ganchos = q.ganchos
+    # raízes folha (x, 1): direto, sem montar a pilha (com ganchos, todo nó passa pela pilha)
+    k = especies.get(type(raiz)) if ganchos is None else None
+    if k == VAR:
+        i = indices.get(raiz.id)
+        if i is not None:
+            return slots[i]
+        v = globais.get(raiz.id)
+        if v is None:
+            raise NameError(raiz.erro_nao_declarada())
+        return v
+    if k == CONST:
+        return raiz.valor
+    valores: List[int] = []
+    pilha: list = [raiz]
+    while pilha:
+        no = pilha.pop()
+        cls = type(no)
+        k = especies.get(cls)
+        if k is None:
+            k = especie(cls)
+        if ganchos is not None and k != APLICA and k != CHAMA:
+            ganchos.no(no)
+        if k == OPBIN:
+            esq = no.opEsq
+            dir = no.opDir
+            ke = especies.get(type(esq))
+            kd = especies.get(type(dir))
+            if (ke == CONST or ke == VAR) and (kd == CONST or kd == VAR) and ganchos is None:
+                # operandos folha (o caso comum: i < n, s + 1): sem passar pela pilha
+                if ke == CONST:
+                    a = esq.valor
+                else:
+                    i = indices.get(esq.id)
+                    a = slots[i] if i is not None else globais.get(esq.id)
+                    if a is None:
+                        raise NameError(esq.erro_nao_declarada())
+                if kd == CONST:
+                    b = dir.valor
+                else:
+                    i = indices.get(dir.id)
+                    b = slots[i] if i is not None else globais.get(dir.id)
+                    if b is None:
+                        raise NameError(dir.erro_nao_declarada())
+                valores.append((operacoes.get(no.operador) or operacao(no.operador))(a, b))
+            else:
+                pilha.append(operacoes.get(no.operador) or operacao(no.operador))
+                pilha.append(dir)
+                pilha.append(esq)
+        elif k == APLICA:
+            direita = valores.pop()
+            valores[-1] = no(valores[-1], direita)
+        elif k == VAR:
+            i = indices.get(no.id)
+            v = slots[i] if i is not None else globais.get(no.id)
+            if v is None:
+                raise NameError(no.erro_nao_declarada())
+            valores.append(v)
+        elif k == CONST:
+            valores.append(no.valor)
+        elif k == CALL:
+            no.destino(funcoes)
+            pilha.append((no,))
+            pilha.extend(reversed(no.args))
+        elif k == CHAMA:
+            no = no[0]
+            n = len(no.args)
+            args_vals = valores[-n:] if n else []
+            if n:
+                del valores[-n:]
+            valores.append(no.chama(funcoes[no.id], args_vals, q, funcoes))
+        else:
+            valores.append(no.avaliador(q, funcoes))
+    return valores[-1]
+
+
+def executa(comandos: List["Stmt"], q: Quadro, funcoes: Optional[Dict[int, "FunDecl"]],
+            cauda: bool = False) -> Union[int, "Call", None]:
+    # resultado da execução: o valor de um return (descarta a pilha de iteradores inteira, com os
+    # laços e blocos em volta) ou None se os comandos terminaram sem return. Os valores da
+    # linguagem são sempre int, então None não se confunde com nenhum deles. Com cauda (corpo de
+    # função, executa_corpo), 'return f(...)' devolve o próprio Call, sem avaliar: a chamada é
+    # feita pelo trampolim.
+    especies = _ESPECIES
+    slots = q.slots
+    indices = q.indices
+    globais = q.globais
+    ganchos = q.ganchos
+    pilha = [iter(comandos)]
+    while pilha:
+        s = next(pilha[-1], None)
+        if s is None:
+            pilha.pop()
+            continue
+        cls = type(s)
+        k = especies.get(cls)
+        if k is None:
+            k = especie(cls)
+        if ganchos is not None:
+            if k == CHAMA:
+                # (while,): a volta do laço, marcada para não contar como uma entrada nova
+                s = s[0]
+                k = WHILE
+                ganchos.volta(s)
+            else:
+                ganchos.no(s)
+        if k == ASSIGN:
+            i = indices.get(s.id)
+            if i is not None:
+                slots[i] = avalia(s.expr, q, funcoes)
+            elif s.id in globais:
+                globais[s.id] = avalia(s.expr, q, funcoes)
+            else:
+                ln = s.linha if s.linha is not None else '?'
+                ps = s.pos if s.pos is not None else '?'
+                raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})")
+        elif k == IF:
+            if avalia(s.cond, q, funcoes) != 0:
+                pilha.append(iter(s.then_stmts))
+            elif s.else_stmts is not None:
+                pilha.append(iter(s.else_stmts))
+        elif k == WHILE:
+            if avalia(s.cond, q, funcoes) != 0:
+                # depois do corpo, o while é reavaliado
+                pilha.append(iter((s,)) if ganchos is None else iter(((s,),)))
+                pilha.append(iter(s.body))
+        elif k == BLOCO:
+            pilha.append(iter(s.stmts))
+        elif k == RETURN:
+            if cauda and especies.get(type(s.expr)) == CALL:
+                if ganchos is not None:
+                    ganchos.no(s.expr)
+                return s.expr
+            return avalia(s.expr, q, funcoes)
+        else:
+            r = s.avaliador(q, funcoes)
+            if r is not None:
+                return r
+    return None
+
+
+def executa_corpo(f: "FunDecl", args_vals: List[int], completo: Dict[int, int], parciais: list,
+                  n_locais: int, q: Quadro, funcoes: Dict[int, "FunDecl"]) -> int:
+    """
+    Uma ativação de f (Call.chama, depois da aridade e do memo), com o mapa de prepara_quadro.
+    Trampolim: uma chamada em posição de cauda (o resultado da função, ou 'return g(...)' nos
+    comandos) não aninha outra ativação. Os argumentos são avaliados no quadro atual, que é
+    reaproveitado para g, e o laço recomeça; recursão de cauda roda com pilha Python constante.
+    Com memo, as chamadas de cauda a funções puras também são consultadas, e as que faltaram
+    recebem o resultado final (é o mesmo valor).
+    """
+    especies = _ESPECIES
+    memo = q.memo
+    if memo is not None and not memo.ligado:
+        memo = None
+    ganchos = q.ganchos
+    pendentes = []
+    novo = Quadro(None, completo, q.globais, q.memo, ganchos)
+    try:
+        while True:
+            if ganchos is not None:
+                ganchos.entra(f)
+            # os argumentos nos slots dos parâmetros, as locais depois
+            slots = args_vals + [0] * n_locais
+            novo.slots = slots
+            if n_locais:
+                # cada inicializador só enxerga os parâmetros e as locais anteriores
+                n = len(args_vals)
+                for i, d in enumerate(f.local_decls):
+                    novo.indices = parciais[i]
+                    if ganchos is not None:
+                        ganchos.no(d)
+                    slots[n + i] = avalia(d.expr, novo, funcoes)
+            novo.indices = completo
+            # executar comandos; um return no meio do corpo volta como valor (ou como o Call de cauda)
+            r = executa(f.comandos, novo, funcoes, True)
+            if r is None:
+                # sem return precoce: o resultado da função
+                r = f.resultado
+                if ganchos is not None:
+                    ganchos.resultado(f)
+                if especies.get(type(r)) != CALL:
+                    r = avalia(r, novo, funcoes)
+                    break
+                if ganchos is not None:
+                    ganchos.no(r)
+            elif especies.get(type(r)) != CALL:
+                break
+            # chamada de cauda: mesma ordem e mesmos erros de avalia() + Call.chama
+            g = r.destino(funcoes)
+            args_vals = [avalia(a, novo, funcoes) for a in r.args]
+            r.confere_aridade(g, args_vals)
+            if memo is not None and getattr(g, 'pura', False):
+                chave = tuple(args_vals)
+                r = memo.busca(g, chave)
+                if r is not None:
+                    break
+                pendentes.append((g, chave))
+            if ganchos is not None:
+                ganchos.sai(f)
+            f = g
+            try:
+                completo, parciais, n_locais = f._quadro
+            except AttributeError:
+                completo, parciais, n_locais = prepara_quadro(f)
+    except BaseException:
+        if ganchos is not None:
+            ganchos.sai(f)
+        raise
+    if ganchos is not None:
+        ganchos.sai(f)
+    for g, chave in pendentes:
+        memo.guarda(g, chave, r)
+    return r
+
+
+def texto_exp(raiz: Exp) -> str:
+    # texto de Exp.gerador(): pedaços de texto e nós na mesma pilha, emitidos em ordem
+    partes: List[str] = []
+    pilha: list = [raiz]
+    while pilha:
+        no = pilha.pop()
+        if type(no) is str:
+            partes.append(no)
+        elif isinstance(no, OpBin):
+            simb = SIMBOLOS_OPERADORES.get(no.operador, '?')
+            pilha += [")", no.opDir, f" {simb} ", no.opEsq, "("]
+        elif isinstance(no, Const):
+            partes.append(str(no.valor))
+        elif isinstance(no, Var):
+            partes.append(no.nome)
+        elif isinstance(no, Call):
+            pilha.append(")")
+            for i in range(len(no.args) - 1, -1, -1):
+                pilha.append(no.args[i])
+                if i:
+                    pilha.append(", ")
+            pilha.append(f"{no.nome}(")
+        else:
+            partes.append(no.gerador())
+    return "".join(partes)
+
+
+def texto_repr(raiz) -> str:
+    # repr() dos nós, das expressões ao Programa (o print(ast) de main.py), e os comandos em
+    # Programa.gerador: como texto_exp, pedaços de texto e nós na mesma pilha, emitidos em ordem.
+    # Listas de nós saem como [a, b]; o que não é nó (None, FunDecl, Const, Var) sai pelo repr()
+    partes: List[str] = []
+    pilha: list = [raiz]
+    while pilha:
+        no = pilha.pop()
+        if type(no) is str:
+            partes.append(no)
+        elif type(no) is list:
+            pilha.append("]")
+            for i in range(len(no) - 1, -1, -1):
+                pilha.append(no[i])
+                if i:
+                    pilha.append(", ")
+            pilha.append("[")
+        elif isinstance(no, OpBin):
+            pilha += [")", no.opDir, ", opDir=", no.opEsq, f"OpBin(operador={no.operador!r}, opEsq="]
+        elif isinstance(no, Call):
+            pilha.append("))")
+            for i in range(len(no.args) - 1, -1, -1):
+                pilha.append(no.args[i])
+                if i:
+                    pilha.append(", ")
+            pilha.append(f"Call({no.nome}(")
+        elif isinstance(no, Decl):
+            pilha += [")", no.expr, f"Decl({no.nome} = "]
+        elif isinstance(no, Assign):
+            pilha += [")", no.expr, f"Assign({no.nome} = "]
+        elif isinstance(no, IfStmt):
+            pilha += [")", no.else_stmts if no.else_stmts is not None else "None", ", else=",
+                      no.then_stmts, ", then=", no.cond, "If(cond="]
+        elif isinstance(no, WhileStmt):
+            pilha += [")", no.body, ", body=", no.cond, "While(cond="]
+        elif isinstance(no, BlockStmt):
+            pilha += [")", no.stmts, "Block("]
+        elif isinstance(no, ReturnStmt):
+            pilha += [")", no.expr, "Return("]
+        elif isinstance(no, Programa):
+            pilha += [")", no.resultado, ", result=", no.comandos, ", cmds=", no.fun_decls, ", funs=",
+                      no.var_decls, "Programa(vars="]
+        else:
+            partes.append(repr(no))
+    return "".join(partes)
 
 # ---------- Declarações e Stmts ----------
 @dataclass
@@ -146,9 +831,15 @@ class Decl:
     expr: Exp
     linha: Optional[int] = None
     pos: Optional[int] = None
+    id: Optional[int] = field(default=None, repr=False, compare=False)  # id de self.nome na TabelaSimbolos
+
+    def __post_init__(self):
+        # id internado do nome (o parser já passa o do token; nós montados à mão são internados aqui)
+        if self.id is None:
+            self.id = interna(self.nome)
 
     def __repr__(self) -> str:
-        return f"Decl({self.nome} = {self.expr})"
+        return texto_repr(self)
 
     def gerador(self) -> str:
         return f"{self.nome} = {self.expr.gerador()};"
@@ -163,18 +854,18 @@ class Assign(Stmt):
     expr: Exp
     linha: Optional[int] = None
     pos: Optional[int] = None
+    id: Optional[int] = field(default=None, repr=False, compare=False)  # id de self.nome na TabelaSimbolos
+
+    def __post_init__(self):
+        # id internado do nome (o parser já passa o do token; nós montados à mão são internados aqui)
+        if self.id is None:
+            self.id = interna(self.nome)
 
     def __repr__(self) -> str:
-        return f"Assign({self.nome} = {self.expr})"
+        return texto_repr(self)
 
-    def avaliador(self, env: Dict[str, int], funcoes: Optional[Dict[str, "FunDecl"]] = None) -> None:
-        if self.nome not in env:
-            ln = self.linha if self.linha is not None else '?'
-            ps = self.pos if self.pos is not None else '?'
-            raise NameError(f"Erro semântico: atribuição para variável não declarada '{self.nome}' (linha {ln}, pos {ps})")
-        val = self.expr.avaliador(env, funcoes)
-        env[self.nome] = val
-        return None
+    def avaliador(self, env: Ambiente, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> Optional[int]:
+        return executa((self,), quadro_de(env), funcoes)
 
 @dataclass
 class IfStmt(Stmt):
@@ -183,18 +874,10 @@ class IfStmt(Stmt):
     else_stmts: Optional[List[Stmt]] = None
 
     def __repr__(self) -> str:
-        return f"If(cond={self.cond}, then={self.then_stmts}, else={self.else_stmts})"
+        return texto_repr(self)
 
-    def avaliador(self, env: Dict[str, int], funcoes: Optional[Dict[str, "FunDecl"]] = None) -> None:
-        cond_val = self.cond.avaliador(env, funcoes)
-        if cond_val != 0:
-            for s in self.then_stmts:
-                s.avaliador(env, funcoes)
-        else:
-            if self.else_stmts is not None:
-                for s in self.else_stmts:
-                    s.avaliador(env, funcoes)
-        return None
+    def avaliador(self, env: Ambiente, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> Optional[int]:
+        return executa((self,), quadro_de(env), funcoes)
 
 @dataclass
 class WhileStmt(Stmt):
@@ -202,30 +885,20 @@ class WhileStmt(Stmt):
     body: List[Stmt]
 
     def __repr__(self) -> str:
-        return f"While(cond={self.cond}, body={self.body})"
+        return texto_repr(self)
 
-    def avaliador(self, env: Dict[str, int], funcoes: Optional[Dict[str, "FunDecl"]] = None) -> None:
-        while self.cond.avaliador(env, funcoes) != 0:
-            for s in self.body:
-                s.avaliador(env, funcoes)
-        return None
+    def avaliador(self, env: Ambiente, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> Optional[int]:
+        return executa((self,), quadro_de(env), funcoes)
 
 @dataclass
 class BlockStmt(Stmt):
     stmts: List[Stmt]
 
     def __repr__(self) -> str:
-        return f"Block({self.stmts})"
-
-    def avaliador(self, env: Dict[str, int], funcoes: Optional[Dict[str, "FunDecl"]] = None) -> None:
-        for s in self.stmts:
-            s.avaliador(env, funcoes)
-        return None
+        return texto_repr(self)
 
-class ReturnException(Exception):
-    def __init__(self, value: int):
-        super().__init__("Return")
-        self.value = value
+    def avaliador(self, env: Ambiente, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> Optional[int]:
+        return executa((self,), quadro_de(env), funcoes)
 
 @dataclass
 class ReturnStmt(Stmt):
@@ -234,11 +907,11 @@ class ReturnStmt(Stmt):
     pos: Optional[int] = None
 
     def __repr__(self) -> str:
-        return f"Return({self.expr})"
+        return texto_repr(self)
 
-    def avaliador(self, env: Dict[str, int], funcoes: Optional[Dict[str, "FunDecl"]] = None) -> None:
-        val = self.expr.avaliador(env, funcoes)
-        raise ReturnException(val)
+    def avaliador(self, env: Ambiente, funcoes: Optional[Dict[int, "FunDecl"]] = None) -> Optional[int]:
+        # o return não levanta exceção: o valor sobe como resultado de executa()
+        return avalia(self.expr, quadro_de(env), funcoes)
 
 # ---------- Função (decl) ----------
 @dataclass
@@ -250,6 +923,14 @@ class FunDecl:
     resultado: Exp
     linha: Optional[int] = None
     pos: Optional[int] = None
+    id: Optional[int] = field(default=None, repr=False, compare=False)  # id de self.nome na TabelaSimbolos
+    param_ids: Optional[List[int]] = field(default=None, repr=False, compare=False)  # ids dos parâmetros
+
+    def __post_init__(self):
+        if self.id is None:
+            self.id = interna(self.nome)
+        if self.param_ids is None:
+            self.param_ids = [interna(p) for p in self.params]
 
     def __repr__(self) -> str:
         return f"FunDecl({self.nome}({', '.join(self.params)}))"
@@ -257,9 +938,16 @@ class FunDecl:
     def gerador(self) -> str:
         params = ", ".join(self.params)
         decls = "\n".join([d.gerador() for d in self.local_decls])
-        cmds = "\n".join([str(c) for c in self.comandos])
+        cmds = "\n".join([texto_repr(c) for c in self.comandos])
         return f"fun {self.nome}({params}) {{\n{decls}\n{cmds}\nreturn {self.resultado.gerador()};\n}}"
 
+# ---------- Verificação semântica (Programa.verifica_semantica) ----------
+def _onde(no, linhas: Optional[IndiceLinhas]) -> str:
+    ln = no.linha if no.linha is not None else '?'
+    ps = no.pos if no.pos is not None else '?'
+    return f"linha {ln}, coluna {coluna(linhas, no.pos)}, pos {ps}"
+
+
 # ---------- PROGRAMA ----------
 @dataclass
 class Programa:
@@ -267,9 +955,10 @@ class Programa:
     fun_decls: List[FunDecl]       # funções
     comandos: List[Stmt]           # comandos do main
     resultado: Exp                 # expressão final (return do main ou Const(0) se ausente)
+    linhas: Optional[IndiceLinhas] = field(default=None, compare=False, repr=False)  # índice de linhas do fonte (colunas nos erros)
 
     def __repr__(self) -> str:
-        return f"Programa(vars={self.var_decls}, funs={self.fun_decls}, cmds={self.comandos}, result={self.resultado})"
+        return texto_repr(self)
 
     def verifica_semantica(self) -> None:
         """
@@ -280,175 +969,65 @@ class Programa:
         - verifica corpos (decls locais, comandos, expressão de retorno)
         - verifica que main não contém 'var' (o parser já evita, mas checagem extra)
         """
-        env: Dict[str, int] = {}
-        funs: Dict[str, FunDecl] = {}
+        from .visitante import VerificaEscopo  # visitante importa este módulo
+        env: Dict[int, int] = {}
+        funs: Dict[int, FunDecl] = {}
+        linhas = self.linhas
+        # pré-ordem de cada expressão/comando (o comando, a sua condição/expressão e depois os
+        # comandos aninhados); VerificaEscopo guarda as tabelas, que crescem durante a verificação
+        globais = VerificaEscopo(env, funs, "chamada para função não declarada", linhas)
 
         # 1) processar var_decls (globais)
         for d in self.var_decls:
             # checar expr usa apenas nomes já declarados (ex.: não permite forward ref a variáveis)
-            def check_e(e: Exp):
-                if isinstance(e, Var):
-                    if e.nome not in env:
-                        ln = e.linha if e.linha is not None else '?'
-                        ps = e.pos if e.pos is not None else '?'
-                        raise NameError(f"Erro semântico: variável '{e.nome}' não declarada (linha {ln}, pos {ps})")
-                elif isinstance(e, OpBin):
-                    check_e(e.opEsq)
-                    check_e(e.opDir)
-                elif isinstance(e, Call):
-                    # chamada a função ainda não permitida aqui (ou precisa existir); permitimos chamadas para funções já em funs
-                    if e.nome not in funs:
-                        ln = e.linha if e.linha is not None else '?'
-                        ps = e.pos if e.pos is not None else '?'
-                        raise NameError(f"Erro semântico: chamada para função não declarada '{e.nome}' (linha {ln}, pos {ps})")
-                    for arg in e.args:
-                        check_e(arg)
-                else:
-                    return
-            check_e(d.expr)
-            if d.nome in env:
+            # chamada a função ainda não permitida aqui (ou precisa existir); permitimos chamadas para funções já em funs
+            globais.percorre(d.expr)
+            if d.id in env:
                 raise NameError(f"Erro semântico: variável '{d.nome}' já declarada")
-            env[d.nome] = 0
+            env[d.id] = 0
 
         # 2) processar funções (registrar assinaturas em ordem)
         for f in self.fun_decls:
-            if f.nome in funs:
+            if f.id in funs:
                 raise NameError(f"Erro semântico: função '{f.nome}' já declarada")
-            funs[f.nome] = f  # registramos; mas para evitar mutual recursion, vamos checar corpos permitindo apenas chamadas para funções já presentes antes
+            funs[f.id] = f  # registramos; mas para evitar mutual recursion, vamos checar corpos permitindo apenas chamadas para funções já presentes antes
             # Nota: não checamos corpo aqui para permitir referências só a funções já registradas (a checagem detalhada vem abaixo)
 
         # 3) checar corpos das funções (evitar chamadas para funções que aparecem depois -> evita mutual recursion)
         # Para isso, nós percorreremos as funções em ordem e construiremos uma tabela parcial
-        partial_funs: Dict[str, FunDecl] = {}
+        partial_funs: Dict[int, FunDecl] = {}
         for f in self.fun_decls:
             # duplicata de nome com variáveis?
-            if f.nome in env:
+            if f.id in env:
                 raise NameError(f"Erro semântico: nome '{f.nome}' usado por variável e função")
+            # f entra em partial_funs já antes do corpo: recursão direta é permitida
+            partial_funs[f.id] = f
             # verificar corpo: os usos de Var devem estar em env OU em params OU em local_decls conforme ordem
             # construir env local inicial com parâmetros (nome->0) + _global env
             local_env = dict(env)
-            for p in f.params:
-                if p in local_env:
+            for p, pid in zip(f.params, f.param_ids):
+                if pid in local_env:
                     raise NameError(f"Erro semântico: parâmetro '{p}' em função '{f.nome}' conflita com nome já declarado")
-                local_env[p] = 0
+                local_env[pid] = 0
+            corpo = VerificaEscopo(local_env, partial_funs, "chamada para função não disponível ainda", linhas)
             # verificar declarações locais (cada inicializador pode usar nomes já no local_env)
             for d in f.local_decls:
-                # verificar expressão de inicialização
-                def check_e2(e: Exp):
-                    if isinstance(e, Var):
-                        if e.nome not in local_env:
-                            ln = e.linha if e.linha is not None else '?'
-                            ps = e.pos if e.pos is not None else '?'
-                            raise NameError(f"Erro semântico: variável '{e.nome}' não declarada (linha {ln}, pos {ps})")
-                    elif isinstance(e, OpBin):
-                        check_e2(e.opEsq); check_e2(e.opDir)
-                    elif isinstance(e, Call):
-                        # permitir chamadas para a própria função (recursão direta)
-                        # ou para funções já registradas em partial_funs (funções anteriores)
-                        if e.nome != f.nome and e.nome not in partial_funs:
-                            ln = e.linha if e.linha is not None else '?'
-                            ps = e.pos if e.pos is not None else '?'
-                            raise NameError(f"Erro semântico: chamada para função não disponível ainda '{e.nome}' (linha {ln}, pos {ps})")
-                        for arg in e.args:
-                            check_e2(arg)
-                    else:
-                        return
-                check_e2(d.expr)
+                corpo.percorre(d.expr)
                 # depois de checar, adicionar o nome local
-                if d.nome in local_env:
+                if d.id in local_env:
                     raise NameError(f"Erro semântico: variável local '{d.nome}' redeclarada em função '{f.nome}'")
-                local_env[d.nome] = 0
-            # verificar comandos do corpo
-            def check_stmt(s: Stmt):
-                if isinstance(s, Assign):
-                    if s.nome not in local_env:
-                        ln = s.linha if s.linha is not None else '?'
-                        ps = s.pos if s.pos is not None else '?'
-                        raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})")
-                    # verificar RHS
-                    check_e2(s.expr)
-                elif isinstance(s, IfStmt):
-                    check_e2(s.cond)
-                    for ss in s.then_stmts: check_stmt(ss)
-                    if s.else_stmts is not None:
-                        for ss in s.else_stmts: check_stmt(ss)
-                elif isinstance(s, WhileStmt):
-                    check_e2(s.cond)
-                    for ss in s.body: check_stmt(ss)
-                elif isinstance(s, ReturnStmt):
-                    check_e2(s.expr)
-                elif isinstance(s, BlockStmt):
-                    for ss in s.stmts: check_stmt(ss)
-                else:
-                    return
-            for c in f.comandos:
-                check_stmt(c)
-            # verificar expressão de retorno da função
-            def check_e3(e: Exp):
-                if isinstance(e, Var):
-                    if e.nome not in local_env:
-                        ln = e.linha if e.linha is not None else '?'
-                        ps = e.pos if e.pos is not None else '?'
-                        raise NameError(f"Erro semântico: variável '{e.nome}' não declarada (linha {ln}, pos {ps})")
-                elif isinstance(e, OpBin):
-                    check_e3(e.opEsq); check_e3(e.opDir)
-                elif isinstance(e, Call):
-                    # permitir recursão direta (chamar a própria função) ou chamadas para funções já em partial_funs
-                    if e.nome != f.nome and e.nome not in partial_funs:
-                        ln = e.linha if e.linha is not None else '?'
-                        ps = e.pos if e.pos is not None else '?'
-                        raise NameError(f"Erro semântico: chamada para função não disponível ainda '{e.nome}' (linha {ln}, pos {ps})")
-                    for arg in e.args: check_e3(arg)
-                else:
-                    return
-            check_e3(f.resultado)
-            # depois de tudo OK, registramos f em partial_funs para funções posteriores poderem chamá-la
-            partial_funs[f.nome] = f
+                local_env[d.id] = 0
+            # verificar comandos do corpo e a expressão de retorno da função
+            for s in f.comandos:
+                corpo.percorre(s)
+            corpo.percorre(f.resultado)
 
         # 4) verificar comandos do main (os nomes usados devem estar em env (globais) ou em funções via chamadas)
         # main não deve conter var (parser já impede); aqui checamos usos de Var e de chamadas
-        def check_expr_main(e: Exp):
-            if isinstance(e, Var):
-                if e.nome not in env:
-                    ln = e.linha if e.linha is not None else '?'
-                    ps = e.pos if e.pos is not None else '?'
-                    raise NameError(f"Erro semântico: variável '{e.nome}' não declarada (linha {ln}, pos {ps})")
-            elif isinstance(e, OpBin):
-                check_expr_main(e.opEsq); check_expr_main(e.opDir)
-            elif isinstance(e, Call):
-                if e.nome not in partial_funs:
-                    ln = e.linha if e.linha is not None else '?'
-                    ps = e.pos if e.pos is not None else '?'
-                    raise NameError(f"Erro semântico: chamada para função não declarada '{e.nome}' (linha {ln}, pos {ps})")
-                for arg in e.args: check_expr_main(arg)
-            else:
-                return
-
-        def check_stmt_main(s: Stmt):
-            if isinstance(s, Assign):
-                if s.nome not in env:
-                    ln = s.linha if s.linha is not None else '?'
-                    ps = s.pos if s.pos is not None else '?'
-                    raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})")
-                check_expr_main(s.expr)
-            elif isinstance(s, IfStmt):
-                check_expr_main(s.cond)
-                for ss in s.then_stmts: check_stmt_main(ss)
-                if s.else_stmts is not None:
-                    for ss in s.else_stmts: check_stmt_main(ss)
-            elif isinstance(s, WhileStmt):
-                check_expr_main(s.cond)
-                for ss in s.body: check_stmt_main(ss)
-            elif isinstance(s, ReturnStmt):
-                check_expr_main(s.expr)
-            elif isinstance(s, BlockStmt):
-                for ss in s.stmts: check_stmt_main(ss)
-            else:
-                return
-
-        for c in self.comandos:
-            check_stmt_main(c)
-        check_expr_main(self.resultado)
+        main = VerificaEscopo(env, partial_funs, "chamada para função não declarada", linhas)
+        for s in self.comandos:
+            main.percorre(s)
+        main.percorre(self.resultado)
 
         # se chegou até aqui, passou na verificação semântica
         return None
@@ -460,28 +1039,39 @@ class Programa:
         for f in self.fun_decls:
             parts.append(f.gerador())
         for c in self.comandos:
-            parts.append(str(c))
+            parts.append(texto_repr(c))
         parts.append(f"return {self.resultado.gerador()};")
         return "\n".join(parts)
 
-    def avaliador(self) -> int:
-        # monta env global e tabela de funções (em ordem)
-        env: Dict[str, int] = {}
-        funcs: Dict[str, FunDecl] = {}
-        # var_decls
-        for d in self.var_decls:
-            val = d.expr.avaliador(env, funcs)
-            env[d.nome] = val
-        # funções (registrar em tabela na ordem)
-        for f in self.fun_decls:
-            if f.nome in funcs:
-                raise NameError(f"Erro semântico: função '{f.nome}' já declarada")
-            funcs[f.nome] = f
-        # executar comandos do main
+    def avaliador(self, memo: Optional[CacheChamadas] = None, ganchos: Optional[Ganchos] = None) -> int:
+        # armazenamento das globais e tabela de funções (em ordem); o main roda num quadro sem slots.
+        # memo: resultados das funções puras (opcional; ver CacheChamadas)
+        # ganchos: observação da execução (opcional; ver Ganchos), com o main como uma ativação
+        globais: Dict[int, int] = {}
+        main = Quadro([], {}, globais, memo, ganchos)
+        funcs: Dict[int, FunDecl] = {}
+        if ganchos is not None:
+            ganchos.entra(self)
         try:
-            for c in self.comandos:
-                c.avaliador(env, funcs)
-        except ReturnException as re:
-            return re.value
-        # avaliar resultado final
-        return self.resultado.avaliador(env, funcs)
+            # var_decls
+            for d in self.var_decls:
+                if ganchos is not None:
+                    ganchos.no(d)
+                globais[d.id] = avalia(d.expr, main, funcs)
+            # funções (registrar em tabela na ordem) e o mapa de slots de cada uma
+            for f in self.fun_decls:
+                if f.id in funcs:
+                    raise NameError(f"Erro semântico: função '{f.nome}' já declarada")
+                funcs[f.id] = f
+                prepara_quadro(f)
+            # executar comandos do main (um return no meio deles encerra o programa)
+            r = executa(self.comandos, main, funcs)
+            if r is not None:
+                return r
+            # avaliar resultado final
+            if ganchos is not None:
+                ganchos.resultado(self)
+            return avalia(self.resultado, main, funcs)
+        finally:
+            if ganchos is not None:
+                ganchos.sai(self)
@@ -7,35 +7,14 @@ from typing import Union
 from .arvore import (
     Exp, Const, OpBin, Var, Decl, Programa,
     Stmt, Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt,
-    FunDecl, Call
+    FunDecl, Call, SIMBOLOS_OPERADORES
 )
+from .visitante import Visitante
 from helpers.token_tipos import Operadores
 
 def _op_symbol(op: Operadores) -> str:
     """Retorna símbolo textual para o operador."""
-    if op == Operadores.SOMA:
-        return '+'
-    if op == Operadores.SUBTRACAO:
-        return '-'
-    if op == Operadores.MULTIPLIC:
-        return '*'
-    if op == Operadores.DIVISAO:
-        return '/'
-    if op == Operadores.MENOR:
-        return '<'
-    if op == Operadores.MAIOR:
-        return '>'
-    if op == Operadores.IGUAL_IGUAL:
-        return '=='
-    if op == Operadores.MENOR_IGUAL:
-        return '<='
-    if op == Operadores.MAIOR_IGUAL:
-        return '>='
-    if op == Operadores.DIFERENTE:
-        return '!='
-    if op == Operadores.RESTO:
-        return '%'
-    return '?'
+    return SIMBOLOS_OPERADORES.get(op, '?')
 
 Node = Union[Exp, Decl, Programa, Stmt, FunDecl]
 
@@ -44,9 +23,29 @@ def build_rich_tree(node: Node, label: str = None) -> Tree:
     Constrói uma Tree do rich a partir dos nós da AST.
     Suporta: Programa, Decl, Var, Const, OpBin, Assign, IfStmt, WhileStmt,
              BlockStmt, ReturnStmt, FunDecl, Call.
+    Usa uma pilha explícita de (nó, Tree onde ele entra) em vez de recursão, então uma cadeia
+    a + b + c + ... (um OpBin por operando) não estoura o limite de recursão.
     """
-    # Programa (raiz)
-    if isinstance(node, Programa):
+    raiz = None
+    pilha = [(node, None)]
+    while pilha:
+        atual, pai = pilha.pop()
+        tree, filhos = _NOS_RICH.visita(atual)
+        if pai is None:
+            raiz = tree
+        else:
+            pai.add(tree)
+        # os filhos saem da pilha em ordem, então entram nas suas Trees na ordem certa
+        pilha.extend(reversed(filhos))
+    return raiz
+
+
+class _NosRich(Visitante):
+    """visita_<Classe>(nó) -> Tree de um nó só e a lista de (filho, Tree onde a Tree do filho deve entrar)."""
+
+    def visita_Programa(self, node: Programa):
+        # Programa (raiz)
+        filhos = []
         tree = Tree("Programa")
 
         # Variáveis globais (var_decls)
@@ -54,7 +53,7 @@ def build_rich_tree(node: Node, label: str = None) -> Tree:
         for d in node.var_decls:
             d_label = f"Decl: {d.nome} (linha={d.linha}, pos={d.pos})"
             d_tree = Tree(d_label)
-            d_tree.add(build_rich_tree(d.expr))
+            filhos.append((d.expr, d_tree))
             vars_branch.add(d_tree)
         tree.add(vars_branch)
 
@@ -75,17 +74,17 @@ def build_rich_tree(node: Node, label: str = None) -> Tree:
             locals_tree = Tree("Local_decls")
             for d in f.local_decls:
                 ld = Tree(f"Decl: {d.nome} (linha={d.linha}, pos={d.pos})")
-                ld.add(build_rich_tree(d.expr))
+                filhos.append((d.expr, ld))
                 locals_tree.add(ld)
             fn_tree.add(locals_tree)
             # comandos da função
             cmds_tree = Tree("Comandos")
             for c in f.comandos:
-                cmds_tree.add(build_rich_tree(c))
+                filhos.append((c, cmds_tree))
             fn_tree.add(cmds_tree)
             # resultado/return da função
             res_tree = Tree("Resultado (return)")
-            res_tree.add(build_rich_tree(f.resultado))
+            filhos.append((f.resultado, res_tree))
             fn_tree.add(res_tree)
 
             funs_branch.add(fn_tree)
@@ -94,98 +93,110 @@ def build_rich_tree(node: Node, label: str = None) -> Tree:
         # Comandos do main
         cmds_branch = Tree("Comandos (main)")
         for c in node.comandos:
-            cmds_branch.add(build_rich_tree(c))
+            filhos.append((c, cmds_branch))
         tree.add(cmds_branch)
 
         # Resultado do main
         res_branch = Tree("Resultado (return main)")
-        res_branch.add(build_rich_tree(node.resultado))
+        filhos.append((node.resultado, res_branch))
         tree.add(res_branch)
 
-        return tree
+        return tree, filhos
 
-    # Decl isolada
-    if isinstance(node, Decl):
+    def visita_Decl(self, node: Decl):
+        # Decl isolada
+        filhos = []
         tree = Tree(f"Decl: {node.nome} (linha={node.linha}, pos={node.pos})")
-        tree.add(build_rich_tree(node.expr))
-        return tree
+        filhos.append((node.expr, tree))
+        return tree, filhos
 
-    # Constante
-    if isinstance(node, Const):
-        return Tree(str(node.valor))
+    def visita_Const(self, node: Const):
+        # Constante
+        return Tree(str(node.valor)), []
 
-    # Variável
-    if isinstance(node, Var):
+    def visita_Var(self, node: Var):
+        # Variável
         lbl = f"Var: {node.nome} (linha={node.linha}, pos={node.pos})"
-        return Tree(lbl)
+        return Tree(lbl), []
 
-    # Chamada de função
-    if isinstance(node, Call):
+    def visita_Call(self, node: Call):
+        # Chamada de função
+        filhos = []
         lbl = f"Call: {node.nome}({len(node.args)} args) (linha={node.linha}, pos={node.pos})"
         t = Tree(lbl)
         if node.args:
             for a in node.args:
-                t.add(build_rich_tree(a))
+                filhos.append((a, t))
         else:
             t.add(Tree("<sem-args>"))
-        return t
+        return t, filhos
 
-    # Operação binária
-    if isinstance(node, OpBin):
+    def visita_OpBin(self, node: OpBin):
+        # Operação binária
+        filhos = []
         sym = _op_symbol(node.operador)
         tree = Tree(sym)
-        tree.add(build_rich_tree(node.opEsq))
-        tree.add(build_rich_tree(node.opDir))
-        return tree
+        filhos.append((node.opEsq, tree))
+        filhos.append((node.opDir, tree))
+        return tree, filhos
 
-    # Atribuição
-    if isinstance(node, Assign):
+    def visita_Assign(self, node: Assign):
+        # Atribuição
+        filhos = []
         lbl = f"Atribuição: {node.nome} (linha={node.linha}, pos={node.pos})"
         t = Tree(lbl)
-        t.add(build_rich_tree(node.expr))
-        return t
+        filhos.append((node.expr, t))
+        return t, filhos
 
-    # If
-    if isinstance(node, IfStmt):
+    def visita_IfStmt(self, node: IfStmt):
+        # If
+        filhos = []
         t = Tree("If")
         cond = Tree("Condição")
-        cond.add(build_rich_tree(node.cond))
+        filhos.append((node.cond, cond))
         t.add(cond)
         then_branch = Tree("Then")
         for s in node.then_stmts:
-            then_branch.add(build_rich_tree(s))
+            filhos.append((s, then_branch))
         t.add(then_branch)
         if node.else_stmts is not None:
             else_branch = Tree("Else")
             for s in node.else_stmts:
-                else_branch.add(build_rich_tree(s))
+                filhos.append((s, else_branch))
             t.add(else_branch)
-        return t
+        return t, filhos
 
-    # While
-    if isinstance(node, WhileStmt):
+    def visita_WhileStmt(self, node: WhileStmt):
+        # While
+        filhos = []
         t = Tree("While")
         cond = Tree("Condição")
-        cond.add(build_rich_tree(node.cond))
+        filhos.append((node.cond, cond))
         t.add(cond)
         body_branch = Tree("Corpo")
         for s in node.body:
-            body_branch.add(build_rich_tree(s))
+            filhos.append((s, body_branch))
         t.add(body_branch)
-        return t
+        return t, filhos
 
-    # Bloco composto
-    if isinstance(node, BlockStmt):
+    def visita_BlockStmt(self, node: BlockStmt):
+        # Bloco composto
+        filhos = []
         t = Tree("Bloco")
         for s in node.stmts:
-            t.add(build_rich_tree(s))
-        return t
+            filhos.append((s, t))
+        return t, filhos
 
-    # Return
-    if isinstance(node, ReturnStmt):
+    def visita_ReturnStmt(self, node: ReturnStmt):
+        # Return
+        filhos = []
         t = Tree("Return")
-        t.add(build_rich_tree(node.expr))
-        return t
+        filhos.append((node.expr, t))
+        return t, filhos
+
+    def generico(self, node):
+        # Fallback — representar genericamente
+        return Tree(repr(node)), []
+
 
-    # Fallback — representar genericamente
-    return Tree(repr(node))
+_NOS_RICH = _NosRich()
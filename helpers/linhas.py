@@ -0,0 +1,60 @@
+# João Victor Lourenço da Silva (20220005997)
+# helpers/linhas.py
+
+import re
+from array import array
+from bisect import bisect_right
+from typing import Optional, Tuple, Union
+
+QUEBRA = re.compile('\n')
+QUEBRA_BYTES = re.compile(b'\n')
+
+
+class IndiceLinhas:
+    """
+    Posição de início de cada linha de um texto-fonte, montada de uma vez (uma varredura em C
+    pelos '\\n'). Linha e coluna de uma posição saem por busca binária, só quando alguém pede
+    (mensagens de erro, impressão de tokens), em vez de o léxico contar linhas caractere a caractere.
+    Linhas e colunas começam em 1.
+    """
+    def __init__(self, texto: Union[str, bytes, memoryview] = '', base: int = 0):
+        # array('q') em vez de lista: 8 bytes por linha, sem um objeto int para cada
+        self.inicios = array('q', [0])
+        if texto:
+            self.estende(texto, base)
+
+    def estende(self, texto: Union[str, bytes, memoryview], base: int = 0) -> None:
+        # acrescenta as linhas de um pedaço de texto que começa na posição absoluta 'base'
+        # (modo streaming: cada bloco lido do arquivo)
+        padrao = QUEBRA if isinstance(texto, str) else QUEBRA_BYTES
+        self.inicios.extend([base + m.end() for m in padrao.finditer(texto)])
+
+    def edita(self, inicio: int, fim: int, novo: str) -> None:
+        # acompanha a troca de texto[inicio:fim] por 'novo' (SessaoIncremental)
+        inicios = self.inicios
+        k1 = bisect_right(inicios, inicio)
+        k2 = bisect_right(inicios, fim)
+        delta = len(novo) - (fim - inicio)
+        novos = array('q', [inicio + m.end() for m in QUEBRA.finditer(novo)])
+        cauda = array('q', [p + delta for p in inicios[k2:]]) if delta else inicios[k2:]
+        inicios[k1:] = novos + cauda
+
+    def linha(self, pos: int) -> int:
+        return bisect_right(self.inicios, pos)
+
+    def coluna(self, pos: int) -> int:
+        return pos - self.inicios[bisect_right(self.inicios, pos) - 1] + 1
+
+    def localiza(self, pos: int) -> Tuple[int, int]:
+        linha = bisect_right(self.inicios, pos)
+        return linha, pos - self.inicios[linha - 1] + 1
+
+    def __len__(self) -> int:
+        return len(self.inicios)
+
+
+def coluna(linhas: Optional[IndiceLinhas], pos: Optional[int]):
+    # coluna de pos para as mensagens de erro ('?' se não houver índice ou posição)
+    if linhas is None or pos is None:
+        return '?'
+    return linhas.coluna(pos)
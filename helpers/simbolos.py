@@ -0,0 +1,43 @@
+# João Victor Lourenço da Silva (20220005997)
+# helpers/simbolos.py
+
+from typing import Dict, List
+
+
+class TabelaSimbolos:
+    """
+    Tabela de internação de identificadores: cada nome distinto recebe um inteiro denso
+    (0, 1, 2, ...) na primeira vez que o léxico o encontra. A AST e as fases seguintes
+    (ambientes do avaliador, symtab, offsets do gerador) usam esse id como chave; o nome
+    só é recuperado para saída (impressão, assembly, mensagens).
+    """
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.ids_bytes: Dict[bytes, int] = {}  # atalho do léxico em bytes (mmap): evita decodificar
+        self.nomes: List[str] = []
+
+    def interna(self, nome: str) -> int:
+        i = self.ids.get(nome)
+        if i is None:
+            i = len(self.nomes)
+            self.ids[nome] = i
+            self.nomes.append(nome)
+        return i
+
+    def interna_bytes(self, lexema: bytes) -> int:
+        i = self.ids_bytes.get(lexema)
+        if i is None:
+            i = self.interna(str(lexema, 'ascii'))
+            self.ids_bytes[lexema] = i
+        return i
+
+    def nome(self, i: int) -> str:
+        return self.nomes[i]
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+
+# tabela única do processo (como sys.intern): o mesmo nome tem o mesmo id em todas as fases
+IDENTIFICADORES = TabelaSimbolos()
+interna = IDENTIFICADORES.interna
@@ -1,12 +1,45 @@
 # João Victor Lourenço da Silva (20220005997)
 
+from typing import Optional
+
+from .linhas import IndiceLinhas
+
 class Token:
-    def __init__(self, tipo, lexema: str, pos: int, linha: int):
+    def __init__(self, tipo, lexema: str, pos: int, linhas: Optional[IndiceLinhas] = None, id: Optional[int] = None):
         # tipo pode ser membro de Numero, Operadores ou Pontuacao
         self.tipo = tipo
         self.lexema = lexema
         self.pos = pos
-        self.linha = linha
+        # índice de linhas do texto-fonte: linha/coluna são calculadas a partir de pos só quando pedidas
+        self.linhas = linhas
+        # id internado do identificador (helpers/simbolos.py); None para os demais tokens
+        self.id = id
+
+    @property
+    def linha(self) -> Optional[int]:
+        return self.linhas.linha(self.pos) if self.linhas is not None else None
+
+    @property
+    def coluna(self) -> Optional[int]:
+        return self.linhas.coluna(self.pos) if self.linhas is not None else None
 
     def __repr__(self): # padrão de exibição do token
         return f"<{self.tipo.__class__.__name__}.{self.tipo.name}, '{self.lexema}', pos={self.pos}, linha={self.linha}>"
+
+
+class TokenFatia(Token):
+    # Token que não guarda o lexema: referencia a fatia [pos, pos + tamanho) de um buffer de bytes
+    # (memoryview sobre o arquivo mapeado em memória). O texto só é decodificado quando alguém lê
+    # tok.lexema (int(tok.lexema) no parser, nomes de variáveis, mensagens de erro).
+    def __init__(self, tipo, fonte: memoryview, pos: int, tamanho: int, linhas: Optional[IndiceLinhas] = None,
+                 id: Optional[int] = None):
+        self.tipo = tipo
+        self.fonte = fonte
+        self.pos = pos
+        self.tamanho = tamanho
+        self.linhas = linhas
+        self.id = id
+
+    @property
+    def lexema(self) -> str:
+        return str(self.fonte[self.pos:self.pos + self.tamanho], 'ascii')
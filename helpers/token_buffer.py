@@ -0,0 +1,80 @@
+# João Victor Lourenço da Silva (20220005997)
+# helpers/token_buffer.py
+
+from array import array
+from collections.abc import Sequence
+from typing import Optional, Union
+
+from .linhas import IndiceLinhas
+from .simbolos import interna
+from .token import Token, TokenFatia
+from .token_tipos import Numero, Operadores, Pontuacao, Identificador, PalavraReservada, Error
+
+# todos os tipos de token numa ordem fixa: o código (array('B')) é o índice nesta lista
+TIPOS = [t for classe in (Numero, Operadores, Pontuacao, Identificador, PalavraReservada, Error) for t in classe]
+CODIGOS = {t: i for i, t in enumerate(TIPOS)}
+
+
+class TokenBuffer(Sequence):
+    """
+    Fluxo de tokens compacto (struct-of-arrays): em vez de um objeto Token por token, guarda
+    tipos como inteiros pequenos em array('B') e início e tamanho em array('i'), mais uma
+    referência ao texto-fonte (str ou memoryview do arquivo) de onde o lexema é fatiado e ao
+    índice de linhas (a linha de cada token sai da posição, sob demanda).
+
+    O Parser roda direto sobre ele (é uma Sequence); buffer[i] devolve um Token criado na hora,
+    só como visão para o parser, impressão e mensagens de erro.
+    """
+    def __init__(self, fonte: Union[str, memoryview], linhas: Optional[IndiceLinhas] = None):
+        self.fonte = fonte
+        self.linhas = linhas
+        self.tipos = array('B')
+        self.inicios = array('i')
+        self.tamanhos = array('i')
+        # última visão criada: o parser consulta o token atual várias vezes seguidas
+        self._ultimo = -1
+        self._visao = None
+
+    def adiciona(self, tipo, inicio: int, tamanho: int) -> None:
+        self.tipos.append(CODIGOS[tipo])
+        self.inicios.append(inicio)
+        self.tamanhos.append(tamanho)
+
+    def adiciona_token(self, tok: Token) -> None:
+        tamanho = tok.tamanho if isinstance(tok, TokenFatia) else len(tok.lexema)
+        self.adiciona(tok.tipo, tok.pos, tamanho)
+
+    def __len__(self) -> int:
+        return len(self.tipos)
+
+    def tipo(self, i: int):
+        return TIPOS[self.tipos[i]]
+
+    def lexema(self, i: int) -> str:
+        inicio = self.inicios[i]
+        fatia = self.fonte[inicio:inicio + self.tamanhos[i]]
+        return fatia if isinstance(fatia, str) else str(fatia, 'ascii')
+
+    def __getitem__(self, i: int) -> Token:
+        if isinstance(i, slice):
+            raise TypeError("TokenBuffer não suporta fatias; use índices")
+        if i < 0:
+            i += len(self.tipos)
+        if i == self._ultimo:
+            return self._visao
+        inicio = self.inicios[i]
+        tamanho = self.tamanhos[i]
+        tipo = TIPOS[self.tipos[i]]
+        if isinstance(self.fonte, str):
+            tok = Token(tipo, self.fonte[inicio:inicio + tamanho], inicio, self.linhas)
+        else:
+            tok = TokenFatia(tipo, self.fonte, inicio, tamanho, self.linhas)
+        if tipo == Identificador.IDENT:
+            # o nome já foi internado pelo léxico: aqui é só a consulta do id
+            tok.id = interna(tok.lexema)
+        self._ultimo = i
+        self._visao = tok
+        return tok
+
+    def __repr__(self) -> str:
+        return f"TokenBuffer({len(self)} tokens)"
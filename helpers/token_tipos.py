@@ -2,10 +2,16 @@
 
 from enum import Enum, auto
 
-class Numero(Enum):
+class TipoToken(Enum):
+    # Os membros são únicos (igualdade é identidade), então o hash pode ser o da identidade, em C,
+    # em vez do Enum.__hash__ em Python (hash do nome): os tipos são chave de dicionário no
+    # léxico, no parser (PODER_LIGACAO) e no avaliador (OPERACOES).
+    __hash__ = object.__hash__
+
+class Numero(TipoToken):
     NUMERO = auto()
 
-class Operadores(Enum):
+class Operadores(TipoToken):
     SOMA = auto()
     SUBTRACAO = auto()
     MULTIPLIC = auto()
@@ -24,7 +30,7 @@ class Operadores(Enum):
     DIFERENTE = auto()
     IGUAL_IGUAL = auto()
 
-class Pontuacao(Enum):
+class Pontuacao(TipoToken):
     PAREN_ESQ = auto()
     PAREN_DIR = auto()
     EOF = auto()
@@ -34,10 +40,10 @@ class Pontuacao(Enum):
     CHAVE_DIR = auto()
     VIRGULA = auto() 
 
-class Identificador(Enum):
+class Identificador(TipoToken):
     IDENT = auto()
 
-class PalavraReservada(Enum):
+class PalavraReservada(TipoToken):
     IF = auto()
     ELSE = auto()
     WHILE = auto()
@@ -46,5 +52,5 @@ class PalavraReservada(Enum):
     VAR = auto()
     MAIN = auto()
 
-class Error(Enum):
+class Error(TipoToken):
     LEX_ERROR = auto()
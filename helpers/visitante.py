@@ -0,0 +1,294 @@
+# João Victor Lourenço da Silva (20220005997)
+# helpers/visitante.py
+
+"""
+Visitantes, transformadores e passadas sobre a AST.
+
+- Visitante: despacho por classe de nó. visita_<Classe>(no) é procurado pela MRO da classe do
+  nó (uma subclasse de OpBin cai em visita_OpBin; sem método, generico) e guardado numa tabela
+  {classe do nó: função} de cada subclasse de Visitante, montada na primeira vez que a classe
+  aparece: depois disso, o despacho de um nó é um acesso a dict, sem cadeia de isinstance.
+- percorre(raiz): pré-ordem com pilha explícita (uma cadeia a + b + c + ... tem um nível de OpBin
+  por operando, e recursão estouraria). Cada visita_* devolve os próximos itens, em ordem (filhos,
+  ou qualquer objeto que outro visita_* saiba tratar, como pedaços de texto), ou None.
+  percorre_contexto(raiz, ctx) faz o mesmo com pares (item, contexto).
+- VisitanteComandos: a pré-ordem de expressões e comandos na ordem do fonte, base das checagens de
+  nomes (Programa.verifica_semantica, analisadorSemantico).
+- Transformador: reconstrói a árvore de baixo para cima (pós-ordem, pilha explícita). Depois que os
+  filhos de um nó foram transformados, transforma_<Classe>(no) devolve o nó que fica no lugar
+  (o próprio, por padrão). Nós cujos filhos não mudaram são reaproveitados; os de expressão são
+  imutáveis e voltam pelo construtor, os demais são copiados.
+- Passo / executa_passos: uma passada sobre o Programa (verificação, otimização, ...) e uma
+  sequência delas.
+"""
+
+import copy
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import Callable, Dict, Optional
+
+from .arvore import (
+    Exp, Const, Var, OpBin, Call, Decl, Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt, FunDecl,
+    Programa, operacao, _onde,
+)
+from .linhas import IndiceLinhas
+from .token_tipos import Operadores
+
+
+class Visitante:
+    prefixo = 'visita_'
+
+    @classmethod
+    def _tabela(cls) -> Dict[type, Callable]:
+        # uma tabela por subclasse (a da classe-base não serve: os métodos são outros)
+        tabela = cls.__dict__.get('_despacho')
+        if tabela is None:
+            tabela = {}
+            cls._despacho = tabela
+        return tabela
+
+    @classmethod
+    def metodo(cls, tipo: type) -> Callable:
+        tabela = cls._tabela()
+        f = tabela.get(tipo)
+        if f is None:
+            for base in tipo.__mro__:
+                f = getattr(cls, cls.prefixo + base.__name__, None)
+                if f is not None:
+                    break
+            else:
+                f = cls.generico
+            tabela[tipo] = f
+        return f
+
+    def generico(self, no, *contexto):
+        # nó sem visita_* própria: nada a fazer e nenhum filho
+        return None
+
+    def visita(self, no, *contexto):
+        return self.metodo(type(no))(self, no, *contexto)
+
+    def percorre(self, raiz) -> None:
+        tabela = self._tabela()
+        metodo = self.metodo
+        pilha = [raiz]
+        while pilha:
+            no = pilha.pop()
+            f = tabela.get(type(no)) or metodo(type(no))
+            mais = f(self, no)
+            if mais:
+                pilha.extend(reversed(mais))
+
+    def percorre_contexto(self, raiz, contexto) -> None:
+        # visita_*(no, contexto) devolve pares (item, contexto do item)
+        tabela = self._tabela()
+        metodo = self.metodo
+        pilha = [(raiz, contexto)]
+        while pilha:
+            no, contexto = pilha.pop()
+            f = tabela.get(type(no)) or metodo(type(no))
+            mais = f(self, no, contexto)
+            if mais:
+                pilha.extend(reversed(mais))
+
+
+class VisitanteComandos(Visitante):
+    """
+    Pré-ordem sobre expressões e comandos: cada comando, a sua condição/expressão e depois os
+    comandos aninhados, em ordem. Subclasses acrescentam as checagens e devolvem o que estes
+    métodos devolvem para seguir adiante.
+    """
+    def visita_OpBin(self, e: OpBin):
+        return (e.opEsq, e.opDir)
+
+    def visita_Call(self, e: Call):
+        return e.args
+
+    def visita_Decl(self, s: Decl):
+        return (s.expr,)
+
+    def visita_Assign(self, s: Assign):
+        return (s.expr,)
+
+    def visita_IfStmt(self, s: IfStmt):
+        return [s.cond, *s.then_stmts, *(s.else_stmts or ())]
+
+    def visita_WhileStmt(self, s: WhileStmt):
+        return [s.cond, *s.body]
+
+    def visita_ReturnStmt(self, s: ReturnStmt):
+        return (s.expr,)
+
+    def visita_BlockStmt(self, s: BlockStmt):
+        return s.stmts
+
+
+class VerificaEscopo(VisitanteComandos):
+    # checagem de Programa.verifica_semantica: nomes são as variáveis visíveis e chamaveis as funções
+    # que podem ser chamadas neste ponto
+    def __init__(self, nomes: Dict[int, int], chamaveis: Dict[int, FunDecl], erro_chamada: str,
+                 linhas: Optional[IndiceLinhas]):
+        self.nomes = nomes
+        self.chamaveis = chamaveis
+        self.erro_chamada = erro_chamada
+        self.linhas = linhas
+
+    def visita_Var(self, e: Var):
+        if e.id not in self.nomes:
+            raise NameError(f"Erro semântico: variável '{e.nome}' não declarada ({_onde(e, self.linhas)})")
+
+    def visita_Call(self, e: Call):
+        if e.id not in self.chamaveis:
+            raise NameError(f"Erro semântico: {self.erro_chamada} '{e.nome}' ({_onde(e, self.linhas)})")
+        return e.args
+
+    def visita_Assign(self, s: Assign):
+        if s.id not in self.nomes:
+            raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' ({_onde(s, self.linhas)})")
+        return (s.expr,)
+
+
+# ---------- estrutura dos nós (para o Transformador) ----------
+# campos que guardam filhos, na ordem do fonte; um campo pode ter um nó, uma lista de nós ou None
+CAMPOS_FILHOS: Dict[type, tuple] = {
+    Const: (),
+    Var: (),
+    OpBin: ('opEsq', 'opDir'),
+    Call: ('args',),
+    Decl: ('expr',),
+    Assign: ('expr',),
+    ReturnStmt: ('expr',),
+    IfStmt: ('cond', 'then_stmts', 'else_stmts'),
+    WhileStmt: ('cond', 'body'),
+    BlockStmt: ('stmts',),
+    FunDecl: ('local_decls', 'comandos', 'resultado'),
+    Programa: ('var_decls', 'fun_decls', 'comandos', 'resultado'),
+}
+
+
+def campos_filhos(tipo: type) -> tuple:
+    campos = CAMPOS_FILHOS.get(tipo)
+    if campos is None:
+        campos = next((CAMPOS_FILHOS[b] for b in tipo.__mro__ if b in CAMPOS_FILHOS), ())
+        CAMPOS_FILHOS[tipo] = campos
+    return campos
+
+
+def reconstroi(no, valores: dict):
+    # cópia de 'no' com os campos de filhos trocados
+    if isinstance(no, OpBin):
+        return OpBin(no.operador, valores.get('opEsq', no.opEsq), valores.get('opDir', no.opDir))
+    if isinstance(no, Call):
+        return Call(no.nome, valores.get('args', no.args), no.linha, no.pos, id=no.id)
+    novo = copy.copy(no)  # preserva atributos extras (param_offsets, ... da análise semântica)
+    for campo, valor in valores.items():
+        setattr(novo, campo, valor)
+    return novo
+
+
+class Transformador(Visitante):
+    prefixo = 'transforma_'
+
+    def generico(self, no):
+        return no
+
+    def transforma(self, raiz):
+        """
+        Devolve a raiz transformada. Na pilha, (no, campos) marca que os filhos de 'no' já foram
+        transformados e estão no fim de 'feitos', na ordem dos campos.
+        """
+        tabela = self._tabela()
+        metodo = self.metodo
+        feitos: list = []
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is tuple:
+                no, formato = no
+                n = sum(1 if k is None else k for _, k in formato)
+                filhos = feitos[len(feitos) - n:]
+                del feitos[len(feitos) - n:]
+                trocados = {}
+                i = 0
+                for campo, k in formato:
+                    if k is None:
+                        velho, novo = getattr(no, campo), filhos[i]
+                        i += 1
+                    else:
+                        velho = getattr(no, campo)
+                        # um filho de lista transformado em None sai da lista
+                        novo = [f for f in filhos[i:i + k] if f is not None]
+                        i += k
+                        if len(novo) == len(velho) and all(a is b for a, b in zip(novo, velho)):
+                            continue
+                        if isinstance(velho, tuple):
+                            novo = tuple(novo)
+                    if novo is not velho:
+                        trocados[campo] = novo
+                if trocados:
+                    no = reconstroi(no, trocados)
+            else:
+                formato = []
+                filhos = []
+                for campo in campos_filhos(type(no)):
+                    valor = getattr(no, campo)
+                    if valor is None:
+                        continue
+                    if isinstance(valor, Sequence):  # lista, tupla ou vista (SessaoIncremental)
+                        formato.append((campo, len(valor)))
+                        filhos.extend(valor)
+                    else:
+                        formato.append((campo, None))
+                        filhos.append(valor)
+                if filhos:
+                    pilha.append((no, formato))
+                    pilha.extend(reversed(filhos))
+                    continue
+            f = tabela.get(type(no)) or metodo(type(no))
+            feitos.append(f(self, no))
+        return feitos[-1]
+
+
+# ---------- passadas ----------
+
+class Passo(ABC):
+    """Uma passada sobre o Programa: executa(programa) devolve o Programa (o mesmo ou outro)."""
+    nome = 'passo'
+
+    @abstractmethod
+    def executa(self, programa: Programa) -> Programa:
+        pass
+
+
+class PassoTransformador(Passo, Transformador):
+    # um Transformador aplicado ao Programa inteiro
+    def executa(self, programa: Programa) -> Programa:
+        return self.transforma(programa)
+
+
+def executa_passos(programa: Programa, passos: Sequence[Passo],
+                   tempos: Optional[Dict[str, float]] = None) -> Programa:
+    # aplica os passos em ordem; se 'tempos' for dado, acumula o tempo de cada um pelo nome
+    for passo in passos:
+        inicio = time.perf_counter()
+        programa = passo.executa(programa)
+        if tempos is not None:
+            tempos[passo.nome] = tempos.get(passo.nome, 0.0) + time.perf_counter() - inicio
+    return programa
+
+
+class DobraConstantes(PassoTransformador):
+    """
+    Exemplo de passada de otimização: OpBin com os dois operandos constantes vira Const. Divisão e
+    resto por zero ficam como estão (o erro continua acontecendo na execução).
+    """
+    nome = 'dobra_constantes'
+
+    def transforma_OpBin(self, no: OpBin) -> Exp:
+        esq, dir = no.opEsq, no.opDir
+        if type(esq) is Const and type(dir) is Const:
+            if dir.valor == 0 and no.operador in (Operadores.DIVISAO, Operadores.RESTO):
+                return no
+            return Const(operacao(no.operador)(esq.valor, dir.valor))
+        return no
@@ -0,0 +1,471 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Interpretador por closures: o Programa é compilado uma vez em closures Python aninhadas, com os
+operadores, os slots das variáveis e as funções chamadas já resolvidos, e a execução só chama essas
+closures, sem o despacho por espécie de nó nem os testes de env de Programa.avaliador() a cada nó.
+
+- Variáveis: cada chamada tem um quadro q (lista) com os parâmetros e as locais em slots fixos, e as
+  globais ficam numa lista g, a mesma para todas as chamadas (como o armazenamento de globais dos
+  Quadros de avaliador()): um nome que não é parâmetro nem local da função é a global.
+- Cada closure recebe (g, q). As de comando devolvem None para seguir e o valor do return para sair
+  (os valores são sempre int), sem exceção para o return.
+- Um operador com operandos folha (constante, slot local, slot global ou chamada) vira uma closure
+  só, com o texto da operação montado num molde: 'q[v0] < q[v1]' num while, 'q[v0] = q[v1] + v2'
+  numa atribuição. A fábrica de closures de cada molde é gerada (exec) na primeira vez e guardada;
+  os slots e as constantes entram como variáveis livres, então moldes iguais compartilham a fábrica.
+- Expressões mais fundas que LIMITE_PROFUNDIDADE (cadeias a + b + c + ...) não viram closures
+  aninhadas, que estourariam a recursão: a parte funda é avaliada por um laço com pilha de valores,
+  como avalia(), e só as subárvores rasas viram closures.
+
+Os resultados e os erros (mensagens, ordem de avaliação) são os de Programa.avaliador(). Nomes não
+resolvidos viram closures que levantam o mesmo erro quando (e se) são executadas.
+"""
+
+import sys
+import textwrap
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from helpers.arvore import (
+    Exp, OpBin, Call, Stmt, FunDecl, Programa, especie, operacao, _divide, _resto,
+    CONST, VAR, OPBIN, CALL, ASSIGN, IF, WHILE, BLOCO, RETURN,
+)
+from helpers.token_tipos import Operadores
+
+# acima disso, a expressão é avaliada pelo laço com pilha (ver _Compilador.exp_funda)
+LIMITE_PROFUNDIDADE = 64
+
+# código de uma expressão: (texto com '{}' no lugar de cada valor capturado, valores, folha).
+# Folha: constante, variável ou chamada de closure, que pode entrar no texto de um operador.
+Codigo = Tuple[str, tuple, bool]
+# comando compilado: (closure, pode devolver um valor de return)
+Comando = Tuple[Callable, bool]
+
+_COMPARACOES = {
+    Operadores.MENOR: '<',
+    Operadores.MAIOR: '>',
+    Operadores.IGUAL_IGUAL: '==',
+    Operadores.MENOR_IGUAL: '<=',
+    Operadores.MAIOR_IGUAL: '>=',
+    Operadores.DIFERENTE: '!=',
+}
+
+# texto de cada operador sobre os textos dos operandos; comparações dão 1/0
+MOLDES = {
+    Operadores.SOMA: '{0} + {1}',
+    Operadores.SUBTRACAO: '{0} - {1}',
+    Operadores.MULTIPLIC: '{0} * {1}',
+    Operadores.DIVISAO: '_divide({0}, {1})',
+    Operadores.RESTO: '_resto({0}, {1})',
+    **{op: f'(1 if {{0}} {s} {{1}} else 0)' for op, s in _COMPARACOES.items()},
+}
+# numa condição de if/while só a verdade importa: a comparação direta basta
+MOLDES_CONDICAO = {op: f'{{0}} {s} {{1}}' for op, s in _COMPARACOES.items()}
+# divisor constante diferente de zero: sem o teste de divisão por zero
+MOLDES_DIVISOR = {
+    Operadores.DIVISAO: '{0} // {1}',
+    Operadores.RESTO: '{0} % {1}',
+}
+
+# nomes que os textos gerados usam além dos valores capturados
+_AMBIENTE = {'_divide': _divide, '_resto': _resto}
+# texto -> fábrica (LRU: os textos se repetem entre programas, mas cada forma nova de expressão
+# ou sequência gera outro, e um processo que fica no ar não deve crescer a cada programa)
+_FABRICAS: "OrderedDict[str, Callable]" = OrderedDict()
+MAX_FABRICAS = 4096
+
+# até quantos comandos uma sequência é desenrolada (acima disso, um laço sobre a tupla)
+_DESENROLA = 8
+
+
+def closure(molde: str, *codigos: Codigo) -> Callable:
+    """
+    Closure do molde: o código-fonte de uma função _f(g, q) (ou lambda) com {0}, {1}, ... no lugar
+    dos textos dos códigos. Os valores capturados viram v0, v1, ... da fábrica, que é gerada uma vez
+    por texto e guardada em _FABRICAS.
+    """
+    texto = molde.format(*(c[0] for c in codigos))
+    valores = [v for c in codigos for v in c[1]]
+    fabrica = _FABRICAS.get(texto)
+    if fabrica is None:
+        nomes = [f'v{i}' for i in range(len(valores))]
+        fonte = (f"def _fabrica({', '.join(nomes)}):\n"
+                 f"{textwrap.indent(texto.format(*nomes), '    ')}\n"
+                 f"    return _f\n")
+        ambiente = dict(_AMBIENTE)
+        exec(fonte, ambiente)
+        fabrica = _FABRICAS[texto] = ambiente['_fabrica']
+        if len(_FABRICAS) > MAX_FABRICAS:
+            _FABRICAS.popitem(last=False)
+    else:
+        _FABRICAS.move_to_end(texto)
+    return fabrica(*valores)
+
+
+def _chamada_de(f: Callable) -> Codigo:
+    return ('{}(g, q)', (f,), True)
+
+
+def _constante(valor: int) -> Codigo:
+    return ('{}', (valor,), True)
+
+
+def levanta(tipo: type, mensagem: str) -> Callable:
+    # closure que levanta o erro quando executada (nome não resolvido, operador desconhecido, ...)
+    def f(g, q):
+        raise tipo(mensagem)
+    return f
+
+
+def fecha(c: Codigo) -> Callable:
+    # closure que avalia o código
+    if c[0] == '{}(g, q)':
+        return c[1][0]
+    return closure('_f = lambda g, q: {0}', c)
+
+
+def _aridade(mensagem: str) -> Callable:
+    # recebe os argumentos já avaliados e levanta o erro de número de argumentos
+    def f(args):
+        raise TypeError(mensagem)
+    return f
+
+
+def _nada(g, q):
+    return None
+
+
+class _Funcao:
+    # alvo de uma chamada: executa é preenchida depois que o corpo é compilado (recursão, funções
+    # declaradas depois de quem as chama)
+    __slots__ = ('executa', 'n_locais')
+
+    def __init__(self):
+        self.executa: Optional[Callable] = None
+        self.n_locais = 0
+
+
+class ProgramaCompilado:
+    def __init__(self, n_globais: int, inicia: Callable, main: Callable, erro: Optional[str]):
+        self.n_globais = n_globais
+        self._inicia = inicia
+        self._main = main
+        self._erro = erro
+
+    def executa(self) -> int:
+        """O mesmo que Programa.avaliador(): globais em ordem, depois os comandos do main."""
+        g: List[int] = [0] * self.n_globais
+        q: List[int] = []
+        self._inicia(g, q)
+        if self._erro is not None:
+            raise NameError(self._erro)
+        # cada chamada de FUN passa por mais quadros Python do que em avalia(): o limite de recursão
+        # cresce na mesma proporção para a recursão chegar à mesma profundidade
+        limite = sys.getrecursionlimit()
+        sys.setrecursionlimit(limite * 2)
+        try:
+            return self._main(g, q)
+        finally:
+            sys.setrecursionlimit(limite)
+
+
+class _Compilador:
+    def __init__(self, funcoes: Dict[int, FunDecl], alvos: Dict[int, _Funcao]):
+        self.globais: Dict[int, int] = {}     # id -> slot em g
+        self.locais: Dict[int, int] = {}      # id -> slot em q (na função sendo compilada)
+        self.funcoes = funcoes                # as que podem ser chamadas (vazio nas globais)
+        self.alvos = alvos
+
+    # ---------- expressões ----------
+
+    def exp(self, no: Exp, condicao: bool = False) -> Codigo:
+        if _passa_de(no, LIMITE_PROFUNDIDADE):
+            return _chamada_de(self.exp_funda(no))
+        return self.exp_rasa(no, condicao)
+
+    def exp_rasa(self, no: Exp, condicao: bool = False) -> Codigo:
+        # recursiva: só é chamada em subárvores de até LIMITE_PROFUNDIDADE níveis
+        k = especie(type(no))
+        if k == CONST:
+            return _constante(no.valor)
+        if k == VAR:
+            slot = self.locais.get(no.id)
+            if slot is not None:
+                return ('q[{}]', (slot,), True)
+            slot = self.globais.get(no.id)
+            if slot is not None:
+                return ('g[{}]', (slot,), True)
+            return _chamada_de(levanta(NameError, no.erro_nao_declarada()))
+        if k == OPBIN:
+            esq = self.operando(no.opEsq)
+            dir = self.operando(no.opDir)
+            molde = (condicao and MOLDES_CONDICAO.get(no.operador)) or MOLDES.get(no.operador)
+            if especie(type(no.opDir)) == CONST and no.opDir.valor != 0:
+                molde = MOLDES_DIVISOR.get(no.operador, molde)
+            if molde is None:
+                # operador desconhecido: a função de operacao() levanta depois dos operandos
+                texto = '{}(' + esq[0] + ', ' + dir[0] + ')'
+                return (texto, (operacao(no.operador),) + esq[1] + dir[1], False)
+            return (molde.format(esq[0], dir[0]), esq[1] + dir[1], False)
+        if k == CALL:
+            return _chamada_de(self.chamada(no, [self.exp_rasa(a) for a in no.args]))
+        return _chamada_de(levanta(TypeError, f"expressão não suportada: {no!r}"))
+
+    def operando(self, no: Exp) -> Codigo:
+        # operando de um operador: folha entra no texto, o resto vira uma closure chamada
+        c = self.exp_rasa(no)
+        return c if c[2] else _chamada_de(fecha(c))
+
+    def chamada(self, no: Call, args: Sequence[Codigo]) -> Callable:
+        # a função chamada é verificada antes dos argumentos; o número deles, depois
+        try:
+            f = no.destino(self.funcoes)
+        except NameError as e:
+            return levanta(NameError, str(e))
+        alvo = self.alvos[no.id]
+        textos = [a[0] for a in args]
+        valores = tuple(v for a in args for v in a[1])
+        if len(args) != len(f.params):
+            erro = _aridade(f"Erro semântico: chamada para '{no.nome}' com número errado de argumentos (esperado {len(f.params)}, encontrado {len(args)})")
+            return closure('_f = lambda g, q: {0}', ('{}([' + ', '.join(textos) + '])', (erro,) + valores, True))
+        # o quadro da função: os argumentos nos slots dos parâmetros e espaço para as locais
+        quadro = '[' + ', '.join(textos + ['0'] * alvo.n_locais) + ']'
+        return closure('_f = lambda g, q: {0}', ('{}.executa(g, ' + quadro + ')', (alvo,) + valores, True))
+
+    def exp_funda(self, raiz: Exp) -> Callable:
+        """
+        Pós-ordem da parte funda da expressão em passos (empilha o valor de uma closure rasa,
+        aplica um operador aos dois do topo, chama uma função com os n do topo), executados por
+        um laço com pilha de valores.
+        """
+        prof = _profundidades(raiz)
+        passos: list = []
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is tuple:
+                passos.append(no)
+                continue
+            if prof[id(no)] <= LIMITE_PROFUNDIDADE:
+                passos.append((_EMPILHA, fecha(self.exp_rasa(no))))
+            elif isinstance(no, OpBin):
+                pilha.append((_APLICA, operacao(no.operador)))
+                pilha.append(no.opDir)
+                pilha.append(no.opEsq)
+            else:
+                try:
+                    f = no.destino(self.funcoes)
+                except NameError as e:
+                    passos.append((_EMPILHA, levanta(NameError, str(e))))
+                    continue
+                pilha.append((_CHAMA, (len(no.args), self.invocacao(no, f))))
+                pilha.extend(reversed(no.args))
+        return _avalia_passos(tuple(passos))
+
+    def invocacao(self, no: Call, f: FunDecl) -> Callable:
+        # (g, argumentos já avaliados) -> valor da chamada
+        alvo = self.alvos[no.id]
+        if len(no.args) != len(f.params):
+            mensagem = f"Erro semântico: chamada para '{no.nome}' com número errado de argumentos (esperado {len(f.params)}, encontrado {len(no.args)})"
+
+            def invoca(g, args):
+                raise TypeError(mensagem)
+        else:
+            def invoca(g, args):
+                return alvo.executa(g, args + [0] * alvo.n_locais)
+        return invoca
+
+    # ---------- comandos ----------
+
+    def comando(self, s: Stmt) -> Comando:
+        k = especie(type(s))
+        if k == ASSIGN:
+            slot = self.locais.get(s.id)
+            if slot is not None:
+                return closure('def _f(g, q):\n    q[{0}] = {1}', _constante(slot), self.exp(s.expr)), False
+            slot = self.globais.get(s.id)
+            if slot is not None:
+                return closure('def _f(g, q):\n    g[{0}] = {1}', _constante(slot), self.exp(s.expr)), False
+            ln = s.linha if s.linha is not None else '?'
+            ps = s.pos if s.pos is not None else '?'
+            return levanta(NameError, f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})"), False
+        if k == IF:
+            cond = self.exp(s.cond, condicao=True)
+            entao, r1 = self.bloco(s.then_stmts)
+            if s.else_stmts is None:
+                if r1:
+                    return closure('def _f(g, q):\n    if {0}:\n        return {1}', cond, _chamada_de(entao)), True
+                return closure('def _f(g, q):\n    if {0}:\n        {1}', cond, _chamada_de(entao)), False
+            senao, r2 = self.bloco(s.else_stmts)
+            if r1 or r2:
+                molde = 'def _f(g, q):\n    if {0}:\n        return {1}\n    return {2}'
+            else:
+                molde = 'def _f(g, q):\n    if {0}:\n        {1}\n    else:\n        {2}'
+            return closure(molde, cond, _chamada_de(entao), _chamada_de(senao)), r1 or r2
+        if k == WHILE:
+            cond = self.exp(s.cond, condicao=True)
+            corpo, r = self.bloco(s.body)
+            if r:
+                molde = 'def _f(g, q):\n    while {0}:\n        r = {1}\n        if r is not None:\n            return r'
+            else:
+                molde = 'def _f(g, q):\n    while {0}:\n        {1}'
+            return closure(molde, cond, _chamada_de(corpo)), r
+        if k == BLOCO:
+            return self.bloco(s.stmts)
+        if k == RETURN:
+            return fecha(self.exp(s.expr)), True
+        return levanta(TypeError, f"comando não suportado: {s!r}"), False
+
+    def bloco(self, comandos: Sequence[Stmt]) -> Comando:
+        return sequencia([self.comando(s) for s in comandos])
+
+    def declara_global(self, d) -> Comando:
+        # var nome = expr no topo: a expressão só enxerga as globais anteriores; redeclarado, o
+        # nome continua no mesmo slot (como a mesma chave do env)
+        expr = self.exp(d.expr)
+        slot = self.globais.setdefault(d.id, len(self.globais))
+        return closure('def _f(g, q):\n    g[{0}] = {1}', _constante(slot), expr), False
+
+    def declara_local(self, d, slot: int) -> Comando:
+        # o inicializador só enxerga os parâmetros e as locais anteriores
+        expr = self.exp(d.expr)
+        self.locais[d.id] = slot
+        return closure('def _f(g, q):\n    q[{0}] = {1}', _constante(slot), expr), False
+
+    def funcao(self, f: FunDecl) -> Callable:
+        # quadro: os argumentos em ordem (parâmetro repetido: vale o último) e as locais, nos slots
+        # de prepara_quadro()
+        self.locais = {pid: i for i, pid in enumerate(f.param_ids)}
+        n = len(f.params)
+        inicia = [self.declara_local(d, n + i) for i, d in enumerate(f.local_decls)]
+        comandos = [self.comando(s) for s in f.comandos]
+        resultado = self.exp(f.resultado)
+        corpo, _ = sequencia(inicia + comandos, resultado)
+        return corpo
+
+
+def sequencia(comandos: Sequence[Comando], final: Optional[Codigo] = None) -> Comando:
+    """Comandos em ordem (saindo no primeiro return) e, se houver, 'return final' no fim."""
+    pode = final is not None or any(r for _, r in comandos)
+    if not comandos:
+        return (_nada if final is None else fecha(final)), pode
+    if len(comandos) == 1 and final is None:
+        return comandos[0]
+    linhas = ['def _f(g, q):']
+    codigos: List[Codigo] = []
+    if len(comandos) > _DESENROLA:
+        codigos.append(('{}', (tuple(f for f, _ in comandos),), True))
+        if pode:
+            linhas += ['    for s in {0}:', '        r = s(g, q)', '        if r is not None:', '            return r']
+        else:
+            linhas += ['    for s in {0}:', '        s(g, q)']
+    else:
+        for f, r in comandos:
+            i = len(codigos)
+            codigos.append(_chamada_de(f))
+            if r:
+                linhas += [f'    r = {{{i}}}', '    if r is not None:', '        return r']
+            else:
+                linhas.append(f'    {{{i}}}')
+    if final is not None:
+        linhas.append(f'    return {{{len(codigos)}}}')
+        codigos.append(final)
+    return closure('\n'.join(linhas), *codigos), pode
+
+
+
+# ---------- expressões fundas ----------
+_EMPILHA, _APLICA, _CHAMA = range(3)
+
+
+def _filhos(no: Exp) -> Sequence[Exp]:
+    if isinstance(no, OpBin):
+        return (no.opEsq, no.opDir)
+    if isinstance(no, Call):
+        return no.args
+    return ()
+
+
+def _passa_de(raiz: Exp, limite: int) -> bool:
+    # a expressão tem mais de 'limite' níveis? (para no primeiro caminho que passa)
+    pilha = [(raiz, 1)]
+    while pilha:
+        no, nivel = pilha.pop()
+        if nivel > limite:
+            return True
+        for f in _filhos(no):
+            pilha.append((f, nivel + 1))
+    return False
+
+
+def _profundidades(raiz: Exp) -> Dict[int, int]:
+    # id(nó) -> níveis da subárvore, em pós-ordem (nós repetidos do DAG de formas contam uma vez)
+    prof: Dict[int, int] = {}
+    pilha = [raiz]
+    while pilha:
+        no = pilha[-1]
+        if id(no) in prof:
+            pilha.pop()
+            continue
+        filhos = _filhos(no)
+        pendentes = [f for f in filhos if id(f) not in prof]
+        if pendentes:
+            pilha.extend(pendentes)
+            continue
+        pilha.pop()
+        prof[id(no)] = 1 + max((prof[id(f)] for f in filhos), default=0)
+    return prof
+
+
+def _avalia_passos(passos: tuple) -> Callable:
+    def f(g, q):
+        valores: List[int] = []
+        for k, x in passos:
+            if k == _EMPILHA:
+                valores.append(x(g, q))
+            elif k == _APLICA:
+                direita = valores.pop()
+                valores[-1] = x(valores[-1], direita)
+            else:
+                n, invoca = x
+                args = valores[-n:] if n else []
+                if n:
+                    del valores[-n:]
+                valores.append(invoca(g, args))
+        return valores[-1]
+    return f
+
+
+# ---------- programa ----------
+
+def compila_closures(programa: Programa) -> ProgramaCompilado:
+    """Compila o programa em closures; ProgramaCompilado.executa() dá o valor de avaliador()."""
+    funcoes: Dict[int, FunDecl] = {}
+    erro = None
+    for f in programa.fun_decls:
+        if f.id in funcoes:
+            erro = erro or f"Erro semântico: função '{f.nome}' já declarada"
+            continue
+        funcoes[f.id] = f
+    alvos = {fid: _Funcao() for fid, f in funcoes.items()}
+
+    # globais: em ordem, cada inicializador só enxerga as anteriores e nenhuma função
+    c = _Compilador({}, alvos)
+    inicia = sequencia([c.declara_global(d) for d in programa.var_decls])[0]
+
+    # o tamanho dos quadros vem antes dos corpos: as chamadas já montam o quadro inteiro
+    for fid, f in funcoes.items():
+        alvos[fid].n_locais = len(f.local_decls)
+
+    c.funcoes = funcoes
+    for fid, f in funcoes.items():
+        alvos[fid].executa = c.funcao(f)
+
+    c.locais = {}
+    main, _ = sequencia([c.comando(s) for s in programa.comandos], c.exp(programa.resultado))
+    return ProgramaCompilado(len(c.globais), inicia, main, erro)
+
+
+def avalia_closures(programa: Programa) -> int:
+    return compila_closures(programa).executa()
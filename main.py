@@ -9,26 +9,54 @@ Sequência de execução e saída:
 """
 
 import os
+import shutil
 import sys
-from analisadorLexico import AnalizadorLexico
+from analisadorLexico import AnalizadorLexicoMmap
 from analisadorSintatico import Parser, ParserError
 from analisadorSemantico import build_symbol_table_and_offsets
-from helpers.arvore import Exp
+from helpers.arvore import CacheChamadas, Exp
 from helpers.arvore_print_rich import build_rich_tree
 from rich import print as rprint
 from gerador import gera_codigo
+from interpretadorClosures import avalia_closures
+from maquinaVirtual import compila_bytecode
+from perfilador import perfila
+from transpiladorPython import compila_python
+
+# modo de avaliação escolhido na linha de comando
+MODOS = ("--arvore", "--closures", "--bytecode", "--python")
 
 
 def main():
-    if len(sys.argv) != 2:
-        print("Uso: python main.py <arquivo.txt>")
+    args = sys.argv[1:]
+    # --arvore: Programa.avaliador(); --closures: interpretador por closures; --bytecode: máquina
+    # de pilha; --python: transpilado para Python. Sem opção, a máquina de pilha se não houver 'as'/'ld' para rodar o assembly.
+    # --memo: com --arvore, guarda os resultados das funções puras e mostra os acertos no fim
+    # --perfil / --perfil-json: avalia pela árvore contando execuções e tempo (perfilador.py) e
+    # mostra o perfil em tabela ou em JSON por linha
+    memo = CacheChamadas() if "--memo" in args else None
+    perfil = next((a for a in args if a in ("--perfil", "--perfil-json")), None)
+    modos = [a for a in args if a in MODOS]
+    args = [a for a in args if a not in MODOS and a not in ("--memo", "--perfil", "--perfil-json")]
+    if len(args) != 1 or len(modos) > 1 or (perfil and memo is not None):
+        print("Uso: python main.py [--arvore | --closures | --bytecode | --python] [--memo | --perfil | --perfil-json] <arquivo.txt>")
+        sys.exit(1)
+    if perfil and modos and modos[0] != "--arvore":
+        print("--perfil só vale para a avaliação pela árvore (--arvore)")
         sys.exit(1)
+    if (memo is not None or perfil) and not modos:
+        modo = "--arvore"
+    elif modos:
+        modo = modos[0]
+    elif shutil.which("as") and shutil.which("ld"):
+        modo = "--arvore"
+    else:
+        modo = "--bytecode"
 
     # 1) Análise Léxica
-    arquivo = sys.argv[1]
-    with open(arquivo, 'r') as f:
-        texto = f.read()
-    lexer = AnalizadorLexico(texto)
+    # o arquivo é mapeado em memória e varrido em bytes (lexemas decodificados só quando usados)
+    arquivo = args[0]
+    lexer = AnalizadorLexicoMmap(arquivo)
     tokens = lexer.tokenizador()
 
     print("\n--- Tokens ---")
@@ -60,8 +88,23 @@ def main():
     # 4) Interpretação (avaliação)
     print("\n--- Resultado da avaliação ---")
     try:
-        resultado = ast.avaliador()
+        if modo == "--closures":
+            resultado = avalia_closures(ast)
+        elif modo == "--bytecode":
+            resultado = compila_bytecode(ast, symtab).executa()
+        elif modo == "--python":
+            resultado = compila_python(ast, symtab).executa()
+        elif perfil:
+            resultado, dados = perfila(ast)
+        else:
+            resultado = ast.avaliador(memo)
         print(resultado)
+        if memo is not None and modo == "--arvore":
+            print("\n--- Memo das funções puras ---")
+            print(memo.relatorio())
+        if perfil:
+            print("\n--- Perfil ---")
+            print(dados.json() if perfil == "--perfil-json" else dados.tabela())
     except Exception as e:
         print("\nErro durante avaliação/semântica:", e)
         sys.exit(1)
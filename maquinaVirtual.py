@@ -0,0 +1,493 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Bytecode e máquina de pilha para programas FUN: o Programa verificado é compilado uma vez num
+array('q') de instruções e operandos, executado por um laço de despacho, sem andar na árvore.
+
+- Parâmetros e locais ficam num quadro (lista) por chamada, nos slots que a análise semântica já
+  calculou: o parâmetro com offset 16 + 8*i fica no slot i e a local com offset -8*j no slot
+  n_params + j - 1 (frame_size / 8 locais). As globais ficam numa lista única, na ordem das
+  declarações, e são endereçadas pelo slot dela.
+- As globais são um armazenamento só, como no assembly e nos Quadros de Programa.avaliador(): o
+  que uma função escreve numa global continua valendo depois do retorno. Os nomes são resolvidos
+  estaticamente (local, depois global).
+- Os valores das expressões ficam numa pilha de operandos. Um if/while cuja condição é uma
+  comparação salta direto pelo resultado dela (SALTA_NAO_MENOR, ...), sem empilhar o 1/0.
+  Dois casos comuns têm instrução própria: CARREGA_2 (operador entre duas locais, como i < n) e
+  INCREMENTA (x = x + constante numa local: i++, s += 1).
+- Chamadas não usam a pilha do Python (cada uma empilha (pc de volta, quadro) em 'quadros'). A
+  profundidade vai até sys.getrecursionlimit() quadros de FUN; passando disso, RecursionError com
+  a mesma mensagem do Python, como em Programa.avaliador() (uma recursão sem fim não come a memória).
+
+O código começa no endereço 0 pelos inicializadores das globais e pelo main, que termina em
+RETORNA com a pilha de quadros vazia; as funções vêm depois. desmonta() lista as instruções.
+"""
+
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from analisadorSemantico import build_symbol_table_and_offsets
+from helpers.arvore import (
+    Exp, Stmt, FunDecl, Programa, especie,
+    CONST, VAR, OPBIN, CALL, ASSIGN, IF, WHILE, BLOCO, RETURN,
+)
+from helpers.token_tipos import Operadores
+
+# ---------- instruções ----------
+(CONSTANTE, CONSTANTE_GRANDE, CARREGA, GUARDA, CARREGA_G, GUARDA_G,
+ SOMA, SUBTRAI, MULTIPLICA, DIVIDE, RESTO,
+ MENOR, MAIOR, IGUAL, MENOR_IGUAL, MAIOR_IGUAL, DIFERENTE,
+ SALTA, SALTA_FALSO,
+ SALTA_NAO_MENOR, SALTA_NAO_MAIOR, SALTA_NAO_IGUAL,
+ SALTA_NAO_MENOR_IGUAL, SALTA_NAO_MAIOR_IGUAL, SALTA_NAO_DIFERENTE,
+ CHAMA, RETORNA,
+ CARREGA_2, INCREMENTA) = range(29)
+
+# nome (na desmontagem) e número de operandos de cada instrução
+INSTRUCOES: List[Tuple[str, int]] = [
+    ('constante', 1), ('constante_grande', 1), ('carrega', 1), ('guarda', 1),
+    ('carrega_g', 1), ('guarda_g', 1),
+    ('soma', 0), ('subtrai', 0), ('multiplica', 0), ('divide', 0), ('resto', 0),
+    ('menor', 0), ('maior', 0), ('igual', 0), ('menor_igual', 0), ('maior_igual', 0),
+    ('diferente', 0),
+    ('salta', 1), ('salta_falso', 1),
+    ('salta_nao_menor', 1), ('salta_nao_maior', 1), ('salta_nao_igual', 1),
+    ('salta_nao_menor_igual', 1), ('salta_nao_maior_igual', 1), ('salta_nao_diferente', 1),
+    ('chama', 3), ('retorna', 0),
+    ('carrega_2', 2), ('incrementa', 2),
+]
+
+INSTRUCOES_OPERADORES = {
+    Operadores.SOMA: SOMA,
+    Operadores.SUBTRACAO: SUBTRAI,
+    Operadores.MULTIPLIC: MULTIPLICA,
+    Operadores.DIVISAO: DIVIDE,
+    Operadores.RESTO: RESTO,
+    Operadores.MENOR: MENOR,
+    Operadores.MAIOR: MAIOR,
+    Operadores.IGUAL_IGUAL: IGUAL,
+    Operadores.MENOR_IGUAL: MENOR_IGUAL,
+    Operadores.MAIOR_IGUAL: MAIOR_IGUAL,
+    Operadores.DIFERENTE: DIFERENTE,
+}
+
+# condição de if/while que é uma comparação: salto quando ela é falsa
+SALTOS_COMPARACOES = {
+    MENOR: SALTA_NAO_MENOR,
+    MAIOR: SALTA_NAO_MAIOR,
+    IGUAL: SALTA_NAO_IGUAL,
+    MENOR_IGUAL: SALTA_NAO_MENOR_IGUAL,
+    MAIOR_IGUAL: SALTA_NAO_MAIOR_IGUAL,
+    DIFERENTE: SALTA_NAO_DIFERENTE,
+}
+
+_MIN_Q, _MAX_Q = -(1 << 63), (1 << 63) - 1
+
+
+class Bytecode:
+    """
+    Programa compilado: codigo (instruções e operandos), constantes (as que não cabem em 64 bits,
+    por índice), globais (nomes, por slot) e funcoes (nome, entrada, n_params, n_locais e nomes
+    dos slots do quadro de cada uma, em ordem de entrada).
+    """
+    def __init__(self, codigo: array, constantes: List[int], globais: List[str],
+                 funcoes: List[Tuple[str, int, int, int, List[str]]]):
+        self.codigo = codigo
+        self.constantes = constantes
+        self.globais = globais
+        self.funcoes = funcoes
+
+    def executa(self) -> int:
+        """Executa a partir do endereço 0 e devolve o valor do return do main."""
+        codigo = self.codigo.tolist()  # índices de lista são mais baratos que os de array
+        constantes = self.constantes
+        g: List[int] = [0] * len(self.globais)
+        q: List[int] = []
+        pilha: List[int] = []
+        quadros: List[Tuple[int, List[int]]] = []
+        max_quadros = sys.getrecursionlimit()
+        empilha = pilha.append
+        desempilha = pilha.pop
+        pc = 0
+        while True:
+            op = codigo[pc]
+            if op == CARREGA:
+                empilha(q[codigo[pc + 1]])
+                pc += 2
+            elif op == CONSTANTE:
+                empilha(codigo[pc + 1])
+                pc += 2
+            elif op == GUARDA:
+                q[codigo[pc + 1]] = desempilha()
+                pc += 2
+            elif op == SOMA:
+                b = desempilha()
+                pilha[-1] += b
+                pc += 1
+            elif op == CARREGA_2:
+                empilha(q[codigo[pc + 1]])
+                empilha(q[codigo[pc + 2]])
+                pc += 3
+            elif op == INCREMENTA:
+                q[codigo[pc + 1]] += codigo[pc + 2]
+                pc += 3
+            elif op == SALTA_NAO_MENOR:
+                b = desempilha()
+                pc = pc + 2 if desempilha() < b else codigo[pc + 1]
+            elif op == SALTA:
+                pc = codigo[pc + 1]
+            elif op == SUBTRAI:
+                b = desempilha()
+                pilha[-1] -= b
+                pc += 1
+            elif op == MULTIPLICA:
+                b = desempilha()
+                pilha[-1] *= b
+                pc += 1
+            elif op == CARREGA_G:
+                empilha(g[codigo[pc + 1]])
+                pc += 2
+            elif op == GUARDA_G:
+                g[codigo[pc + 1]] = desempilha()
+                pc += 2
+            elif op == SALTA_NAO_IGUAL:
+                b = desempilha()
+                pc = pc + 2 if desempilha() == b else codigo[pc + 1]
+            elif op == RESTO:
+                b = desempilha()
+                if b == 0:
+                    raise ZeroDivisionError("Divisão por zero (resto)")
+                pilha[-1] %= b
+                pc += 1
+            elif op == DIVIDE:
+                b = desempilha()
+                if b == 0:
+                    raise ZeroDivisionError("Divisão por zero")
+                pilha[-1] //= b
+                pc += 1
+            elif op == CHAMA:
+                # os argumentos (no topo da pilha) viram os primeiros slots do quadro novo
+                base = len(pilha) - codigo[pc + 2]
+                novo = pilha[base:]
+                del pilha[base:]
+                novo += [0] * codigo[pc + 3]
+                if len(quadros) >= max_quadros:
+                    raise RecursionError("maximum recursion depth exceeded")
+                quadros.append((pc + 4, q))
+                q = novo
+                pc = codigo[pc + 1]
+            elif op == RETORNA:
+                # o valor fica no topo da pilha, para quem chamou
+                if not quadros:
+                    return desempilha()
+                pc, q = quadros.pop()
+            elif op == SALTA_FALSO:
+                pc = codigo[pc + 1] if desempilha() == 0 else pc + 2
+            elif op == SALTA_NAO_MAIOR:
+                b = desempilha()
+                pc = pc + 2 if desempilha() > b else codigo[pc + 1]
+            elif op == SALTA_NAO_MENOR_IGUAL:
+                b = desempilha()
+                pc = pc + 2 if desempilha() <= b else codigo[pc + 1]
+            elif op == SALTA_NAO_MAIOR_IGUAL:
+                b = desempilha()
+                pc = pc + 2 if desempilha() >= b else codigo[pc + 1]
+            elif op == SALTA_NAO_DIFERENTE:
+                b = desempilha()
+                pc = pc + 2 if desempilha() != b else codigo[pc + 1]
+            elif op == MENOR:
+                b = desempilha()
+                pilha[-1] = 1 if pilha[-1] < b else 0
+                pc += 1
+            elif op == MAIOR:
+                b = desempilha()
+                pilha[-1] = 1 if pilha[-1] > b else 0
+                pc += 1
+            elif op == IGUAL:
+                b = desempilha()
+                pilha[-1] = 1 if pilha[-1] == b else 0
+                pc += 1
+            elif op == MENOR_IGUAL:
+                b = desempilha()
+                pilha[-1] = 1 if pilha[-1] <= b else 0
+                pc += 1
+            elif op == MAIOR_IGUAL:
+                b = desempilha()
+                pilha[-1] = 1 if pilha[-1] >= b else 0
+                pc += 1
+            elif op == DIFERENTE:
+                b = desempilha()
+                pilha[-1] = 1 if pilha[-1] != b else 0
+                pc += 1
+            elif op == CONSTANTE_GRANDE:
+                empilha(constantes[codigo[pc + 1]])
+                pc += 2
+            else:
+                raise ValueError(f"instrução desconhecida {op} (endereço {pc})")
+
+    def desmonta(self) -> str:
+        """Listagem: endereço, instrução, operandos e, em comentário, o nome do slot/função."""
+        codigo = self.codigo
+        entradas = {e: (nome, slots) for nome, e, _, _, slots in self.funcoes}
+        slots: List[str] = []
+        linhas = ["main:"]
+        pc = 0
+        while pc < len(codigo):
+            if pc in entradas:
+                nome, slots = entradas[pc]
+                linhas.append(f"\n{nome}:")
+            op = codigo[pc]
+            nome_op, n = INSTRUCOES[op]
+            operandos = list(codigo[pc + 1:pc + 1 + n])
+            nota = ""
+            if op in (CARREGA, GUARDA, INCREMENTA):
+                nota = slots[operandos[0]]
+            elif op == CARREGA_2:
+                nota = f"{slots[operandos[0]]} {slots[operandos[1]]}"
+            elif op in (CARREGA_G, GUARDA_G):
+                nota = self.globais[operandos[0]]
+            elif op == CONSTANTE_GRANDE:
+                nota = str(self.constantes[operandos[0]])
+            elif op == CHAMA:
+                nota = entradas[operandos[0]][0]
+            texto = f"  {pc:6}  {nome_op:<22} {' '.join(map(str, operandos))}"
+            linhas.append(f"{texto:<46} ; {nota}" if nota else texto.rstrip())
+            pc += 1 + n
+        return "\n".join(linhas) + "\n"
+
+
+class _Compilador:
+    def __init__(self, symtab: Dict[int, Dict[str, Any]]):
+        self.symtab = symtab
+        self.codigo = array('q')
+        self.constantes: List[int] = []
+        self.indices_constantes: Dict[int, int] = {}
+        self.globais: Dict[int, int] = {}          # id -> slot em g
+        self.slots: Dict[int, int] = {}            # id -> slot no quadro (função sendo compilada)
+        self.funcoes: Dict[int, FunDecl] = {}      # as que podem ser chamadas (vazio nas globais)
+        self.entradas: Dict[int, int] = {}         # id da função -> endereço
+        self.chamadas: List[Tuple[int, int]] = []  # (posição do operando de entrada, id da função)
+
+    def emite(self, *palavras: int) -> None:
+        self.codigo.extend(palavras)
+
+    def constante(self, valor: int) -> None:
+        if _MIN_Q <= valor <= _MAX_Q:
+            self.emite(CONSTANTE, valor)
+            return
+        i = self.indices_constantes.get(valor)
+        if i is None:
+            i = self.indices_constantes[valor] = len(self.constantes)
+            self.constantes.append(valor)
+        self.emite(CONSTANTE_GRANDE, i)
+
+    def exp(self, raiz: Exp) -> None:
+        # pós-ordem com pilha explícita: depois dos operandos de um nó vai a instrução dele
+        # ((op,) de um operador, (CHAMA, f) de uma chamada)
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is tuple:
+                if no[0] == CHAMA:
+                    self.chama(no[1])
+                else:
+                    self.emite(no[0])
+                continue
+            k = especie(type(no))
+            if k == CONST:
+                self.constante(no.valor)
+            elif k == VAR:
+                slot = self.slots.get(no.id)
+                if slot is not None:
+                    self.emite(CARREGA, slot)
+                elif no.id in self.globais:
+                    self.emite(CARREGA_G, self.globais[no.id])
+                else:
+                    raise NameError(no.erro_nao_declarada())
+            elif k == OPBIN:
+                op = INSTRUCOES_OPERADORES.get(no.operador)
+                if op is None:
+                    raise ValueError(f"Operador desconhecido: {no.operador}")
+                if self.carrega_2(no):
+                    self.emite(op)
+                else:
+                    pilha += ((op,), no.opDir, no.opEsq)
+            elif k == CALL:
+                f = no.destino(self.funcoes)
+                if len(no.args) != len(f.params):
+                    raise TypeError(f"Erro semântico: chamada para '{no.nome}' com número errado de argumentos (esperado {len(f.params)}, encontrado {len(no.args)})")
+                pilha.append((CHAMA, f))
+                pilha.extend(reversed(no.args))
+            else:
+                raise TypeError(f"expressão não suportada: {no!r}")
+
+    def carrega_2(self, no) -> bool:
+        # os dois operandos são locais: uma instrução só para empilhar os dois
+        esq, dir = no.opEsq, no.opDir
+        if especie(type(esq)) != VAR or especie(type(dir)) != VAR:
+            return False
+        if esq.id not in self.slots or dir.id not in self.slots:
+            return False
+        self.emite(CARREGA_2, self.slots[esq.id], self.slots[dir.id])
+        return True
+
+    def chama(self, f: FunDecl) -> None:
+        # a entrada é preenchida depois que todas as funções forem compiladas
+        self.emite(CHAMA, 0, len(f.params), self.symtab[f.id]['frame_size'] // 8)
+        self.chamadas.append((len(self.codigo) - 3, f.id))
+
+    def condicao(self, cond: Exp) -> int:
+        """Código que salta quando cond é falsa; devolve a posição do endereço do salto."""
+        op = INSTRUCOES_OPERADORES.get(cond.operador) if especie(type(cond)) == OPBIN else None
+        salto = SALTOS_COMPARACOES.get(op)
+        if salto is None:
+            self.exp(cond)
+            salto = SALTA_FALSO
+        elif not self.carrega_2(cond):
+            self.exp(cond.opEsq)
+            self.exp(cond.opDir)
+        self.emite(salto, 0)
+        return len(self.codigo) - 1
+
+    def incrementa(self, s) -> bool:
+        # x = x + k / x = x - k numa local: uma instrução só (o parser gera isso para x++, x += k)
+        e = s.expr
+        slot = self.slots.get(s.id)
+        if slot is None or especie(type(e)) != OPBIN or e.operador not in (Operadores.SOMA, Operadores.SUBTRACAO):
+            return False
+        if especie(type(e.opEsq)) != VAR or e.opEsq.id != s.id or especie(type(e.opDir)) != CONST:
+            return False
+        k = e.opDir.valor if e.operador == Operadores.SOMA else -e.opDir.valor
+        if not _MIN_Q <= k <= _MAX_Q:
+            return False
+        self.emite(INCREMENTA, slot, k)
+        return True
+
+    def guarda(self, s) -> None:
+        slot = self.slots.get(s.id)
+        if slot is not None:
+            self.emite(GUARDA, slot)
+        elif s.id in self.globais:
+            self.emite(GUARDA_G, self.globais[s.id])
+        else:
+            ln = s.linha if s.linha is not None else '?'
+            ps = s.pos if s.pos is not None else '?'
+            raise NameError(f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})")
+
+    def comandos(self, comandos: Sequence[Stmt]) -> None:
+        # pilha explícita de comandos e ações: ('alvo', posições) preenche os saltos pendentes com
+        # o endereço atual, ('pula', posições) emite um salto a preencher depois, ('volta', endereço)
+        # emite um salto para trás (fim do corpo de um while)
+        codigo = self.codigo
+        pilha: list = list(reversed(comandos))
+        while pilha:
+            s = pilha.pop()
+            if type(s) is tuple:
+                acao, x = s
+                if acao == 'alvo':
+                    for p in x:
+                        codigo[p] = len(codigo)
+                elif acao == 'pula':
+                    self.emite(SALTA, 0)
+                    x.append(len(codigo) - 1)
+                else:
+                    self.emite(SALTA, x)
+                continue
+            k = especie(type(s))
+            if k == ASSIGN:
+                if not self.incrementa(s):
+                    self.exp(s.expr)
+                    self.guarda(s)
+            elif k == IF:
+                falso = self.condicao(s.cond)
+                if s.else_stmts is None:
+                    pilha.append(('alvo', [falso]))
+                else:
+                    fim: List[int] = []
+                    pilha.append(('alvo', fim))
+                    pilha.extend(reversed(s.else_stmts))
+                    pilha.append(('alvo', [falso]))
+                    pilha.append(('pula', fim))
+                pilha.extend(reversed(s.then_stmts))
+            elif k == WHILE:
+                inicio = len(codigo)
+                falso = self.condicao(s.cond)
+                pilha.append(('alvo', [falso]))
+                pilha.append(('volta', inicio))
+                pilha.extend(reversed(s.body))
+            elif k == BLOCO:
+                pilha.extend(reversed(s.stmts))
+            elif k == RETURN:
+                self.exp(s.expr)
+                self.emite(RETORNA)
+            else:
+                raise TypeError(f"comando não suportado: {s!r}")
+
+    def funcao(self, f: FunDecl) -> List[str]:
+        """Compila f a partir do endereço atual; devolve o nome de cada slot do quadro."""
+        info = self.symtab[f.id]
+        n_params = len(f.params)
+        nomes = list(f.params) + [''] * (info['frame_size'] // 8)
+        self.slots = {pid: (off - 16) // 8 for pid, off in info['param_offsets'].items()}
+        # cada inicializador enxerga os parâmetros e as locais anteriores
+        for d in f.local_decls:
+            self.exp(d.expr)
+            slot = n_params + (-info['local_offsets'][d.id]) // 8 - 1
+            self.slots[d.id] = slot
+            nomes[slot] = d.nome
+            self.emite(GUARDA, slot)
+        self.comandos(f.comandos)
+        self.exp(f.resultado)
+        self.emite(RETORNA)
+        return nomes
+
+
+def compila_bytecode(programa: Programa, symtab: Optional[Dict[int, Dict[str, Any]]] = None) -> Bytecode:
+    """
+    Compila o programa (verificado por build_symbol_table_and_offsets, que é chamada aqui se a
+    symtab não for dada) em bytecode.
+    """
+    if symtab is None:
+        symtab = build_symbol_table_and_offsets(programa)
+    c = _Compilador(symtab)
+
+    # globais: em ordem, cada inicializador só enxerga as anteriores e nenhuma função
+    nomes_globais: List[str] = []
+    for d in programa.var_decls:
+        c.exp(d.expr)
+        slot = c.globais.setdefault(d.id, len(c.globais))
+        if slot == len(nomes_globais):
+            nomes_globais.append(d.nome)
+        c.emite(GUARDA_G, slot)
+
+    c.funcoes = {f.id: f for f in programa.fun_decls}
+    c.comandos(programa.comandos)
+    c.exp(programa.resultado)
+    c.emite(RETORNA)
+
+    funcoes = []
+    for f in programa.fun_decls:
+        entrada = c.entradas[f.id] = len(c.codigo)
+        nomes = c.funcao(f)
+        funcoes.append((f.nome, entrada, len(f.params), len(nomes) - len(f.params), nomes))
+    for p, fid in c.chamadas:
+        c.codigo[p] = c.entradas[fid]
+    return Bytecode(c.codigo, c.constantes, nomes_globais, funcoes)
+
+
+def avalia_bytecode(programa: Programa) -> int:
+    return compila_bytecode(programa).executa()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Uso: python maquinaVirtual.py <arquivo.txt>")
+        sys.exit(1)
+    from analisadorLexico import AnalizadorLexico
+    from analisadorSintatico import Parser
+    with open(sys.argv[1], 'r') as f:
+        programa = Parser(AnalizadorLexico(f.read()).tokenizador()).parse()
+    bytecode = compila_bytecode(programa)
+    print(bytecode.desmonta())
+    print(bytecode.executa())
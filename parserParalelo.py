@@ -0,0 +1,229 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Front-end paralelo: as declarações de topo ('var'/'fun') são independentes entre si, então são
+parseadas em vários processos.
+
+- Pré-varredura: um passe pelos tipos dos tokens contando chaves; todo 'var'/'fun'/'main' na
+  profundidade 0 começa um item de topo (os 'var' locais estão dentro de '{}' e não contam).
+- Os itens são agrupados em lotes contíguos de tamanho parecido; cada lote vai para um
+  ProcessPoolExecutor como colunas (códigos de tipo, posições, lexemas, ids) e volta como a
+  lista de Decl/FunDecl. O main é parseado no processo principal enquanto isso.
+- Os lotes voltam em ordem e o Programa é montado na ordem do fonte. Os ids internados vêm dos
+  tokens (o léxico roda no processo principal), então valem no processo principal.
+- A AST não tem ciclos, então o coletor de ciclos fica pausado enquanto os nós são criados (no
+  parse dos lotes e na desserialização dos resultados): com ele ligado, as coletas disparadas pela
+  alocação em massa custam mais que o próprio unpickle.
+- Em qualquer erro o programa inteiro é reparseado em sequência pelo Parser, que gera
+  exatamente a mesma mensagem (ou o mesmo Programa) do front-end normal.
+"""
+
+import gc
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Tuple
+
+from analisadorSintatico import Parser
+from helpers.arvore import Programa
+from helpers.linhas import IndiceLinhas
+from helpers.token import Token
+from helpers.token_buffer import TIPOS, CODIGOS, TokenBuffer
+from helpers.token_tipos import Pontuacao, PalavraReservada
+
+# abaixo disso (em tokens) o custo de mandar os lotes para os processos não compensa
+MIN_TOKENS = 20000
+# lotes por processo: mais de um equilibra funções de tamanhos diferentes
+LOTES_POR_PROCESSO = 4
+
+_INICIOS = {PalavraReservada.VAR: 'var', PalavraReservada.FUN: 'fun', PalavraReservada.MAIN: 'main'}
+
+
+def divide_topo(tokens: Sequence[Token]) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Intervalos [inicio, fim) dos itens de topo, em ordem: ('var'|'fun'|'main', inicio, fim).
+    None se a forma não for a esperada (chaves desbalanceadas, tokens fora de um item, algo
+    depois do main): nesses casos só o parser sequencial sabe dizer qual é o erro.
+    """
+    if isinstance(tokens, TokenBuffer):
+        tipos = [TIPOS[c] for c in tokens.tipos]
+    else:
+        tipos = [tok.tipo for tok in tokens]
+    esq, dir = Pontuacao.CHAVE_ESQ, Pontuacao.CHAVE_DIR
+    itens = []
+    profundidade = 0
+    for i, tipo in enumerate(tipos):
+        if tipo is esq:
+            profundidade += 1
+        elif tipo is dir:
+            profundidade -= 1
+            if profundidade < 0:
+                return None
+        elif profundidade == 0 and tipo in _INICIOS:
+            if itens:
+                itens[-1][2] = i
+            elif i != 0:
+                return None
+            itens.append([_INICIOS[tipo], i, len(tipos)])
+    if not itens or itens[-1][0] != 'main' or any(it[0] == 'main' for it in itens[:-1]):
+        return None
+    return [tuple(it) for it in itens]
+
+
+def agrupa(itens: List[Tuple[str, int, int]], n_lotes: int) -> List[List[Tuple[str, int, int]]]:
+    # lotes contíguos com mais ou menos o mesmo número de tokens
+    total = sum(fim - ini for _, ini, fim in itens)
+    alvo = max(1, total // max(1, n_lotes))
+    lotes, atual, tamanho = [], [], 0
+    for item in itens:
+        atual.append(item)
+        tamanho += item[2] - item[1]
+        if tamanho >= alvo:
+            lotes.append(atual)
+            atual, tamanho = [], 0
+    if atual:
+        lotes.append(atual)
+    return lotes
+
+
+@contextmanager
+def sem_coletor():
+    # pausa o coletor de ciclos (a contagem de referências continua liberando tudo normalmente)
+    ativo = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if ativo:
+            gc.enable()
+
+
+# ---------- lado do processo trabalhador ----------
+
+class LinhasTrecho(IndiceLinhas):
+    # só os inícios de linha que cobrem um lote; 'primeira' = quantas linhas vêm antes deles
+    def __init__(self, inicios: array, primeira: int):
+        self.inicios = inicios
+        self.primeira = primeira
+
+    def linha(self, pos: int) -> int:
+        return bisect_right(self.inicios, pos) + self.primeira
+
+    def localiza(self, pos: int) -> Tuple[int, int]:
+        return self.linha(pos), self.coluna(pos)
+
+
+def empacota(tokens: Sequence[Token], lote: List[Tuple[str, int, int]]) -> tuple:
+    # colunas dos tokens do lote (bem mais baratas de serializar que objetos Token)
+    ini, fim = lote[0][1], lote[-1][2]
+    codigos = bytearray()
+    posicoes = array('q')
+    lexemas = []
+    ids = []
+    for i in range(ini, fim):
+        tok = tokens[i]
+        codigos.append(CODIGOS[tok.tipo])
+        posicoes.append(tok.pos)
+        lexemas.append(tok.lexema)
+        ids.append(tok.id)
+    linhas = tokens[ini].linhas
+    trecho = None
+    if linhas is not None:
+        k0 = linhas.linha(posicoes[0]) - 1
+        k1 = linhas.linha(posicoes[-1])
+        trecho = (linhas.inicios[k0:k1], k0)
+    itens = [(tipo, a - ini, b - ini) for tipo, a, b in lote]
+    return bytes(codigos), posicoes, lexemas, ids, trecho, itens
+
+
+def parse_lote(pacote: tuple) -> list:
+    codigos, posicoes, lexemas, ids, trecho, itens = pacote
+    linhas = LinhasTrecho(*trecho) if trecho is not None else None
+    tokens = [Token(TIPOS[c], lex, pos, linhas, id) for c, lex, pos, id in zip(codigos, lexemas, posicoes, ids)]
+    parser = Parser(tokens)
+    nos = []
+    with sem_coletor():
+        for tipo, ini, fim in itens:
+            parser.pos = ini
+            no = parser.parse_var_decl() if tipo == 'var' else parser.parse_fun_decl()
+            if parser.pos != fim:
+                raise ValueError(f"item de topo terminou no token {parser.pos}, esperado {fim}")
+            nos.append(no)
+    return nos
+
+
+# ---------- lado do processo principal ----------
+
+class ParserParalelo:
+    """
+    Parser.parse() com as declarações de topo distribuídas por 'processos' processos. O pool é
+    criado na primeira chamada e reaproveitado; feche com fecha() (ou use 'with').
+    """
+    def __init__(self, processos: Optional[int] = None, min_tokens: int = MIN_TOKENS):
+        self.processos = processos or os.cpu_count() or 1
+        self.min_tokens = min_tokens
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fecha()
+
+    def fecha(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def parse(self, tokens: Sequence[Token]) -> Programa:
+        itens = divide_topo(tokens) if len(tokens) >= self.min_tokens else None
+        if itens is None or len(itens) < 2:
+            return Parser(tokens).parse()
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.processos)
+        lotes = agrupa(itens[:-1], self.processos * LOTES_POR_PROCESSO)
+        futuros = []
+        try:
+            # os resultados são desserializados pela thread do executor enquanto esperamos aqui
+            with sem_coletor():
+                for lote in lotes:
+                    futuros.append(self.executor.submit(parse_lote, empacota(tokens, lote)))
+                parser = Parser(tokens)
+                parser.pos = itens[-1][1]
+                comandos, resultado = parser.parse_main()
+                var_decls, fun_decls = [], []
+                for lote, futuro in zip(lotes, futuros):
+                    for (tipo, _, _), no in zip(lote, futuro.result()):
+                        (var_decls if tipo == 'var' else fun_decls).append(no)
+        except Exception:
+            # erro de sintaxe (ou falha de um processo): o parser sequencial dá o erro de sempre
+            for futuro in futuros:
+                futuro.cancel()
+            return Parser(tokens).parse()
+        return Programa(var_decls, fun_decls, comandos, resultado, linhas=tokens[0].linhas)
+
+
+def parse_paralelo(tokens: Sequence[Token], processos: Optional[int] = None) -> Programa:
+    with ParserParalelo(processos) as parser:
+        return parser.parse(tokens)
+
+
+if __name__ == '__main__':
+    from analisadorLexico import AnalizadorLexico
+    from analisadorSintatico import ParserError
+
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python parserParalelo.py <arquivo.txt> [processos]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        texto = f.read()
+    tokens = AnalizadorLexico(texto).tokenizador()
+    try:
+        ast = parse_paralelo(tokens, int(sys.argv[2]) if len(sys.argv) == 3 else None)
+    except ParserError as e:
+        print(e)
+        sys.exit(1)
+    print("\nResultado da análise sintática:", ast)
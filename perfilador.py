@@ -0,0 +1,222 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Perfil de uma execução pela árvore: Programa.avaliador(ganchos=Perfilador()), o próprio
+interpretador (quadros, globais compartilhadas, return por valor, trampolim nas chamadas de
+cauda) chamando os ganchos de helpers.arvore.Ganchos. Sem ganchos, o avaliador só testa um None
+por nó; o perfil é pedido explicitamente (perfila(programa), ou python main.py --perfil).
+
+- Execuções por nó: cada expressão avaliada e cada comando executado (um while conta uma vez por
+  entrada; as voltas, cada vez que o corpo termina e a condição é reavaliada, ficam à parte).
+- Por função (FunDecl, e o main): chamadas, tempo acumulado (com as chamadas de dentro; numa
+  recursão, só a ativação de fora soma) e próprio (sem elas). Uma chamada de cauda encerra a
+  ativação de quem chama e abre a da chamada, como no trampolim.
+- Onde: a linha/pos do nó. Comandos sem span (If, While, Bloco) usam o do primeiro descendente
+  que tem. Constantes e operadores não têm span e podem ser o mesmo objeto em vários lugares
+  (hash-consing): contam à parte em cada comando onde são avaliados, com o lugar dele.
+
+Perfil.tabela() é o relatório em texto e Perfil.json() o mesmo por linha do fonte.
+"""
+
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from helpers.arvore import Ganchos, Programa, FunDecl, Decl, Stmt, WhileStmt, Const, OpBin
+from helpers.visitante import campos_filhos
+
+Lugar = Optional[Tuple[Optional[int], Optional[int]]]
+
+
+def _span(no) -> Lugar:
+    linha = getattr(no, 'linha', None)
+    if linha is None:
+        return None
+    return (linha, getattr(no, 'pos', None))
+
+
+def lugar_de(no) -> Lugar:
+    # (linha, pos) do nó ou do primeiro descendente com span, em pré-ordem (pilha explícita)
+    pilha = [no]
+    while pilha:
+        atual = pilha.pop()
+        if isinstance(atual, list):
+            pilha.extend(reversed(atual))
+            continue
+        lugar = _span(atual)
+        if lugar is not None:
+            return lugar
+        for campo in reversed(campos_filhos(type(atual))):
+            filho = getattr(atual, campo, None)
+            if filho is not None:
+                pilha.append(filho)
+    return None
+
+
+class Perfil:
+    def __init__(self):
+        # chave de um nó: id(nó), ou (id(nó), lugar do comando) para constantes e operadores
+        self.execucoes: Dict[Any, int] = {}             # chave -> vezes
+        self.nos: Dict[Any, Any] = {}                   # chave -> nó (mantém o id válido)
+        self.lugares: Dict[Any, Lugar] = {}             # chave -> (linha, pos)
+        self.iteracoes: Dict[int, int] = {}             # id(WhileStmt) -> voltas
+        self.funcoes: Dict[str, Dict[str, Any]] = {}    # nome -> chamadas, acumulado, proprio, linha, pos
+        self.resultado: Optional[int] = None
+
+    def registra(self, k, no, contexto: Lugar) -> None:
+        # primeira execução de um nó: guarda o nó e onde ele está
+        self.nos[k] = no
+        lugar = lugar_de(no) if isinstance(no, Stmt) else _span(no)
+        self.lugares[k] = lugar or contexto
+
+    def por_linha(self) -> Dict[str, Dict[str, Any]]:
+        linhas: Dict[str, Dict[str, Any]] = {}
+        for k, vezes in self.execucoes.items():
+            no = self.nos[k]
+            linha, pos = self.lugares[k] or (None, None)
+            item = linhas.setdefault(str(linha if linha is not None else '?'),
+                                     {'execucoes': 0, 'voltas': 0, 'nos': []})
+            item['execucoes'] += vezes
+            voltas = self.iteracoes.get(k)
+            if voltas is not None:
+                item['voltas'] += voltas
+            item['nos'].append({'pos': pos, 'tipo': type(no).__name__, 'execucoes': vezes,
+                                **({'voltas': voltas} if voltas is not None else {})})
+        for item in linhas.values():
+            item['nos'].sort(key=lambda n: (n['pos'] if n['pos'] is not None else -1, n['tipo']))
+        return dict(sorted(linhas.items(), key=lambda kv: (not kv[0].isdigit(), int(kv[0]) if kv[0].isdigit() else 0)))
+
+    def json(self, indent: Optional[int] = 2) -> str:
+        funcoes = {nome: {**d, 'acumulado': round(d['acumulado'], 9), 'proprio': round(d['proprio'], 9)}
+                   for nome, d in self.funcoes.items()}
+        return json.dumps({'resultado': self.resultado, 'funcoes': funcoes, 'linhas': self.por_linha()},
+                          indent=indent, ensure_ascii=False)
+
+    def tabela(self, max_linhas: int = 20) -> str:
+        saida = [f"{'função':<20} {'linha':>6} {'chamadas':>10} {'acumulado ms':>13} {'próprio ms':>12}"]
+        for nome, d in sorted(self.funcoes.items(), key=lambda kv: -kv[1]['proprio']):
+            linha = d['linha'] if d['linha'] is not None else '-'
+            saida.append(f"{nome:<20} {linha:>6} {d['chamadas']:>10} {d['acumulado'] * 1000:>13.3f} "
+                         f"{d['proprio'] * 1000:>12.3f}")
+        linhas = self.por_linha()
+        saida.append("")
+        saida.append(f"{'linha':>6} {'execuções':>12} {'voltas':>10}   nós")
+        for linha, item in sorted(linhas.items(), key=lambda kv: -kv[1]['execucoes'])[:max_linhas]:
+            nos = ", ".join(f"{n['tipo']}x{n['execucoes']}" for n in item['nos'][:6])
+            if len(item['nos']) > 6:
+                nos += ", ..."
+            saida.append(f"{linha:>6} {item['execucoes']:>12} {item['voltas']:>10}   {nos}")
+        return "\n".join(saida)
+
+
+# como o Perfilador trata cada classe de nó (calculado na primeira vez)
+_EXPRESSAO, _NO_COMANDO, _COMANDO, _DECLARACAO = range(4)
+_TIPOS: Dict[type, int] = {}
+
+
+def _tipo(cls: type) -> int:
+    if cls is Const or cls is OpBin:
+        return _NO_COMANDO
+    if issubclass(cls, Stmt):
+        return _COMANDO
+    if issubclass(cls, Decl):
+        return _DECLARACAO
+    return _EXPRESSAO
+
+
+class Perfilador(Ganchos):
+    # os ganchos de Programa.avaliador(): conta cada nó e mede cada ativação
+    def __init__(self):
+        self.perfil = Perfil()
+        self.contexto: Lugar = None   # lugar do comando em execução (para nós sem span)
+        self.ativas: List[list] = []  # [nome, início, tempo dos filhos, contexto de quem chamou]
+        self.abertas: Dict[str, int] = {}
+        self.resultados: Dict[int, Lugar] = {}  # id(FunDecl) -> lugar do return final
+
+    def lugar_resultado(self, f: FunDecl) -> Lugar:
+        lugar = self.resultados.get(id(f))
+        if lugar is None:
+            lugar = self.resultados[id(f)] = lugar_de(f.resultado) or _span(f)
+        return lugar
+
+    # ---------- ganchos ----------
+
+    def no(self, no) -> None:
+        # chave: id(nó), ou (id(nó), lugar do comando) para constantes e operadores
+        cls = type(no)
+        k = _TIPOS.get(cls)
+        if k is None:
+            k = _TIPOS[cls] = _tipo(cls)
+        if k == _DECLARACAO:
+            # inicializador de uma global ou local: não conta, só dá o lugar
+            self.contexto = _span(no)
+            return
+        perfil = self.perfil
+        execucoes = perfil.execucoes
+        chave = (id(no), self.contexto) if k == _NO_COMANDO else id(no)
+        n = execucoes.get(chave)
+        if n is None:
+            perfil.registra(chave, no, self.contexto)
+            n = 0
+        execucoes[chave] = n + 1
+        if k == _COMANDO:
+            self.contexto = perfil.lugares[chave]
+            if cls is WhileStmt:
+                perfil.iteracoes.setdefault(chave, 0)
+
+    def volta(self, s: WhileStmt) -> None:
+        self.contexto = self.perfil.lugares[id(s)]
+        self.perfil.iteracoes[id(s)] += 1
+
+    def entra(self, dono) -> None:
+        if isinstance(dono, Programa):
+            nome, lugar = 'main', None
+        else:
+            nome, lugar = dono.nome, _span(dono)
+        d = self.perfil.funcoes.get(nome)
+        if d is None:
+            linha, pos = lugar or (None, None)
+            d = self.perfil.funcoes[nome] = {'chamadas': 0, 'acumulado': 0.0, 'proprio': 0.0,
+                                             'linha': linha, 'pos': pos}
+        d['chamadas'] += 1
+        self.abertas[nome] = self.abertas.get(nome, 0) + 1
+        self.ativas.append([nome, time.perf_counter(), 0.0, self.contexto])
+
+    def sai(self, dono) -> None:
+        nome, inicio, filhos, self.contexto = self.ativas.pop()
+        duracao = time.perf_counter() - inicio
+        d = self.perfil.funcoes[nome]
+        d['proprio'] += duracao - filhos
+        self.abertas[nome] -= 1
+        if not self.abertas[nome]:
+            d['acumulado'] += duracao
+        if self.ativas:
+            self.ativas[-1][2] += duracao
+
+    def resultado(self, dono) -> None:
+        if isinstance(dono, Programa):
+            self.contexto = lugar_de(dono.resultado)
+        else:
+            self.contexto = self.lugar_resultado(dono)
+
+
+def perfila(programa: Programa) -> Tuple[int, Perfil]:
+    """(resultado, perfil) de uma execução do programa; o resultado e os erros são os de avaliador()."""
+    perfilador = Perfilador()
+    r = perfilador.perfil.resultado = programa.avaliador(ganchos=perfilador)
+    return r, perfilador.perfil
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[1] != '--json'):
+        print("Uso: python perfilador.py [--json] <arquivo.txt>")
+        sys.exit(1)
+    from analisadorLexico import AnalizadorLexico
+    from analisadorSintatico import Parser
+    from analisadorSemantico import build_symbol_table_and_offsets
+    with open(sys.argv[-1], 'r') as arquivo:
+        programa = Parser(AnalizadorLexico(arquivo.read()).tokenizador()).parse()
+    build_symbol_table_and_offsets(programa)
+    _, perfil = perfila(programa)
+    print(perfil.json() if sys.argv[1] == '--json' else perfil.tabela())
@@ -0,0 +1,533 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Formato binário compacto do Programa verificado: a AST inteira mais as anotações da análise
+semântica (param_offsets, local_offsets e frame_size de cada FunDecl), para guardar e distribuir
+programas/bibliotecas FUN já compilados e carregá-los sem léxico, parse nem checagem.
+
+Arquivo: cabeçalho MAGICA + versão (u16) + reservado (u16), seguido de registros
+(tipo u8, tamanho u32, crc32 u32, dados), em little-endian. O crc32 cobre tipo, tamanho e dados:
+um arquivo corrompido (em disco ou no caminho até outra máquina) é rejeitado, não carregado.
+
+    NOMES    nomes novos, separados por '\\0' (identificadores e constantes que não cabem em 64
+             bits); o índice de um nome é a ordem de chegada no arquivo
+    LINHAS   início de cada linha do fonte (IndiceLinhas.inicios), para as colunas dos erros: tipo
+             da coluna (abaixo) + valores
+    GLOBAL   uma declaração 'var' do topo
+    FUNCAO   uma função, com as anotações
+    MAIN     comandos e resultado do main
+    FIM      fim do programa
+
+Cada registro de item tem os nós em pós-ordem (filhos antes do pai): um código de espécie (u8) por
+nó e quatro colunas de inteiros: os campos, os nomes (índices em NOMES), as linhas e as posições
+dos nós que têm span. O cabeçalho do registro tem as cinco quantidades (u32) e o tipo de cada coluna
+('b', 'h', 'i' ou 'q', o menor em que todos os valores dela cabem); depois vêm as espécies e as
+colunas. Campos de cada espécie (nome, params e os nomes dos offsets vão, nessa ordem, na coluna de
+nomes, que o leitor confere de uma vez por registro; o resto vai na de campos):
+
+    CONST        valor                  CONST_GRANDE  índice do texto do valor em NOMES
+    VAR          nome                   OPBIN         código do operador (helpers/arena.py)
+    CALL         nome, n_args
+    DECL/ASSIGN  nome                   RETURN        -
+    IF           n_then, n_else (-1 = sem else)
+    WHILE        n_corpo                BLOCO         n_comandos
+    FUNDECL      nome, n_params, params..., n_locais, n_comandos, anotada (0/1)
+                 [, frame_size, n, (nome, offset) dos parâmetros..., n, (nome, offset) das locais...,
+                 pura (0/1, -1 = não calculada)]
+    PROGRAMA     n_comandos (fecha o registro MAIN: comandos e resultado)
+
+VAR, CALL, DECL, ASSIGN, RETURN e FUNDECL têm span (uma linha e uma posição, -1 se ausente).
+Os nomes vão como texto e são internados de novo ao carregar, então os ids de helpers/simbolos.py
+(que só valem num processo) não aparecem no arquivo.
+
+O escritor e o leitor andam com pilha explícita (uma cadeia a + b + c + ... tem um nível de OpBin
+por operando) e trabalham registro a registro: EscritorBinario grava cada item assim que ele é
+dado e le_itens devolve cada item assim que o seu registro é lido. Qualquer problema na leitura
+(crc, registro truncado, nó de espécie inesperada no lugar de um filho) é FormatoInvalido.
+A pureza de cada função vai no arquivo (com as anotações), então carregar não refaz a análise de
+pureza; a carga custa quase só a construção dos nós.
+"""
+
+import gc
+import io
+import struct
+import sys
+import zlib
+from array import array
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from analisadorSemantico import marca_funcoes_puras
+from helpers.arena import DECL, FUNDECL, PROGRAMA, OPERADORES, CODIGOS_OPERADORES, SEM, _especie, _filhos_no
+from helpers.arvore import (
+    CONST, VAR, OPBIN, CALL, ASSIGN, IF, WHILE, BLOCO, RETURN,
+    Const, Var, OpBin, Call, Decl, Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt, FunDecl, Programa,
+)
+from helpers.linhas import IndiceLinhas
+from helpers.simbolos import IDENTIFICADORES, interna
+
+MAGICA = b'FUNB'
+VERSAO = 3
+
+# tipos de registro
+FIM, NOMES, LINHAS, GLOBAL, FUNCAO, MAIN = range(6)
+
+CONST_GRANDE = 15  # espécie só do arquivo: constante fora de int64
+
+_CABECALHO = struct.Struct('<4sHH')
+_REGISTRO = struct.Struct('<BII')
+_TIPO_TAMANHO = struct.Struct('<BI')
+_ITEM = struct.Struct('<5I4s')
+_MIN_Q, _MAX_Q = -(1 << 63), (1 << 63) - 1
+_TROCA_BYTES = sys.byteorder != 'little'
+# tipo de array -> faixa de valores
+_TIPOS_ARRAY = (('b', -(1 << 7), (1 << 7) - 1), ('h', -(1 << 15), (1 << 15) - 1),
+                ('i', -(1 << 31), (1 << 31) - 1), ('q', _MIN_Q, _MAX_Q))
+_TAMANHOS = {t: array(t).itemsize for t, _, _ in _TIPOS_ARRAY}
+
+# código -> operador (um código fora da tabela, inclusive negativo, é KeyError)
+_OPERADORES = dict(enumerate(OPERADORES))
+# classes que podem ocupar o lugar de uma expressão / de um comando ao remontar os nós
+_EXPS = frozenset((Const, Var, OpBin, Call))
+_COMANDOS = frozenset((Assign, IfStmt, WhileStmt, BlockStmt, ReturnStmt))
+# erros de remontar dados corrompidos (índices, iteradores e tipos fora do lugar)
+_ERROS_LEITURA = (IndexError, StopIteration, ValueError, KeyError, TypeError, AttributeError, struct.error)
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+# ---------- escrita ----------
+
+class EscritorBinario:
+    """Grava um Programa em 'arquivo' (aberto em modo binário), um registro por item."""
+
+    def __init__(self, arquivo: BinaryIO):
+        self.arquivo = arquivo
+        self.indices: Dict[Any, int] = {}   # id internado (ou texto de constante) -> índice no arquivo
+        self.novos: List[str] = []          # nomes ainda não gravados
+        arquivo.write(_CABECALHO.pack(MAGICA, VERSAO, 0))
+
+    def grava_programa(self, programa: Programa) -> None:
+        if programa.linhas is not None:
+            self.grava_linhas(programa.linhas)
+        for d in programa.var_decls:
+            self.grava_global(d)
+        for f in programa.fun_decls:
+            self.grava_funcao(f)
+        self.grava_main(programa.comandos, programa.resultado)
+        self.fecha()
+
+    def grava_linhas(self, linhas: IndiceLinhas) -> None:
+        coluna = _coluna(linhas.inicios)
+        self._registro(LINHAS, coluna.typecode.encode() + _bytes(coluna))
+
+    def grava_global(self, d: Decl) -> None:
+        self._item(GLOBAL, [d])
+
+    def grava_funcao(self, f: FunDecl) -> None:
+        self._item(FUNCAO, [f])
+
+    def grava_main(self, comandos: list, resultado) -> None:
+        self._item(MAIN, [*comandos, resultado], len(comandos))
+
+    def fecha(self) -> None:
+        self._registro(FIM, b'')
+
+    def _nome(self, id: int) -> int:
+        k = self.indices.get(id)
+        if k is None:
+            k = self.indices[id] = len(self.indices)
+            self.novos.append(IDENTIFICADORES.nomes[id])
+        return k
+
+    def _item(self, tipo: int, raizes: list, n_main: Optional[int] = None) -> None:
+        especies = bytearray()
+        campos: List[int] = []
+        nomes: List[int] = []
+        spans = ([], [])
+        for raiz in raizes:
+            self._codifica(raiz, especies, campos, nomes, spans)
+        if n_main is not None:
+            especies.append(PROGRAMA)
+            campos.append(n_main)
+        if self.novos:
+            # os nomes entram antes do primeiro item que os usa
+            self._registro(NOMES, '\0'.join(self.novos).encode('utf-8', 'surrogatepass'))
+            self.novos.clear()
+        colunas = [_coluna(valores) for valores in (campos, nomes, *spans)]
+        cabecalho = _ITEM.pack(len(especies), *map(len, colunas), ''.join(c.typecode for c in colunas).encode())
+        self._registro(tipo, b''.join((cabecalho, especies, *map(_bytes, colunas))))
+
+    def _codifica(self, raiz, especies: bytearray, campos: List[int], nomes: List[int], spans: tuple) -> None:
+        # pós-ordem com pilha explícita: (nó, espécie) marca que os filhos já foram gravados
+        nome = self._nome
+        linhas, posicoes = spans
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is not tuple:
+                k = _especie(no)
+                filhos = _filhos_no(no, k)
+                pilha.append((no, k))
+                pilha.extend(reversed(filhos))
+                continue
+            no, k = no
+            if k == CONST:
+                v = no.valor
+                if _MIN_Q <= v <= _MAX_Q:
+                    especies.append(CONST)
+                    campos.append(v)
+                else:
+                    especies.append(CONST_GRANDE)
+                    nomes.append(self._constante(v))
+                continue
+            especies.append(k)
+            if k == OPBIN:
+                campos.append(CODIGOS_OPERADORES[no.operador])
+                continue
+            if k == VAR or k == DECL or k == ASSIGN or k == CALL or k == RETURN or k == FUNDECL:
+                linhas.append(SEM if no.linha is None else no.linha)
+                posicoes.append(SEM if no.pos is None else no.pos)
+            if k == VAR or k == DECL or k == ASSIGN:
+                nomes.append(nome(no.id))
+            elif k == CALL:
+                nomes.append(nome(no.id))
+                campos.append(len(no.args))
+            elif k == RETURN:
+                pass
+            elif k == IF:
+                campos += (len(no.then_stmts), SEM if no.else_stmts is None else len(no.else_stmts))
+            elif k == WHILE:
+                campos.append(len(no.body))
+            elif k == BLOCO:
+                campos.append(len(no.stmts))
+            elif k == FUNDECL:
+                nomes.append(nome(no.id))
+                nomes += [nome(p) for p in no.param_ids]
+                campos += (len(no.param_ids), len(no.local_decls), len(no.comandos))
+                if hasattr(no, 'frame_size'):
+                    campos += (1, no.frame_size)
+                    for offsets in (no.param_offsets, no.local_offsets):
+                        campos.append(len(offsets))
+                        for id, off in offsets.items():
+                            nomes.append(nome(id))
+                            campos.append(off)
+                    pura = getattr(no, 'pura', None)
+                    campos.append(SEM if pura is None else int(pura))
+                else:
+                    campos.append(0)
+            else:
+                raise TypeError(f"nó sem representação no formato binário: {type(no).__name__}")
+
+    def _constante(self, v: int) -> int:
+        chave = ('const', v)
+        k = self.indices.get(chave)
+        if k is None:
+            k = self.indices[chave] = len(self.indices)
+            self.novos.append(str(v))
+        return k
+
+    def _registro(self, tipo: int, dados: bytes) -> None:
+        self.arquivo.write(_REGISTRO.pack(tipo, len(dados), _crc(tipo, len(dados), dados)))
+        self.arquivo.write(dados)
+
+
+def _crc(tipo: int, tamanho: int, dados: bytes) -> int:
+    return zlib.crc32(dados, zlib.crc32(_TIPO_TAMANHO.pack(tipo, tamanho)))
+
+
+def _coluna(valores: List[int]) -> array:
+    # coluna de inteiros no menor tipo de array em que todos cabem
+    menor = min(valores, default=0)
+    maior = max(valores, default=0)
+    return array(next(t for t, lo, hi in _TIPOS_ARRAY if lo <= menor and maior <= hi), valores)
+
+
+def _bytes(a: array) -> bytes:
+    if _TROCA_BYTES:
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _array(tipo: str, dados) -> array:
+    if len(tipo) != 1 or tipo not in 'bhiq':
+        raise FormatoInvalido(f"tipo de coluna inválido: {tipo!r}")
+    a = array(tipo)
+    a.frombytes(dados)
+    if _TROCA_BYTES:
+        a.byteswap()
+    return a
+
+
+def grava(programa: Programa, arquivo: BinaryIO) -> None:
+    EscritorBinario(arquivo).grava_programa(programa)
+
+
+def serializa(programa: Programa) -> bytes:
+    saida = io.BytesIO()
+    grava(programa, saida)
+    return saida.getvalue()
+
+
+# ---------- leitura ----------
+
+def le_itens(arquivo: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """
+    Lê o arquivo registro a registro e devolve (tipo, item) assim que cada item é decodificado:
+    (LINHAS, IndiceLinhas), (GLOBAL, Decl), (FUNCAO, FunDecl) e (MAIN, (comandos, resultado)).
+    """
+    cabecalho = arquivo.read(_CABECALHO.size)
+    if len(cabecalho) != _CABECALHO.size:
+        raise FormatoInvalido("arquivo binário FUN truncado (cabeçalho)")
+    magica, versao, _ = _CABECALHO.unpack(cabecalho)
+    if magica != MAGICA:
+        raise FormatoInvalido("não é um arquivo binário FUN")
+    if versao != VERSAO:
+        raise FormatoInvalido(f"versão {versao} do formato binário FUN não suportada (esperada {VERSAO})")
+    nomes: List[str] = []
+    ids: List[int] = []
+    constantes: Dict[int, Const] = {}
+    while True:
+        cab = arquivo.read(_REGISTRO.size)
+        if len(cab) != _REGISTRO.size:
+            raise FormatoInvalido("arquivo binário FUN truncado (sem registro FIM)")
+        tipo, tamanho, crc = _REGISTRO.unpack(cab)
+        dados = arquivo.read(tamanho)
+        if len(dados) != tamanho:
+            raise FormatoInvalido("arquivo binário FUN truncado")
+        if _crc(tipo, tamanho, dados) != crc:
+            raise FormatoInvalido("registro corrompido no arquivo binário FUN (crc32)")
+        if tipo == FIM:
+            return
+        try:
+            item = _le_registro(tipo, dados, nomes, ids, constantes)
+        except FormatoInvalido:
+            raise
+        except _ERROS_LEITURA as e:
+            raise FormatoInvalido(f"registro inválido no arquivo binário FUN: {e!r}") from None
+        if item is not None:
+            yield tipo, item
+
+
+def _le_registro(tipo: int, dados: bytes, nomes: List[str], ids: List[int], constantes: Dict[int, Const]):
+    # um registro: NOMES acrescenta aos nomes (None); os demais dão o item
+    if tipo == NOMES:
+        novos = dados.decode('utf-8', 'surrogatepass').split('\0')
+        nomes += novos
+        ids += [interna(n) for n in novos]
+        return None
+    if tipo == LINHAS:
+        linhas = IndiceLinhas()
+        linhas.inicios = array('q', _array(dados[:1].decode('ascii'), dados[1:]))
+        return linhas
+    if tipo not in (GLOBAL, FUNCAO, MAIN):
+        raise FormatoInvalido(f"tipo de registro desconhecido: {tipo}")
+    pilha = _decodifica(dados, nomes, ids, constantes)
+    esperado = {GLOBAL: Decl, FUNCAO: FunDecl, MAIN: tuple}[tipo]
+    if len(pilha) != 1 or type(pilha[0]) is not esperado:
+        raise FormatoInvalido("registro inválido no arquivo binário FUN")
+    return pilha[0]
+
+
+def _tira(pilha: list, n: int, classes) -> list:
+    # os n últimos da pilha, que precisam ser de uma das classes (expressões ou comandos)
+    if n < 0 or n > len(pilha):
+        raise FormatoInvalido("número de filhos inválido no arquivo binário FUN")
+    itens = pilha[len(pilha) - n:]
+    del pilha[len(pilha) - n:]
+    for x in itens:
+        if type(x) not in classes:
+            raise FormatoInvalido(f"nó {type(x).__name__} fora do lugar no arquivo binário FUN")
+    return itens
+
+
+def _topo(pilha: list, classes):
+    # o filho no topo da pilha (fica lá: o pai toma o lugar dele)
+    x = pilha[-1]
+    if type(x) not in classes:
+        raise FormatoInvalido(f"nó {type(x).__name__} fora do lugar no arquivo binário FUN")
+    return x
+
+
+def _decodifica(dados: bytes, nomes: List[str], ids: List[int], constantes: Dict[int, Const]) -> list:
+    # remonta os nós de um registro: cada nó tira os filhos do topo da pilha e entra no lugar deles
+    n, *quantidades, tipos = _ITEM.unpack_from(dados)
+    fim = _ITEM.size + n
+    especies = dados[_ITEM.size:fim]
+    colunas = []
+    for quantidade, tipo in zip(quantidades, tipos.decode()):
+        inicio, fim = fim, fim + quantidade * _TAMANHOS[tipo]
+        colunas.append(_array(tipo, dados[inicio:fim]))
+    if fim != len(dados):
+        raise FormatoInvalido("tamanho de registro inválido no arquivo binário FUN")
+    campos, indices, linhas, posicoes = colunas
+    # os índices de nomes de uma vez: no laço, nomes[i] e ids[i] não precisam de checagem
+    if indices and (min(indices) < 0 or max(indices) >= len(nomes)):
+        raise FormatoInvalido("índice de nome inválido no arquivo binário FUN")
+    # spans ausentes (-1) viram None aqui, fora do laço (nós do parser sempre têm span)
+    if SEM in linhas:
+        linhas = [None if v == SEM else v for v in linhas]
+    if SEM in posicoes:
+        posicoes = [None if v == SEM else v for v in posicoes]
+    prox = iter(campos).__next__
+    prox_nome = iter(indices).__next__
+    prox_linha = iter(linhas).__next__
+    prox_pos = iter(posicoes).__next__
+    pilha: list = []
+    empilha = pilha.append
+    exps = _EXPS
+    operadores = _OPERADORES
+    for k in especies:
+        # os casos comuns (VAR, OPBIN, CONST) com as checagens aqui dentro, sem chamadas a mais
+        if k == VAR:
+            i = prox_nome()
+            empilha(Var(nomes[i], prox_linha(), prox_pos(), ids[i]))
+        elif k == OPBIN:
+            direita = pilha.pop()
+            esquerda = pilha[-1]
+            if type(direita) not in exps or type(esquerda) not in exps:
+                raise FormatoInvalido("operando de OpBin fora do lugar no arquivo binário FUN")
+            pilha[-1] = OpBin(operadores[prox()], esquerda, direita)
+        elif k == CONST:
+            v = prox()
+            c = constantes.get(v)
+            if c is None:
+                c = constantes[v] = Const(v)
+            empilha(c)
+        elif k == ASSIGN or k == DECL:
+            i = prox_nome()
+            cls = Assign if k == ASSIGN else Decl
+            pilha[-1] = cls(nomes[i], _topo(pilha, _EXPS), prox_linha(), prox_pos(), id=ids[i])
+        elif k == CALL:
+            i = prox_nome()
+            args = _tira(pilha, prox(), _EXPS)
+            empilha(Call(nomes[i], args, prox_linha(), prox_pos(), id=ids[i]))
+        elif k == IF:
+            n_then = prox()
+            n_else = prox()
+            else_stmts = None if n_else == SEM else _tira(pilha, n_else, _COMANDOS)
+            then_stmts = _tira(pilha, n_then, _COMANDOS)
+            pilha[-1] = IfStmt(_topo(pilha, _EXPS), then_stmts, else_stmts)
+        elif k == WHILE:
+            corpo = _tira(pilha, prox(), _COMANDOS)
+            pilha[-1] = WhileStmt(_topo(pilha, _EXPS), corpo)
+        elif k == RETURN:
+            pilha[-1] = ReturnStmt(_topo(pilha, _EXPS), prox_linha(), prox_pos())
+        elif k == BLOCO:
+            empilha(BlockStmt(_tira(pilha, prox(), _COMANDOS)))
+        elif k == CONST_GRANDE:
+            empilha(Const(int(nomes[prox_nome()])))
+        elif k == FUNDECL:
+            empilha(_decodifica_funcao(pilha, prox, prox_nome, prox_linha(), prox_pos(), nomes, ids))
+        elif k == PROGRAMA:
+            n_cmds = prox()
+            resultado = _tira(pilha, 1, _EXPS)[0]
+            empilha((_tira(pilha, n_cmds, _COMANDOS), resultado))
+        else:
+            raise FormatoInvalido(f"espécie de nó desconhecida: {k}")
+    return pilha
+
+
+def _decodifica_funcao(pilha: list, prox, prox_nome, linha: int, pos: int, nomes: List[str],
+                       ids: List[int]) -> FunDecl:
+    i = prox_nome()
+    params = [prox_nome() for _ in range(prox())]
+    n_locais = prox()
+    n_cmds = prox()
+    resultado = _tira(pilha, 1, _EXPS)[0]
+    comandos = _tira(pilha, n_cmds, _COMANDOS)
+    locais = _tira(pilha, n_locais, (Decl,))
+    f = FunDecl(nomes[i], [nomes[p] for p in params], locais, comandos, resultado, linha, pos,
+                id=ids[i], param_ids=[ids[p] for p in params])
+    if prox():
+        # anotações da análise semântica (os mesmos atributos que build_symbol_table_and_offsets põe)
+        f.frame_size = prox()
+        f.param_offsets = {ids[prox_nome()]: prox() for _ in range(prox())}
+        f.local_offsets = {ids[prox_nome()]: prox() for _ in range(prox())}
+        f.num_params = len(params)
+        pura = prox()
+        if pura == 0 or pura == 1:
+            f.pura = pura == 1
+        elif pura != SEM:
+            raise FormatoInvalido(f"pureza inválida no arquivo binário FUN: {pura}")
+    return f
+
+
+def tabela_simbolos(programa: Programa) -> Dict[int, Any]:
+    # a symtab de build_symbol_table_and_offsets, refeita das anotações (offsets são os mesmos dicts)
+    symtab: Dict[int, Dict[str, Any]] = {}
+    for d in programa.var_decls:
+        symtab[d.id] = {'kind': 'var', 'name': d.nome}
+    for f in programa.fun_decls:
+        symtab[f.id] = {
+            'kind': 'fun',
+            'name': f.nome,
+            'num_params': len(f.params),
+            'params': list(f.params),
+            'param_offsets': f.param_offsets,
+            'local_offsets': f.local_offsets,
+            'frame_size': f.frame_size,
+        }
+    # a pureza gravada com as anotações; se faltar em alguma função, refeita sobre a AST
+    if all(hasattr(f, 'pura') for f in programa.fun_decls):
+        for f in programa.fun_decls:
+            symtab[f.id]['pura'] = f.pura
+    else:
+        marca_funcoes_puras(programa, symtab)
+    return symtab
+
+
+def carrega(arquivo: BinaryIO) -> Tuple[Programa, Dict[int, Any]]:
+    """(Programa, symtab) de um arquivo gravado com grava() a partir de um programa verificado."""
+    linhas = None
+    var_decls: List[Decl] = []
+    fun_decls: List[FunDecl] = []
+    main = None
+    # sem coletas do gc no meio da carga: só se criam nós, nenhum ciclo vira lixo aqui
+    gc_ligado = gc.isenabled()
+    gc.disable()
+    try:
+        for tipo, item in le_itens(arquivo):
+            if tipo == GLOBAL:
+                var_decls.append(item)
+            elif tipo == FUNCAO:
+                if not hasattr(item, 'frame_size'):
+                    raise FormatoInvalido(f"função '{item.nome}' sem anotações da análise semântica")
+                fun_decls.append(item)
+            elif tipo == MAIN:
+                main = item
+            elif tipo == LINHAS:
+                linhas = item
+    finally:
+        if gc_ligado:
+            gc.enable()
+    if main is None:
+        raise FormatoInvalido("arquivo binário FUN sem o main")
+    programa = Programa(var_decls, fun_decls, main[0], main[1], linhas)
+    return programa, tabela_simbolos(programa)
+
+
+def desserializa(dados: bytes) -> Tuple[Programa, Dict[int, Any]]:
+    return carrega(io.BytesIO(dados))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Uso: python serializadorBinario.py <arquivo.txt> <saida.funb>")
+        print("     python serializadorBinario.py --carrega <arquivo.funb>")
+        sys.exit(1)
+    if sys.argv[1] == '--carrega':
+        with open(sys.argv[2], 'rb') as f:
+            programa, _ = carrega(f)
+        print(programa)
+    else:
+        from analisadorLexico import AnalizadorLexico
+        from analisadorSintatico import Parser
+        from analisadorSemantico import build_symbol_table_and_offsets
+        with open(sys.argv[1], 'r') as f:
+            programa = Parser(AnalizadorLexico(f.read()).tokenizador()).parse()
+        build_symbol_table_and_offsets(programa)
+        with open(sys.argv[2], 'wb') as f:
+            grava(programa, f)
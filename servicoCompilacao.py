@@ -0,0 +1,435 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Serviço de compilação: um processo que fica no ar e atende pedidos de verificar, compilar e
+avaliar programas FUN, sem pagar a cada programa a partida do Python, o import do rich e o do
+compilador inteiro (como um 'python main.py' por programa).
+
+- Protocolo: JSON por linha, um pedido por linha e uma resposta por linha, com o id do pedido (as
+  respostas saem na ordem em que ficam prontas):
+      {"id": 1, "op": "avalia", "fonte": "main { return 1 + 2; }", "modo": "closures", "timeout": 5}
+      {"id": 1, "ok": true, "resultado": 3, "ms": 1.92, "ms_fila": 0.01, "ms_execucao": 0.41}
+  op "verifica" (léxico + parse + semântica: globais e funções, com aridade e pureza), "compila"
+  (o assembly de gerador.gera_codigo), "avalia" (modo "arvore", "closures", "bytecode" ou
+  "python"; padrão "bytecode"), "metricas" e "ping". Erro: {"id", "ok": false, "erro": tipo,
+  "mensagem"}.
+- Transporte: um socket Unix (--socket caminho; várias conexões, cada uma com vários pedidos em
+  andamento) ou stdin/stdout.
+- Execução: um ProcessPoolExecutor de processos aquecidos (spawn): cada processo importa este
+  módulo, que importa o compilador todo, e o initializer passa um programa pequeno por todas as
+  operações. Cada processo guarda os últimos programas verificados (LRU pela sha256 do fonte),
+  então o mesmo fonte não passa de novo pelo front-end, e é trocado por um novo a cada
+  TAREFAS_POR_PROCESSO pedidos (a memória não cresce com o número de programas distintos).
+- Limites: até max_concorrentes pedidos executando ao mesmo tempo (no máximo um por processo) e
+  até max_pendentes esperando por uma vaga; acima disso a resposta é "Ocupado" na hora. Cada
+  pedido tem um timeout (o do pedido, finito e até timeout_max): no processo, um setitimer
+  interrompe a execução (TimeoutError); se o processo não volta nem assim (preso em código C), os
+  processos do pool são encerrados e o pool é recriado, e os pedidos que estavam nele respondem
+  com erro.
+- Métricas: por op, pedidos, erros, timeouts, recusados e as latências (espera por vaga e total)
+  dos últimos JANELA pedidos, com p50/p90/p99/máx (op "metricas", e no stderr ao terminar).
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import signal
+import stat
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from analisadorSemantico import build_symbol_table_and_offsets
+from gerador import gera_codigo
+from helpers.arvore import Programa
+from interpretadorClosures import avalia_closures
+from maquinaVirtual import compila_bytecode
+from transpiladorPython import compila_python
+
+OPERACOES = ('verifica', 'compila', 'avalia')
+MODOS = ('arvore', 'closures', 'bytecode', 'python')
+MODO_PADRAO = 'bytecode'
+
+TIMEOUT_PADRAO = 10.0
+TIMEOUT_MAX = 60.0
+# folga do timeout no servidor além do timer do processo, antes de recriar o pool: cobre a partida
+# de um processo que substitui outro (reciclado, ou o pool recriado)
+FOLGA_TIMEOUT = 5.0
+MAX_PENDENTES = 256
+# latências guardadas por op para os percentis
+JANELA = 4096
+# programas verificados guardados por processo
+TAMANHO_CACHE = 64
+# pedidos por processo antes de trocá-lo por um novo: os caches dos back-ends têm limite, mas a
+# tabela de identificadores (helpers.simbolos.IDENTIFICADORES) só cresce
+TAREFAS_POR_PROCESSO = 1000
+# uma linha de pedido pode trazer um programa grande
+LIMITE_LINHA = 64 * 1024 * 1024
+
+AQUECIMENTO = """
+var g = 2;
+var i = 0;
+fun dobro(x) { var r = x * g; if (r > 10) { return r - 1; } return r; }
+main { while (i < 3) { g += dobro(i); i++; } return g; }
+"""
+
+
+# ---------- processos de trabalho ----------
+
+_PROGRAMAS: "OrderedDict[str, Tuple[Programa, Dict[int, Any]]]" = OrderedDict()
+
+
+def _programa(fonte: str) -> Tuple[Programa, Dict[int, Any]]:
+    # front-end com LRU por processo (o Programa verificado não muda ao ser avaliado)
+    chave = hashlib.sha256(fonte.encode('utf-8', 'surrogatepass')).hexdigest()
+    guardado = _PROGRAMAS.get(chave)
+    if guardado is not None:
+        _PROGRAMAS.move_to_end(chave)
+        return guardado
+    programa = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+    symtab = build_symbol_table_and_offsets(programa)
+    _PROGRAMAS[chave] = (programa, symtab)
+    if len(_PROGRAMAS) > TAMANHO_CACHE:
+        _PROGRAMAS.popitem(last=False)
+    return programa, symtab
+
+
+def _avalia(programa: Programa, symtab: Dict[int, Any], modo: str) -> int:
+    if modo == 'closures':
+        return avalia_closures(programa)
+    if modo == 'bytecode':
+        return compila_bytecode(programa, symtab).executa()
+    if modo == 'python':
+        return compila_python(programa, symtab).executa()
+    return programa.avaliador()
+
+
+def _tempo_esgotado(signum, frame):
+    raise TimeoutError()
+
+
+def _aquece() -> None:
+    # initializer de cada processo: os módulos já vieram com este; passa um programa pequeno por
+    # todas as operações e modos (fábricas de closures, objetos de código, ...). O Ctrl+C fica para
+    # o servidor, que encerra o pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    trabalha('verifica', AQUECIMENTO, MODO_PADRAO, None)
+    trabalha('compila', AQUECIMENTO, MODO_PADRAO, None)
+    for modo in MODOS:
+        trabalha('avalia', AQUECIMENTO, modo, None)
+    _PROGRAMAS.clear()
+
+
+def trabalha(op: str, fonte: str, modo: str, timeout: Optional[float]) -> Dict[str, Any]:
+    """Um pedido, no processo de trabalho: a resposta (sem o id), com o tempo de execução."""
+    inicio = time.perf_counter()
+    timer = timeout is not None and hasattr(signal, 'setitimer')
+    if timer:
+        signal.signal(signal.SIGALRM, _tempo_esgotado)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        programa, symtab = _programa(fonte)
+        if op == 'verifica':
+            resposta = {
+                'ok': True,
+                'globais': [d.nome for d in programa.var_decls],
+                'funcoes': [{'nome': f.nome, 'params': list(f.params), 'pura': bool(getattr(f, 'pura', False))}
+                            for f in programa.fun_decls],
+            }
+        elif op == 'compila':
+            resposta = {'ok': True, 'assembly': gera_codigo(programa)}
+        else:
+            resposta = {'ok': True, 'resultado': _avalia(programa, symtab, modo)}
+    except TimeoutError:
+        resposta = {'ok': False, 'erro': 'TimeoutError', 'mensagem': f"tempo esgotado ({timeout} s)"}
+    except Exception as e:
+        # erros do programa (léxicos, sintáticos, semânticos, de execução) são a resposta
+        resposta = {'ok': False, 'erro': type(e).__name__, 'mensagem': str(e)}
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    resposta['ms_execucao'] = round((time.perf_counter() - inicio) * 1000, 3)
+    return resposta
+
+
+# ---------- servidor ----------
+
+def _percentis(valores) -> Dict[str, float]:
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    return {
+        'p50': round(ordenados[(n - 1) // 2], 3),
+        'p90': round(ordenados[(n - 1) * 9 // 10], 3),
+        'p99': round(ordenados[(n - 1) * 99 // 100], 3),
+        'max': round(ordenados[-1], 3),
+    }
+
+
+class Metricas:
+    def __init__(self, janela: int = JANELA):
+        self.janela = janela
+        self.por_op: Dict[str, Dict[str, Any]] = {}
+
+    def _op(self, op: str) -> Dict[str, Any]:
+        m = self.por_op.get(op)
+        if m is None:
+            m = self.por_op[op] = {'pedidos': 0, 'erros': 0, 'timeouts': 0, 'recusados': 0,
+                                   'ms': deque(maxlen=self.janela), 'ms_fila': deque(maxlen=self.janela)}
+        return m
+
+    def registra(self, op: str, resposta: Dict[str, Any]) -> None:
+        m = self._op(op)
+        m['pedidos'] += 1
+        if not resposta.get('ok'):
+            m['erros'] += 1
+            if resposta.get('erro') == 'TimeoutError':
+                m['timeouts'] += 1
+            elif resposta.get('erro') == 'Ocupado':
+                m['recusados'] += 1
+        if 'ms' in resposta:
+            m['ms'].append(resposta['ms'])
+        if 'ms_fila' in resposta:
+            m['ms_fila'].append(resposta['ms_fila'])
+
+    def resumo(self) -> Dict[str, Any]:
+        return {op: {'pedidos': m['pedidos'], 'erros': m['erros'], 'timeouts': m['timeouts'],
+                     'recusados': m['recusados'], 'ms': _percentis(m['ms']),
+                     'ms_fila': _percentis(m['ms_fila'])}
+                for op, m in sorted(self.por_op.items())}
+
+
+class Servico:
+    def __init__(self, processos: Optional[int] = None, max_concorrentes: Optional[int] = None,
+                 max_pendentes: int = MAX_PENDENTES, timeout_padrao: float = TIMEOUT_PADRAO,
+                 timeout_max: float = TIMEOUT_MAX):
+        self.processos = processos or os.cpu_count() or 1
+        # no máximo um pedido por processo: o prazo do wait_for não inclui espera na fila do pool,
+        # e um pool ocupado não é tomado por preso
+        self.max_concorrentes = min(max_concorrentes or self.processos, self.processos)
+        self.max_pendentes = max_pendentes
+        self.timeout_padrao = timeout_padrao
+        self.timeout_max = timeout_max
+        self.pool = self._novo_pool()
+        self.vagas = asyncio.Semaphore(self.max_concorrentes)
+        self.pendentes = 0
+        self.metricas = Metricas()
+
+    def _novo_pool(self) -> ProcessPoolExecutor:
+        # spawn, não fork: o pool é criado (e recriado) com o servidor já rodando, e um fork
+        # enquanto outra thread segura um lock (o do sys.stdin, lido numa thread quando é um
+        # arquivo) deixaria o filho travado
+        return ProcessPoolExecutor(max_workers=self.processos, initializer=_aquece,
+                                   mp_context=multiprocessing.get_context('spawn'),
+                                   max_tasks_per_child=TAREFAS_POR_PROCESSO)
+
+    def _recria_pool(self, antigo: ProcessPoolExecutor) -> None:
+        # um processo não voltou do timeout: encerra os processos do pool e começa outro
+        if self.pool is not antigo:
+            return  # outro pedido já recriou
+        self.pool = self._novo_pool()
+        for p in list(getattr(antigo, '_processes', {}).values()):
+            p.terminate()
+        antigo.shutdown(wait=False, cancel_futures=True)
+
+    async def atende(self, pedido: Dict[str, Any]) -> Dict[str, Any]:
+        """A resposta de um pedido já decodificado (com o id dele, se veio)."""
+        chegada = time.perf_counter()
+        op = pedido.get('op')
+        resposta = await self._atende(op, pedido, chegada)
+        resposta['ms'] = round((time.perf_counter() - chegada) * 1000, 3)
+        if 'id' in pedido:
+            resposta = {'id': pedido['id'], **resposta}
+        self.metricas.registra(str(op), resposta)
+        return resposta
+
+    async def _atende(self, op, pedido: Dict[str, Any], chegada: float) -> Dict[str, Any]:
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'metricas':
+            return {'ok': True, 'metricas': self.metricas.resumo(), 'executando':
+                    self.max_concorrentes - self.vagas._value, 'pendentes': self.pendentes}
+        if op not in OPERACOES:
+            return {'ok': False, 'erro': 'ValueError', 'mensagem': f"op desconhecida: {op!r}"}
+        fonte = pedido.get('fonte')
+        if not isinstance(fonte, str):
+            return {'ok': False, 'erro': 'ValueError', 'mensagem': "pedido sem 'fonte' (texto do programa)"}
+        modo = pedido.get('modo', MODO_PADRAO)
+        if modo not in MODOS:
+            return {'ok': False, 'erro': 'ValueError', 'mensagem': f"modo desconhecido: {modo!r} (use {', '.join(MODOS)})"}
+        try:
+            timeout = min(float(pedido.get('timeout', self.timeout_padrao)), self.timeout_max)
+        except (TypeError, ValueError):
+            return {'ok': False, 'erro': 'ValueError', 'mensagem': "timeout precisa ser um número"}
+        if not math.isfinite(timeout) or timeout <= 0:
+            return {'ok': False, 'erro': 'ValueError', 'mensagem': "timeout precisa ser um número positivo e finito"}
+
+        if self.vagas.locked():
+            if self.pendentes >= self.max_pendentes:
+                return {'ok': False, 'erro': 'Ocupado', 'mensagem':
+                        f"{self.max_concorrentes} pedidos executando e {self.pendentes} esperando"}
+        self.pendentes += 1
+        try:
+            await self.vagas.acquire()
+        finally:
+            self.pendentes -= 1
+        try:
+            ms_fila = round((time.perf_counter() - chegada) * 1000, 3)
+            pool = self.pool
+            futuro = asyncio.get_running_loop().run_in_executor(pool, trabalha, op, fonte, modo, timeout)
+            try:
+                resposta = await asyncio.wait_for(futuro, timeout + FOLGA_TIMEOUT)
+            except asyncio.TimeoutError:
+                self._recria_pool(pool)
+                resposta = {'ok': False, 'erro': 'TimeoutError',
+                            'mensagem': f"tempo esgotado ({timeout} s); processos reiniciados"}
+            except BrokenProcessPool:
+                self._recria_pool(pool)
+                resposta = {'ok': False, 'erro': 'BrokenProcessPool',
+                            'mensagem': "processo de trabalho encerrado durante o pedido"}
+            resposta['ms_fila'] = ms_fila
+            return resposta
+        finally:
+            self.vagas.release()
+
+    async def linha(self, texto: str) -> str:
+        try:
+            pedido = json.loads(texto)
+            if not isinstance(pedido, dict):
+                raise ValueError("o pedido precisa ser um objeto JSON")
+        except ValueError as e:
+            resposta = {'ok': False, 'erro': 'JSONDecodeError', 'mensagem': str(e)}
+            self.metricas.registra('invalido', resposta)
+        else:
+            resposta = await self.atende(pedido)
+        return json.dumps(resposta, ensure_ascii=False)
+
+    async def _atende_fluxo(self, le, escreve) -> None:
+        # cada linha vira uma tarefa; as respostas saem quando ficam prontas
+        tarefas = set()
+
+        async def uma(texto: str):
+            await escreve(await self.linha(texto))
+
+        while True:
+            try:
+                dados = await le()
+            except ValueError:
+                await escreve(json.dumps({'ok': False, 'erro': 'ValueError',
+                                          'mensagem': f"linha maior que {LIMITE_LINHA} bytes"}))
+                break
+            if not dados:
+                break
+            texto = dados.decode('utf-8', 'replace').strip()
+            if not texto:
+                continue
+            tarefa = asyncio.ensure_future(uma(texto))
+            tarefas.add(tarefa)
+            tarefa.add_done_callback(tarefas.discard)
+        if tarefas:
+            await asyncio.gather(*tarefas)
+
+    async def conexao(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        trava = asyncio.Lock()
+
+        async def escreve(linha: str):
+            async with trava:
+                writer.write(linha.encode('utf-8') + b'\n')
+                await writer.drain()
+
+        try:
+            await self._atende_fluxo(reader.readline, escreve)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve_socket(self, caminho: str) -> None:
+        if os.path.exists(caminho):
+            os.unlink(caminho)
+        servidor = await asyncio.start_unix_server(self.conexao, path=caminho, limit=LIMITE_LINHA)
+        print(f"servicoCompilacao: ouvindo em {caminho} ({self.processos} processos)", file=sys.stderr)
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            if os.path.exists(caminho):
+                os.unlink(caminho)
+
+    async def serve_stdin(self) -> None:
+        loop = asyncio.get_running_loop()
+        if stat.S_ISREG(os.fstat(sys.stdin.fileno()).st_mode):
+            # um arquivo não serve para connect_read_pipe (e a leitura não fica parada): lê numa thread
+            async def le() -> bytes:
+                return await loop.run_in_executor(None, sys.stdin.buffer.readline)
+        else:
+            reader = asyncio.StreamReader(limit=LIMITE_LINHA)
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+            le = reader.readline
+
+        async def escreve(linha: str):
+            sys.stdout.write(linha + '\n')
+            sys.stdout.flush()
+
+        await self._atende_fluxo(le, escreve)
+
+    def fecha(self) -> None:
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+USO = ("Uso: python servicoCompilacao.py [--socket caminho] [--processos N] [--concorrentes N]\n"
+       "                                [--pendentes N] [--timeout segundos] [--timeout-max segundos]")
+
+
+def main(args) -> None:
+    opcoes: Dict[str, str] = {}
+    nomes = ('--socket', '--processos', '--concorrentes', '--pendentes', '--timeout', '--timeout-max')
+    i = 0
+    while i < len(args):
+        if args[i] not in nomes or i + 1 >= len(args):
+            print(USO)
+            sys.exit(1)
+        opcoes[args[i]] = args[i + 1]
+        i += 2
+    try:
+        processos = int(opcoes['--processos']) if '--processos' in opcoes else None
+        concorrentes = int(opcoes['--concorrentes']) if '--concorrentes' in opcoes else None
+        pendentes = int(opcoes.get('--pendentes', MAX_PENDENTES))
+        timeout = float(opcoes.get('--timeout', TIMEOUT_PADRAO))
+        timeout_max = float(opcoes.get('--timeout-max', TIMEOUT_MAX))
+    except ValueError:
+        print(USO)
+        sys.exit(1)
+
+    async def roda():
+        servico = Servico(processos, concorrentes, pendentes, timeout, timeout_max)
+        # SIGINT/SIGTERM cancelam o serviço: as métricas saem e o pool é encerrado
+        tarefa = asyncio.current_task()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sinal, tarefa.cancel)
+        try:
+            if '--socket' in opcoes:
+                await servico.serve_socket(opcoes['--socket'])
+            else:
+                await servico.serve_stdin()
+        finally:
+            print(json.dumps(servico.metricas.resumo(), ensure_ascii=False), file=sys.stderr)
+            servico.fecha()
+
+    try:
+        asyncio.run(roda())
+    except asyncio.CancelledError:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,507 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Compilação incremental: mantém o texto e o Programa de uma compilação em itens de topo ('var',
+'fun' e o 'main') e, a cada edição, reanalisa só os itens que a edição tocou.
+
+- Cada item guarda o seu pedaço do texto (os itens, em ordem, formam o texto inteiro) e o seu nó.
+  As posições/linhas dentro do nó valem relativas ao início do item, mais um deslocamento por item;
+  o deslocamento só é aplicado ao nó quando alguém o lê (Programa.var_decls/fun_decls são vistas
+  sobre a tabela de itens), então uma edição não anda pelos itens depois dela.
+- A tabela de itens fica em blocos com as somas de caracteres e de linhas de cada um: achar o item
+  de uma posição e trocar os itens reanalisados custa O(blocos + tamanho de um bloco), sem copiar a
+  tabela.
+- Léxico e sintático rodam só sobre o texto dos itens tocados (a janela); se o último token da
+  janela emendar no primeiro do item seguinte, a janela cresce um item e tenta de novo.
+- O main é o último item e volta posicionado a cada edição (Programa.comandos/resultado são listas
+  e nós comuns), então ele ainda custa o seu tamanho numa edição antes dele.
+"""
+
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser, ParserError
+from helpers.linhas import IndiceLinhas
+from helpers.arvore import Programa, Exp, Var, OpBin, Call
+from helpers.token import Token
+from helpers.token_tipos import PalavraReservada
+
+
+@dataclass
+class ItemTopo:
+    # declaração de topo, o seu pedaço do texto e a origem que as posições guardadas no nó supõem:
+    # posição no nó = posição no texto - início do item + origem_pos (idem para as linhas)
+    tipo: str          # 'var', 'fun' ou 'main'
+    no: object         # Decl, FunDecl ou (comandos, resultado) do main
+    texto: str
+    quebras: int       # texto.count('\n')
+    origem_pos: int
+    origem_linha: int
+
+
+def _posiciona(it: ItemTopo, inicio: int, linha: int):
+    # nó do item com as posições absolutas de agora (início do item e quebras de linha antes dele)
+    if it.origem_pos != inicio or it.origem_linha != linha:
+        it.no = desloca_posicoes(it.no, inicio - it.origem_pos, linha - it.origem_linha)
+        it.origem_pos, it.origem_linha = inicio, linha
+    return it.no
+
+
+def _pos(tok: Token) -> int:
+    return tok.pos
+
+
+# nomes de campos por classe de nó (fields() a cada visita domina o custo do deslocamento)
+_CAMPOS = {}
+
+
+def _campos(cls) -> tuple:
+    campos = _CAMPOS.get(cls)
+    if campos is None:
+        campos = tuple(c.name for c in fields(cls)) if is_dataclass(cls) else ()
+        _CAMPOS[cls] = campos
+    return campos
+
+
+def desloca_exp(raiz: Exp, dpos: int, dlinha: int) -> Exp:
+    # nós de expressão são imutáveis: a subárvore volta remontada (pós-ordem com pilha explícita);
+    # subárvores canônicas não têm linha/pos e são reaproveitadas como estão
+    feitos: List[Exp] = []
+    pilha: list = [raiz]
+    while pilha:
+        no = pilha.pop()
+        if type(no) is tuple:
+            no, n = no
+            filhos = feitos[len(feitos) - n:]
+            del feitos[len(feitos) - n:]
+            if isinstance(no, OpBin):
+                feitos.append(OpBin(no.operador, filhos[0], filhos[1]))
+            else:
+                feitos.append(Call(no.nome, filhos, _soma(no.linha, dlinha), _soma(no.pos, dpos), id=no.id))
+        elif no._forma is None:
+            feitos.append(no)
+        elif isinstance(no, Var):
+            feitos.append(Var(no.nome, _soma(no.linha, dlinha), _soma(no.pos, dpos), id=no.id))
+        else:
+            filhos = (no.opEsq, no.opDir) if isinstance(no, OpBin) else no.args
+            pilha.append((no, len(filhos)))
+            pilha.extend(reversed(filhos))
+    return feitos[-1]
+
+
+def _soma(valor: Optional[int], delta: int) -> Optional[int]:
+    return valor + delta if valor is not None else None
+
+
+def desloca_posicoes(no, dpos: int, dlinha: int):
+    # soma dpos/dlinha aos campos pos/linha de um nó e de todos os nós abaixo dele; devolve o nó
+    # (o mesmo objeto, ou o remontado se for uma expressão ou a tupla do main)
+    if isinstance(no, Exp):
+        return desloca_exp(no, dpos, dlinha)
+    if isinstance(no, tuple):
+        return tuple(desloca_posicoes(x, dpos, dlinha) for x in no)
+    pilha = [no]
+    while pilha:
+        atual = pilha.pop()
+        if isinstance(atual, list):
+            for i, valor in enumerate(atual):
+                if isinstance(valor, Exp):
+                    atual[i] = desloca_exp(valor, dpos, dlinha)
+                else:
+                    pilha.append(valor)
+            continue
+        for nome in _campos(type(atual)):
+            valor = getattr(atual, nome)
+            if valor is None or isinstance(valor, (int, str)):
+                if nome == 'pos' and valor is not None:
+                    atual.pos = valor + dpos
+                elif nome == 'linha' and valor is not None:
+                    atual.linha = valor + dlinha
+            elif isinstance(valor, Exp):
+                setattr(atual, nome, desloca_exp(valor, dpos, dlinha))
+            else:
+                pilha.append(valor)
+    return no
+
+
+# ---------- tabela de itens ----------
+BLOCO = 64
+
+# colunas das somas de cada bloco
+CARACTERES, QUEBRAS, VARS, FUNS = range(4)
+_COLUNA_TIPO = {'var': VARS, 'fun': FUNS}
+
+
+def _somas(itens: List[ItemTopo]) -> List[int]:
+    return [sum(len(it.texto) for it in itens), sum(it.quebras for it in itens),
+            sum(it.tipo == 'var' for it in itens), sum(it.tipo == 'fun' for it in itens)]
+
+
+class TabelaItens:
+    """
+    Itens de topo em blocos de BLOCO a 2*BLOCO itens (menos se a tabela toda for menor), com as
+    somas de cada bloco: caracteres, quebras de linha, 'var's e 'fun's. As buscas somam blocos
+    inteiros até achar o certo e só então andam dentro dele.
+    """
+    def __init__(self, itens: List[ItemTopo]):
+        self.blocos = [itens[i:i + BLOCO] for i in range(0, len(itens), BLOCO)]
+        self.somas = [_somas(b) for b in self.blocos]
+        self.total = [sum(coluna) for coluna in zip(*self.somas)]
+
+    def __len__(self) -> int:
+        return sum(map(len, self.blocos))
+
+    def __iter__(self) -> Iterator[Tuple[ItemTopo, int, int]]:
+        # (item, início, quebras de linha antes dele) em ordem
+        inicio = linha = 0
+        for bloco in self.blocos:
+            for it in bloco:
+                yield it, inicio, linha
+                inicio += len(it.texto)
+                linha += it.quebras
+
+    def localiza(self, pos: int) -> Tuple[int, int, int, int]:
+        # (bloco, índice no bloco, início, quebras antes) do item que contém pos (o último, se
+        # pos estiver no fim do texto)
+        inicio = linha = 0
+        ultimo = len(self.blocos) - 1
+        for j, soma in enumerate(self.somas):
+            if pos < inicio + soma[CARACTERES] or j == ultimo:
+                break
+            inicio += soma[CARACTERES]
+            linha += soma[QUEBRAS]
+        bloco = self.blocos[j]
+        for i, it in enumerate(bloco):
+            if pos < inicio + len(it.texto) or i == len(bloco) - 1:
+                break
+            inicio += len(it.texto)
+            linha += it.quebras
+        return j, i, inicio, linha
+
+    def item(self, j: int, i: int) -> ItemTopo:
+        return self.blocos[j][i]
+
+    def seguinte(self, j: int, i: int) -> Optional[Tuple[int, int]]:
+        if i + 1 < len(self.blocos[j]):
+            return j, i + 1
+        return (j + 1, 0) if j + 1 < len(self.blocos) else None
+
+    def trecho(self, j1: int, i1: int, j2: int, i2: int) -> List[ItemTopo]:
+        # itens de (j1, i1) a (j2, i2), inclusive
+        if j1 == j2:
+            return self.blocos[j1][i1:i2 + 1]
+        itens = self.blocos[j1][i1:]
+        for bloco in self.blocos[j1 + 1:j2]:
+            itens.extend(bloco)
+        itens.extend(self.blocos[j2][:i2 + 1])
+        return itens
+
+    def troca(self, j1: int, i1: int, j2: int, i2: int, novos: List[ItemTopo]) -> None:
+        # troca os itens de (j1, i1) a (j2, i2) por 'novos'; só os blocos j1..j2 (e o seguinte, se
+        # o que sobrar for pequeno) são remontados
+        blocos, somas = self.blocos, self.somas
+        itens = blocos[j1][:i1] + novos + blocos[j2][i2 + 1:]
+        if len(itens) < BLOCO and j2 + 1 < len(blocos):
+            j2 += 1
+            itens += blocos[j2]
+        # remonta em blocos de BLOCO a 2*BLOCO itens (um só, menor, se não houver itens para tanto)
+        pedacos = []
+        if itens:
+            partes = max(1, len(itens) // BLOCO)
+            passo, sobra = divmod(len(itens), partes)
+            k = 0
+            for p in range(partes):
+                n = passo + (p < sobra)
+                pedacos.append(itens[k:k + n])
+                k += n
+        novas = [_somas(b) for b in pedacos]
+        for soma in somas[j1:j2 + 1]:
+            for c, v in enumerate(soma):
+                self.total[c] -= v
+        for soma in novas:
+            for c, v in enumerate(soma):
+                self.total[c] += v
+        blocos[j1:j2 + 1] = pedacos
+        somas[j1:j2 + 1] = novas
+
+    def ultimo(self) -> Tuple[ItemTopo, int, int]:
+        it = self.blocos[-1][-1]
+        return it, self.total[CARACTERES] - len(it.texto), self.total[QUEBRAS] - it.quebras
+
+    def enesimo(self, tipo: str, k: int) -> Tuple[ItemTopo, int, int]:
+        # k-ésimo item do tipo ('var' ou 'fun'), com o seu início e as quebras antes dele
+        coluna = _COLUNA_TIPO[tipo]
+        inicio = linha = 0
+        for j, soma in enumerate(self.somas):
+            if k < soma[coluna]:
+                break
+            k -= soma[coluna]
+            inicio += soma[CARACTERES]
+            linha += soma[QUEBRAS]
+        else:
+            raise IndexError(k)
+        for it in self.blocos[j]:
+            if it.tipo == tipo:
+                if k == 0:
+                    return it, inicio, linha
+                k -= 1
+            inicio += len(it.texto)
+            linha += it.quebras
+        raise IndexError(k)
+
+    def inicio_linha(self, linha: int) -> int:
+        # posição onde começa a linha 'linha' (1 = primeira)
+        falta = linha - 1
+        inicio = 0
+        if falta <= 0:
+            return 0
+        for j, soma in enumerate(self.somas):
+            if falta <= soma[QUEBRAS]:
+                break
+            falta -= soma[QUEBRAS]
+            inicio += soma[CARACTERES]
+        else:
+            return inicio
+        for it in self.blocos[j]:
+            if falta <= it.quebras:
+                p = -1
+                for _ in range(falta):
+                    p = it.texto.index('\n', p + 1)
+                return inicio + p + 1
+            falta -= it.quebras
+            inicio += len(it.texto)
+        return inicio
+
+    def texto(self) -> str:
+        return ''.join(it.texto for bloco in self.blocos for it in bloco)
+
+
+class VistaItens(Sequence):
+    """
+    Programa.var_decls / fun_decls de uma sessão: os nós de um tipo de item, posicionados na hora
+    em que são lidos. Acompanha a sessão (depois de uma edição, mostra os itens novos).
+    """
+    def __init__(self, tabela: TabelaItens, tipo: str):
+        self.tabela = tabela
+        self.tipo = tipo
+
+    def __len__(self) -> int:
+        return self.tabela.total[_COLUNA_TIPO[self.tipo]]
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(len(self)))]
+        if k < 0:
+            k += len(self)
+        if not 0 <= k < len(self):
+            raise IndexError(k)
+        return _posiciona(*self.tabela.enesimo(self.tipo, k))
+
+    def __iter__(self):
+        tipo = self.tipo
+        for it, inicio, linha in self.tabela:
+            if it.tipo == tipo:
+                yield _posiciona(it, inicio, linha)
+
+    def __eq__(self, outro):
+        if isinstance(outro, Sequence) and not isinstance(outro, str):
+            return list(self) == list(outro)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class LinhasSessao:
+    """
+    Índice de linhas (mesma interface de IndiceLinhas) do texto de uma sessão, tirado da tabela de
+    itens: acha o item da posição e conta as quebras dentro dele.
+    """
+    def __init__(self, tabela: TabelaItens):
+        self.tabela = tabela
+
+    def linha(self, pos: int) -> int:
+        j, i, inicio, linha = self.tabela.localiza(pos)
+        return linha + self.tabela.item(j, i).texto.count('\n', 0, max(pos - inicio, 0)) + 1
+
+    def coluna(self, pos: int) -> int:
+        return pos - self.tabela.inicio_linha(self.linha(pos)) + 1
+
+    def localiza(self, pos: int) -> Tuple[int, int]:
+        linha = self.linha(pos)
+        return linha, pos - self.tabela.inicio_linha(linha) + 1
+
+    def __len__(self) -> int:
+        return self.tabela.total[QUEBRAS] + 1
+
+    @property
+    def inicios(self):
+        # o array de IndiceLinhas, montado do texto inteiro (serializadorBinario.grava_linhas)
+        return IndiceLinhas(self.tabela.texto()).inicios
+
+
+def _tokens_janela(janela: str, seguinte: Optional[str]) -> Optional[List[Token]]:
+    # tokens da janela, com posições e linhas relativas a ela; com o texto do item seguinte, confere
+    # que um token começa exatamente no fim da janela (senão devolve None: a janela precisa crescer)
+    if seguinte is None:
+        return AnalizadorLexico(janela).tokenizador()
+    fim = len(janela)
+    tokens: List[Token] = []
+    for tok in AnalizadorLexico(janela + seguinte, IndiceLinhas(janela)).varre():
+        if tok.pos >= fim:
+            return tokens if tok.pos == fim else None
+        tokens.append(tok)
+    return None
+
+
+def _parse_janela(tokens, janela: str) -> List[ItemTopo]:
+    # parseia os itens de topo de uma janela; o primeiro começa no início dela e cada um vai até o
+    # começo do seguinte. O 'main' exige o EOF logo depois, então só fecha a janela que vai até o fim.
+    parser = Parser(tokens)
+    tipos, nos, inicios = [], [], []
+    while parser.pos < len(tokens):
+        tok = parser.get()
+        inicios.append(tok.pos if inicios else 0)
+        if tok.tipo == PalavraReservada.VAR:
+            tipos.append('var')
+            nos.append(parser.parse_var_decl())
+        elif tok.tipo == PalavraReservada.FUN:
+            tipos.append('fun')
+            nos.append(parser.parse_fun_decl())
+        else:
+            tipos.append('main')
+            nos.append(parser.parse_main())
+    inicios.append(len(janela))
+    itens: List[ItemTopo] = []
+    linha = 0
+    for k, (tipo, no) in enumerate(zip(tipos, nos)):
+        texto = janela[inicios[k]:inicios[k + 1]]
+        quebras = texto.count('\n')
+        itens.append(ItemTopo(tipo, no, texto, quebras, inicios[k], linha))
+        linha += quebras
+    return itens
+
+
+class SessaoIncremental:
+    def __init__(self, texto: str, tokens: Optional[List[Token]] = None, programa: Optional[Programa] = None):
+        # sem tabela (None), a sessão guarda só o texto: a próxima edição parseia tudo
+        self.itens: Optional[TabelaItens] = None
+        self._texto = texto
+        self.programa = None
+        # números da última edição (para medir o quanto foi reaproveitado)
+        self.estatisticas = {}
+        if programa is not None:
+            if tokens is None:
+                tokens = AnalizadorLexico(texto).tokenizador()
+            self.itens = TabelaItens(self._itens_do_programa(texto, tokens, programa))
+            self._texto = None
+            self.programa = programa
+        elif tokens is not None:
+            self.itens = TabelaItens(_parse_janela(tokens, texto))
+            self._texto = None
+            self.programa = self._monta_programa()
+        else:
+            self.programa = self._parse_tudo(texto)
+
+    @property
+    def texto(self) -> str:
+        # montado dos itens a cada leitura (a sessão não guarda o texto inteiro)
+        return self._texto if self.itens is None else self.itens.texto()
+
+    # ---------- montagem dos itens de topo ----------
+    def _itens_do_programa(self, texto: str, tokens, programa: Programa) -> List[ItemTopo]:
+        # recupera os itens de um Programa já pronto: o nome da declaração está em no.pos, então o
+        # 'var'/'fun' é o token anterior; cada item vai até o início do seguinte
+        decls = [('var', d) for d in programa.var_decls] + [('fun', f) for f in programa.fun_decls]
+        inicios = []
+        for tipo, no in decls:
+            inicios.append((bisect_left(tokens, no.pos, key=_pos) - 1, tipo, no))
+        inicios.sort(key=lambda t: t[0])
+        # o main começa no primeiro 'main' depois da última declaração
+        ini_main = inicios[-1][0] if inicios else 0
+        while tokens[ini_main].tipo != PalavraReservada.MAIN:
+            ini_main += 1
+        inicios.append((ini_main, 'main', (programa.comandos, programa.resultado)))
+        itens = []
+        linha = 0
+        for k, (ini, tipo, no) in enumerate(inicios):
+            a = tokens[ini].pos if k else 0
+            b = tokens[inicios[k + 1][0]].pos if k + 1 < len(inicios) else len(texto)
+            pedaco = texto[a:b]
+            # as posições do Programa já são absolutas: origem = início do próprio item
+            itens.append(ItemTopo(tipo, no, pedaco, pedaco.count('\n'), a, linha))
+            linha += itens[-1].quebras
+        return itens
+
+    def _monta_programa(self) -> Programa:
+        tabela = self.itens
+        comandos, resultado = _posiciona(*tabela.ultimo())
+        return Programa(VistaItens(tabela, 'var'), VistaItens(tabela, 'fun'), comandos, resultado,
+                        linhas=LinhasSessao(tabela))
+
+    def _parse_tudo(self, texto: str) -> Programa:
+        self.itens = None
+        self._texto = texto
+        self.itens = TabelaItens(_parse_janela(_tokens_janela(texto, None), texto))
+        self._texto = None
+        return self._monta_programa()
+
+    # ---------- edição ----------
+    def edita(self, inicio: int, fim: int, novo: str) -> Programa:
+        """
+        Substitui texto[inicio:fim] por 'novo' e devolve o Programa atualizado.
+        Se a nova versão tiver erro sintático, o ParserError sobe (o do parse completo, com as
+        linhas certas) e a próxima edição parseia tudo.
+        """
+        tabela = self.itens
+        if tabela is None:
+            texto = self._texto
+            self.programa = None
+            self.programa = self._parse_tudo(texto[:inicio] + novo + texto[fim:])
+            self.estatisticas = {'itens_reparseados': len(self.itens)}
+            return self.programa
+
+        # 1) janela: do item com o caractere antes da edição (um token dele pode emendar no texto
+        #    novo) até o item com texto[fim]
+        j1, i1, ini_janela, _ = tabela.localiza(max(inicio - 1, 0))
+        j2, i2, _, _ = tabela.localiza(fim)
+        antigo = ''.join(it.texto for it in tabela.trecho(j1, i1, j2, i2))
+        janela = antigo[:inicio - ini_janela] + novo + antigo[fim - ini_janela:]
+        while True:
+            prox = tabela.seguinte(j2, i2)
+            seguinte = tabela.item(*prox).texto if prox is not None else None
+            tokens = _tokens_janela(janela, seguinte)
+            if tokens is not None:
+                break
+            j2, i2 = prox
+            janela += seguinte
+
+        # 2) sintático só na janela; os itens fora dela ficam como estão (os de depois só andam de
+        #    origem, e isso é aplicado quando forem lidos)
+        try:
+            novos = _parse_janela(tokens, janela)
+        except ParserError:
+            texto = self.texto
+            self.itens = None
+            self.programa = None
+            self.programa = self._parse_tudo(texto[:inicio] + novo + texto[fim:])
+            self.estatisticas = {'itens_reparseados': len(self.itens)}
+            return self.programa
+        # as posições dos nós novos são relativas à janela: origem = início do item dentro dela
+        n_antigos = len(tabela)
+        trocados = len(tabela.trecho(j1, i1, j2, i2))
+        tabela.troca(j1, i1, j2, i2, novos)
+        self.estatisticas = {
+            'tokens_relexados': len(tokens),
+            'delta_pos': len(novo) - (fim - inicio),
+            'delta_linha': novo.count('\n') - antigo.count('\n', inicio - ini_janela, fim - ini_janela),
+            'itens_reparseados': len(novos),
+            'itens_reaproveitados': n_antigos - trocados,
+        }
+        self.programa = self._monta_programa()
+        return self.programa
@@ -0,0 +1,110 @@
+# João Victor Lourenço da Silva (20220005997)
+# tests/test_cacheCompilacao.py
+"""
+Entradas corrompidas no cache do front-end: CacheCompilacao.compila descarta a entrada, compila o
+fonte de novo e grava a entrada certa no lugar. E a versão do compilador na chave cobre todos os
+módulos do repositório que o front-end carrega.
+Uso: python -m pytest tests  (ou python -m unittest discover tests)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cacheCompilacao import MODULOS_COMPILADOR, CacheCompilacao, chave
+from serializadorBinario import serializa
+
+FONTE = """
+var g = 7;
+fun f(n) {
+  var s = 0;
+  while (n > 0) { if ((n % 2) == 0) { s += n; } else { s -= 1; } n--; }
+  return s + g;
+}
+main { g = f(10) + g; return g; }
+"""
+
+
+class TestEntradaCorrompida(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.cache = CacheCompilacao(self._dir.name)
+        self.programa, _ = self.cache.compila(FONTE)
+        self.caminho = self.cache._caminho(chave(FONTE))
+        with open(self.caminho, 'rb') as f:
+            self.entrada = f.read()
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def confere_recompila(self, corrompida: bytes):
+        with open(self.caminho, 'wb') as f:
+            f.write(corrompida)
+        programa, _ = self.cache.compila(FONTE)
+        self.assertEqual(repr(programa), repr(self.programa))
+        self.assertEqual(programa.avaliador(), self.programa.avaliador())
+        self.assertEqual(self.cache.estatisticas['faltas'], 2)
+        self.assertEqual(self.cache.estatisticas['gravacoes'], 2)
+        # a entrada foi regravada e volta a dar acerto
+        with open(self.caminho, 'rb') as f:
+            self.assertEqual(f.read(), self.entrada)
+        self.cache.compila(FONTE)
+        self.assertEqual(self.cache.estatisticas['acertos'], 1)
+
+    def test_entrada_igual_ao_formato_binario(self):
+        self.assertEqual(self.entrada, serializa(self.programa))
+
+    def test_byte_trocado(self):
+        # um bit trocado em cada posição depois do cabeçalho
+        for i in range(8, len(self.entrada), 7):
+            with self.subTest(posicao=i):
+                corrompida = bytearray(self.entrada)
+                corrompida[i] ^= 0x10
+                self.cache.estatisticas.update(acertos=0, faltas=1, gravacoes=1)
+                self.confere_recompila(bytes(corrompida))
+
+    def test_entrada_truncada(self):
+        for tamanho in (0, 3, 8, len(self.entrada) // 2, len(self.entrada) - 1):
+            with self.subTest(tamanho=tamanho):
+                self.cache.estatisticas.update(acertos=0, faltas=1, gravacoes=1)
+                self.confere_recompila(self.entrada[:tamanho])
+
+    def test_outro_formato(self):
+        self.confere_recompila(b'isto nao e um arquivo FUNB')
+
+
+# num processo novo: importa o cache, compila FONTE com e sem ele (imports feitos dentro de funções
+# também contam) e lista os módulos do repositório carregados
+MODULOS_CARREGADOS = """
+import json, os, sys, tempfile
+raiz = os.getcwd()
+from cacheCompilacao import CacheCompilacao, compila_sem_cache
+fonte = sys.stdin.read()
+compila_sem_cache(fonte)[0].verifica_semantica()
+with tempfile.TemporaryDirectory() as pasta:
+    CacheCompilacao(pasta).compila(fonte)
+    CacheCompilacao(pasta).compila(fonte)
+print(json.dumps(sorted(nome for nome, m in sys.modules.items()
+                        if (getattr(m, '__file__', None) or '').startswith(raiz + os.sep)
+                        and not m.__file__.endswith('__init__.py'))))
+"""
+
+
+class TestVersaoCompilador(unittest.TestCase):
+    def test_modulos_do_front_end_na_versao(self):
+        # um módulo do front-end fora de MODULOS_COMPILADOR muda sem invalidar as entradas
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        saida = subprocess.run([sys.executable, "-c", MODULOS_CARREGADOS], input=FONTE, cwd=raiz,
+                               capture_output=True, text=True, check=True).stdout
+        carregados = set(json.loads(saida))
+        self.assertIn('cacheCompilacao', carregados)
+        self.assertEqual(carregados - set(MODULOS_COMPILADOR), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
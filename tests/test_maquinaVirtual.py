@@ -0,0 +1,61 @@
+# João Victor Lourenço da Silva (20220005997)
+# tests/test_maquinaVirtual.py
+"""
+Profundidade das chamadas na máquina de pilha: uma recursão sem fim para em RecursionError (com a
+mensagem do Python, como Programa.avaliador()) em vez de crescer 'quadros' até acabar a memória, e
+o limite acompanha sys.getrecursionlimit().
+Uso: python -m pytest tests  (ou python -m unittest discover tests)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analisadorLexico import AnalizadorLexico
+from analisadorSintatico import Parser
+from maquinaVirtual import avalia_bytecode
+
+SEM_FIM = """
+fun f(n) { return 1 + f(n + 1); }
+main { return f(0); }
+"""
+
+PROFUNDA = """
+fun f(n) { var r = 0; if (n > 0) { r = 1 + f(n - 1); } return r; }
+main { return f(%d); }
+"""
+
+
+def programa(fonte: str):
+    p = Parser(AnalizadorLexico(fonte).tokenizador()).parse()
+    p.verifica_semantica()
+    return p
+
+
+class TestProfundidade(unittest.TestCase):
+    def setUp(self):
+        self.limite = sys.getrecursionlimit()
+
+    def tearDown(self):
+        sys.setrecursionlimit(self.limite)
+
+    def test_recursao_sem_fim(self):
+        with self.assertRaisesRegex(RecursionError, "maximum recursion depth exceeded"):
+            avalia_bytecode(programa(SEM_FIM))
+
+    def test_abaixo_do_limite(self):
+        n = self.limite - 1
+        self.assertEqual(avalia_bytecode(programa(PROFUNDA % n)), n)
+
+    def test_limite_acompanha_recursionlimit(self):
+        n = self.limite * 4
+        with self.assertRaises(RecursionError):
+            avalia_bytecode(programa(PROFUNDA % n))
+        sys.setrecursionlimit(n + 1)
+        self.assertEqual(avalia_bytecode(programa(PROFUNDA % n)), n)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,336 @@
+# João Victor Lourenço da Silva (20220005997)
+
+"""
+Transpilador FUN -> Python: o Programa verificado vira código-fonte Python (cada FunDecl um def,
+cada WhileStmt um while, as globais nomes do módulo, o main a função _main), compilado com
+compile() e executado com exec, então a execução fica no laço de avaliação do próprio CPython.
+Os objetos de código ficam guardados pelo sha256 do fonte gerado.
+
+- Nomes: globais viram v_<nome>, parâmetros e locais l_<nome> e funções f_<nome> (o léxico não
+  aceita '_' em identificadores, então não há colisão com os nomes do gerador nem com palavras-chave
+  do Python). Com prefixos diferentes, uma global lida no inicializador de uma local de mesmo nome
+  (declarada depois) continua sendo a global, como no Quadro de avaliador().
+- Divisão e resto são // e %, como em Programa.avaliador(); com divisor que não seja uma
+  constante diferente de zero, passam por _divide/_resto, que levantam o mesmo ZeroDivisionError.
+  Comparações dão 1/0 ('(1 if a < b else 0)'), menos na condição de if/while.
+- As globais são as do módulo, compartilhadas por todas as chamadas como o armazenamento de
+  globais de avaliador(): um def que atribui a uma global a declara 'global'.
+- Expressões mais fundas que LIMITE_PROFUNDIDADE (cadeias a + b + c + ...) são quebradas em
+  temporárias (_t0 = ...) antes do comando, na ordem de avaliação, para o compile() do Python
+  não estourar o limite de aninhamento.
+"""
+
+import hashlib
+import sys
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from analisadorSemantico import build_symbol_table_and_offsets
+from helpers.arvore import (
+    Exp, Stmt, FunDecl, Programa, especie, _divide, _resto,
+    CONST, VAR, OPBIN, CALL, ASSIGN, IF, WHILE, BLOCO, RETURN,
+)
+from helpers.token_tipos import Operadores
+from helpers.visitante import VisitanteComandos
+
+# acima disso, a subexpressão vai para uma temporária (ver _Transpilador.exp)
+LIMITE_PROFUNDIDADE = 50
+
+_COMPARACOES = {
+    Operadores.MENOR: '<',
+    Operadores.MAIOR: '>',
+    Operadores.IGUAL_IGUAL: '==',
+    Operadores.MENOR_IGUAL: '<=',
+    Operadores.MAIOR_IGUAL: '>=',
+    Operadores.DIFERENTE: '!=',
+}
+
+MOLDES = {
+    Operadores.SOMA: '({} + {})',
+    Operadores.SUBTRACAO: '({} - {})',
+    Operadores.MULTIPLIC: '({} * {})',
+    Operadores.DIVISAO: '_divide({}, {})',
+    Operadores.RESTO: '_resto({}, {})',
+    **{op: f'(1 if {{}} {s} {{}} else 0)' for op, s in _COMPARACOES.items()},
+}
+# divisor constante diferente de zero: o operador do Python direto
+MOLDES_DIVISOR = {
+    Operadores.DIVISAO: '({} // {})',
+    Operadores.RESTO: '({} % {})',
+}
+# comparação na condição de if/while: só a verdade importa
+MOLDES_CONDICAO = {op: f'{{}} {s} {{}}' for op, s in _COMPARACOES.items()}
+
+
+def _erro(mensagem: str) -> int:
+    # nome não resolvido num ponto que avaliador() só rejeita ao executar
+    raise NameError(mensagem)
+
+
+# nomes que o código gerado usa além das funções e globais dele
+_AMBIENTE = {'_divide': _divide, '_resto': _resto, '_erro': _erro}
+
+# sha256 do fonte -> objeto de código (LRU: um processo que fica no ar não cresce a cada programa)
+_CODIGOS: "OrderedDict[str, CodeType]" = OrderedDict()
+MAX_CODIGOS = 256
+
+
+def codigo_de(fonte: str) -> CodeType:
+    chave = hashlib.sha256(fonte.encode('utf-8')).hexdigest()
+    codigo = _CODIGOS.get(chave)
+    if codigo is None:
+        codigo = _CODIGOS[chave] = compile(fonte, f'<fun {chave[:12]}>', 'exec')
+        if len(_CODIGOS) > MAX_CODIGOS:
+            _CODIGOS.popitem(last=False)
+    else:
+        _CODIGOS.move_to_end(chave)
+    return codigo
+
+
+class ProgramaPython:
+    def __init__(self, fonte: str):
+        self.fonte = fonte
+        self.codigo = codigo_de(fonte)
+
+    def executa(self) -> int:
+        """O mesmo que Programa.avaliador(): um módulo novo (globais zeradas) a cada execução."""
+        modulo = dict(_AMBIENTE)
+        exec(self.codigo, modulo)
+        return modulo['_main']()
+
+
+class _Atribuidos(VisitanteComandos):
+    # nomes (id -> nome) atribuídos (Assign) nos comandos
+    def de(self, comandos: Sequence[Stmt]) -> Dict[int, str]:
+        self.nomes: Dict[int, str] = {}
+        for s in comandos:
+            self.percorre(s)
+        return self.nomes
+
+    def visita_Assign(self, s):
+        self.nomes[s.id] = s.nome
+        return (s.expr,)
+
+
+class _Transpilador:
+    def __init__(self, programa: Programa):
+        self.funcoes: Dict[int, FunDecl] = {f.id: f for f in programa.fun_decls}
+        self.globais: Set[int] = set()          # globais já declaradas
+        self.visiveis: Set[int] = set()         # parâmetros e locais do def sendo gerado
+        self.chamaveis: Dict[int, FunDecl] = {}
+        self.n_temporarias = 0
+
+    def nome_var(self, no) -> Optional[str]:
+        if no.id in self.visiveis:
+            return 'l_' + no.nome
+        if no.id in self.globais:
+            return 'v_' + no.nome
+        return None
+
+    # ---------- expressões ----------
+
+    def exp(self, raiz: Exp, antes: List[str], condicao: bool = False) -> str:
+        """
+        Texto da expressão (pós-ordem com pilha explícita). Subexpressões fundas vão para
+        temporárias, em 'antes', junto com as já prontas à esquerda delas (ordem de avaliação).
+        """
+        # valores: (texto, profundidade, simples); simples = constante ou variável
+        valores: List[Tuple[str, int, bool]] = []
+        pilha: list = [raiz]
+        while pilha:
+            no = pilha.pop()
+            if type(no) is tuple:
+                acao, no = no
+                if acao == 'op':
+                    b = valores.pop()
+                    a = valores.pop()
+                    molde = (condicao and no is raiz and MOLDES_CONDICAO.get(no.operador)) \
+                        or MOLDES.get(no.operador)
+                    if especie(type(no.opDir)) == CONST and no.opDir.valor != 0:
+                        molde = MOLDES_DIVISOR.get(no.operador, molde)
+                    if molde is None:
+                        raise ValueError(f"Operador desconhecido: {no.operador}")
+                    valores.append((molde.format(a[0], b[0]), 1 + max(a[1], b[1]), False))
+                else:
+                    n = len(no.args)
+                    args = valores[len(valores) - n:]
+                    del valores[len(valores) - n:]
+                    textos = [a[0] for a in args]
+                    prof = 1 + max((a[1] for a in args), default=0)
+                    valores.append((f"f_{no.nome}({', '.join(textos)})", prof, False))
+                if valores[-1][1] > LIMITE_PROFUNDIDADE:
+                    self.derrama(valores, antes)
+                continue
+            k = especie(type(no))
+            if k == CONST:
+                valores.append((str(no.valor) if no.valor >= 0 else f'({no.valor})', 1, True))
+            elif k == VAR:
+                nome = self.nome_var(no)
+                if nome is None:
+                    valores.append((f"_erro({no.erro_nao_declarada()!r})", 1, False))
+                else:
+                    valores.append((nome, 1, True))
+            elif k == OPBIN:
+                pilha += (('op', no), no.opDir, no.opEsq)
+            elif k == CALL:
+                try:
+                    f = no.destino(self.chamaveis)
+                except NameError as e:
+                    # avaliador() levanta antes de avaliar os argumentos
+                    valores.append((f"_erro({str(e)!r})", 1, False))
+                    continue
+                if len(no.args) != len(f.params):
+                    raise TypeError(f"Erro semântico: chamada para '{no.nome}' com número errado de argumentos (esperado {len(f.params)}, encontrado {len(no.args)})")
+                pilha.append(('chama', no))
+                pilha.extend(reversed(no.args))
+            else:
+                raise TypeError(f"expressão não suportada: {no!r}")
+        return valores[-1][0]
+
+    def derrama(self, valores: List[Tuple[str, int, bool]], antes: List[str]) -> None:
+        for i, (texto, _, simples) in enumerate(valores):
+            if not simples:
+                nome = f"_t{self.n_temporarias}"
+                self.n_temporarias += 1
+                antes.append(f"{nome} = {texto}")
+                valores[i] = (nome, 1, True)
+
+    # ---------- comandos ----------
+
+    def comandos(self, comandos: Sequence[Stmt], nivel: int, linhas: List[str]) -> None:
+        # pilha de (comando ou linha pronta, nível de indentação)
+        pilha: list = [(s, nivel) for s in reversed(comandos)]
+        while pilha:
+            s, n = pilha.pop()
+            recuo = '    ' * n
+            if type(s) is str:
+                linhas.append(recuo + s)
+                continue
+            antes: List[str] = []
+            k = especie(type(s))
+            if k == ASSIGN:
+                alvo = self.nome_var(s)
+                if alvo is None:
+                    ln = s.linha if s.linha is not None else '?'
+                    ps = s.pos if s.pos is not None else '?'
+                    mensagem = f"Erro semântico: atribuição para variável não declarada '{s.nome}' (linha {ln}, pos {ps})"
+                    linhas.append(f"{recuo}_erro({mensagem!r})")
+                    continue
+                texto = self.exp(s.expr, antes)
+                linhas += [recuo + a for a in antes]
+                linhas.append(f"{recuo}{alvo} = {texto}")
+            elif k == IF:
+                texto = self.exp(s.cond, antes, condicao=True)
+                linhas += [recuo + a for a in antes]
+                linhas.append(f"{recuo}if {texto}:")
+                # cada bloco começa com 'pass': um ramo só com blocos vazios não gera linhas
+                if s.else_stmts is not None:
+                    pilha += [(x, n + 1) for x in reversed(s.else_stmts)]
+                    pilha += [('pass', n + 1), ('else:', n)]
+                pilha += [(x, n + 1) for x in reversed(s.then_stmts)]
+                pilha.append(('pass', n + 1))
+            elif k == WHILE:
+                texto = self.exp(s.cond, antes, condicao=True)
+                if antes:
+                    # as temporárias da condição são recalculadas a cada volta
+                    linhas.append(f"{recuo}while True:")
+                    linhas += [recuo + '    ' + a for a in antes]
+                    linhas.append(f"{recuo}    if not ({texto}):")
+                    linhas.append(f"{recuo}        break")
+                    pilha += [(x, n + 1) for x in reversed(s.body)]
+                else:
+                    linhas.append(f"{recuo}while {texto}:")
+                    pilha += [(x, n + 1) for x in reversed(s.body)]
+                    pilha.append(('pass', n + 1))
+            elif k == BLOCO:
+                pilha += [(x, n) for x in reversed(s.stmts)]
+            elif k == RETURN:
+                texto = self.exp(s.expr, antes)
+                linhas += [recuo + a for a in antes]
+                linhas.append(f"{recuo}return {texto}")
+            else:
+                raise TypeError(f"comando não suportado: {s!r}")
+
+    def retorno(self, e: Exp, linhas: List[str]) -> None:
+        antes: List[str] = []
+        texto = self.exp(e, antes)
+        linhas += ['    ' + a for a in antes]
+        linhas.append(f"    return {texto}")
+
+    def funcao(self, f: FunDecl, linhas: List[str]) -> None:
+        linhas.append(f"def f_{f.nome}({', '.join('l_' + p for p in f.params)}):")
+        proprios = set(f.param_ids) | {d.id for d in f.local_decls}
+        globais = sorted(n for id, n in _Atribuidos().de(f.comandos).items()
+                         if id not in proprios and id in self.globais)
+        if globais:
+            linhas.append(f"    global {', '.join('v_' + n for n in globais)}")
+        self.visiveis = set(f.param_ids)
+        self.n_temporarias = 0
+        for d in f.local_decls:
+            antes: List[str] = []
+            texto = self.exp(d.expr, antes)
+            linhas += ['    ' + a for a in antes]
+            linhas.append(f"    l_{d.nome} = {texto}")
+            self.visiveis.add(d.id)
+        self.comandos(f.comandos, 1, linhas)
+        self.retorno(f.resultado, linhas)
+        linhas.append("")
+
+
+def transpila(programa: Programa) -> str:
+    """Fonte Python do programa: os defs das funções e _main (globais, comandos e resultado)."""
+    t = _Transpilador(programa)
+    linhas: List[str] = []
+    t.chamaveis = t.funcoes
+    t.globais = {d.id for d in programa.var_decls}
+    for f in programa.fun_decls:
+        t.funcao(f, linhas)
+
+    # _main: globais em ordem (cada inicializador só enxerga as anteriores e nenhuma função),
+    # depois os comandos do main
+    t.visiveis = set()
+    t.n_temporarias = 0
+    t.globais = set()
+    t.chamaveis = {}
+    linhas.append("def _main():")
+    nomes = sorted({d.nome for d in programa.var_decls})
+    if nomes:
+        linhas.append(f"    global {', '.join('v_' + n for n in nomes)}")
+    for d in programa.var_decls:
+        antes: List[str] = []
+        texto = t.exp(d.expr, antes)
+        linhas += ['    ' + a for a in antes]
+        linhas.append(f"    v_{d.nome} = {texto}")
+        t.globais.add(d.id)
+    t.chamaveis = t.funcoes
+    t.comandos(programa.comandos, 1, linhas)
+    t.retorno(programa.resultado, linhas)
+    return "\n".join(linhas) + "\n"
+
+
+def compila_python(programa: Programa, symtab: Optional[Dict[int, Dict[str, Any]]] = None) -> ProgramaPython:
+    """
+    Transpila o programa (verificado por build_symbol_table_and_offsets, que é chamada aqui se a
+    symtab não for dada) e compila o fonte (ou pega o objeto de código já guardado).
+    """
+    if symtab is None:
+        build_symbol_table_and_offsets(programa)
+    return ProgramaPython(transpila(programa))
+
+
+def avalia_python(programa: Programa) -> int:
+    return compila_python(programa).executa()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Uso: python transpiladorPython.py <arquivo.txt>")
+        sys.exit(1)
+    from analisadorLexico import AnalizadorLexico
+    from analisadorSintatico import Parser
+    with open(sys.argv[1], 'r') as f:
+        programa = Parser(AnalizadorLexico(f.read()).tokenizador()).parse()
+    compilado = compila_python(programa)
+    print(compilado.fonte)
+    print(compilado.executa())